@@ -1,13 +1,13 @@
 from django.contrib import admin
 from .models import (
     AccessDevice, AccessZone, AccessLog, AccessAlert,
-    ClientAccessCredential, AccessSchedule
+    ClientAccessCredential, AccessSchedule, GymAccessKey
 )
 
 
 @admin.register(AccessDevice)
 class AccessDeviceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'gym', 'device_type', 'status', 'is_active', 'last_heartbeat']
+    list_display = ['name', 'gym', 'device_type', 'validation_mode', 'status', 'is_active', 'last_heartbeat']
     list_filter = ['gym', 'device_type', 'status', 'provider', 'is_active']
     search_fields = ['name', 'device_id', 'ip_address']
     readonly_fields = ['last_heartbeat', 'created_at', 'updated_at']
@@ -52,3 +52,11 @@ class AccessScheduleAdmin(admin.ModelAdmin):
     list_filter = ['gym', 'is_active']
     search_fields = ['name']
     filter_horizontal = ['membership_plans']
+
+
+@admin.register(GymAccessKey)
+class GymAccessKeyAdmin(admin.ModelAdmin):
+    list_display = ['key_id', 'gym', 'is_active', 'retired_at', 'created_at']
+    list_filter = ['gym', 'is_active']
+    fields = ['gym', 'key_id', 'public_key', 'is_active', 'retired_at', 'created_at']
+    readonly_fields = ['gym', 'key_id', 'public_key', 'created_at']
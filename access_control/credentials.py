@@ -0,0 +1,251 @@
+"""
+Credenciales de acceso firmadas (Ed25519 por gimnasio)
+======================================================
+Emisión en el servidor de las credenciales que muestra la app y de la
+instantánea que sincronizan las puertas en modo LOCAL. El formato y la
+verificación están en access_control.offline (compartido con la puerta).
+
+- issue_credential(client): credencial corta (ACCESS_CREDENTIAL_TTL) con el
+  plan de la membresía activa, limitada al fin de la membresía.
+- public_keys(gym_id): claves públicas aceptadas (caché), para verificar en
+  el servidor sin consultar la base de datos.
+- build_snapshot(device): allowlist de socios con membresía activa
+  (ids ordenados, codificados en diferencias), clientes bloqueados, planes de
+  la zona de la puerta y horarios por plan.
+- record_offline_logs(device, events): alta por lotes de los AccessLog
+  subidos por la puerta (idempotente por id de evento).
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, time as dt_time
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .offline import CREDENTIAL_PREFIX, Claims, b64decode, b64encode, encode_payload
+from .models import AccessLog, AccessSchedule, GymAccessKey
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_TTL = getattr(settings, 'ACCESS_CREDENTIAL_TTL', 300)
+
+# La puerta deja de validar en local si no sincroniza en este tiempo
+SNAPSHOT_MAX_AGE = getattr(settings, 'ACCESS_SNAPSHOT_MAX_AGE', 24 * 3600)
+SNAPSHOT_REFRESH_SECONDS = 60
+SNAPSHOT_CACHE_TTL = 30
+
+MAX_EVENTS_PER_UPLOAD = 1000
+
+PUBLIC_KEYS_CACHE_KEY = 'access_keys:{}'
+SNAPSHOT_CACHE_KEY = 'access_snapshot:{}:{}'
+
+
+# -----------------------------------------------------------------------------
+# Claves
+# -----------------------------------------------------------------------------
+
+def create_key(gym):
+    """Genera una clave nueva y la deja como la de firma del gimnasio."""
+    private = Ed25519PrivateKey.generate()
+    public = private.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    with transaction.atomic():
+        GymAccessKey.objects.filter(gym=gym, is_active=True).update(is_active=False)
+        key = GymAccessKey(gym=gym, key_id=os.urandom(4).hex(), public_key=b64encode(public))
+        key.private_key = b64encode(private.private_bytes_raw())
+        key.save()
+    cache.delete(PUBLIC_KEYS_CACHE_KEY.format(gym.id))
+    return key
+
+
+def rotate_key(gym, retire_previous=False):
+    """
+    Nueva clave de firma. Las anteriores se siguen aceptando (credenciales
+    ya emitidas) salvo retire_previous=True (clave comprometida).
+    """
+    previous = list(GymAccessKey.objects.filter(gym=gym, retired_at__isnull=True).values_list('pk', flat=True))
+    key = create_key(gym)
+    if retire_previous:
+        GymAccessKey.objects.filter(pk__in=previous).update(retired_at=timezone.now())
+        cache.delete(PUBLIC_KEYS_CACHE_KEY.format(gym.id))
+    return key
+
+
+def get_signing_key(gym):
+    key = GymAccessKey.objects.filter(gym=gym, is_active=True, retired_at__isnull=True).first()
+    return key or create_key(gym)
+
+
+def public_keys(gym_id):
+    """{key_id: clave pública base64url} aceptadas para el gimnasio."""
+    cache_key = PUBLIC_KEYS_CACHE_KEY.format(gym_id)
+    keys = cache.get(cache_key)
+    if keys is None:
+        keys = dict(
+            GymAccessKey.objects.filter(gym_id=gym_id, retired_at__isnull=True).values_list('key_id', 'public_key')
+        )
+        cache.set(cache_key, keys, 3600)
+    return keys
+
+
+# -----------------------------------------------------------------------------
+# Emisión
+# -----------------------------------------------------------------------------
+
+def active_memberships(gym, today=None):
+    from clients.models import ClientMembership
+
+    today = today or timezone.localdate()
+    return ClientMembership.objects.filter(
+        gym=gym, status='ACTIVE', start_date__lte=today,
+    ).filter(models.Q(end_date__isnull=True) | models.Q(end_date__gte=today))
+
+
+def issue_credential(client, membership=None, now=None):
+    """
+    Firma una credencial para el cliente. Devuelve (token, expira_en_epoch)
+    o (None, None) si no puede acceder (bloqueado o sin membresía activa).
+    """
+    if client.status == 'BLOCKED':
+        return None, None
+    if membership is None:
+        membership = active_memberships(client.gym).filter(client=client).order_by('-start_date').first()
+    if membership is None:
+        return None, None
+
+    now = int(now if now is not None else time.time())
+    not_after = now + CREDENTIAL_TTL
+    if membership.end_date:
+        end_of_membership = timezone.make_aware(datetime.combine(membership.end_date, dt_time.max))
+        not_after = min(not_after, int(end_of_membership.timestamp()))
+
+    key = get_signing_key(client.gym)
+    claims = Claims(key.key_id, client.gym_id, client.id, now, not_after, membership.plan_id)
+    payload = encode_payload(claims)
+    signature = Ed25519PrivateKey.from_private_bytes(b64decode(key.private_key)).sign(payload)
+    return f"{CREDENTIAL_PREFIX}{b64encode(payload)}.{b64encode(signature)}", not_after
+
+
+# -----------------------------------------------------------------------------
+# Instantánea para las puertas
+# -----------------------------------------------------------------------------
+
+def delta_encode(ids):
+    """[3, 7, 8, 20] -> [3, 4, 1, 12] (ids ordenados)."""
+    previous = 0
+    encoded = []
+    for value in ids:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+def _schedule_slots(gym):
+    slots = {}
+    schedules = AccessSchedule.objects.filter(gym=gym, is_active=True).prefetch_related('membership_plans')
+    for schedule in schedules:
+        slot = [sorted(schedule.days_of_week), schedule.start_time.strftime('%H:%M'), schedule.end_time.strftime('%H:%M')]
+        for plan in schedule.membership_plans.all():
+            slots.setdefault(str(plan.id), []).append(slot)
+    return slots
+
+
+def build_snapshot(device):
+    """Instantánea de validación local para un dispositivo (caché corta por zona)."""
+    from clients.models import Client
+
+    gym = device.gym
+    zone = device.zone
+    cache_key = SNAPSHOT_CACHE_KEY.format(gym.id, zone.id if zone else 0)
+    snapshot = cache.get(cache_key)
+    if snapshot is not None:
+        return snapshot
+
+    get_signing_key(gym)  # La puerta necesita al menos una clave aunque aún no se haya emitido nada
+    members = sorted(set(
+        active_memberships(gym).exclude(client__status='BLOCKED').values_list('client_id', flat=True)
+    ))
+    revoked = sorted(Client.objects.filter(gym=gym, status='BLOCKED').values_list('id', flat=True))
+
+    content = {
+        'gym_id': gym.id,
+        'timezone': settings.TIME_ZONE,
+        'keys': public_keys(gym.id),
+        'members': delta_encode(members),
+        'revoked': revoked,
+        'zone': {
+            'id': zone.id,
+            'restricted': zone.requires_specific_membership,
+            'plans': sorted(zone.allowed_membership_plans.values_list('id', flat=True)),
+        } if zone else None,
+        'schedules': _schedule_slots(gym),
+    }
+    version = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+    snapshot = {
+        **content,
+        'version': version,
+        'generated_at': int(time.time()),
+        'max_age': SNAPSHOT_MAX_AGE,
+        'refresh_interval': SNAPSHOT_REFRESH_SECONDS,
+    }
+    cache.set(cache_key, snapshot, SNAPSHOT_CACHE_TTL)
+    return snapshot
+
+
+# -----------------------------------------------------------------------------
+# Subida de registros de la puerta
+# -----------------------------------------------------------------------------
+
+def _event_timestamp(value):
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    parsed = parse_datetime(value or '')
+    return parsed or timezone.now()
+
+
+def record_offline_logs(device, events):
+    """
+    Crea los AccessLog de un lote de eventos de la puerta. Los eventos ya
+    subidos (reintentos) se ignoran. Devuelve el número de registros nuevos.
+    """
+    from clients.models import Client
+
+    events = [e for e in events[:MAX_EVENTS_PER_UPLOAD] if isinstance(e, dict) and e.get('id')]
+    client_ids = {e.get('client_id') for e in events if e.get('client_id')}
+    valid_clients = set(
+        Client.objects.filter(gym=device.gym, id__in=client_ids).values_list('id', flat=True)
+    )
+    denial_reasons = {code for code, _ in AccessLog.DENIAL_REASONS}
+
+    logs = [
+        AccessLog(
+            gym=device.gym,
+            device=device,
+            client_id=e['client_id'] if e.get('client_id') in valid_clients else None,
+            direction='EXIT' if e.get('direction') == 'EXIT' else 'ENTRY',
+            status='GRANTED' if e.get('status') == 'GRANTED' else 'DENIED',
+            denial_reason=e.get('denial_reason') if e.get('denial_reason') in denial_reasons else '',
+            credential_type='QR_DYNAMIC',
+            credential_value_masked=f"GC1 {e.get('key_id', '')}".strip()[:50],
+            timestamp=_event_timestamp(e.get('timestamp')),
+            raw_data={'offline': True},
+            device_event_id=str(e['id'])[:64],
+        )
+        for e in events
+    ]
+    existing = set(
+        AccessLog.objects.filter(device=device, device_event_id__in=[log.device_event_id for log in logs])
+        .values_list('device_event_id', flat=True)
+    )
+    new_logs = [log for log in logs if log.device_event_id not in existing]
+    # ignore_conflicts cubre dos subidas simultáneas del mismo lote
+    AccessLog.objects.bulk_create(new_logs, batch_size=500, ignore_conflicts=True)
+    logger.info(f"Dispositivo {device.id}: {len(new_logs)} accesos offline registrados ({len(events)} recibidos)")
+    return len(new_logs)
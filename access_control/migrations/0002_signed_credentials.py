@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('access_control', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymAccessKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_id', models.CharField(help_text='Identificador (hex) incluido en cada credencial', max_length=8, unique=True)),
+                ('public_key', models.CharField(help_text='Clave pública (base64url)', max_length=64)),
+                ('_private_key_encrypted', models.TextField(db_column='private_key')),
+                ('is_active', models.BooleanField(default=True, help_text='Se usa para firmar credenciales nuevas')),
+                ('retired_at', models.DateTimeField(blank=True, help_text='Deja de aceptarse en las puertas', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Clave de Firma de Accesos',
+                'verbose_name_plural': 'Claves de Firma de Accesos',
+                'ordering': ['gym', '-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='accessdevice',
+            name='validation_mode',
+            field=models.CharField(choices=[('SERVER', 'Validación en servidor'), ('LOCAL', 'Validación local (credencial firmada)')], default='SERVER', help_text='LOCAL: la puerta verifica las credenciales firmadas con la instantánea sincronizada', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='accesslog',
+            name='device_event_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='accesslog',
+            constraint=models.UniqueConstraint(condition=models.Q(('device_event_id__isnull', False)), fields=('device', 'device_event_id'), name='unique_access_log_device_event'),
+        ),
+        migrations.AddField(
+            model_name='gymaccesskey',
+            name='gym',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_keys', to='organizations.gym'),
+        ),
+    ]
@@ -106,6 +106,16 @@ class AccessDevice(models.Model):
         default=False,
         help_text="Permitir acceso cuando el dispositivo está offline (usa caché local)"
     )
+    VALIDATION_MODES = [
+        ('SERVER', 'Validación en servidor'),
+        ('LOCAL', 'Validación local (credencial firmada)'),
+    ]
+    validation_mode = models.CharField(
+        max_length=10,
+        choices=VALIDATION_MODES,
+        default='SERVER',
+        help_text="LOCAL: la puerta verifica las credenciales firmadas con la instantánea sincronizada"
+    )
     timeout_seconds = models.IntegerField(default=5, help_text="Timeout de conexión en segundos")
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -278,6 +288,45 @@ class ClientAccessCredential(models.Model):
         return True
 
 
+class GymAccessKey(models.Model):
+    """
+    Clave Ed25519 con la que el gimnasio firma las credenciales de acceso
+    (ver access_control.credentials). La privada se guarda cifrada; las
+    públicas vigentes se envían a las puertas en la instantánea offline.
+    """
+    gym = models.ForeignKey(
+        'organizations.Gym',
+        on_delete=models.CASCADE,
+        related_name='access_keys'
+    )
+    key_id = models.CharField(max_length=8, unique=True, help_text="Identificador (hex) incluido en cada credencial")
+    public_key = models.CharField(max_length=64, help_text="Clave pública (base64url)")
+    _private_key_encrypted = models.TextField(db_column='private_key')
+    
+    is_active = models.BooleanField(default=True, help_text="Se usa para firmar credenciales nuevas")
+    retired_at = models.DateTimeField(null=True, blank=True, help_text="Deja de aceptarse en las puertas")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Clave de Firma de Accesos"
+        verbose_name_plural = "Claves de Firma de Accesos"
+        ordering = ['gym', '-created_at']
+    
+    def __str__(self):
+        return f"{self.gym} - {self.key_id}"
+    
+    @property
+    def private_key(self):
+        """Clave privada (base64url) descifrada."""
+        from core.security_utils import decrypt_value
+        return decrypt_value(self._private_key_encrypted) or ''
+    
+    @private_key.setter
+    def private_key(self, value):
+        from core.security_utils import encrypt_value
+        self._private_key_encrypted = encrypt_value(value)
+
+
 class AccessLog(models.Model):
     """
     Registro de entradas y salidas.
@@ -370,6 +419,9 @@ class AccessLog(models.Model):
     )
     notes = models.TextField(blank=True, help_text="Notas adicionales")
     
+    # Identificador del evento en la puerta (subida por lotes, idempotente)
+    device_event_id = models.CharField(max_length=64, null=True, blank=True)
+    
     class Meta:
         verbose_name = "Registro de Acceso"
         verbose_name_plural = "Registros de Acceso"
@@ -380,6 +432,13 @@ class AccessLog(models.Model):
             models.Index(fields=['device', 'timestamp']),
             models.Index(fields=['status', 'timestamp']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['device', 'device_event_id'],
+                name='unique_access_log_device_event',
+                condition=models.Q(device_event_id__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         client_name = self.client.full_name if self.client else "Desconocido"
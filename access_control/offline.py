@@ -0,0 +1,194 @@
+"""
+Validación local de credenciales firmadas (modo puerta)
+=======================================================
+Formato de la credencial que muestra la app (QR):
+
+    GC1.<base64url(payload)>.<base64url(firma Ed25519)>
+
+payload (25 bytes, big-endian):
+    versión (1) | key_id (4) | gym_id (4) | client_id (4)
+    | válido desde (4, epoch) | válido hasta (4, epoch) | plan_id (4, 0 = sin plan)
+
+La firma se hace con la clave Ed25519 del gimnasio (GymAccessKey). Las
+puertas en modo LOCAL verifican la credencial sin consultar el servidor,
+contra una instantánea sincronizada periódicamente
+(`GET /api/access/offline/snapshot/`) con:
+
+- keys:      claves públicas vigentes {key_id: base64url}
+- members:   allowlist de socios con membresía activa (ids ordenados,
+             codificados como diferencias con el anterior)
+- revoked:   clientes bloqueados (sus credenciales ya emitidas no valen)
+- zone:      planes permitidos en la zona de la puerta (si la restringe)
+- schedules: franjas horarias por plan
+
+Los accesos se acumulan en OfflineValidator.pending y se suben por lotes
+(`POST /api/access/offline/logs/`).
+
+Este módulo no depende de Django (solo de `cryptography`) para poder
+distribuirse tal cual en el controlador de la puerta.
+"""
+import base64
+import struct
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, time as dt_time
+from itertools import accumulate
+from zoneinfo import ZoneInfo
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+CREDENTIAL_PREFIX = 'GC1.'
+CREDENTIAL_VERSION = 1
+PAYLOAD_FORMAT = '>B4sIIIII'
+
+# Tolerancia de reloj entre el móvil, el servidor y la puerta
+CLOCK_SKEW_SECONDS = 30
+
+Claims = namedtuple('Claims', ['key_id', 'gym_id', 'client_id', 'not_before', 'not_after', 'plan_id'])
+
+
+class InvalidCredential(Exception):
+    """Credencial mal formada o con firma no válida."""
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def encode_payload(claims: Claims) -> bytes:
+    return struct.pack(
+        PAYLOAD_FORMAT, CREDENTIAL_VERSION, bytes.fromhex(claims.key_id), claims.gym_id,
+        claims.client_id, claims.not_before, claims.not_after, claims.plan_id or 0,
+    )
+
+
+def parse_credential(token: str):
+    """Devuelve (Claims, payload, firma) sin verificar la firma."""
+    if not token or not token.startswith(CREDENTIAL_PREFIX):
+        raise InvalidCredential('Formato desconocido')
+    try:
+        payload_b64, signature_b64 = token[len(CREDENTIAL_PREFIX):].split('.')
+        payload, signature = b64decode(payload_b64), b64decode(signature_b64)
+        version, key_id, gym_id, client_id, not_before, not_after, plan_id = struct.unpack(PAYLOAD_FORMAT, payload)
+    except (ValueError, struct.error):
+        raise InvalidCredential('Credencial mal formada')
+    if version != CREDENTIAL_VERSION:
+        raise InvalidCredential('Versión no soportada')
+    return Claims(key_id.hex(), gym_id, client_id, not_before, not_after, plan_id or None), payload, signature
+
+
+def verify_credential(token: str, public_keys: dict) -> Claims:
+    """
+    Verifica la firma contra {key_id: clave pública en bytes o base64url}.
+    No comprueba la vigencia (ver check_window).
+    """
+    claims, payload, signature = parse_credential(token)
+    public_key = public_keys.get(claims.key_id)
+    if public_key is None:
+        raise InvalidCredential('Clave desconocida')
+    if isinstance(public_key, str):
+        public_key = b64decode(public_key)
+    try:
+        Ed25519PublicKey.from_public_bytes(public_key).verify(signature, payload)
+    except (InvalidSignature, ValueError):
+        raise InvalidCredential('Firma no válida')
+    return claims
+
+
+def check_window(claims: Claims, now: float) -> bool:
+    return claims.not_before - CLOCK_SKEW_SECONDS <= now <= claims.not_after + CLOCK_SKEW_SECONDS
+
+
+def schedule_allows(slots, local_dt: datetime) -> bool:
+    """Igual que AccessSchedule.is_access_allowed_now para [[días, 'HH:MM', 'HH:MM'], ...]."""
+    current = local_dt.time()
+    for days, start, end in slots:
+        if local_dt.weekday() not in days:
+            continue
+        start, end = dt_time.fromisoformat(start), dt_time.fromisoformat(end)
+        if start <= end and start <= current <= end:
+            return True
+        if start > end and (current >= start or current <= end):
+            return True
+    return False
+
+
+class OfflineValidator:
+    """
+    Validación en la puerta contra una instantánea del servidor.
+    Las decisiones tienen la misma forma que AccessValidationResult.to_dict().
+    """
+
+    def __init__(self, snapshot: dict):
+        self.pending = []
+        self.load(snapshot)
+
+    def load(self, snapshot: dict):
+        """Carga (o sustituye tras sincronizar) la instantánea."""
+        self.snapshot = snapshot
+        self.gym_id = snapshot['gym_id']
+        self.keys = {key_id: b64decode(key) for key_id, key in snapshot['keys'].items()}
+        self.members = set(accumulate(snapshot.get('members', [])))
+        self.revoked = set(snapshot.get('revoked', []))
+        zone = snapshot.get('zone')
+        self.zone_plans = set(zone['plans']) if zone and zone.get('restricted') else None
+        self.schedules = {int(plan_id): slots for plan_id, slots in (snapshot.get('schedules') or {}).items()}
+        self.tz = ZoneInfo(snapshot.get('timezone') or 'UTC')
+
+    def is_stale(self, now: float) -> bool:
+        return now - self.snapshot['generated_at'] > self.snapshot.get('max_age', 86400)
+
+    def _decide(self, token: str, now: float):
+        if self.is_stale(now):
+            return None, 'DEVICE_ERROR', 'Instantánea de accesos caducada'
+        try:
+            claims = verify_credential(token, self.keys)
+        except InvalidCredential:
+            return None, 'INVALID_CREDENTIAL', 'Credencial no reconocida'
+        if claims.gym_id != self.gym_id:
+            return claims, 'INVALID_CREDENTIAL', 'Credencial de otro centro'
+        if not check_window(claims, now):
+            return claims, 'CREDENTIAL_EXPIRED', 'Credencial expirada'
+        if claims.client_id in self.revoked:
+            return claims, 'ACCOUNT_BLOCKED', 'Acceso revocado'
+        if claims.plan_id is None or claims.client_id not in self.members:
+            return claims, 'NO_MEMBERSHIP', 'No tienes una membresía activa'
+
+        slots = self.schedules.get(claims.plan_id)
+        if slots and not schedule_allows(slots, datetime.fromtimestamp(now, self.tz)):
+            return claims, 'SCHEDULE_RESTRICTED', 'Tu plan no permite acceso en este horario'
+        if self.zone_plans is not None and claims.plan_id not in self.zone_plans:
+            return claims, 'ZONE_NOT_ALLOWED', 'Tu plan no incluye acceso a esta zona'
+        return claims, '', 'Acceso concedido'
+
+    def validate(self, token: str, direction: str = 'ENTRY', now: float = None) -> dict:
+        """Decide el acceso y lo encola para la subida por lotes."""
+        now = time.time() if now is None else now
+        claims, denial_reason, message = self._decide(token, now)
+        granted = not denial_reason
+        self.pending.append({
+            'id': uuid.uuid4().hex,
+            'client_id': claims.client_id if claims else None,
+            'direction': direction,
+            'status': 'GRANTED' if granted else 'DENIED',
+            'denial_reason': denial_reason,
+            'timestamp': int(now),
+            'key_id': claims.key_id if claims else '',
+        })
+        return {
+            'granted': granted,
+            'client_id': claims.client_id if claims else None,
+            'denial_reason': denial_reason,
+            'message': message,
+        }
+
+    def drain(self, limit: int = 500) -> list:
+        """Saca hasta `limit` registros pendientes para subirlos."""
+        batch, self.pending = self.pending[:limit], self.pending[limit:]
+        return batch
@@ -92,6 +92,14 @@ class AccessControlService:
                 message='Credencial expirada o inactiva'
             )
         
+        return self._validate_client(client, device)
+    
+    def _validate_client(
+        self,
+        client: Client,
+        device: Optional[AccessDevice] = None
+    ) -> AccessValidationResult:
+        """Comprobaciones del cliente una vez identificada la credencial."""
         # 3. Verificar estado del cliente
         if client.status == 'BLOCKED':
             return AccessValidationResult(
@@ -423,11 +431,62 @@ class AccessControlService:
             id__in=occupancy['client_ids']
         ).values('id', 'first_name', 'last_name', 'email', 'photo'))
     
+    def validate_signed_credential(
+        self,
+        token: str,
+        device: Optional[AccessDevice] = None
+    ) -> AccessValidationResult:
+        """
+        Valida una credencial firmada (GC1.) de la app. La firma y la vigencia
+        se comprueban sin base de datos (claves públicas en caché); después
+        se aplican las comprobaciones habituales del cliente.
+        """
+        from .credentials import public_keys
+        from .offline import InvalidCredential, check_window, verify_credential
+        
+        try:
+            claims = verify_credential(token, public_keys(self.gym.id))
+        except InvalidCredential:
+            return AccessValidationResult(
+                granted=False,
+                denial_reason='INVALID_CREDENTIAL',
+                message='QR inválido o expirado'
+            )
+        
+        if claims.gym_id != self.gym.id:
+            return AccessValidationResult(
+                granted=False,
+                denial_reason='INVALID_CREDENTIAL',
+                message='QR de otro centro'
+            )
+        
+        client = Client.objects.filter(id=claims.client_id, gym=self.gym).first()
+        if not client:
+            return AccessValidationResult(
+                granted=False,
+                denial_reason='INVALID_CREDENTIAL',
+                message='QR inválido o expirado'
+            )
+        
+        if not check_window(claims, timezone.now().timestamp()):
+            return AccessValidationResult(
+                granted=False,
+                client=client,
+                denial_reason='CREDENTIAL_EXPIRED',
+                message='QR expirado'
+            )
+        
+        return self._validate_client(client, device)
+    
     def validate_qr_token(self, token: str, device: Optional[AccessDevice] = None) -> AccessValidationResult:
         """
         Valida un token QR dinámico de la app móvil.
         """
         from clients.models import Client
+        from .offline import CREDENTIAL_PREFIX
+        
+        if token.startswith(CREDENTIAL_PREFIX):
+            return self.validate_signed_credential(token, device)
         
         try:
             # Buscar cliente por token QR activo
@@ -32,4 +32,6 @@ api_urlpatterns = [
     path('access/validate-qr/', views.api_validate_qr, name='api_access_validate_qr'),
     path('access/heartbeat/', views.api_device_heartbeat, name='api_access_heartbeat'),
     path('access/occupancy/', views.api_get_occupancy, name='api_access_occupancy'),
+    path('access/offline/snapshot/', views.api_offline_snapshot, name='api_access_offline_snapshot'),
+    path('access/offline/logs/', views.api_offline_logs, name='api_access_offline_logs'),
 ]
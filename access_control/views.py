@@ -9,11 +9,11 @@ Incluye:
 
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponseNotModified, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta, datetime
 from functools import wraps
@@ -22,6 +22,7 @@ import hmac
 import hashlib
 import logging
 
+from clients.search import search_q
 from .models import AccessDevice, AccessZone, AccessLog, AccessAlert, ClientAccessCredential
 from core.ratelimit import get_client_ip
 from .services import AccessControlService
@@ -198,11 +199,7 @@ def access_log_list(request):
     if date_to:
         logs = logs.filter(timestamp__date__lte=date_to)
     if client_search:
-        logs = logs.filter(
-            Q(client__first_name__icontains=client_search) |
-            Q(client__last_name__icontains=client_search) |
-            Q(client__email__icontains=client_search)
-        )
+        logs = logs.filter(search_q(client_search, prefix='client__'))
     if device_id:
         logs = logs.filter(device_id=device_id)
     
@@ -573,6 +570,78 @@ def api_get_occupancy(request):
     return JsonResponse(occupancy)
 
 
+@csrf_exempt
+@require_device_api_key
+@require_http_methods(['GET'])
+def api_offline_snapshot(request):
+    """
+    Instantánea para la validación local de credenciales firmadas.
+    
+    SECURITY: Requires valid API Key in X-API-Key header.
+    
+    GET /api/access/offline/snapshot/
+    Headers: X-API-Key: <device_api_key>, If-None-Match: "<version>"
+    
+    Solo para dispositivos en modo LOCAL o con modo offline permitido.
+    Responde 304 si la puerta ya tiene la versión actual.
+    """
+    from .credentials import build_snapshot
+    
+    device = request.access_device
+    if device.validation_mode != 'LOCAL' and not device.allow_offline_mode:
+        return JsonResponse({'error': 'Device not in local validation mode'}, status=403)
+    
+    device.update_heartbeat()
+    snapshot = build_snapshot(device)
+    etag = f'"{snapshot["version"]}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(snapshot)
+    response['ETag'] = etag
+    return response
+
+
+@csrf_exempt
+@require_device_api_key
+@require_http_methods(['POST'])
+def api_offline_logs(request):
+    """
+    Subida por lotes de los accesos validados en la puerta.
+    
+    SECURITY: Requires valid API Key in X-API-Key header.
+    
+    POST /api/access/offline/logs/
+    Headers: X-API-Key: <device_api_key>
+    {
+        "events": [
+            {"id": "uuid", "client_id": 123, "direction": "ENTRY",
+             "status": "GRANTED", "denial_reason": "", "timestamp": 1760000000}
+        ]
+    }
+    
+    Los eventos ya recibidos (reintentos) se ignoran.
+    """
+    from .credentials import MAX_EVENTS_PER_UPLOAD, record_offline_logs
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    events = data.get('events')
+    if not isinstance(events, list):
+        return JsonResponse({'error': 'Missing required field: events'}, status=400)
+    if len(events) > MAX_EVENTS_PER_UPLOAD:
+        return JsonResponse({'error': f'Max {MAX_EVENTS_PER_UPLOAD} events per request'}, status=400)
+    
+    device = request.access_device
+    device.update_heartbeat()
+    created = record_offline_logs(device, events)
+    
+    return JsonResponse({'success': True, 'received': len(events), 'created': created})
+
+
 # ===========================================
 # API JSON PARA FRONTEND (AJAX)
 # ===========================================
@@ -712,6 +781,10 @@ def api_device_bulk(request):
 # VISTAS CRUD DE DISPOSITIVOS Y ZONAS
 # ===========================================
 
+def _validation_mode(value):
+    return value if value in dict(AccessDevice.VALIDATION_MODES) else 'SERVER'
+
+
 @login_required
 def device_create(request):
     """Crear nuevo dispositivo de acceso."""
@@ -732,6 +805,7 @@ def device_create(request):
             ip_address=request.POST.get('ip_address') or None,
             api_key=request.POST.get('api_key') or uuid.uuid4().hex,
             is_active='is_active' in request.POST,
+            validation_mode=_validation_mode(request.POST.get('validation_mode')),
         )
         
         zone_id = request.POST.get('zone')
@@ -749,6 +823,7 @@ def device_create(request):
         'zones': zones,
         'provider_choices': AccessDevice.PROVIDER_CHOICES,
         'device_type_choices': AccessDevice.DEVICE_TYPES,
+        'validation_mode_choices': AccessDevice.VALIDATION_MODES,
     })
 
 
@@ -775,6 +850,7 @@ def device_edit(request, device_id):
             device.api_key = request.POST.get('api_key')
         
         device.is_active = 'is_active' in request.POST
+        device.validation_mode = _validation_mode(request.POST.get('validation_mode'))
         
         zone_id = request.POST.get('zone')
         device.zone_id = zone_id if zone_id else None
@@ -797,6 +873,7 @@ def device_edit(request, device_id):
         'api_key': {'value': device.api_key},
         'is_active': {'value': device.is_active},
         'zone': {'value': str(device.zone_id) if device.zone_id else ''},
+        'validation_mode': {'value': device.validation_mode},
     }
     
     return render(request, 'backoffice/access_control/device_form.html', {
@@ -805,6 +882,7 @@ def device_edit(request, device_id):
         'zones': zones,
         'provider_choices': AccessDevice.PROVIDER_CHOICES,
         'device_type_choices': AccessDevice.DEVICE_TYPES,
+        'validation_mode_choices': AccessDevice.VALIDATION_MODES,
     })
 
 
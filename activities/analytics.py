@@ -1,19 +1,69 @@
 """
 Analytics y reportes para el sistema de actividades y asistencias.
 Inspirado en Mindbody, Glofox, WellnessLiving.
+
+Las métricas agregables (sesiones, aforo, asistencia, no-shows, cancelaciones)
+se leen de la tabla de hechos AttendanceFact (ver activities.rollups), de modo
+que los dashboards no re-agregan ActivitySession × attendees en cada carga.
+Las métricas no aditivas (clientes únicos, valoraciones) se consultan aparte.
 """
 from django.db.models import Count, Avg, Q, F, Sum, Max, Min, FloatField
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth, ExtractHour, ExtractWeekDay
+from django.db.models.functions import TruncWeek, TruncMonth, ExtractWeekDay
 from django.utils import timezone
 from datetime import timedelta, datetime
 from decimal import Decimal
 from collections import defaultdict
 
-from .models import ActivitySession, Activity, Room
+from .models import ActivitySession, Activity, Room, AttendanceFact, ClassReview
 from clients.models import ClientVisit
 from staff.models import StaffProfile
 
 
+def _as_local_date(value):
+    """Fecha local de un datetime (aware o naive) o date."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _facts(gym, start_date, end_date):
+    """Hechos de asistencia del gimnasio en el rango (por día local, ambos incluidos)."""
+    return AttendanceFact.objects.filter(
+        gym=gym,
+        date__gte=_as_local_date(start_date),
+        date__lte=_as_local_date(end_date)
+    )
+
+
+def _ratio(numerator, denominator, percent=False, digits=2):
+    if not denominator:
+        return 0
+    value = numerator / denominator
+    return round(value * 100 if percent else value, digits)
+
+
+def _period_expression(period, default='daily'):
+    """Expresión de agrupación temporal sobre AttendanceFact.date."""
+    period = period if period in ('daily', 'weekly', 'monthly') else default
+    if period == 'weekly':
+        return TruncWeek('date')
+    if period == 'monthly':
+        return TruncMonth('date')
+    return F('date')
+
+
+def _session_range_filter(gym, start_date, end_date):
+    """Filtro de sesiones completadas equivalente al rango de _facts()."""
+    return {
+        'gym': gym,
+        'status': 'COMPLETED',
+        'start_datetime__date__gte': _as_local_date(start_date),
+        'start_datetime__date__lte': _as_local_date(end_date),
+    }
+
+
 class AttendanceAnalytics:
     """Analytics para asistencias a clases"""
     
@@ -27,23 +77,18 @@ class AttendanceAnalytics:
         Genera datos para heatmap de asistencia por día/hora.
         Returns: {day_of_week: {hour: attendance_count}}
         """
-        sessions = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
+        cells = _facts(self.gym, self.start_date, self.end_date).filter(
+            completed_sessions__gt=0
         ).annotate(
-            day_of_week=ExtractWeekDay('start_datetime'),
-            hour=ExtractHour('start_datetime'),
-            attendance=Count('attendees')
-        ).values('day_of_week', 'hour', 'attendance')
+            day_of_week=ExtractWeekDay('date')
+        ).values('day_of_week', 'hour').annotate(
+            attendance=Sum('attendance')
+        )
         
         # Organizar en estructura de heatmap
         heatmap = defaultdict(lambda: defaultdict(int))
-        for session in sessions:
-            day = session['day_of_week']
-            hour = session['hour']
-            heatmap[day][hour] += session['attendance']
+        for cell in cells:
+            heatmap[cell['day_of_week']][cell['hour']] += cell['attendance']
         
         return dict(heatmap)
     
@@ -51,86 +96,62 @@ class AttendanceAnalytics:
         """
         Identifica las franjas horarias con más asistencia.
         """
-        peak_data = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
-        ).annotate(
-            hour=ExtractHour('start_datetime')
-        ).values('hour').annotate(
-            total_attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField()),
-            session_count=Count('id')
-        ).order_by('-total_attendance')[:top_n]
-        
-        return list(peak_data)
+        peak_data = _facts(self.gym, self.start_date, self.end_date).values('hour').annotate(
+            total_attendance=Sum('attendance'),
+            session_count=Sum('completed_sessions')
+        ).filter(session_count__gt=0).order_by('-total_attendance')[:top_n]
+        
+        return [
+            {**row, 'avg_attendance': _ratio(row['total_attendance'], row['session_count'])}
+            for row in peak_data
+        ]
     
     def get_occupancy_rate(self):
         """
         Calcula tasa de ocupación promedio (% de aforo usado).
         """
-        sessions = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED',
-            max_capacity__gt=0
-        ).annotate(
-            attendance_count=Count('attendees')
-        ).values('attendance_count', 'max_capacity')
-        
-        total_capacity = 0
-        total_attendance = 0
-        
-        for session in sessions:
-            total_capacity += session['max_capacity']
-            total_attendance += session['attendance_count']
-        
-        if total_capacity == 0:
-            return 0
-        
-        return round((total_attendance / total_capacity) * 100, 2)
+        totals = _facts(self.gym, self.start_date, self.end_date).aggregate(
+            capacity=Sum('capacity'),
+            attendance=Sum('occupancy_attendance')
+        )
+        return _ratio(totals['attendance'] or 0, totals['capacity'] or 0, percent=True)
     
     def get_attendance_trends(self, period='daily'):
         """
         Tendencias de asistencia en el tiempo.
         period: 'daily', 'weekly', 'monthly'
         """
-        trunc_func = {
-            'daily': TruncDate,
-            'weekly': TruncWeek,
-            'monthly': TruncMonth
-        }.get(period, TruncDate)
-        
-        trends = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
-        ).annotate(
-            period=trunc_func('start_datetime')
+        trends = _facts(self.gym, self.start_date, self.end_date).annotate(
+            period=_period_expression(period)
         ).values('period').annotate(
-            total_sessions=Count('id'),
-            total_attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField()),
-            occupancy_rate=Avg(
-                F('attendees__id') * 100.0 / F('max_capacity'),
-                output_field=FloatField()
-            )
-        ).order_by('period')
+            total_sessions=Sum('completed_sessions'),
+            total_attendance=Sum('attendance'),
+            total_capacity=Sum('capacity'),
+            occupancy_attendance=Sum('occupancy_attendance')
+        ).filter(total_sessions__gt=0).order_by('period')
         
-        return list(trends)
+        results = []
+        for row in trends:
+            capacity = row.pop('total_capacity')
+            occupancy_attendance = row.pop('occupancy_attendance')
+            row['avg_attendance'] = _ratio(row['total_attendance'], row['total_sessions'])
+            row['occupancy_rate'] = _ratio(occupancy_attendance, capacity, percent=True)
+            results.append(row)
+        return results
     
     def get_noshow_cancellation_rates(self):
         """
-        Tasas de no-show y cancelaciones.
+        Tasas de no-show y cancelaciones (sobre las reservas de clases).
+        Solo cuentan las reservas marcadas como asistidas, no los asistentes
+        sin reserva.
         """
-        total_bookings = ClientVisit.objects.filter(
-            client__gym=self.gym,
-            date__gte=self.start_date.date(),
-            date__lte=self.end_date.date()
-        ).count()
+        stats = _facts(self.gym, self.start_date, self.end_date).aggregate(
+            total_bookings=Sum('bookings'),
+            attended=Sum('attended_bookings'),
+            no_shows=Sum('no_shows'),
+            cancelled=Sum('cancellations')
+        )
+        total_bookings = stats['total_bookings'] or 0
         
         if total_bookings == 0:
             return {
@@ -143,42 +164,29 @@ class AttendanceAnalytics:
                 'attendance_rate': 0
             }
         
-        stats = ClientVisit.objects.filter(
-            client__gym=self.gym,
-            date__gte=self.start_date.date(),
-            date__lte=self.end_date.date()
-        ).aggregate(
-            attended=Count('id', filter=Q(status='ATTENDED')),
-            no_shows=Count('id', filter=Q(status='NOSHOW')),
-            cancelled=Count('id', filter=Q(status='CANCELLED'))
-        )
+        attended = stats['attended'] or 0
+        no_shows = stats['no_shows'] or 0
+        cancelled = stats['cancelled'] or 0
         
         return {
             'total_bookings': total_bookings,
-            'attended': stats['attended'],
-            'no_shows': stats['no_shows'],
-            'cancelled': stats['cancelled'],
-            'no_show_rate': round((stats['no_shows'] / total_bookings) * 100, 2),
-            'cancellation_rate': round((stats['cancelled'] / total_bookings) * 100, 2),
-            'attendance_rate': round((stats['attended'] / total_bookings) * 100, 2)
+            'attended': attended,
+            'no_shows': no_shows,
+            'cancelled': cancelled,
+            'no_show_rate': _ratio(no_shows, total_bookings, percent=True),
+            'cancellation_rate': _ratio(cancelled, total_bookings, percent=True),
+            'attendance_rate': _ratio(attended, total_bookings, percent=True)
         }
     
     def get_average_class_size(self):
         """
         Tamaño promedio de clase.
         """
-        avg = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
-        ).annotate(
-            attendance_count=Count('attendees')
-        ).aggregate(
-            avg_size=Avg('attendance_count')
+        totals = _facts(self.gym, self.start_date, self.end_date).aggregate(
+            sessions=Sum('completed_sessions'),
+            attendance=Sum('attendance')
         )
-        
-        return round(avg['avg_size'] or 0, 2)
+        return _ratio(totals['attendance'] or 0, totals['sessions'] or 0)
 
 
 class StaffAnalytics:
@@ -193,34 +201,49 @@ class StaffAnalytics:
         """
         Performance detallado por instructor.
         """
-        filters = {
-            'gym': self.gym,
-            'start_datetime__gte': self.start_date,
-            'start_datetime__lte': self.end_date,
-            'status': 'COMPLETED',
-            'staff__isnull': False
-        }
+        facts = _facts(self.gym, self.start_date, self.end_date).filter(
+            staff__isnull=False,
+            completed_sessions__gt=0
+        )
+        sessions = ActivitySession.objects.filter(
+            **_session_range_filter(self.gym, self.start_date, self.end_date),
+            staff__isnull=False
+        )
         
         if staff_id:
-            filters['staff_id'] = staff_id
+            facts = facts.filter(staff_id=staff_id)
+            sessions = sessions.filter(staff_id=staff_id)
         
-        staff_stats = ActivitySession.objects.filter(
-            **filters
-        ).values(
+        staff_stats = list(facts.values(
             'staff__id',
             'staff__user__first_name',
             'staff__user__last_name'
         ).annotate(
-            classes_taught=Count('id'),
-            total_attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField()),
-            max_attendance=Max('attendees__id'),
-            unique_clients=Count('attendees', distinct=True),
-            avg_rating=Avg('reviews__instructor_rating', output_field=FloatField()),
-            total_reviews=Count('reviews')
-        ).order_by('-total_attendance')
-        
-        return list(staff_stats)
+            classes_taught=Sum('completed_sessions'),
+            total_attendance=Sum('attendance'),
+            max_attendance=Max('max_attendance')
+        ).order_by('-total_attendance'))
+        
+        # Métricas no aditivas: clientes únicos y valoraciones
+        unique_clients = dict(sessions.values('staff_id').annotate(
+            n=Count('attendees', distinct=True)
+        ).values_list('staff_id', 'n'))
+        ratings = {
+            row['session__staff_id']: row
+            for row in ClassReview.objects.filter(session__in=sessions).values('session__staff_id').annotate(
+                avg_rating=Avg('instructor_rating', output_field=FloatField()),
+                total_reviews=Count('id')
+            )
+        }
+        
+        for row in staff_stats:
+            row['avg_attendance'] = _ratio(row['total_attendance'], row['classes_taught'])
+            row['unique_clients'] = unique_clients.get(row['staff__id'], 0)
+            rating = ratings.get(row['staff__id'], {})
+            row['avg_rating'] = rating.get('avg_rating')
+            row['total_reviews'] = rating.get('total_reviews', 0)
+        
+        return staff_stats
     
     def get_top_instructors(self, metric='attendance', top_n=10):
         """
@@ -251,23 +274,11 @@ class StaffAnalytics:
         """
         Tasa de utilización de instructores (% de clases asignadas).
         """
-        total_sessions = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date
-        ).count()
-        
-        assigned_sessions = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            staff__isnull=False
-        ).count()
-        
-        if total_sessions == 0:
-            return 0
-        
-        return round((assigned_sessions / total_sessions) * 100, 2)
+        totals = _facts(self.gym, self.start_date, self.end_date).aggregate(
+            total_sessions=Sum('sessions'),
+            assigned_sessions=Sum('sessions', filter=Q(staff__isnull=False))
+        )
+        return _ratio(totals['assigned_sessions'] or 0, totals['total_sessions'] or 0, percent=True)
     
     def get_instructor_schedule_density(self, staff_id):
         """
@@ -277,12 +288,9 @@ class StaffAnalytics:
         if days == 0:
             return 0
         
-        classes_count = ActivitySession.objects.filter(
-            gym=self.gym,
-            staff_id=staff_id,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date
-        ).count()
+        classes_count = _facts(self.gym, self.start_date, self.end_date).filter(
+            staff_id=staff_id
+        ).aggregate(total=Sum('sessions'))['total'] or 0
         
         return round(classes_count / days, 2)
 
@@ -299,133 +307,137 @@ class ActivityAnalytics:
         """
         Actividades más populares por asistencia.
         """
-        activities = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
-        ).values(
+        activities = list(_facts(self.gym, self.start_date, self.end_date).values(
             'activity__id',
             'activity__name',
             'activity__category__name'
         ).annotate(
-            sessions_count=Count('id'),
-            total_attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField()),
-            unique_clients=Count('attendees', distinct=True),
-            avg_rating=Avg('reviews__class_rating', output_field=FloatField()),
-            occupancy_rate=Avg(
-                F('attendees__id') * 100.0 / F('max_capacity'),
-                output_field=FloatField()
-            )
-        ).order_by('-total_attendance')[:top_n]
-        
-        return list(activities)
+            sessions_count=Sum('completed_sessions'),
+            total_attendance=Sum('attendance'),
+            total_capacity=Sum('capacity'),
+            occupancy_attendance=Sum('occupancy_attendance')
+        ).filter(sessions_count__gt=0).order_by('-total_attendance')[:top_n])
+        
+        # Métricas no aditivas sólo para el top N
+        activity_ids = [row['activity__id'] for row in activities]
+        sessions = ActivitySession.objects.filter(
+            **_session_range_filter(self.gym, self.start_date, self.end_date),
+            activity_id__in=activity_ids
+        )
+        unique_clients = dict(sessions.values('activity_id').annotate(
+            n=Count('attendees', distinct=True)
+        ).values_list('activity_id', 'n'))
+        ratings = dict(ClassReview.objects.filter(session__in=sessions).values('session__activity_id').annotate(
+            avg=Avg('class_rating', output_field=FloatField())
+        ).values_list('session__activity_id', 'avg'))
+        
+        for row in activities:
+            capacity = row.pop('total_capacity')
+            occupancy_attendance = row.pop('occupancy_attendance')
+            row['avg_attendance'] = _ratio(row['total_attendance'], row['sessions_count'])
+            row['occupancy_rate'] = _ratio(occupancy_attendance, capacity, percent=True)
+            row['unique_clients'] = unique_clients.get(row['activity__id'], 0)
+            row['avg_rating'] = ratings.get(row['activity__id'])
+        
+        return activities
     
     def get_activity_trends(self, activity_id, period='weekly'):
         """
         Tendencias de una actividad específica en el tiempo.
         """
-        trunc_func = {
-            'daily': TruncDate,
-            'weekly': TruncWeek,
-            'monthly': TruncMonth
-        }.get(period, TruncWeek)
-        
-        trends = ActivitySession.objects.filter(
-            gym=self.gym,
-            activity_id=activity_id,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
+        trends = _facts(self.gym, self.start_date, self.end_date).filter(
+            activity_id=activity_id
         ).annotate(
-            period=trunc_func('start_datetime')
+            period=_period_expression(period, default='weekly')
         ).values('period').annotate(
-            sessions=Count('id'),
-            attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField())
-        ).order_by('period')
-        
-        return list(trends)
+            sessions=Sum('completed_sessions'),
+            attendance=Sum('attendance')
+        ).filter(sessions__gt=0).order_by('period')
+        
+        return [
+            {**row, 'avg_attendance': _ratio(row['attendance'], row['sessions'])}
+            for row in trends
+        ]
     
     def get_time_slot_performance(self):
         """
         Performance por franja horaria para todas las actividades.
         """
-        time_slots = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
+        time_slots = _facts(self.gym, self.start_date, self.end_date).values(
+            'hour', 'activity__name'
         ).annotate(
-            hour=ExtractHour('start_datetime')
-        ).values('hour', 'activity__name').annotate(
-            sessions=Count('id'),
-            attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField())
-        ).order_by('hour', '-attendance')
-        
-        return list(time_slots)
+            sessions=Sum('completed_sessions'),
+            attendance=Sum('attendance')
+        ).filter(sessions__gt=0).order_by('hour', '-attendance')
+        
+        return [
+            {**row, 'avg_attendance': _ratio(row['attendance'], row['sessions'])}
+            for row in time_slots
+        ]
     
     def get_room_utilization(self):
         """
         Utilización de salas.
         """
-        room_stats = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
+        room_stats = _facts(self.gym, self.start_date, self.end_date).filter(
             room__isnull=False
         ).values(
             'room__id',
             'room__name'
         ).annotate(
-            sessions_count=Count('id'),
-            total_attendance=Count('attendees'),
-            avg_attendance=Avg('attendees__id', output_field=FloatField()),
-            occupancy_rate=Avg(
-                F('attendees__id') * 100.0 / F('max_capacity'),
-                output_field=FloatField()
-            )
+            sessions_count=Sum('sessions'),
+            completed=Sum('completed_sessions'),
+            total_attendance=Sum('attendance'),
+            total_capacity=Sum('capacity'),
+            occupancy_attendance=Sum('occupancy_attendance')
         ).order_by('-sessions_count')
         
-        return list(room_stats)
+        results = []
+        for row in room_stats:
+            completed = row.pop('completed')
+            capacity = row.pop('total_capacity')
+            occupancy_attendance = row.pop('occupancy_attendance')
+            row['avg_attendance'] = _ratio(row['total_attendance'], completed)
+            row['occupancy_rate'] = _ratio(occupancy_attendance, capacity, percent=True)
+            results.append(row)
+        return results
     
     def get_cross_class_patterns(self, top_n=10):
         """
         Patrones de asistencia cruzada: qué clases suelen asistir los mismos clientes.
+        Incluye el lift de cada par (>1: se combinan más de lo esperado por azar).
         """
-        from django.db.models import Subquery, OuterRef
-        
-        # Obtener clientes que asisten a múltiples tipos de clases
-        client_activities = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
-        ).values('attendees', 'activity__name').distinct()
-        
-        # Agrupar por combinaciones de actividades
-        patterns = defaultdict(int)
-        client_classes = defaultdict(set)
-        
-        for record in client_activities:
-            if record['attendees'] and record['activity__name']:
-                client_classes[record['attendees']].add(record['activity__name'])
-        
-        # Contar combinaciones
-        for client_id, classes in client_classes.items():
-            if len(classes) > 1:
-                classes_list = sorted(list(classes))
-                for i, class1 in enumerate(classes_list):
-                    for class2 in classes_list[i+1:]:
-                        pair = f"{class1} + {class2}"
-                        patterns[pair] += 1
-        
-        # Ordenar y tomar top N
-        sorted_patterns = sorted(patterns.items(), key=lambda x: x[1], reverse=True)[:top_n]
-        
-        return [{'combination': pair, 'count': count} for pair, count in sorted_patterns]
+        import numpy as np
+        from .analytics_kernels import cooccurrence, top_pairs
+        
+        # Pares (cliente, actividad) de las sesiones completadas del periodo
+        rows = ActivitySession.attendees.through.objects.filter(
+            activitysession__gym=self.gym,
+            activitysession__start_datetime__gte=self.start_date,
+            activitysession__start_datetime__lte=self.end_date,
+            activitysession__status='COMPLETED'
+        ).values_list('client_id', 'activitysession__activity_id').distinct()
+        
+        pairs = np.fromiter(rows.iterator(chunk_size=10000), dtype=np.dtype((np.int64, 2)))
+        if pairs.size == 0:
+            return []
+        
+        matrix, activity_ids, support, n_clients = cooccurrence(pairs[:, 0], pairs[:, 1])
+        top = top_pairs(matrix, support, n_clients, k=top_n)
+        
+        names = dict(Activity.objects.filter(
+            id__in=[int(activity_ids[idx]) for pair in top for idx in pair[:2]]
+        ).values_list('id', 'name'))
+        
+        results = []
+        for i, j, count, lift in top:
+            first, second = sorted([names.get(int(activity_ids[i]), ''), names.get(int(activity_ids[j]), '')])
+            results.append({
+                'combination': f"{first} + {second}",
+                'count': count,
+                'lift': lift
+            })
+        return results
 
 
 class AdvancedAnalytics:
@@ -441,83 +453,58 @@ class AdvancedAnalytics:
         Análisis de anticipación de reservas.
         ¿Con cuánta anticipación reservan los clientes?
         """
+        import numpy as np
+        from .analytics_kernels import lead_time_stats
+        
         # Requeriría un campo booking_datetime en ClientVisit
         # Por ahora, aproximación con created_at
         visits = ClientVisit.objects.filter(
             client__gym=self.gym,
             date__gte=self.start_date.date(),
             date__lte=self.end_date.date(),
-            status__in=['ATTENDED', 'SCHEDULED']
-        ).values('created_at', 'date')
-        
-        lead_times = []
-        for visit in visits:
-            if visit['created_at'] and visit['date']:
-                lead_time_days = (visit['date'] - visit['created_at'].date()).days
-                if lead_time_days >= 0:  # Solo adelantadas
-                    lead_times.append(lead_time_days)
+            status__in=['ATTENDED', 'SCHEDULED'],
+            created_at__isnull=False
+        ).values_list('created_at', 'date')
+        
+        days = np.fromiter(
+            ((created_at.date().toordinal(), visit_date.toordinal())
+             for created_at, visit_date in visits.iterator(chunk_size=10000)),
+            dtype=np.dtype((np.int64, 2))
+        )
+        stats = lead_time_stats(days[:, 0], days[:, 1]) if days.size else None
         
-        if not lead_times:
+        if not stats:
             return {
                 'avg_lead_days': 0,
                 'median_lead_days': 0,
                 'same_day_bookings': 0,
                 'advance_bookings': 0
             }
-        
-        lead_times.sort()
-        median_idx = len(lead_times) // 2
-        
-        return {
-            'avg_lead_days': round(sum(lead_times) / len(lead_times), 2),
-            'median_lead_days': lead_times[median_idx],
-            'same_day_bookings': lead_times.count(0),
-            'advance_bookings': len([lt for lt in lead_times if lt > 0]),
-            'distribution': {
-                'same_day': lead_times.count(0),
-                'days_1_3': len([lt for lt in lead_times if 1 <= lt <= 3]),
-                'days_4_7': len([lt for lt in lead_times if 4 <= lt <= 7]),
-                'days_8_plus': len([lt for lt in lead_times if lt > 7])
-            }
-        }
+        return stats
     
     def get_seasonal_patterns(self):
         """
         Patrones estacionales: qué días de la semana y meses son más populares.
         Calcula correctamente el promedio de asistencia por día de la semana.
         """
-        # Primero obtenemos cada sesión con su día de semana y cuenta de asistentes
-        sessions_with_attendance = ActivitySession.objects.filter(
-            gym=self.gym,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
-        ).annotate(
-            day_of_week=ExtractWeekDay('start_datetime'),
-            attendance_count=Count('attendees')
-        ).values('day_of_week', 'attendance_count')
-        
-        # Agrupar por día de la semana
-        from collections import defaultdict
-        day_stats = defaultdict(lambda: {'sessions': 0, 'total_attendance': 0})
-        
-        for session in sessions_with_attendance:
-            dow = session['day_of_week']
-            day_stats[dow]['sessions'] += 1
-            day_stats[dow]['total_attendance'] += session['attendance_count']
+        day_stats = _facts(self.gym, self.start_date, self.end_date).annotate(
+            day_of_week=ExtractWeekDay('date')
+        ).values('day_of_week').annotate(
+            sessions=Sum('completed_sessions'),
+            attendance=Sum('attendance')
+        ).filter(sessions__gt=0).order_by('day_of_week')
         
         day_names = ['Domingo', 'Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
         
         results = []
-        for day_num in sorted(day_stats.keys()):
-            stats = day_stats[day_num]
-            avg = stats['total_attendance'] / stats['sessions'] if stats['sessions'] > 0 else 0
+        for stats in day_stats:
+            day_num = stats['day_of_week']
             results.append({
                 'day_of_week': day_num,
                 'day_name': day_names[day_num - 1] if 1 <= day_num <= 7 else 'Unknown',
                 'sessions': stats['sessions'],
-                'attendance': stats['total_attendance'],
-                'avg_attendance': round(avg, 1)
+                'attendance': stats['attendance'],
+                'avg_attendance': _ratio(stats['attendance'], stats['sessions'], digits=1)
             })
         
         # Ordenar por promedio de asistencia descendente para mostrar el mejor día primero
@@ -530,43 +517,28 @@ class AdvancedAnalytics:
         Predicción de asistencia basada en históricos.
         Usa el promedio de sesiones con condiciones similares (misma actividad, día, hora).
         """
-        # Obtener sesiones similares con su conteo de asistentes
-        similar_sessions = ActivitySession.objects.filter(
-            gym=self.gym,
+        similar = _facts(self.gym, self.start_date, self.end_date).filter(
             activity_id=activity_id,
-            start_datetime__gte=self.start_date,
-            start_datetime__lte=self.end_date,
-            status='COMPLETED'
+            completed_sessions__gt=0
         ).annotate(
-            dow=ExtractWeekDay('start_datetime'),
-            hr=ExtractHour('start_datetime'),
-            attendance_count=Count('attendees')
-        ).filter(
-            dow=day_of_week,
-            hr=hour
-        ).values('attendance_count')
-        
-        attendance_values = [s['attendance_count'] for s in similar_sessions]
+            dow=ExtractWeekDay('date')
+        ).filter(dow=day_of_week)
+        
+        def summarize(facts):
+            return facts.aggregate(
+                sessions=Sum('completed_sessions'),
+                attendance=Sum('attendance'),
+                min_attendance=Min('min_attendance'),
+                max_attendance=Max('max_attendance')
+            )
         
-        if not attendance_values:
+        stats = summarize(similar.filter(hour=hour))
+        if not stats['sessions']:
             # Si no hay datos exactos, buscar con condiciones más amplias
             # Solo por actividad y día de la semana
-            broader_sessions = ActivitySession.objects.filter(
-                gym=self.gym,
-                activity_id=activity_id,
-                start_datetime__gte=self.start_date,
-                start_datetime__lte=self.end_date,
-                status='COMPLETED'
-            ).annotate(
-                dow=ExtractWeekDay('start_datetime'),
-                attendance_count=Count('attendees')
-            ).filter(
-                dow=day_of_week
-            ).values('attendance_count')
-            
-            attendance_values = [s['attendance_count'] for s in broader_sessions]
-        
-        if not attendance_values:
+            stats = summarize(similar)
+        
+        if not stats['sessions']:
             return {
                 'predicted_attendance': 0,
                 'min_expected': 0,
@@ -574,20 +546,20 @@ class AdvancedAnalytics:
                 'confidence': 'low'
             }
         
-        avg_attendance = sum(attendance_values) / len(attendance_values)
-        min_attendance = min(attendance_values)
-        max_attendance = max(attendance_values)
+        sessions_count = stats['sessions']
+        min_attendance = stats['min_attendance']
+        max_attendance = stats['max_attendance']
         
         # Calcular confianza basada en la variabilidad y cantidad de datos
         variance = max_attendance - min_attendance
         confidence = 'low'
-        if len(attendance_values) >= 10 and variance <= 5:
+        if sessions_count >= 10 and variance <= 5:
             confidence = 'high'
-        elif len(attendance_values) >= 5 and variance <= 8:
+        elif sessions_count >= 5 and variance <= 8:
             confidence = 'medium'
         
         return {
-            'predicted_attendance': round(avg_attendance, 1),
+            'predicted_attendance': _ratio(stats['attendance'], sessions_count, digits=1),
             'min_expected': min_attendance,
             'max_expected': max_attendance,
             'confidence': confidence
@@ -0,0 +1,138 @@
+"""
+Kernels numéricos (NumPy) para los analytics de actividades.
+
+Trabajan sobre arrays ya cargados de la base de datos, sin bucles Python por
+cliente o por visita:
+
+- cooccurrence(): matriz de co-asistencia actividad × actividad como producto
+  Xᵀ·X de la matriz de incidencia cliente × actividad, calculada por bloques
+  de clientes para acotar la memoria.
+- top_pairs(): los k pares más frecuentes con su lift.
+- lead_time_stats(): media, mediana, distribución e histograma de días de
+  antelación de las reservas.
+
+Usage:
+    from activities.analytics_kernels import cooccurrence, top_pairs
+
+    matrix, activity_ids, support, n_clients = cooccurrence(client_ids, activity_ids)
+    pairs = top_pairs(matrix, support, n_clients, k=10)
+"""
+import numpy as np
+
+CLIENT_BLOCK = 65536
+LEAD_TIME_BUCKETS = (
+    ('same_day', 0, 0),
+    ('days_1_3', 1, 3),
+    ('days_4_7', 4, 7),
+    ('days_8_plus', 8, None),
+)
+
+
+def cooccurrence(client_ids, activity_ids, block_size=CLIENT_BLOCK):
+    """
+    Matriz de co-asistencia a partir de pares (cliente, actividad).
+
+    Los pares repetidos cuentan una sola vez por cliente. Devuelve
+    (matriz A×A int64, ids de actividad por índice, clientes por actividad,
+    número de clientes). La diagonal es el soporte de cada actividad.
+    """
+    client_ids = np.asarray(client_ids, dtype=np.int64)
+    activity_ids = np.asarray(activity_ids, dtype=np.int64)
+    if client_ids.size == 0:
+        return np.zeros((0, 0), dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0
+
+    activities, activity_idx = np.unique(activity_ids, return_inverse=True)
+    n_activities = activities.size
+
+    # Deduplicar (cliente, actividad) con una clave lineal ordenada por cliente
+    keys = np.unique(client_ids * n_activities + activity_idx)
+    cols = keys % n_activities
+    client_keys = keys // n_activities
+    # Índice compacto de cliente (0..n_clients-1), ya ordenado
+    new_client = np.empty(client_keys.size, dtype=bool)
+    new_client[0] = True
+    np.not_equal(client_keys[1:], client_keys[:-1], out=new_client[1:])
+    rows = np.cumsum(new_client) - 1
+    n_clients = int(rows[-1]) + 1
+
+    matrix = np.zeros((n_activities, n_activities), dtype=np.int64)
+    bounds = np.searchsorted(rows, np.arange(0, n_clients + block_size, block_size))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start == end:
+            continue
+        block_rows = rows[start:end]
+        offset = block_rows[0]
+        block = np.zeros((block_rows[-1] - offset + 1, n_activities), dtype=np.float32)
+        block[block_rows - offset, cols[start:end]] = 1.0
+        matrix += (block.T @ block).astype(np.int64)
+
+    support = np.diagonal(matrix).copy()
+    return matrix, activities, support, n_clients
+
+
+def top_pairs(matrix, support, n_clients, k=10, min_count=1):
+    """
+    Los k pares (i < j) con más clientes en común.
+
+    Devuelve una lista de (i, j, count, lift) ordenada por count descendente;
+    lift = P(i, j) / (P(i)·P(j)).
+    """
+    n = matrix.shape[0]
+    if n < 2 or k <= 0:
+        return []
+
+    i, j = np.triu_indices(n, k=1)
+    counts = matrix[i, j]
+    mask = counts >= min_count
+    i, j, counts = i[mask], j[mask], counts[mask]
+    if counts.size == 0:
+        return []
+
+    if counts.size > k:
+        selected = np.argpartition(-counts, k - 1)[:k]
+    else:
+        selected = np.arange(counts.size)
+    # Orden estable: count desc, y a igualdad por índices
+    selected = selected[np.lexsort((j[selected], i[selected], -counts[selected]))]
+
+    denominator = support[i[selected]].astype(np.float64) * support[j[selected]]
+    lift = np.divide(
+        counts[selected] * float(n_clients), denominator,
+        out=np.zeros(selected.size), where=denominator > 0
+    )
+    return [
+        (int(a), int(b), int(c), round(float(l), 2))
+        for a, b, c, l in zip(i[selected], j[selected], counts[selected], lift)
+    ]
+
+
+def lead_time_stats(booked_days, visit_days, histogram_days=14):
+    """
+    Estadísticas de antelación (en días) entre la fecha de reserva y la de visita.
+
+    booked_days / visit_days: ordinales de fecha (date.toordinal()). Las reservas
+    a posteriori (antelación negativa) se descartan. El histograma agrupa en la
+    última casilla todo lo que supera `histogram_days`.
+    """
+    lead = np.asarray(visit_days, dtype=np.int64) - np.asarray(booked_days, dtype=np.int64)
+    lead = lead[lead >= 0]
+    if lead.size == 0:
+        return None
+
+    # Mediana superior (elemento real de la muestra, como antes)
+    median = int(np.partition(lead, lead.size // 2)[lead.size // 2])
+    histogram = np.bincount(np.minimum(lead, histogram_days), minlength=histogram_days + 1)
+
+    distribution = {}
+    for name, low, high in LEAD_TIME_BUCKETS:
+        selected = lead >= low if high is None else (lead >= low) & (lead <= high)
+        distribution[name] = int(np.count_nonzero(selected))
+
+    return {
+        'avg_lead_days': round(float(lead.mean()), 2),
+        'median_lead_days': median,
+        'same_day_bookings': distribution['same_day'],
+        'advance_bookings': int(lead.size) - distribution['same_day'],
+        'distribution': distribution,
+        'histogram': histogram.tolist(),
+    }
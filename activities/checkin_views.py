@@ -12,12 +12,13 @@ import hmac
 import time
 import json
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseNotModified, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.db.models import Count
 from django.utils import timezone
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
@@ -27,6 +28,7 @@ from core.ratelimit import get_client_ip
 
 from organizations.models import Gym
 from clients.models import Client
+from . import qr_display
 from .models import ActivitySession, AttendanceSettings, SessionCheckin
 
 # Security logger
@@ -149,19 +151,26 @@ def session_qr_display(request, session_id):
 @login_required
 def qr_display_api(request, session_id):
     """
-    API para obtener datos actualizados del QR (llamado por JS cada N segundos).
+    API para obtener datos actualizados del QR (llamado por JS desde la pantalla).
+    
+    Con If-None-Match o `?since=<version>` responde 304 si nada ha cambiado.
+    Los datos salen de caché (ver activities.qr_display).
     """
     gym = request.gym
-    session = get_object_or_404(ActivitySession, id=session_id, gym=gym)
-    
-    qr_data = get_current_qr_data(session, gym)
+    state = qr_display.get_state(session_id)
+    if state is None or gym is None or state['gym_id'] != gym.id:
+        raise Http404("Sesión no encontrada")
     
-    # Agregar info de asistentes
-    qr_data['attendee_count'] = session.attendees.count()
-    qr_data['max_capacity'] = session.max_capacity
-    qr_data['checkins'] = SessionCheckin.objects.filter(session=session).count()
+    since = request.GET.get('since') or request.headers.get('If-None-Match', '').strip('W/"') or None
+    qr_data = qr_display.build_payload(state)
     
-    return JsonResponse(qr_data)
+    if qr_data['version'] == since:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(qr_data)
+    response['ETag'] = f'"{qr_data["version"]}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @csrf_exempt
@@ -342,13 +351,18 @@ def today_sessions_qr_list(request):
     Útil para que el staff seleccione qué clase proyectar.
     """
     gym = request.gym
-    today = timezone.now().date()
+    today = timezone.localdate()
+    day_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
     
+    # Reservas contadas en la misma consulta (antes, una consulta por sesión)
     sessions = ActivitySession.objects.filter(
         gym=gym,
-        start_datetime__date=today,
+        start_datetime__gte=day_start,
+        start_datetime__lt=day_start + timedelta(days=1),
         status='SCHEDULED'
-    ).select_related('activity', 'room', 'staff').order_by('start_datetime')
+    ).select_related('activity', 'room', 'staff', 'staff__user').annotate(
+        attendees_total=Count('attendees')
+    ).order_by('start_datetime')
     
     context = {
         'sessions': sessions,
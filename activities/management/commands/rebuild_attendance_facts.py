@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from activities.rollups import rebuild_range
+from organizations.models import Gym
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de hechos de asistencia (AttendanceFact) para el histórico'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Días de histórico a reconstruir')
+        parser.add_argument('--gym', type=int, help='ID del gimnasio (por defecto, todos)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Días por bloque')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = today - timedelta(days=options['days'])
+        chunk = timedelta(days=options['chunk_days'])
+
+        gyms = Gym.objects.all()
+        if options['gym']:
+            gyms = gyms.filter(id=options['gym'])
+
+        for gym in gyms:
+            rows = 0
+            block_start = start
+            while block_start <= today:
+                block_end = min(block_start + chunk - timedelta(days=1), today)
+                rows += rebuild_range(gym.id, block_start, block_end)
+                block_start = block_end + timedelta(days=1)
+            self.stdout.write(self.style.SUCCESS(f'✅ {gym.name}: {rows} filas'))
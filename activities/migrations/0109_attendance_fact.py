@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0016_staff_commission_session'),
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('activities', '0108_membership_hierarchy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('completed_sessions', models.PositiveIntegerField(default=0)),
+                ('cancelled_sessions', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(default=0, help_text='Suma de aforos')),
+                ('attendance', models.PositiveIntegerField(default=0, help_text='Suma de asistentes')),
+                ('min_attendance', models.PositiveIntegerField(default=0)),
+                ('max_attendance', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_facts', to='activities.activity')),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_facts', to='organizations.gym')),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_facts', to='activities.room')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_facts', to='staff.staffprofile')),
+            ],
+            options={
+                'verbose_name': 'Hecho de Asistencia',
+                'verbose_name_plural': 'Hechos de Asistencia',
+                'indexes': [models.Index(fields=['gym', 'date'], name='activities__gym_id_f6cad8_idx'), models.Index(fields=['gym', 'activity', 'date'], name='activities__gym_id_dab479_idx'), models.Index(fields=['gym', 'staff', 'date'], name='activities__gym_id_5c2493_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:49
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_occupancy_attendance(apps, schema_editor):
+    # Aproximación hasta el siguiente rebuild_attendance_facts: los buckets
+    # con aforo cuentan toda su asistencia
+    AttendanceFact = apps.get_model('activities', 'AttendanceFact')
+    AttendanceFact.objects.filter(capacity__gt=0).update(occupancy_attendance=F('attendance'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0109_attendance_fact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancefact',
+            name='attended_bookings',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancefact',
+            name='occupancy_attendance',
+            field=models.PositiveIntegerField(default=0, help_text='Asistentes de las sesiones con aforo (numerador de la ocupación)'),
+        ),
+        migrations.RunPython(fill_occupancy_attendance, migrations.RunPython.noop),
+    ]
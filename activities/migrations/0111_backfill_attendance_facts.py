@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+# Copia congelada de activities.rollups._aggregate: la migración no debe
+# cambiar si más adelante cambia el cálculo de los hechos.
+def _aggregate(AttendanceFact, rows):
+    facts = {}
+    for row in rows:
+        local = timezone.localtime(row['start_datetime'])
+        key = (row['gym_id'], local.date(), local.hour, row['activity_id'], row['staff_id'], row['room_id'])
+        fact = facts.get(key)
+        if fact is None:
+            fact = facts[key] = AttendanceFact(
+                gym_id=key[0], date=key[1], hour=key[2], activity_id=key[3], staff_id=key[4], room_id=key[5],
+            )
+            fact.min_attendance = None
+
+        fact.sessions += 1
+        fact.bookings += row['n_bookings']
+        fact.attended_bookings += row['n_attended']
+        fact.no_shows += row['n_no_shows']
+        fact.cancellations += row['n_cancellations']
+
+        if row['status'] == 'CANCELLED':
+            fact.cancelled_sessions += 1
+        elif row['status'] == 'COMPLETED':
+            attendees = row['n_attendees']
+            fact.completed_sessions += 1
+            fact.attendance += attendees
+            if row['max_capacity']:
+                fact.capacity += row['max_capacity']
+                fact.occupancy_attendance += attendees
+            fact.max_attendance = max(fact.max_attendance, attendees)
+            fact.min_attendance = attendees if fact.min_attendance is None else min(fact.min_attendance, attendees)
+
+    for fact in facts.values():
+        if fact.min_attendance is None:
+            fact.min_attendance = 0
+    return facts
+
+
+def backfill_attendance_facts(apps, schema_editor):
+    """
+    Rellena AttendanceFact con todo el histórico de sesiones, gimnasio a
+    gimnasio y año a año (la tarea nocturna solo recalcula los últimos días).
+    """
+    ActivitySession = apps.get_model('activities', 'ActivitySession')
+    AttendanceFact = apps.get_model('activities', 'AttendanceFact')
+
+    gym_ids = list(ActivitySession.objects.values_list('gym_id', flat=True).distinct().order_by('gym_id'))
+    for gym_id in gym_ids:
+        sessions = ActivitySession.objects.filter(gym_id=gym_id)
+        bounds = sessions.order_by('start_datetime').values_list('start_datetime', flat=True)
+        first, last = bounds.first(), bounds.last()
+        # Bloques de un año, cortados en medianoche local para que un bucket no quede partido
+        start = timezone.localtime(first).replace(hour=0, minute=0, second=0, microsecond=0)
+        while start <= last:
+            end = timezone.localtime(start + timedelta(days=366)).replace(hour=0, minute=0, second=0, microsecond=0)
+            rows = sessions.filter(start_datetime__gte=start, start_datetime__lt=end).annotate(
+                n_attendees=Count('attendees', distinct=True),
+                n_bookings=Count('bookings', distinct=True),
+                n_attended=Count('bookings', filter=Q(bookings__attendance_status='ATTENDED'), distinct=True),
+                n_no_shows=Count('bookings', filter=Q(bookings__attendance_status='NO_SHOW'), distinct=True),
+                n_cancellations=Count('bookings', filter=Q(bookings__status='CANCELLED'), distinct=True),
+            ).values(
+                'gym_id', 'activity_id', 'staff_id', 'room_id', 'start_datetime', 'status', 'max_capacity',
+                'n_attendees', 'n_bookings', 'n_attended', 'n_no_shows', 'n_cancellations',
+            ).order_by()
+            facts = _aggregate(AttendanceFact, rows.iterator(chunk_size=2000))
+            AttendanceFact.objects.filter(
+                gym_id=gym_id, date__gte=start.date(), date__lt=end.date(),
+            ).delete()
+            AttendanceFact.objects.bulk_create(facts.values(), batch_size=1000)
+            start = end
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0110_attendance_fact_booked_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_attendance_facts, migrations.RunPython.noop),
+    ]
@@ -886,3 +886,52 @@ class ScheduleSettings(models.Model):
         """Obtener o crear configuración para un gimnasio"""
         config, created = cls.objects.get_or_create(gym=gym)
         return config
+
+
+class AttendanceFact(models.Model):
+    """
+    Tabla de hechos pre-agregada de asistencia a clases.
+    Una fila por gimnasio, día, hora local, actividad, instructor y sala.
+    Se mantiene con activities.rollups (señales + tarea nocturna) y es la
+    fuente de activities.analytics.
+    """
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='attendance_facts')
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name='attendance_facts')
+    staff = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_facts')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_facts')
+    
+    # Sesiones (todas / completadas / canceladas)
+    sessions = models.PositiveIntegerField(default=0)
+    completed_sessions = models.PositiveIntegerField(default=0)
+    cancelled_sessions = models.PositiveIntegerField(default=0)
+    
+    # Sesiones completadas
+    capacity = models.PositiveIntegerField(default=0, help_text=_("Suma de aforos"))
+    attendance = models.PositiveIntegerField(default=0, help_text=_("Suma de asistentes"))
+    occupancy_attendance = models.PositiveIntegerField(
+        default=0, help_text=_("Asistentes de las sesiones con aforo (numerador de la ocupación)")
+    )
+    min_attendance = models.PositiveIntegerField(default=0)
+    max_attendance = models.PositiveIntegerField(default=0)
+    
+    # Reservas
+    bookings = models.PositiveIntegerField(default=0)
+    attended_bookings = models.PositiveIntegerField(default=0)
+    no_shows = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _("Hecho de Asistencia")
+        verbose_name_plural = _("Hechos de Asistencia")
+        indexes = [
+            models.Index(fields=['gym', 'date']),
+            models.Index(fields=['gym', 'activity', 'date']),
+            models.Index(fields=['gym', 'staff', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.gym_id} {self.date} {self.hour:02d}h - {self.activity_id}"
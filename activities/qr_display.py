@@ -0,0 +1,103 @@
+"""
+Estado de las pantallas de QR de clase (tablets en modo kiosko).
+
+Cada tablet consulta el QR de su sesión cada pocos segundos durante todo el
+día. Los datos de la sesión (actividad, hora, aforo, reservas) se guardan en
+caché y el contador de check-ins se mantiene sumando/restando al crear o
+borrar un SessionCheckin (ver activities.signals), así que una consulta
+normal no toca la base de datos.
+
+Cada respuesta lleva una `version` (también como ETag) que cambia al rotar
+el token o al variar los contadores: If-None-Match o `?since=<version>` sin
+cambios -> 304 sin cuerpo. La pantalla consulta a intervalos; no se espera
+en el servidor para no ocupar workers síncronos.
+"""
+import time
+
+from django.core.cache import cache
+
+STATE_CACHE_KEY = 'qr_display:{}'
+CHECKINS_CACHE_KEY = 'qr_display:{}:checkins'
+# Se recuenta cada cierto tiempo por si se pierde algún incremento
+STATE_TTL = 600
+
+DEFAULT_REFRESH_SECONDS = 30
+
+
+def _build_state(session_id):
+    from .models import ActivitySession, AttendanceSettings
+
+    session = ActivitySession.objects.select_related('activity', 'gym').filter(pk=session_id).first()
+    if session is None:
+        return None
+    try:
+        refresh_seconds = session.gym.attendance_settings.qr_refresh_seconds
+    except AttendanceSettings.DoesNotExist:
+        refresh_seconds = DEFAULT_REFRESH_SECONDS
+    return {
+        'gym_id': session.gym_id,
+        'session_id': session.id,
+        'session_name': session.activity.name,
+        'start_time': session.start_datetime.strftime('%H:%M'),
+        'max_capacity': session.max_capacity,
+        'attendee_count': session.attendees.count(),
+        'refresh_seconds': refresh_seconds or DEFAULT_REFRESH_SECONDS,
+    }
+
+
+def get_state(session_id):
+    """Datos de la pantalla de una sesión con su contador de check-ins (None si no existe)."""
+    from .models import SessionCheckin
+
+    state_key, checkins_key = STATE_CACHE_KEY.format(session_id), CHECKINS_CACHE_KEY.format(session_id)
+    cached = cache.get_many([state_key, checkins_key])
+    state = cached.get(state_key)
+    if state is None:
+        state = _build_state(session_id)
+        if state is None:
+            return None
+        cache.set(state_key, state, STATE_TTL)
+
+    checkins = cached.get(checkins_key)
+    if checkins is None:
+        checkins = SessionCheckin.objects.filter(session_id=session_id).count()
+        # add: no pisar un contador que otra petición ya haya inicializado e incrementado
+        if not cache.add(checkins_key, checkins, STATE_TTL):
+            checkins = cache.get(checkins_key, checkins)
+    return {**state, 'checkins': checkins}
+
+
+def invalidate(session_id):
+    """Descarta los datos de la sesión (cambios en la sesión o en sus reservas)."""
+    cache.delete(STATE_CACHE_KEY.format(session_id))
+
+
+def add_checkins(session_id, delta):
+    """Ajusta el contador de check-ins; si no está en caché se recontará al leerlo."""
+    try:
+        cache.incr(CHECKINS_CACHE_KEY.format(session_id), delta)
+    except ValueError:
+        pass
+
+
+def build_payload(state, now=None):
+    """Respuesta para la pantalla: token actual, contadores y versión."""
+    from .checkin_views import generate_qr_token
+
+    now = int(now if now is not None else time.time())
+    refresh_seconds = state['refresh_seconds']
+    rounded_time = (now // refresh_seconds) * refresh_seconds
+    token = generate_qr_token(state['session_id'], rounded_time)
+    return {
+        'token': token,
+        'url': f"/activities/checkin/qr/{token}/",
+        'refresh_in': refresh_seconds - (now - rounded_time),
+        'session_id': state['session_id'],
+        'session_name': state['session_name'],
+        'start_time': state['start_time'],
+        'attendee_count': state['attendee_count'],
+        'max_capacity': state['max_capacity'],
+        'checkins': state['checkins'],
+        'version': f"{rounded_time:x}-{state['checkins']}-{state['attendee_count']}-{state['max_capacity']}",
+    }
+
@@ -0,0 +1,168 @@
+"""
+Mantenimiento de la tabla de hechos AttendanceFact.
+
+Cada fila agrega las sesiones de un gimnasio por (día, hora local, actividad,
+instructor, sala). Las métricas de los dashboards (heatmap, horas pico,
+ocupación, tendencias, estacionalidad, predicción...) se leen de aquí en vez de
+re-agregar ActivitySession × attendees en cada carga.
+
+Mantenimiento:
+- refresh_for_session(): recalcula el bucket de una sesión (señales).
+- rebuild_range(): recalcula un rango de días de un gimnasio (tarea nocturna,
+  `manage.py rebuild_attendance_facts`). El histórico lo rellena la
+  migración 0111_backfill_attendance_facts.
+"""
+import logging
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FactKey = namedtuple('FactKey', ['gym_id', 'date', 'hour', 'activity_id', 'staff_id', 'room_id'])
+
+SESSION_FIELDS = ('id', 'gym_id', 'activity_id', 'staff_id', 'room_id', 'start_datetime', 'status', 'max_capacity')
+
+
+def fact_key_for(gym_id, activity_id, staff_id, room_id, start_datetime):
+    """Clave del bucket (día y hora en hora local) de una sesión."""
+    local = timezone.localtime(start_datetime)
+    return FactKey(gym_id, local.date(), local.hour, activity_id, staff_id, room_id)
+
+
+def session_fact_key(session):
+    return fact_key_for(session.gym_id, session.activity_id, session.staff_id, session.room_id, session.start_datetime)
+
+
+def _local_bounds(start_date, end_date):
+    """[inicio del primer día, inicio del día siguiente al último) en hora local."""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _session_rows(sessions_qs):
+    """Una fila por sesión con asistentes y reservas contados en la misma consulta."""
+    return sessions_qs.annotate(
+        n_attendees=Count('attendees', distinct=True),
+        n_bookings=Count('bookings', distinct=True),
+        n_attended=Count('bookings', filter=Q(bookings__attendance_status='ATTENDED'), distinct=True),
+        n_no_shows=Count('bookings', filter=Q(bookings__attendance_status='NO_SHOW'), distinct=True),
+        n_cancellations=Count('bookings', filter=Q(bookings__status='CANCELLED'), distinct=True),
+    ).values(
+        *SESSION_FIELDS, 'n_attendees', 'n_bookings', 'n_attended', 'n_no_shows', 'n_cancellations',
+    ).order_by()
+
+
+def _aggregate(rows):
+    """Agrupa filas de sesión en hechos {FactKey: AttendanceFact sin guardar}."""
+    from .models import AttendanceFact
+
+    facts = {}
+    for row in rows:
+        key = fact_key_for(row['gym_id'], row['activity_id'], row['staff_id'], row['room_id'], row['start_datetime'])
+        fact = facts.get(key)
+        if fact is None:
+            fact = facts[key] = AttendanceFact(**key._asdict())
+            fact.min_attendance = None
+
+        fact.sessions += 1
+        fact.bookings += row['n_bookings']
+        fact.attended_bookings += row['n_attended']
+        fact.no_shows += row['n_no_shows']
+        fact.cancellations += row['n_cancellations']
+
+        if row['status'] == 'CANCELLED':
+            fact.cancelled_sessions += 1
+        elif row['status'] == 'COMPLETED':
+            attendees = row['n_attendees']
+            fact.completed_sessions += 1
+            fact.attendance += attendees
+            if row['max_capacity']:
+                # Las sesiones sin aforo no cuentan para la ocupación
+                fact.capacity += row['max_capacity']
+                fact.occupancy_attendance += attendees
+            fact.max_attendance = max(fact.max_attendance, attendees)
+            fact.min_attendance = attendees if fact.min_attendance is None else min(fact.min_attendance, attendees)
+
+    for fact in facts.values():
+        if fact.min_attendance is None:
+            fact.min_attendance = 0
+    return facts
+
+
+def _bucket_filter(key):
+    """Filtro Q para los hechos (o sesiones) de un bucket, con staff/sala opcionales."""
+    q = Q(gym_id=key.gym_id, activity_id=key.activity_id)
+    q &= Q(staff__isnull=True) if key.staff_id is None else Q(staff_id=key.staff_id)
+    q &= Q(room__isnull=True) if key.room_id is None else Q(room_id=key.room_id)
+    return q
+
+
+def refresh_bucket(key):
+    """Recalcula un único bucket a partir de sus sesiones."""
+    from .models import ActivitySession, AttendanceFact
+
+    tz = timezone.get_current_timezone()
+    hour_start = timezone.make_aware(datetime.combine(key.date, time(key.hour)), tz)
+    sessions = ActivitySession.objects.filter(
+        _bucket_filter(key),
+        start_datetime__gte=hour_start,
+        start_datetime__lt=hour_start + timedelta(hours=1),
+    )
+    facts = _aggregate(_session_rows(sessions))
+
+    with transaction.atomic():
+        AttendanceFact.objects.filter(_bucket_filter(key), date=key.date, hour=key.hour).delete()
+        if facts:
+            AttendanceFact.objects.bulk_create(facts.values())
+
+
+def refresh_for_session(session, previous_key=None):
+    """Actualiza el bucket de una sesión (y el anterior si cambió de hora/instructor/sala)."""
+    key = session_fact_key(session)
+    refresh_bucket(key)
+    if previous_key and previous_key != key:
+        refresh_bucket(previous_key)
+
+
+def rebuild_range(gym_id, start_date, end_date):
+    """
+    Recalcula todos los hechos de un gimnasio entre dos fechas (incluidas).
+    Devuelve el número de filas escritas.
+    """
+    from .models import ActivitySession, AttendanceFact
+
+    start, end = _local_bounds(start_date, end_date)
+    sessions = ActivitySession.objects.filter(
+        gym_id=gym_id,
+        start_datetime__gte=start,
+        start_datetime__lt=end,
+    )
+    facts = _aggregate(_session_rows(sessions).iterator(chunk_size=2000))
+
+    with transaction.atomic():
+        AttendanceFact.objects.filter(gym_id=gym_id, date__gte=start_date, date__lte=end_date).delete()
+        AttendanceFact.objects.bulk_create(facts.values(), batch_size=1000)
+
+    logger.info(f"AttendanceFact gym={gym_id} {start_date}..{end_date}: {len(facts)} filas")
+    return len(facts)
+
+
+def rebuild_recent(days=2, gym_ids=None):
+    """Recalcula los últimos `days` días (y hoy) para todos los gimnasios."""
+    from organizations.models import Gym
+
+    today = timezone.localdate()
+    start = today - timedelta(days=days)
+    if gym_ids is None:
+        gym_ids = Gym.objects.values_list('id', flat=True)
+
+    total = 0
+    for gym_id in gym_ids:
+        total += rebuild_range(gym_id, start, today)
+    return total
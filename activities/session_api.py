@@ -14,6 +14,7 @@ from django.utils import timezone
 from .models import ActivitySession, WaitlistEntry, SessionCheckin
 from clients.models import ClientVisit
 from clients.models import Client
+from clients.search import search_clients
 
 
 @login_required
@@ -891,15 +892,11 @@ def search_clients_for_session(request, session_id):
     # Exclude clients already in class
     existing_ids = session.attendees.values_list('id', flat=True)
     
-    clients = Client.objects.filter(
-        gym=gym, status='ACTIVE'
-    ).exclude(
-        id__in=existing_ids
-    ).filter(
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query)
-    )[:10]
+    clients = search_clients(
+        Client.objects.filter(gym=gym, status='ACTIVE').exclude(id__in=existing_ids),
+        query,
+        limit=10,
+    )
     
     results = [{
         'id': c.id,
@@ -1,7 +1,8 @@
 """
-Signals para el sistema de valoraciones de clases y activación de membresías.
+Signals para el sistema de valoraciones de clases, activación de membresías
+y mantenimiento de la tabla de hechos de asistencia (AttendanceFact).
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
@@ -163,3 +164,122 @@ def activate_pending_membership_on_first_visit(sender, instance, created, **kwar
             f"Membresía #{membership.id} activada por primera visita "
             f"(cliente: {client}, plan: {plan.name})"
         )
+
+
+# =============================================================================
+# TABLA DE HECHOS DE ASISTENCIA (AttendanceFact)
+# =============================================================================
+
+FACT_STATUSES = ('COMPLETED', 'CANCELLED')
+
+
+def _refresh_attendance_fact(session, previous_key=None):
+    from .rollups import refresh_for_session
+    try:
+        refresh_for_session(session, previous_key=previous_key)
+    except Exception as e:
+        logger.warning(f"No se pudo actualizar AttendanceFact de la sesión {session.pk}: {e}")
+
+
+@receiver(pre_save, sender='activities.ActivitySession')
+def remember_session_fact_key(sender, instance, **kwargs):
+    """Guarda el bucket y estado previos para detectar cambios de hora/instructor/sala."""
+    from .rollups import fact_key_for
+
+    instance._previous_fact_key = None
+    instance._previous_status = None
+    if not instance.pk:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(
+        'gym_id', 'activity_id', 'staff_id', 'room_id', 'start_datetime', 'status'
+    ).first()
+    if previous:
+        instance._previous_status = previous.pop('status')
+        instance._previous_fact_key = fact_key_for(**previous)
+
+
+@receiver(post_save, sender='activities.ActivitySession')
+def update_attendance_fact_on_session_change(sender, instance, created, **kwargs):
+    """
+    Refresca el hecho de asistencia cuando una sesión se completa o cancela
+    (o cambia de bucket una sesión ya agregada). Las sesiones programadas
+    se recogen en la reconstrucción nocturna.
+    """
+    from .rollups import session_fact_key
+
+    previous_key = getattr(instance, '_previous_fact_key', None)
+    previous_status = getattr(instance, '_previous_status', None)
+    moved = previous_key is not None and previous_key != session_fact_key(instance)
+
+    if instance.status in FACT_STATUSES or previous_status in FACT_STATUSES or moved:
+        _refresh_attendance_fact(instance, previous_key=previous_key)
+
+
+@receiver(post_delete, sender='activities.ActivitySession')
+def update_attendance_fact_on_session_delete(sender, instance, **kwargs):
+    _refresh_attendance_fact(instance)
+
+
+@receiver(m2m_changed, sender='activities.ActivitySession_attendees')
+def update_attendance_fact_on_attendees_change(sender, instance, action, reverse, pk_set, **kwargs):
+    from .models import ActivitySession
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        sessions = [instance]
+    else:
+        # client.attended_sessions.add(...): pk_set son sesiones
+        sessions = ActivitySession.objects.filter(pk__in=pk_set or [])
+    for session in sessions:
+        if session.status == 'COMPLETED':
+            _refresh_attendance_fact(session)
+
+
+@receiver(post_save, sender='activities.ActivitySessionBooking')
+def update_attendance_fact_on_booking_change(sender, instance, **kwargs):
+    """No-shows y cancelaciones de clases ya cerradas."""
+    session = instance.session
+    if session.status in FACT_STATUSES:
+        _refresh_attendance_fact(session)
+
+
+# =============================================================================
+# PANTALLAS DE QR (contador de check-ins en caché, ver activities.qr_display)
+# =============================================================================
+
+@receiver(post_save, sender='activities.SessionCheckin')
+def count_checkin_for_qr_display(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from django.db import transaction
+        from .qr_display import add_checkins
+
+        session_id = instance.session_id
+        transaction.on_commit(lambda: add_checkins(session_id, 1))
+
+
+@receiver(post_delete, sender='activities.SessionCheckin')
+def uncount_checkin_for_qr_display(sender, instance, **kwargs):
+    from django.db import transaction
+    from .qr_display import add_checkins
+
+    session_id = instance.session_id
+    transaction.on_commit(lambda: add_checkins(session_id, -1))
+
+
+@receiver(post_save, sender='activities.ActivitySession')
+def invalidate_qr_display_on_session_change(sender, instance, created, **kwargs):
+    if not created:
+        from .qr_display import invalidate
+        invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender='activities.ActivitySession_attendees')
+def invalidate_qr_display_on_attendees_change(sender, instance, action, reverse, pk_set, **kwargs):
+    from .qr_display import invalidate
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # Al vaciar desde el cliente no se conocen las sesiones: las recoge la caducidad
+    for session_id in (pk_set or []) if reverse else [instance.pk]:
+        invalidate(session_id)
@@ -100,3 +100,16 @@ def send_review_request_notification_sync(request_id):
     Versión síncrona del envío de notificación (fallback si Celery no disponible).
     """
     send_review_request_notification(request_id)
+
+
+@shared_task(name='activities.rebuild_attendance_facts')
+def rebuild_attendance_facts(days=2):
+    """
+    Reconstruye la tabla de hechos de asistencia de los últimos días.
+    Recoge cambios que no disparan señales (sesiones programadas, ediciones masivas).
+    Ejecutar diariamente via Celery Beat.
+    """
+    from activities.rollups import rebuild_recent
+    
+    rows = rebuild_recent(days=days)
+    return f"Rebuilt {rows} attendance fact rows"
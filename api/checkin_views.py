@@ -6,6 +6,8 @@ SECURITY:
 - Uses HMAC with SECRET_KEY for token generation (not just SHA256)
 - Tokens expire every 30 seconds
 - Longer token length (16 chars = 64 bits) for better security
+- `credential`: Ed25519-signed credential (access_control.credentials) that
+  doors in LOCAL mode verify without calling the server
 """
 from rest_framework import views, status
 from rest_framework.response import Response
@@ -19,6 +21,7 @@ import time
 
 from clients.models import Client, ClientVisit
 from activities.models import ActivitySession, SessionCheckin, AttendanceSettings
+from access_control.credentials import issue_credential
 
 
 def _generate_secure_qr_token(client_id: int, access_code: str, timestamp: int) -> str:
@@ -87,9 +90,13 @@ class GenerateQRTokenView(views.APIView):
                 'sessions_total': getattr(plan, 'sessions_included', None) if plan else None,
             }
         
+        credential, credential_expires = issue_credential(client)
+        
         return Response({
             'token': qr_token,
             'expires_in': expires_in,
+            'credential': credential,
+            'credential_expires_at': credential_expires,
             'membership': membership_info
         })
     
@@ -129,10 +136,14 @@ class RefreshQRTokenView(views.APIView):
         next_refresh = (timestamp + 1) * 30
         expires_in = int(next_refresh - current_time)
         
+        credential, credential_expires = issue_credential(client)
+        
         return Response({
             'token': qr_token,
             'expires_in': expires_in,
             'timestamp': timestamp,
+            'credential': credential,
+            'credential_expires_at': credential_expires,
         })
 
 
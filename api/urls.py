@@ -24,6 +24,8 @@ from .workout_views import (
     StartWorkoutView,
     WorkoutStatusView,
     LogSetView,
+    SyncWorkoutView,
+    ExerciseProgressView,
     CompleteExerciseView,
     FinishWorkoutView,
     WorkoutHistoryView,
@@ -96,6 +98,8 @@ from .wallet_views import (
     WalletBonusCalculatorView
 )
 
+from access_control.urls import api_urlpatterns as access_api_urlpatterns
+
 urlpatterns = [
     # System Config
     path('system/config/', views.SystemConfigView.as_view(), name='api_system_config'),
@@ -133,6 +137,9 @@ urlpatterns = [
     path('workout/start/', StartWorkoutView.as_view(), name='api_workout_start'),
     path('workout/active/', ActiveWorkoutView.as_view(), name='api_workout_active'),
     path('workout/history/', WorkoutHistoryView.as_view(), name='api_workout_history'),
+    path('workout/sync/', SyncWorkoutView.as_view(), name='api_workout_sync'),
+    path('workout/progress/', ExerciseProgressView.as_view(), name='api_workout_progress'),
+    path('workout/progress/<int:exercise_id>/', ExerciseProgressView.as_view(), name='api_workout_exercise_progress'),
     path('workout/<int:workout_id>/', WorkoutStatusView.as_view(), name='api_workout_status'),
     path('workout/<int:workout_id>/log/<int:exercise_log_id>/set/', LogSetView.as_view(), name='api_workout_log_set'),
     path('workout/<int:workout_id>/log/<int:exercise_log_id>/complete/', CompleteExerciseView.as_view(), name='api_workout_complete_exercise'),
@@ -219,3 +226,6 @@ urlpatterns = [
 
 
 
+
+# API de hardware de control de acceso (autenticación por API Key del dispositivo)
+urlpatterns += access_api_urlpatterns
@@ -12,8 +12,10 @@ import json
 from clients.models import Client
 from routines.models import (
     ClientRoutine, RoutineDay, RoutineExercise, 
-    WorkoutLog, ExerciseLog
+    WorkoutLog, ExerciseLog, ExerciseProgress
 )
+from routines.progression import serialize_progress
+from routines.workout_sync import WorkoutSyncError, sync_workout
 
 
 def get_client_from_user(user):
@@ -212,6 +214,30 @@ class LogSetView(views.APIView):
         })
 
 
+class SyncWorkoutView(views.APIView):
+    """
+    POST: Sincronizar de una vez un entrenamiento grabado en la app
+    (todas las series de todos los ejercicios, opcionalmente finalizado).
+    URL: /api/workout/sync/
+    
+    Body: ver routines.workout_sync. Idempotente: reenviar el mismo lote
+    (mismo workout_id/sync_key e ids de serie) no duplica series.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        client = get_client_from_user(request.user)
+        if not client:
+            return Response({'error': 'No es un cliente'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            result = sync_workout(client, request.data)
+        except WorkoutSyncError as e:
+            return Response({'error': str(e)}, status=e.status)
+        
+        return Response({'success': True, **result})
+
+
 class CompleteExerciseView(views.APIView):
     """
     POST: Marcar un ejercicio como completado.
@@ -418,3 +444,39 @@ class ActiveWorkoutView(views.APIView):
             'routine_name': active_workout.routine.name if active_workout.routine else None,
             'day_name': active_workout.routine_day.name if active_workout.routine_day else None,
         })
+
+
+class ExerciseProgressView(views.APIView):
+    """
+    GET: Progresión del cliente por ejercicio (récords, 1RM estimado, volumen).
+    URL: /api/workout/progress/                  -> resumen de todos los ejercicios
+    URL: /api/workout/progress/<exercise_id>/    -> resumen + serie semanal
+    
+    Query params:
+    - weeks: semanas de la serie (default 52, 0 = todas)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, exercise_id=None):
+        client = get_client_from_user(request.user)
+        if not client:
+            return Response({'error': 'No es un cliente'}, status=status.HTTP_403_FORBIDDEN)
+        
+        progress = ExerciseProgress.objects.filter(client=client).select_related('exercise')
+        
+        if exercise_id is None:
+            return Response({
+                'exercises': [
+                    {**serialize_progress(p), 'exercise_name': p.exercise.name}
+                    for p in progress.order_by('-last_week', 'exercise__name')
+                ],
+            })
+        
+        p = progress.filter(exercise_id=exercise_id).first()
+        if not p:
+            return Response({'error': 'Sin registros para este ejercicio'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            weeks = max(0, int(request.query_params.get('weeks', 52)))
+        except ValueError:
+            weeks = 52
+        return Response({**serialize_progress(p, weeks=weeks), 'exercise_name': p.exercise.name})
@@ -1,14 +1,11 @@
 from django.utils import timezone
-from django.db.models import Sum, Count, Q, Max, Prefetch, OuterRef, Subquery
+from django.db.models import Sum, Count, Q, F, Max, Prefetch
 from django.db.models.functions import TruncDate, TruncMonth
 from django.core.cache import cache
 from datetime import timedelta, datetime
 from sales.models import Order
 from clients.models import Client
 from memberships.models import MembershipPlan
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
 
 class DashboardService:
     CACHE_TIMEOUT = 300  # 5 minutos de caché
@@ -93,7 +90,7 @@ class DashboardService:
 
     def get_risk_clients_enhanced(self):
         """
-        ⭐ SISTEMA DE SCORING DE RIESGO ESTRATOSFÉRICO (0-100 puntos):
+        ⭐ SISTEMA DE SCORING DE RIESGO (0-100 puntos):
         
         FACTORES FINANCIEROS (50 pts max):
         - 30 pts: Pagos pendientes (cada orden)
@@ -106,189 +103,41 @@ class DashboardService:
         
         FACTORES DE RETENCIÓN (15 pts max):
         - 10 pts: Cliente nuevo (<3 meses)
-        - 15 pts: Tasa de asistencia <50% del promedio (si hay datos)
         
-        OPTIMIZADO: Una sola consulta con anotaciones + análisis de user.last_login
+        La puntuación de todos los clientes activos la calcula clients.risk_scoring
+        (job nocturno + recálculo incremental) y aquí solo se leen los 15 de más
+        riesgo de ClientRiskScore.
         """
         def _calculate():
-            try:
-                from clients.models import ClientMembership
-            except:
-                ClientMembership = None
-            
-            # Subconsultas para evitar N+1
-            last_order_date = Order.objects.filter(
-                client=OuterRef('pk'),
-                status='PAID'
-            ).order_by('-created_at').values('created_at')[:1]
-            
-            pending_orders_count = Order.objects.filter(
-                client=OuterRef('pk'),
-                status__in=['PENDING', 'PARTIAL']
-            ).values('client').annotate(cnt=Count('id')).values('cnt')
-            
-            # Consulta optimizada con anotaciones + datos de usuario
-            clients = Client.objects.filter(
-                gym=self.gym, 
-                status='ACTIVE'
-            ).select_related('user').annotate(
-                pending_orders=Count('orders', filter=Q(orders__status__in=['PENDING', 'PARTIAL'])),
-                last_order_date=Subquery(last_order_date)
-            ).only(
-                'id', 'first_name', 'last_name', 'email', 'created_at', 
-                'last_app_access', 'app_access_count', 'user'
-            )[:150]  # Aumentado para mejor análisis
-            
-            # Pre-cargar membresías expirando
-            expiring_memberships = {}
-            if ClientMembership:
-                expiring = ClientMembership.objects.filter(
-                    client__gym=self.gym,
-                    client__status='ACTIVE',
-                    status='ACTIVE',
-                    end_date__lte=self.today + timedelta(days=15),
-                    end_date__gte=self.today
-                ).select_related('client').order_by('end_date')
-                
-                for m in expiring:
-                    if m.client_id not in expiring_memberships:
-                        expiring_memberships[m.client_id] = m.end_date
+            from clients.risk_scoring import risk_level, top_risk_scores
             
             risk_clients = []
-            
-            for client in clients:
-                score = 0
-                factors = []
-                
-                # ======== FACTORES FINANCIEROS (50 pts max) ========
-                
-                # Factor 1: Billing Risk (30 pts max)
-                if client.pending_orders > 0:
-                    billing_score = min(30, client.pending_orders * 10)
-                    score += billing_score
-                    factors.append({
-                        'type': 'billing',
-                        'text': f'💳 {client.pending_orders} pagos pendientes',
-                        'points': billing_score,
-                        'category': 'financial'
-                    })
-                
-                # Factor 2: Membership Expiry Risk (20 pts)
-                if client.id in expiring_memberships:
-                    score += 20
-                    factors.append({
-                        'type': 'expiry',
-                        'text': f'⏰ Expira {expiring_memberships[client.id].strftime("%d/%m")}',
-                        'points': 20,
-                        'category': 'financial'
-                    })
+            for risk in top_risk_scores(self.gym, limit=15):
+                client = risk.client
+                factors = risk.factors
+                level = risk_level(risk.score)
                 
-                # ======== FACTORES DE ENGAGEMENT (35 pts max) ========
-                
-                # Factor 3: App/Portal Inactivity (25 pts) - NUEVO
-                if client.user:  # Tiene cuenta en el portal/app
-                    if client.user.last_login:
-                        days_since_login = (timezone.now() - client.user.last_login).days
-                        if days_since_login > 30:
-                            # Progresivo: más días = más puntos
-                            engagement_score = min(25, 15 + ((days_since_login - 30) // 10) * 5)
-                            score += engagement_score
-                            factors.append({
-                                'type': 'app_inactive',
-                                'text': f'📱 Sin acceso app {days_since_login} días',
-                                'points': engagement_score,
-                                'category': 'engagement'
-                            })
-                    else:
-                        # Cuenta creada pero nunca accedió (10 pts)
-                        score += 10
-                        factors.append({
-                            'type': 'no_app_login',
-                            'text': '🔒 Nunca accedió a la app',
-                            'points': 10,
-                            'category': 'engagement'
-                        })
-                
-                # Factor 4: Order Inactivity (15 pts)
-                if client.last_order_date:
-                    days_since_order = (self.today - client.last_order_date.date()).days
-                    if days_since_order > 30:
-                        inactive_score = min(15, (days_since_order // 15) * 5)
-                        score += inactive_score
-                        factors.append({
-                            'type': 'inactive',
-                            'text': f'💤 Sin pagos {days_since_order} días',
-                            'points': inactive_score,
-                            'category': 'engagement'
-                        })
-                else:
-                    # Nunca ha pagado (crítico)
-                    score += 15
-                    factors.append({
-                        'type': 'no_payment',
-                        'text': '❌ Sin historial de pagos',
-                        'points': 15,
-                        'category': 'engagement'
-                    })
-                
-                # ======== FACTORES DE RETENCIÓN (15 pts max) ========
-                
-                # Factor 5: New Client Risk (10 pts)
-                days_as_client = (self.today - client.created_at.date()).days
-                if days_as_client < 90:
-                    score += 10
-                    factors.append({
-                        'type': 'new_client',
-                        'text': f'🆕 Cliente nuevo ({days_as_client}d)',
-                        'points': 10,
-                        'category': 'retention'
-                    })
-                
-                # Agregar a lista si score >= 15 (umbral reducido para capturar más casos)
-                if score >= 15:
-                    # Determinar nivel de riesgo
-                    if score >= 70:
-                        risk_level = 'CRÍTICO'
-                        risk_color = 'red'
-                        risk_icon = '🚨'
-                    elif score >= 50:
-                        risk_level = 'ALTO'
-                        risk_color = 'orange'
-                        risk_icon = '⚠️'
-                    elif score >= 30:
-                        risk_level = 'MEDIO'
-                        risk_color = 'yellow'
-                        risk_icon = '⚡'
-                    else:
-                        risk_level = 'BAJO'
-                        risk_color = 'blue'
-                        risk_icon = 'ℹ️'
-                    
-                    # Categorizar factores
-                    financial_factors = [f for f in factors if f.get('category') == 'financial']
-                    engagement_factors = [f for f in factors if f.get('category') == 'engagement']
-                    retention_factors = [f for f in factors if f.get('category') == 'retention']
-                    
-                    risk_clients.append({
-                        'id': client.id,
-                        'name': f"{client.first_name} {client.last_name}",
-                        'email': client.email,
-                        'score': score,
-                        'level': risk_level,
-                        'color': risk_color,
-                        'icon': risk_icon,
-                        'factors': factors,
-                        'financial_factors': financial_factors,
-                        'engagement_factors': engagement_factors,
-                        'retention_factors': retention_factors,
-                        'has_app_access': bool(client.user),
-                        'action_required': score >= 50,
-                        'days_to_action': max(1, 30 - (score // 3)),
-                        # Recomendaciones de acción
-                        'recommended_actions': self._get_recommended_actions(factors, score)
-                    })
+                risk_clients.append({
+                    'id': client.id,
+                    'name': f"{client.first_name} {client.last_name}",
+                    'email': client.email,
+                    'score': risk.score,
+                    'level': level['label'],
+                    'color': level['color'],
+                    'icon': level['icon'],
+                    'factors': factors,
+                    'financial_factors': [f for f in factors if f.get('category') == 'financial'],
+                    'engagement_factors': [f for f in factors if f.get('category') == 'engagement'],
+                    'retention_factors': [f for f in factors if f.get('category') == 'retention'],
+                    'has_app_access': bool(client.user_id),
+                    'action_required': risk.score >= 50,
+                    'days_to_action': max(1, 30 - (risk.score // 3)),
+                    'computed_at': risk.computed_at,
+                    # Recomendaciones de acción
+                    'recommended_actions': self._get_recommended_actions(factors, risk.score)
+                })
             
-            return sorted(risk_clients, key=lambda x: x['score'], reverse=True)[:15]
+            return risk_clients
         
         return self._get_cached('risk_clients_enhanced', _calculate)
     
@@ -435,149 +284,21 @@ class DashboardService:
 
     def get_revenue_forecast(self, months_ahead=3):
         """
-        Forecasting con Moving Average + Linear Regression
-        Predice la facturación de los próximos N meses.
-        Optimizado con caché (datos no cambian mucho).
+        Forecasting con Moving Average + tendencia lineal (mínimos cuadrados).
+        Predice la facturación de los próximos N meses a partir de la
+        facturación mensual agregada (GymMonthlyRevenue), sin recorrer Order.
         """
+        from backoffice.forecasting import forecast_gyms
+        
         def _calculate():
-            try:
-                # 1. Recopilar data histórica (últimos 6-12 meses)
-                six_months_ago = self.today - timedelta(days=180)
-                
-                monthly_data = Order.objects.filter(
-                    gym=self.gym,
-                    status='PAID',
-                    created_at__date__gte=six_months_ago
-                ).annotate(
-                    month=TruncMonth('created_at')
-                ).values('month').annotate(
-                    total=Sum('total_amount')
-                ).order_by('month')
-                
-                # 2. Convertir a DataFrame
-                df = pd.DataFrame(list(monthly_data))
-                if df.empty:
-                    return self._empty_forecast(months_ahead)
-                
-                df.columns = ['date', 'revenue']
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.sort_values('date').reset_index(drop=True)
-                df['revenue'] = df['revenue'].astype(float)
-                
-                # 3. Rellenar meses faltantes con interpolación
-                date_range = pd.date_range(start=six_months_ago, end=self.today, freq='MS')
-                df = df.set_index('date').reindex(date_range, fill_value=0).reset_index()
-                df.columns = ['date', 'revenue']
-                df['revenue'] = df['revenue'].interpolate(method='linear', fill_value='backfill')
-                
-                # 4. Calcular Moving Average (suavizar)
-                if len(df) >= 3:
-                    df['ma_3m'] = df['revenue'].rolling(window=3, center=True, min_periods=1).mean()
-                    forecast_values = df['ma_3m'].values
-                else:
-                    forecast_values = df['revenue'].values
-                
-                # 5. Linear Regression para tendencia
-                X = np.arange(len(df)).reshape(-1, 1)
-                y = df['revenue'].values
-                
-                model = LinearRegression()
-                model.fit(X, y)
-                slope = float(model.coef_[0])
-                
-                # 6. Predecir próximos meses
-                future_indices = np.arange(len(df), len(df) + months_ahead).reshape(-1, 1)
-                forecast = model.predict(future_indices)
-                
-                # 7. Construir respuesta
-                forecast_data = []
-                for i in range(months_ahead):
-                    future_date = self.today + timedelta(days=30 * (i + 1))
-                    predicted_value = max(0, float(forecast[i]))
-                    
-                    # Determinar confianza basada en cantidad de datos
-                    if len(df) >= 12:
-                        confidence = 'ALTA'
-                        confidence_pct = 85
-                    elif len(df) >= 6:
-                        confidence = 'MEDIA'
-                        confidence_pct = 70
-                    else:
-                        confidence = 'BAJA'
-                        confidence_pct = 55
-                    
-                    forecast_data.append({
-                        'month': future_date.strftime("%b %Y"),
-                        'month_short': future_date.strftime("%b"),
-                        'predicted': round(predicted_value, 2),
-                        'confidence': confidence,
-                        'confidence_pct': confidence_pct
-                    })
-                
-                # Histórico promedio - manejar NaN
-                positive_revenue = df[df['revenue'] > 0]['revenue']
-                if len(positive_revenue) > 0:
-                    historical_avg = float(positive_revenue.mean())
-                    if pd.isna(historical_avg):
-                        historical_avg = 0
-                else:
-                    historical_avg = 0
-                
-                # Determinar tendencia
-                if slope > 0:
-                    trend = 'CRECIENTE'
-                    trend_icon = '↑'
-                    trend_color = 'green'
-                elif slope < 0:
-                    trend = 'DECRECIENTE'
-                    trend_icon = '↓'
-                    trend_color = 'red'
-                else:
-                    trend = 'ESTABLE'
-                    trend_icon = '→'
-                    trend_color = 'gray'
-                
-                return {
-                    'forecast': forecast_data,
-                    'historical_avg': round(historical_avg, 2) if not pd.isna(historical_avg) else 0,
-                    'historical_data_points': len(df),
-                    'trend': trend,
-                    'trend_icon': trend_icon,
-                    'trend_color': trend_color,
-                    'trend_strength': round(abs(slope), 2),
-                    'total_quarterly': round(sum(f['predicted'] for f in forecast_data), 2),
-                    'monthly_avg': round(sum(f['predicted'] for f in forecast_data) / len(forecast_data), 2)
-                }
-            except Exception as e:
-                # Si hay error, retornar forecast vacío pero válido
-                return self._empty_forecast(months_ahead)
+            return forecast_gyms([self.gym], months_ahead, today=self.today)[self.gym.id]
         
         return self._get_cached(f'revenue_forecast_{months_ahead}', _calculate)
     
     def _empty_forecast(self, months_ahead=3):
         """Helper para retornar estructura válida cuando no hay datos"""
-        forecast_data = []
-        for i in range(months_ahead):
-            future_date = self.today + timedelta(days=30 * (i + 1))
-            forecast_data.append({
-                'month': future_date.strftime("%b %Y"),
-                'month_short': future_date.strftime("%b"),
-                'predicted': 0,
-                'confidence': 'BAJA',
-                'confidence_pct': 0
-            })
-        
-        return {
-            'forecast': forecast_data,
-            'historical_avg': 0,
-            'historical_data_points': 0,
-            'trend': 'SIN DATOS',
-            'trend_icon': '?',
-            'trend_color': 'gray',
-            'trend_strength': 0,
-            'total_quarterly': 0,
-            'monthly_avg': 0
-        }
+        from backoffice.forecasting import empty_forecast
+        return empty_forecast(self.today, months_ahead)
 
     def get_breakeven_analysis(self):
         """
@@ -593,15 +314,12 @@ class DashboardService:
             # Calcular facturación mensual (últimos 6 meses)
             six_months_ago = self.today - timedelta(days=180)
             
-            monthly_revenue = Order.objects.filter(
+            # Facturación mensual agregada (GymMonthlyRevenue), sin recorrer Order
+            from sales.models import GymMonthlyRevenue
+            monthly_revenue = GymMonthlyRevenue.objects.filter(
                 gym=self.gym,
-                status='PAID',
-                created_at__gte=six_months_ago
-            ).annotate(
-                month=TruncMonth('created_at')
-            ).values('month').annotate(
-                total=Sum('total_amount')
-            ).order_by('month')
+                month__gte=six_months_ago.replace(day=1)
+            ).values('month', total=F('total_amount')).order_by('month')
             
             # Calcular gastos mensuales (últimos 6 meses)
             monthly_expenses = Expense.objects.filter(
@@ -618,11 +336,7 @@ class DashboardService:
             expenses_by_month = {item['month']: float(item['total'] or 0) for item in monthly_expenses}
             
             # Balance del mes actual
-            current_month_revenue = float(Order.objects.filter(
-                gym=self.gym,
-                status='PAID',
-                created_at__gte=self.first_day_this_month
-            ).aggregate(total=Sum('total_amount'))['total'] or 0)
+            current_month_revenue = revenue_by_month.get(self.first_day_this_month, 0)
             
             current_month_expenses = float(Expense.objects.filter(
                 gym=self.gym,
@@ -632,9 +346,8 @@ class DashboardService:
             current_balance = current_month_revenue - current_month_expenses
             
             # Balance acumulado total (desde el inicio)
-            total_revenue = float(Order.objects.filter(
-                gym=self.gym,
-                status='PAID'
+            total_revenue = float(GymMonthlyRevenue.objects.filter(
+                gym=self.gym
             ).aggregate(total=Sum('total_amount'))['total'] or 0)
             
             total_expenses = float(Expense.objects.filter(
@@ -0,0 +1,193 @@
+"""
+Forecast de facturación sin dependencias (ni pandas ni sklearn).
+
+Trabaja sobre series mensuales compactas (sales.revenue.monthly_series, leídas
+de GymMonthlyRevenue): media móvil, tendencia por mínimos cuadrados en forma
+cerrada y, opcionalmente, estacionalidad multiplicativa por mes del año cuando
+hay al menos dos años de histórico.
+
+Usage:
+    from backoffice.forecasting import forecast_gyms, forecast_franchise
+
+    forecast_gyms([gym], months_ahead=3)[gym.id]['forecast']
+    forecast_franchise(franchise)   # {gym_id: forecast}
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+HISTORY_MONTHS = 6
+SEASONAL_PERIOD = 12
+
+
+def moving_average(values, window=3):
+    """Media móvil centrada (ventana incompleta en los extremos)."""
+    half = window // 2
+    result = []
+    for i in range(len(values)):
+        chunk = values[max(0, i - half):i + window - half]
+        result.append(sum(chunk) / len(chunk))
+    return result
+
+
+def linear_trend(values):
+    """
+    Recta de mínimos cuadrados y = intercept + slope·x con x = 0..n-1.
+    Devuelve (slope, intercept).
+    """
+    n = len(values)
+    if n == 0:
+        return 0.0, 0.0
+    if n == 1:
+        return 0.0, float(values[0])
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    # Σ(x - x̄)² = n(n²-1)/12
+    sxx = n * (n * n - 1) / 12
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    slope = sxy / sxx
+    return slope, mean_y - slope * mean_x
+
+
+def seasonal_indices(values, period=SEASONAL_PERIOD):
+    """
+    Índices estacionales multiplicativos (media 1) por posición en el ciclo,
+    sobre la serie sin tendencia. None si hay menos de dos ciclos completos.
+    """
+    if len(values) < 2 * period:
+        return None
+    slope, intercept = linear_trend(values)
+    ratios = [[] for _ in range(period)]
+    for x, y in enumerate(values):
+        fitted = intercept + slope * x
+        if fitted > 0:
+            ratios[x % period].append(y / fitted)
+    indices = [sum(r) / len(r) if r else 1.0 for r in ratios]
+    mean = sum(indices) / period
+    return [i / mean for i in indices] if mean > 0 else None
+
+
+def forecast_series(values, months_ahead=3, seasonal=False):
+    """
+    Predicción de los próximos meses de una serie mensual.
+    Devuelve (predicciones, slope).
+    """
+    slope, intercept = linear_trend(values)
+    indices = seasonal_indices(values) if seasonal else None
+    n = len(values)
+    predictions = []
+    for step in range(months_ahead):
+        x = n + step
+        value = intercept + slope * x
+        if indices:
+            value *= indices[x % SEASONAL_PERIOD]
+        predictions.append(max(0.0, value))
+    return predictions, slope
+
+
+def _confidence(points):
+    if points >= 12:
+        return 'ALTA', 85
+    if points >= 6:
+        return 'MEDIA', 70
+    return 'BAJA', 55
+
+
+def empty_forecast(today, months_ahead=3):
+    """Estructura válida cuando no hay datos."""
+    forecast_data = []
+    for i in range(months_ahead):
+        future_date = today + timedelta(days=30 * (i + 1))
+        forecast_data.append({
+            'month': future_date.strftime("%b %Y"),
+            'month_short': future_date.strftime("%b"),
+            'predicted': 0,
+            'confidence': 'BAJA',
+            'confidence_pct': 0
+        })
+
+    return {
+        'forecast': forecast_data,
+        'historical_avg': 0,
+        'historical_data_points': 0,
+        'trend': 'SIN DATOS',
+        'trend_icon': '?',
+        'trend_color': 'gray',
+        'trend_strength': 0,
+        'total_quarterly': 0,
+        'monthly_avg': 0
+    }
+
+
+def build_forecast(values, today, months_ahead=3, seasonal=False):
+    """Forecast del dashboard (misma estructura que DashboardService) para una serie."""
+    if not any(values):
+        return empty_forecast(today, months_ahead)
+
+    predictions, slope = forecast_series(values, months_ahead, seasonal=seasonal)
+    confidence, confidence_pct = _confidence(len(values))
+
+    forecast_data = []
+    for i, predicted in enumerate(predictions):
+        future_date = today + timedelta(days=30 * (i + 1))
+        forecast_data.append({
+            'month': future_date.strftime("%b %Y"),
+            'month_short': future_date.strftime("%b"),
+            'predicted': round(predicted, 2),
+            'confidence': confidence,
+            'confidence_pct': confidence_pct
+        })
+
+    positive = [v for v in values if v > 0]
+    historical_avg = sum(positive) / len(positive) if positive else 0
+
+    if slope > 0:
+        trend, trend_icon, trend_color = 'CRECIENTE', '↑', 'green'
+    elif slope < 0:
+        trend, trend_icon, trend_color = 'DECRECIENTE', '↓', 'red'
+    else:
+        trend, trend_icon, trend_color = 'ESTABLE', '→', 'gray'
+
+    total = sum(f['predicted'] for f in forecast_data)
+    return {
+        'forecast': forecast_data,
+        'historical_avg': round(historical_avg, 2),
+        'historical_data_points': len(values),
+        'trend': trend,
+        'trend_icon': trend_icon,
+        'trend_color': trend_color,
+        'trend_strength': round(abs(slope), 2),
+        'total_quarterly': round(total, 2),
+        'monthly_avg': round(total / len(forecast_data), 2) if forecast_data else 0,
+        'history_smoothed': [round(v, 2) for v in moving_average(values)]
+    }
+
+
+def forecast_gyms(gyms, months_ahead=3, history_months=HISTORY_MONTHS, seasonal=False, today=None):
+    """
+    Forecast de varios gimnasios con una sola consulta a GymMonthlyRevenue.
+
+    El histórico son los `history_months` meses hasta el actual (incluido).
+    Con seasonal=True se aplica estacionalidad si hay al menos 24 meses.
+    Returns: {gym_id: forecast}
+    """
+    from sales.revenue import add_months, month_start, monthly_series
+
+    today = today or timezone.localdate()
+    current = month_start(today)
+    start = add_months(current, -(history_months - 1))
+    gym_ids = [gym.id if hasattr(gym, 'id') else gym for gym in gyms]
+
+    series = monthly_series(gym_ids, start, current)
+    return {
+        gym_id: build_forecast(series[gym_id], today, months_ahead, seasonal=seasonal)
+        for gym_id in gym_ids
+    }
+
+
+def forecast_franchise(franchise, months_ahead=3, **kwargs):
+    """Forecast de todos los gimnasios de una franquicia. Returns: {gym_id: forecast}"""
+    from organizations.models import Gym
+
+    gym_ids = list(Gym.objects.filter(franchise=franchise).values_list('id', flat=True))
+    return forecast_gyms(gym_ids, months_ahead, **kwargs)
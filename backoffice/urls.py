@@ -2,6 +2,7 @@ from django.urls import path, include
 from . import views
 from organizations.views import gym_settings_view
 from accounts.views import switch_gym
+from core.export_views import export_job_download, export_job_status
 from clients.views import (
     clients_list, client_create, client_detail, client_edit, 
     client_add_note, client_delete_note, client_add_document, client_edit_note,
@@ -39,6 +40,8 @@ urlpatterns = [
     path("clients/import/", client_import, name="client_import"),
     path("clients/export/excel/", client_export_excel, name="client_export_excel"),
     path("clients/export/pdf/", client_export_pdf, name="client_export_pdf"),
+    path("exports/<str:job_id>/", export_job_status, name="export_job_status"),
+    path("exports/<str:job_id>/download/", export_job_download, name="export_job_download"),
     path("clients/create/", client_create, name="client_create"),
     path("clients/<int:client_id>/", client_detail, name="client_detail"),
     path("clients/<int:client_id>/edit/", client_edit, name="client_edit"),
@@ -394,7 +394,7 @@ def chat_poll_messages(request, room_id):
 def chat_search_clients(request):
     """Buscar clientes para iniciar chat (AJAX)"""
     from clients.models import Client
-    from django.db.models import Q
+    from clients.search import search_clients
     
     gym_id = request.session.get("current_gym_id")
     if not gym_id:
@@ -408,15 +408,7 @@ def chat_search_clients(request):
         user__isnull=False  # Solo clientes con acceso al portal
     )
     
-    if search_term:
-        clients = clients.filter(
-            Q(first_name__icontains=search_term) |
-            Q(last_name__icontains=search_term) |
-            Q(email__icontains=search_term) |
-            Q(phone_number__icontains=search_term)
-        )
-    
-    clients = clients[:20]  # Limitar a 20 resultados
+    clients = search_clients(clients, search_term, limit=20)  # Limitar a 20 resultados
     
     results = [{
         'id': client.id,
@@ -4,14 +4,95 @@ Servicio de Calendario iCal para sincronización con calendarios externos.
 Funcionalidades:
 1. Generar archivo .ics para una reserva individual
 2. Generar feed iCal (URL de suscripción) con todas las reservas del cliente
+
+Google, Apple y Outlook consultan el feed de cada suscriptor periódicamente
+y para siempre. Para que esas consultas no regeneren el calendario:
+
+- Cada cliente tiene una versión de feed (en caché) que se renueva al
+  confirmar cambios en sus reservas, en las sesiones reservadas o en la
+  actividad (ver clients.signals). Con la versión y el día de la ventana se
+  forma el ETag, así que la vista responde 304 sin tocar las reservas.
+- El .ics generado se guarda en caché por ETag.
+- Los eventos se escriben directamente como texto (RFC 5545: escapado,
+  líneas plegadas a 75 octetos, CRLF y horas en UTC) en lugar de construir
+  componentes de icalendar.
 """
 
-import hashlib
 import secrets
-from datetime import timedelta
-from icalendar import Calendar, Event, vText
-from django.utils import timezone
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+FEED_WINDOW_DAYS = 14
+
+FEED_VERSION_CACHE_KEY = 'calendar_feed_version:{}'
+FEED_CACHE_KEY = 'calendar_feed_ics:{}:{}'
+# Sin cambios, la versión caduca y se asigna otra (un 200 extra por cliente)
+FEED_VERSION_TTL = 30 * 24 * 3600
+# Recoge cambios que no renuevan la versión (datos del gimnasio, instructor)
+FEED_CACHE_TTL = 24 * 3600
+
+
+# -----------------------------------------------------------------------------
+# Escritura iCal
+# -----------------------------------------------------------------------------
+
+def escape_text(value):
+    """Escapa un valor TEXT de iCal (barra, punto y coma, coma y saltos de línea)."""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Pliega una línea a 75 octetos sin partir caracteres UTF-8."""
+    if len(line.encode('utf-8')) <= 75:
+        return line
+    parts = []
+    current, size, limit = [], 0, 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            parts.append(''.join(current))
+            # Las líneas de continuación empiezan por un espacio
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += char_size
+    parts.append(''.join(current))
+    return '\r\n '.join(parts)
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _quote_param(value):
+    return '"{}"'.format(str(value).replace('"', "'"))
+
+
+def _render_calendar(name, prodid, events, extra=()):
+    lines = [
+        'BEGIN:VCALENDAR',
+        f'PRODID:{prodid}',
+        'VERSION:2.0',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+        *extra,
+    ]
+    for event_lines in events:
+        lines.extend(event_lines)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(fold_line(line) for line in lines) + '\r\n').encode('utf-8')
 
 
 def generate_booking_ics(booking):
@@ -24,22 +105,10 @@ def generate_booking_ics(booking):
     Returns:
         bytes: Contenido del archivo .ics
     """
-    cal = Calendar()
-    
-    # Propiedades del calendario
-    cal.add('prodid', '-//GymCRM//Booking Calendar//ES')
-    cal.add('version', '2.0')
-    cal.add('calscale', 'GREGORIAN')
-    cal.add('method', 'PUBLISH')
-    cal.add('x-wr-calname', 'Mi Reserva')
-    
-    event = _create_event_from_booking(booking)
-    cal.add_component(event)
-    
-    return cal.to_ical()
+    return _render_calendar('Mi Reserva', '-//GymCRM//Booking Calendar//ES', [_event_lines(booking)])
 
 
-def generate_client_calendar_feed(client, token):
+def generate_client_calendar_feed(client, token=None):
     """
     Genera un feed iCal completo con todas las reservas futuras del cliente.
     Este feed se actualiza automáticamente cuando el cliente de calendario
@@ -47,79 +116,69 @@ def generate_client_calendar_feed(client, token):
     
     Args:
         client: Client instance
-        token: Token único del cliente para el feed
+        token: Token único del cliente para el feed (no se usa; se mantiene
+            por compatibilidad)
     
     Returns:
         bytes: Contenido del feed iCal
     """
     from activities.models import ActivitySessionBooking
     
-    cal = Calendar()
-    
-    # Propiedades del calendario
     gym_name = client.gym.commercial_name or client.gym.name
-    cal.add('prodid', f'-//GymCRM//{gym_name}//ES')
-    cal.add('version', '2.0')
-    cal.add('calscale', 'GREGORIAN')
-    cal.add('method', 'PUBLISH')
-    cal.add('x-wr-calname', f'Mis Clases - {gym_name}')
-    cal.add('x-wr-timezone', str(timezone.get_current_timezone()))
-    
-    # Obtener reservas confirmadas (pasadas recientes + futuras)
-    # Incluimos las últimas 2 semanas para que el usuario vea historial reciente
-    two_weeks_ago = timezone.now() - timedelta(days=14)
     
+    # Incluimos las últimas 2 semanas (por días completos, ver feed_window_start)
+    # para que el usuario vea historial reciente
     bookings = ActivitySessionBooking.objects.filter(
         client=client,
         status='CONFIRMED',
-        session__start_datetime__gte=two_weeks_ago
+        session__start_datetime__gte=feed_window_start()
     ).select_related(
         'session',
         'session__activity',
+        'session__activity__category',
         'session__room',
         'session__staff',
         'session__staff__user',
         'session__gym'
     ).order_by('session__start_datetime')
     
-    for booking in bookings:
-        event = _create_event_from_booking(booking)
-        cal.add_component(event)
-    
-    return cal.to_ical()
+    return _render_calendar(
+        f'Mis Clases - {gym_name}',
+        f'-//GymCRM//{escape_text(gym_name)}//ES',
+        (_event_lines(booking) for booking in bookings.iterator(chunk_size=500)),
+        extra=[f'X-WR-TIMEZONE:{timezone.get_current_timezone()}'],
+    )
 
 
-def _create_event_from_booking(booking):
+def _event_lines(booking):
     """
-    Crea un evento iCal a partir de una reserva.
+    Líneas (sin plegar) del VEVENT de una reserva.
     
     Args:
         booking: ActivitySessionBooking instance
     
     Returns:
-        Event: Componente de evento iCal
+        list: Líneas del evento, alarmas incluidas
     """
     session = booking.session
     activity = session.activity
     gym = session.gym
-    
-    event = Event()
-    
-    # Identificador único del evento (importante para actualizaciones)
-    uid = f"booking-{booking.id}@gymcrm.local"
-    event.add('uid', uid)
-    
-    # Título del evento
-    event.add('summary', activity.name)
-    
-    # Fechas/horas
-    event.add('dtstart', session.start_datetime)
-    event.add('dtend', session.end_datetime)
-    
-    # Timestamps
-    event.add('dtstamp', timezone.now())
-    event.add('created', booking.booked_at)
-    event.add('last-modified', booking.updated_at)
+    gym_name = gym.commercial_name or gym.name
+    
+    # DTSTAMP estable: el feed se cachea y debe salir idéntico entre consultas
+    stamp = max(booking.updated_at, session.updated_at)
+    
+    lines = [
+        'BEGIN:VEVENT',
+        # Identificador único del evento (importante para actualizaciones)
+        f'UID:booking-{booking.id}@gymcrm.local',
+        f'SUMMARY:{escape_text(activity.name)}',
+        f'DTSTART:{format_utc(session.start_datetime)}',
+        f'DTEND:{format_utc(session.end_datetime)}',
+        f'DTSTAMP:{format_utc(stamp)}',
+        f'CREATED:{format_utc(booking.booked_at)}',
+        f'LAST-MODIFIED:{format_utc(stamp)}',
+    ]
     
     # Ubicación
     location_parts = []
@@ -129,13 +188,12 @@ def _create_event_from_booking(booking):
         location_parts.append(gym.address)
     if gym.city:
         location_parts.append(gym.city)
-    
-    location = ", ".join(location_parts) if location_parts else gym.commercial_name or gym.name
-    event.add('location', location)
+    location = ", ".join(location_parts) if location_parts else gym_name
+    lines.append(f'LOCATION:{escape_text(location)}')
     
     # Descripción detallada
     description_parts = [
-        f"📍 {gym.commercial_name or gym.name}",
+        f"📍 {gym_name}",
     ]
     
     if session.staff:
@@ -151,38 +209,99 @@ def _create_event_from_booking(booking):
         description_parts.append(f"\n🎯 Tu puesto: #{booking.spot_number}")
     
     description_parts.append(f"\n📱 Reserva #{booking.id}")
+    description = "\n".join(description_parts)
+    lines.append(f'DESCRIPTION:{escape_text(description)}')
     
-    event.add('description', "\n".join(description_parts))
-    
-    # Categoría
     if activity.category:
-        event.add('categories', [activity.category.name])
+        lines.append(f'CATEGORIES:{escape_text(activity.category.name)}')
     
-    # Estado (confirmado)
-    event.add('status', 'CONFIRMED')
+    lines.append('STATUS:CONFIRMED')
     
     # Organizador (el gimnasio)
     if gym.email:
-        organizer = vText(f"mailto:{gym.email}")
-        organizer.params['CN'] = vText(gym.commercial_name or gym.name)
-        event.add('organizer', organizer)
-    
-    # Alarma/Recordatorio (30 minutos antes por defecto)
-    from icalendar import Alarm
-    alarm = Alarm()
-    alarm.add('action', 'DISPLAY')
-    alarm.add('description', f'Tu clase de {activity.name} empieza en 30 minutos')
-    alarm.add('trigger', timedelta(minutes=-30))
-    event.add_component(alarm)
-    
-    # Segunda alarma (2 horas antes)
-    alarm2 = Alarm()
-    alarm2.add('action', 'DISPLAY')
-    alarm2.add('description', f'Recordatorio: Tienes clase de {activity.name} hoy')
-    alarm2.add('trigger', timedelta(hours=-2))
-    event.add_component(alarm2)
-    
-    return event
+        lines.append(f'ORGANIZER;CN={_quote_param(gym_name)}:mailto:{gym.email}')
+    
+    # Recordatorios: 30 minutos y 2 horas antes
+    for trigger, text in (
+        ('-PT30M', f'Tu clase de {activity.name} empieza en 30 minutos'),
+        ('-PT2H', f'Recordatorio: Tienes clase de {activity.name} hoy'),
+    ):
+        lines.extend([
+            'BEGIN:VALARM',
+            'ACTION:DISPLAY',
+            f'DESCRIPTION:{escape_text(text)}',
+            f'TRIGGER:{trigger}',
+            'END:VALARM',
+        ])
+    
+    lines.append('END:VEVENT')
+    return lines
+
+
+# -----------------------------------------------------------------------------
+# Versión del feed y caché
+# -----------------------------------------------------------------------------
+
+def feed_window_start(today=None):
+    """Inicio de la ventana del feed, alineado al día para que el ETag sea estable."""
+    today = today or timezone.localdate()
+    start = today - timedelta(days=FEED_WINDOW_DAYS)
+    return timezone.make_aware(datetime.combine(start, datetime.min.time()))
+
+
+def _new_version():
+    return time.time_ns() // 1000
+
+
+def get_feed_version(client_id):
+    """Versión actual del feed del cliente (microsegundos del último cambio)."""
+    key = FEED_VERSION_CACHE_KEY.format(client_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), FEED_VERSION_TTL)
+        version = cache.get(key) or _new_version()
+    return version
+
+
+def bump_calendar_feeds(client_ids):
+    """Renueva la versión del feed de los clientes indicados."""
+    client_ids = {client_id for client_id in client_ids if client_id}
+    if client_ids:
+        version = _new_version()
+        cache.set_many({FEED_VERSION_CACHE_KEY.format(client_id): version for client_id in client_ids}, FEED_VERSION_TTL)
+
+
+def schedule_feed_bump(client_ids):
+    """
+    bump_calendar_feeds() al confirmar la transacción en curso. Antes de
+    confirmar, una consulta del feed guardaría en caché los datos antiguos
+    con la versión nueva.
+    """
+    client_ids = list(client_ids)
+    if client_ids:
+        transaction.on_commit(lambda: bump_calendar_feeds(client_ids))
+
+
+def feed_validators(client_id, today=None):
+    """(ETag, Last-Modified) del feed del cliente sin consultar sus reservas."""
+    today = today or timezone.localdate()
+    version = get_feed_version(client_id)
+    etag = f'"{version:x}-{today:%Y%m%d}"'
+    last_modified = datetime.fromtimestamp(version / 1_000_000, tz=dt_timezone.utc)
+    return etag, last_modified
+
+
+def get_cached_calendar_feed(client_id, etag):
+    """Feed del cliente para el ETag dado, generándolo solo si no está en caché."""
+    from clients.models import Client
+    
+    key = FEED_CACHE_KEY.format(client_id, etag)
+    content = cache.get(key)
+    if content is None:
+        client = Client.objects.select_related('gym').get(pk=client_id)
+        content = generate_client_calendar_feed(client)
+        cache.set(key, content, FEED_CACHE_TTL)
+    return content
 
 
 def get_or_create_calendar_token(client):
@@ -11,6 +11,8 @@ from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_GET, require_POST
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 from activities.models import ActivitySessionBooking
 from clients.models import Client
@@ -61,19 +63,29 @@ def calendar_feed(request, token):
     aplicación de calendario (Google Calendar, Apple Calendar, Outlook, etc.)
     
     URL: /calendar/feed/<token>.ics
-    """
-    client = get_object_or_404(Client, calendar_token=token)
-    
-    # Generar el feed completo
-    ics_content = calendar_service.generate_client_calendar_feed(client, token)
     
-    response = HttpResponse(ics_content, content_type='text/calendar; charset=utf-8')
+    Los calendarios repiten la consulta indefinidamente: se responde 304 con
+    el ETag/Last-Modified de la versión del feed y, si hay que enviarlo, el
+    .ics sale de la caché salvo que haya cambiado algo desde la última vez.
+    """
+    client_id = Client.objects.filter(calendar_token=token).values_list('id', flat=True).first()
+    if client_id is None:
+        raise Http404("Calendario no encontrado")
     
-    # Headers para suscripción de calendario
-    response['Content-Disposition'] = 'inline; filename="mis_clases.ics"'
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
+    etag, last_modified = calendar_service.feed_validators(client_id)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+    if response is None:
+        ics_content = calendar_service.get_cached_calendar_feed(client_id, etag)
+        response = HttpResponse(ics_content, content_type='text/calendar; charset=utf-8')
+        # Headers para suscripción de calendario
+        response['Content-Disposition'] = 'inline; filename="mis_clases.ics"'
+    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Siempre revalidar, pero sin impedir guardar la copia
+    response['Cache-Control'] = 'private, no-cache'
     
     return response
 
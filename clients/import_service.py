@@ -1,7 +1,6 @@
 """
 Servicio para importar clientes desde CSV
 """
-import pandas as pd
 from datetime import datetime
 from django.db import transaction
 from django.core.exceptions import ValidationError
@@ -72,6 +71,8 @@ class ClientImportService:
     
     def parse_date(self, date_str):
         """Intenta parsear diferentes formatos de fecha"""
+        import pandas as pd
+
         if pd.isna(date_str) or not date_str:
             return None
         
@@ -95,6 +96,8 @@ class ClientImportService:
     
     def normalize_phone(self, phone):
         """Normaliza número de teléfono"""
+        import pandas as pd
+
         if pd.isna(phone) or not phone:
             return ''
         
@@ -150,6 +153,8 @@ class ClientImportService:
         Returns:
             dict con resultados de importación
         """
+        import pandas as pd
+
         try:
             # Leer CSV
             df = pd.read_csv(csv_file, encoding='utf-8')
@@ -207,6 +212,8 @@ class ClientImportService:
     
     def _extract_client_data(self, row, column_mapping):
         """Extrae y normaliza datos de una fila del CSV"""
+        import pandas as pd
+
         data = {}
         
         # Nombre (obligatorio)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from clients.risk_scoring import RiskScoringEngine
+from organizations.models import Gym
+
+
+class Command(BaseCommand):
+    help = 'Calcula el riesgo de abandono (ClientRiskScore) de todos los clientes activos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', type=int, help='ID del gimnasio (por defecto, todos)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Clientes por lote')
+
+    def handle(self, *args, **options):
+        gyms = Gym.objects.all()
+        if options['gym']:
+            gyms = gyms.filter(id=options['gym'])
+
+        for gym in gyms:
+            scored = RiskScoringEngine(gym, batch_size=options['batch_size']).run()
+            self.stdout.write(self.style.SUCCESS(f'✅ {gym.name}: {scored} clientes'))
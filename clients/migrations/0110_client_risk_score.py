@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('clients', '0109_add_client_penalty'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(default=0, help_text='0-100, donde 100 es alto riesgo')),
+                ('level', models.CharField(choices=[('NONE', 'Sin riesgo'), ('LOW', 'Bajo'), ('MEDIUM', 'Medio'), ('HIGH', 'Alto'), ('CRITICAL', 'Crítico')], default='NONE', max_length=10)),
+                ('factors', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField()),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_score', to='clients.client')),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_risk_scores', to='organizations.gym')),
+            ],
+            options={
+                'verbose_name': 'Riesgo de Abandono',
+                'verbose_name_plural': 'Riesgos de Abandono',
+                'indexes': [models.Index(fields=['gym', '-score'], name='clients_cli_gym_id_1cbacd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('clients', '0110_client_risk_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(help_text='Similitud 0-100')),
+                ('reasons', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('DISMISSED', 'Descartado')], default='PENDING', max_length=10)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clients.client')),
+                ('client_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clients.client')),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='organizations.gym')),
+            ],
+            options={
+                'verbose_name': 'Posible Duplicado',
+                'verbose_name_plural': 'Posibles Duplicados',
+                'indexes': [models.Index(fields=['gym', 'status', '-score'], name='clients_dup_gym_id_449c45_idx')],
+                'unique_together': {('client_a', 'client_b')},
+            },
+        ),
+    ]
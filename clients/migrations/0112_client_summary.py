@@ -0,0 +1,170 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+# Copia congelada de clients.summary.compute_summaries: la migración no debe
+# cambiar si más adelante cambia el cálculo del resumen.
+def _grouped(queryset, **aggregates):
+    (name, aggregate), = aggregates.items()
+    return dict(
+        queryset.values('client_id').annotate(**{name: aggregate}).order_by()
+        .values_list('client_id', name)
+    )
+
+
+def _summaries(apps, rows, today):
+    ActivitySessionBooking = apps.get_model('activities', 'ActivitySessionBooking')
+    ClientWallet = apps.get_model('finance', 'ClientWallet')
+    ClientRedsysToken = apps.get_model('finance', 'ClientRedsysToken')
+    MembershipPause = apps.get_model('memberships', 'MembershipPause')
+    ClientMembership = apps.get_model('clients', 'ClientMembership')
+    ClientSummary = apps.get_model('clients', 'ClientSummary')
+    ClientVisit = apps.get_model('clients', 'ClientVisit')
+
+    ids = [client_id for client_id, _ in rows]
+    visits = {
+        client_id: (last, noshows)
+        for client_id, last, noshows in ClientVisit.objects.filter(client_id__in=ids)
+        .values('client_id').annotate(
+            last=Max('date'),
+            noshows=Count('id', filter=Q(status='NOSHOW')),
+        ).order_by().values_list('client_id', 'last', 'noshows')
+    }
+    last_booking = _grouped(
+        ActivitySessionBooking.objects.filter(client_id__in=ids), last=Max('booked_at')
+    )
+    memberships = ClientMembership.objects.filter(client_id__in=ids)
+    expires = _grouped(
+        memberships.filter(status='ACTIVE', end_date__gte=today), end=Min('end_date')
+    )
+    unpaid = set(
+        memberships.filter(status='PENDING_PAYMENT').values_list('client_id', flat=True).distinct()
+    )
+    plans = {}
+    for client_id, plan_id in memberships.filter(status='ACTIVE', plan__isnull=False).values_list(
+        'client_id', 'plan_id'
+    ).distinct():
+        plans.setdefault(client_id, set()).add(plan_id)
+    paused = set(
+        MembershipPause.objects.filter(
+            membership__client_id__in=ids,
+            status='ACTIVE',
+            start_date__lte=today,
+            end_date__gte=today,
+        ).values_list('membership__client_id', flat=True).distinct()
+    )
+    redsys = set(
+        ClientRedsysToken.objects.filter(client_id__in=ids).values_list('client_id', flat=True).distinct()
+    )
+    wallets = dict(ClientWallet.objects.filter(client_id__in=ids).values_list('client_id', 'balance'))
+
+    summaries = []
+    for client_id, gym_id in rows:
+        last_visit, noshows = visits.get(client_id, (None, 0))
+        plan_ids = sorted(plans.get(client_id, ()))
+        balance = wallets.get(client_id)
+        summaries.append(ClientSummary(
+            client_id=client_id,
+            gym_id=gym_id,
+            last_visit_date=last_visit,
+            last_booking_at=last_booking.get(client_id),
+            noshow_count=noshows,
+            active_plan_ids=f",{','.join(map(str, plan_ids))}," if plan_ids else "",
+            membership_expires_on=expires.get(client_id),
+            has_unpaid_membership=client_id in unpaid,
+            has_active_pause=client_id in paused,
+            has_redsys_token=client_id in redsys,
+            wallet_sign=None if balance is None else (balance > 0) - (balance < 0),
+        ))
+    return summaries
+
+
+def backfill_client_summaries(apps, schema_editor):
+    """
+    Rellena ClientSummary de todos los clientes (keyset por id, como
+    rebuild_summaries): los filtros del listado la leen desde el primer día,
+    sin esperar a la conciliación nocturna.
+    """
+    Client = apps.get_model('clients', 'Client')
+    ClientSummary = apps.get_model('clients', 'ClientSummary')
+
+    today = timezone.localdate()
+    last_id = 0
+    while True:
+        rows = list(
+            Client.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'gym_id')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        ClientSummary.objects.bulk_create(_summaries(apps, rows, today))
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('clients', '0111_duplicate_candidate'),
+        ('activities', '0108_membership_hierarchy'),
+        ('finance', '0017_wallet_system'),
+        ('memberships', '0117_usage_limit_combined'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSummary',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='clients.client')),
+                ('last_visit_date', models.DateField(blank=True, null=True)),
+                ('last_booking_at', models.DateTimeField(blank=True, null=True)),
+                ('noshow_count', models.PositiveIntegerField(default=0)),
+                ('active_plan_ids', models.TextField(blank=True, default='')),
+                ('membership_expires_on', models.DateField(blank=True, help_text='Fin más próximo de las membresías activas', null=True)),
+                ('has_unpaid_membership', models.BooleanField(default=False)),
+                ('has_active_pause', models.BooleanField(default=False)),
+                ('has_redsys_token', models.BooleanField(default=False)),
+                ('wallet_sign', models.SmallIntegerField(blank=True, help_text='-1 saldo negativo, 0 a cero, 1 positivo; vacío sin monedero', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Cliente',
+                'verbose_name_plural': 'Resúmenes de Clientes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['gym', 'created_at', 'id'], name='client_gym_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['gym', 'first_name', 'last_name', 'id'], name='client_gym_name_idx'),
+        ),
+        migrations.AddField(
+            model_name='clientsummary',
+            name='gym',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_summaries', to='organizations.gym'),
+        ),
+        migrations.AddIndex(
+            model_name='clientsummary',
+            index=models.Index(fields=['gym', 'last_visit_date'], name='clients_cli_gym_id_4d1fa8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientsummary',
+            index=models.Index(fields=['gym', 'last_booking_at'], name='clients_cli_gym_id_456571_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientsummary',
+            index=models.Index(fields=['gym', 'membership_expires_on'], name='clients_cli_gym_id_9e9aa7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientsummary',
+            index=models.Index(fields=['gym', 'noshow_count'], name='clients_cli_gym_id_daf794_idx'),
+        ),
+        migrations.RunPython(backfill_client_summaries, migrations.RunPython.noop),
+    ]
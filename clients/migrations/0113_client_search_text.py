@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:26
+
+import unicodedata
+
+from django.db import migrations, models
+
+TRGM_INDEX_NAME = 'client_search_text_trgm'
+
+
+# Copia congelada de clients.search.build_search_text: la migración no debe
+# cambiar si más adelante cambia la normalización del módulo.
+def _normalize(text):
+    text = str(text or '').lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def build_search_text(client):
+    parts = [_normalize(getattr(client, field, '')) for field in ('first_name', 'last_name', 'email', 'dni')]
+    parts.append(''.join(char for char in str(client.phone_number or '') if char.isdigit()))
+    return ' '.join(' '.join(part.split()) for part in parts if part and part.strip())
+
+
+def fill_search_text(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    batch = []
+    for client in Client.objects.only(
+        'id', 'first_name', 'last_name', 'email', 'dni', 'phone_number',
+    ).iterator(chunk_size=2000):
+        client.search_text = build_search_text(client)
+        batch.append(client)
+        if len(batch) >= 2000:
+            Client.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        Client.objects.bulk_update(batch, ['search_text'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Solo PostgreSQL: en SQLite (desarrollo) la búsqueda funciona sin índice
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TRGM_INDEX_NAME} '
+        'ON clients_client USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRGM_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0112_client_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -87,6 +87,8 @@ class Client(models.Model):
     birth_date = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=2, choices=Gender.choices, default=Gender.NOT_SPECIFIED)
     address = models.TextField(blank=True)
+    # Nombre, email, documento y teléfono normalizados (ver clients.search)
+    search_text = models.TextField(blank=True, default="", editable=False)
     photo = models.ImageField(upload_to="clients/photos/", blank=True, null=True)
 
     # Access Control
@@ -188,6 +190,13 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Ordenación y paginación por keyset del listado de clientes
+            models.Index(fields=["gym", "created_at", "id"], name="client_gym_created_idx"),
+            models.Index(fields=["gym", "first_name", "last_name", "id"], name="client_gym_name_idx"),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.status})".strip()
 
@@ -262,7 +271,13 @@ class Client(models.Model):
                     if len(nie_clean) == 8 and nie_clean[0] in "XYZ" and nie_clean[1:].isdigit():
                         calculated_letter = self.calculate_nie_letter(nie_clean)
                         self.dni = nie_clean + calculated_letter
-        
+
+        from .search import SEARCH_FIELDS, build_search_text
+        self.search_text = build_search_text(self)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(SEARCH_FIELDS):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+
         super().save(*args, **kwargs)
 
 
@@ -981,3 +996,109 @@ class ClientPenalty(models.Model):
             total=models.Sum('amount'),
             count=models.Count('id')
         )
+
+
+class ClientRiskScore(models.Model):
+    """
+    Puntuación de riesgo de abandono (churn) de un cliente activo.
+    La calcula clients.risk_scoring (job programado + recálculo incremental
+    cuando cambian ventas, membresías o accesos) y la leen el dashboard,
+    las alertas de retención y el listado de clientes.
+    """
+    class Level(models.TextChoices):
+        NONE = "NONE", "Sin riesgo"
+        LOW = "LOW", "Bajo"
+        MEDIUM = "MEDIUM", "Medio"
+        HIGH = "HIGH", "Alto"
+        CRITICAL = "CRITICAL", "Crítico"
+
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, related_name="risk_score")
+    gym = models.ForeignKey("organizations.Gym", on_delete=models.CASCADE, related_name="client_risk_scores")
+    score = models.PositiveSmallIntegerField(default=0, help_text="0-100, donde 100 es alto riesgo")
+    level = models.CharField(max_length=10, choices=Level.choices, default=Level.NONE)
+    factors = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Riesgo de Abandono"
+        verbose_name_plural = "Riesgos de Abandono"
+        indexes = [
+            models.Index(fields=["gym", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.client} - {self.score} ({self.get_level_display()})"
+
+
+class DuplicateCandidate(models.Model):
+    """
+    Pareja de fichas de un mismo gimnasio que probablemente son la misma persona.
+    La genera clients.utils.duplicate_detection (escaneo por gimnasio y
+    comprobación incremental al crear un cliente) y la consume el asistente
+    de fusión. client_a siempre tiene el id menor.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pendiente"
+        DISMISSED = "DISMISSED", "Descartado"
+
+    gym = models.ForeignKey("organizations.Gym", on_delete=models.CASCADE, related_name="duplicate_candidates")
+    client_a = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="+")
+    client_b = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="+")
+    score = models.PositiveSmallIntegerField(help_text="Similitud 0-100")
+    reasons = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    detected_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Posible Duplicado"
+        verbose_name_plural = "Posibles Duplicados"
+        unique_together = ("client_a", "client_b")
+        indexes = [
+            models.Index(fields=["gym", "status", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.client_a_id} ~ {self.client_b_id} ({self.score})"
+
+
+class ClientSummary(models.Model):
+    """
+    Resumen desnormalizado de un cliente para filtrar y ordenar el listado sin
+    joins con visitas, reservas, membresías, tokens ni monedero.
+    Lo mantiene clients.summary (señales + reconciliación nocturna).
+    """
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    gym = models.ForeignKey("organizations.Gym", on_delete=models.CASCADE, related_name="client_summaries")
+
+    last_visit_date = models.DateField(null=True, blank=True)
+    last_booking_at = models.DateTimeField(null=True, blank=True)
+    noshow_count = models.PositiveIntegerField(default=0)
+
+    # Planes de las membresías activas en formato ",3,7," (filtro por contains)
+    active_plan_ids = models.TextField(blank=True, default="")
+    membership_expires_on = models.DateField(
+        null=True, blank=True, help_text="Fin más próximo de las membresías activas"
+    )
+    has_unpaid_membership = models.BooleanField(default=False)
+    has_active_pause = models.BooleanField(default=False)
+
+    has_redsys_token = models.BooleanField(default=False)
+    wallet_sign = models.SmallIntegerField(
+        null=True, blank=True, help_text="-1 saldo negativo, 0 a cero, 1 positivo; vacío sin monedero"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen de Cliente"
+        verbose_name_plural = "Resúmenes de Clientes"
+        indexes = [
+            models.Index(fields=["gym", "last_visit_date"]),
+            models.Index(fields=["gym", "last_booking_at"]),
+            models.Index(fields=["gym", "membership_expires_on"]),
+            models.Index(fields=["gym", "noshow_count"]),
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.client_id}"
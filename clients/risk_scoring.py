@@ -0,0 +1,242 @@
+"""
+Scoring de riesgo de abandono (churn) de todos los clientes activos.
+
+Sustituye al cálculo del dashboard, que solo evaluaba una muestra de 150
+clientes. Recorre los clientes activos por lotes (keyset por id) y en cada
+lote resuelve los datos con tres consultas agrupadas (ventas pendientes,
+última venta pagada y membresías a punto de expirar). El resultado se guarda
+en ClientRiskScore con un upsert por lote.
+
+Puntuación (0-100):
+- Financiero: ventas pendientes (10 pts c/u, máx. 30) y membresía que
+  expira en menos de 15 días (20).
+- Engagement: sin acceso a la app en 30 días (15-25), usuario que nunca
+  accedió (10), sin pagos en 30 días (máx. 15) o sin pagos nunca (15).
+- Retención: cliente nuevo, menos de 90 días (10).
+
+Usage:
+    from clients.risk_scoring import RiskScoringEngine, rescore_clients
+
+    RiskScoringEngine(gym).run()      # todos los clientes activos del gimnasio
+    rescore_clients([client.id])      # recálculo incremental
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# Puntuación mínima para aparecer en el dashboard
+LIST_THRESHOLD = 15
+EXPIRY_WINDOW_DAYS = 15
+# Factores que dependen del último acceso a la app
+LOGIN_FACTORS = {'app_inactive', 'no_app_login'}
+
+# (puntuación mínima, código, etiqueta, color, icono)
+LEVELS = [
+    (70, 'CRITICAL', 'CRÍTICO', 'red', '🚨'),
+    (50, 'HIGH', 'ALTO', 'orange', '⚠️'),
+    (30, 'MEDIUM', 'MEDIO', 'yellow', '⚡'),
+    (LIST_THRESHOLD, 'LOW', 'BAJO', 'blue', 'ℹ️'),
+]
+
+
+def risk_level(score):
+    """Nivel de riesgo de una puntuación: dict con code, label, color e icon."""
+    for minimum, code, label, color, icon in LEVELS:
+        if score >= minimum:
+            return {'code': code, 'label': label, 'color': color, 'icon': icon}
+    return {'code': 'NONE', 'label': 'SIN RIESGO', 'color': 'gray', 'icon': ''}
+
+
+def score_client(*, pending_orders, expiring_on, has_user, last_login, last_paid_at,
+                 created_at, now):
+    """
+    Reglas de scoring para un cliente. Devuelve (score, factors).
+    Todos los datos vienen ya resueltos; no hace consultas.
+    """
+    today = timezone.localdate(now)
+    score = 0
+    factors = []
+
+    def add(type_, text, points, category):
+        nonlocal score
+        score += points
+        factors.append({'type': type_, 'text': text, 'points': points, 'category': category})
+
+    # Financieros
+    if pending_orders:
+        add('billing', f'💳 {pending_orders} pagos pendientes', min(30, pending_orders * 10), 'financial')
+
+    if expiring_on:
+        add('expiry', f'⏰ Expira {expiring_on.strftime("%d/%m")}', 20, 'financial')
+
+    # Engagement
+    if has_user:
+        if last_login:
+            days_since_login = (now - last_login).days
+            if days_since_login > 30:
+                points = min(25, 15 + ((days_since_login - 30) // 10) * 5)
+                add('app_inactive', f'📱 Sin acceso app {days_since_login} días', points, 'engagement')
+        else:
+            add('no_app_login', '🔒 Nunca accedió a la app', 10, 'engagement')
+
+    if last_paid_at:
+        days_since_order = (today - timezone.localdate(last_paid_at)).days
+        if days_since_order > 30:
+            points = min(15, (days_since_order // 15) * 5)
+            add('inactive', f'💤 Sin pagos {days_since_order} días', points, 'engagement')
+    else:
+        add('no_payment', '❌ Sin historial de pagos', 15, 'engagement')
+
+    # Retención
+    days_as_client = (today - timezone.localdate(created_at)).days
+    if days_as_client < 90:
+        add('new_client', f'🆕 Cliente nuevo ({days_as_client}d)', 10, 'retention')
+
+    return min(score, 100), factors
+
+
+class RiskScoringEngine:
+    """
+    Calcula y guarda ClientRiskScore para los clientes activos de un gimnasio
+    (o de todos si gym es None).
+    """
+
+    def __init__(self, gym=None, now=None, batch_size=BATCH_SIZE):
+        self.gym = gym
+        self.now = now or timezone.now()
+        self.today = timezone.localdate(self.now)
+        self.batch_size = batch_size
+
+    def _active_clients(self):
+        from .models import Client
+
+        clients = Client.objects.filter(status=Client.Status.ACTIVE)
+        if self.gym is not None:
+            clients = clients.filter(gym=self.gym)
+        return clients
+
+    def run(self):
+        """Puntúa todos los clientes activos. Devuelve el número de clientes puntuados."""
+        from .models import ClientRiskScore
+
+        clients = self._active_clients()
+        scored = 0
+        last_id = 0
+        while True:
+            rows = list(
+                clients.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'gym_id', 'user_id', 'user__last_login', 'created_at'
+                )[:self.batch_size]
+            )
+            if not rows:
+                break
+            scored += self._write(self._score_rows(rows))
+            last_id = rows[-1][0]
+
+        # Quitar puntuaciones de clientes que ya no están activos (o cambiaron de gimnasio)
+        stale = ClientRiskScore.objects.all()
+        if self.gym is not None:
+            stale = stale.filter(gym=self.gym)
+        stale.filter(
+            ~Q(client__status='ACTIVE') | ~Q(client__gym_id=F('gym_id'))
+        ).delete()
+
+        logger.info(f"Riesgo de abandono: {scored} clientes puntuados"
+                    + (f" ({self.gym})" if self.gym is not None else ""))
+        return scored
+
+    def score_clients(self, client_ids):
+        """Recalcula solo los clientes indicados (los no activos pierden su puntuación)."""
+        from .models import ClientRiskScore
+
+        client_ids = list(client_ids)
+        rows = list(self._active_clients().filter(id__in=client_ids).values_list(
+            'id', 'gym_id', 'user_id', 'user__last_login', 'created_at'
+        ))
+        active_ids = {row[0] for row in rows}
+        ClientRiskScore.objects.filter(client_id__in=set(client_ids) - active_ids).delete()
+        return self._write(self._score_rows(rows))
+
+    def _score_rows(self, rows):
+        """Puntúa un lote de (id, gym_id, user_id, last_login, created_at) con consultas agrupadas."""
+        from sales.models import Order
+        from .models import ClientMembership, ClientRiskScore
+
+        ids = [row[0] for row in rows]
+
+        pending = dict(
+            Order.objects.filter(client_id__in=ids, status__in=['PENDING', 'PARTIAL'])
+            .values('client_id').annotate(n=Count('id')).order_by()
+            .values_list('client_id', 'n')
+        )
+        last_paid = dict(
+            Order.objects.filter(client_id__in=ids, status='PAID')
+            .values('client_id').annotate(last=Max('created_at')).order_by()
+            .values_list('client_id', 'last')
+        )
+        expiring = dict(
+            ClientMembership.objects.filter(
+                client_id__in=ids,
+                status='ACTIVE',
+                end_date__gte=self.today,
+                end_date__lte=self.today + timedelta(days=EXPIRY_WINDOW_DAYS),
+            ).values('client_id').annotate(end=Min('end_date')).order_by()
+            .values_list('client_id', 'end')
+        )
+
+        scores = []
+        for client_id, gym_id, user_id, last_login, created_at in rows:
+            score, factors = score_client(
+                pending_orders=pending.get(client_id, 0),
+                expiring_on=expiring.get(client_id),
+                has_user=user_id is not None,
+                last_login=last_login,
+                last_paid_at=last_paid.get(client_id),
+                created_at=created_at,
+                now=self.now,
+            )
+            scores.append(ClientRiskScore(
+                client_id=client_id,
+                gym_id=gym_id,
+                score=score,
+                level=risk_level(score)['code'],
+                factors=factors,
+                computed_at=self.now,
+            ))
+        return scores
+
+    def _write(self, scores):
+        from .models import ClientRiskScore
+
+        if not scores:
+            return 0
+        with transaction.atomic():
+            ClientRiskScore.objects.bulk_create(
+                scores,
+                update_conflicts=True,
+                unique_fields=['client'],
+                update_fields=['gym', 'score', 'level', 'factors', 'computed_at'],
+            )
+        return len(scores)
+
+
+def rescore_clients(client_ids):
+    """Recálculo incremental de unos pocos clientes (señales de ventas, membresías y accesos)."""
+    return RiskScoringEngine().score_clients(client_ids)
+
+
+def top_risk_scores(gym, limit=15, min_score=LIST_THRESHOLD):
+    """Clientes de más riesgo de un gimnasio (ClientRiskScore con cliente y usuario)."""
+    from .models import ClientRiskScore
+
+    return list(
+        ClientRiskScore.objects.filter(gym=gym, score__gte=min_score)
+        .select_related('client')
+        .order_by('-score', 'client_id')[:limit]
+    )
@@ -0,0 +1,106 @@
+"""
+Búsqueda de clientes compartida por el TPV, la ficha/listado, el chat, las
+clases, las taquillas y el check-in.
+
+Cada cliente guarda en `Client.search_text` su texto de búsqueda ya
+normalizado (nombre, apellidos, email y documento en minúsculas y sin
+acentos, más el teléfono solo con dígitos). Client.save() lo mantiene al día.
+
+Una búsqueda se parte en términos y exige que todos aparezcan dentro de
+search_text (`LIKE '%término%'`, AND entre términos): "ana garcia",
+"garcía ana" o "612 34 56" encuentran lo mismo que escribe el recepcionista.
+En PostgreSQL el índice GIN con gin_trgm_ops (migración
+0113_client_search_text) resuelve esos LIKE sin recorrer la tabla.
+
+search_clients() además ordena los resultados: coincidencias exactas (ID,
+documento, email o teléfono) primero, luego los que empiezan por el término
+y después el resto, por nombre.
+"""
+import re
+import unicodedata
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'dni', 'phone_number')
+
+# Consultas que son un teléfono escrito con separadores: "+34 612-34 56"
+PHONE_QUERY_RE = re.compile(r'\+?[\d\s().-]+')
+MIN_PHONE_DIGITS = 3
+
+
+def normalize(text):
+    """Minúsculas y sin acentos."""
+    text = str(text or '').lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def phone_digits(value):
+    return ''.join(char for char in str(value or '') if char.isdigit())
+
+
+def build_search_text(client):
+    """Texto normalizado que se guarda en Client.search_text."""
+    parts = [normalize(getattr(client, field, '')) for field in ('first_name', 'last_name', 'email', 'dni')]
+    parts.append(phone_digits(client.phone_number))
+    return ' '.join(' '.join(part.split()) for part in parts if part and part.strip())
+
+
+def search_terms(query):
+    """Términos normalizados de una consulta; un teléfono se busca solo con sus dígitos."""
+    query = (query or '').strip()
+    if PHONE_QUERY_RE.fullmatch(query):
+        digits = phone_digits(query)
+        if len(digits) >= MIN_PHONE_DIGITS or query.isdigit():
+            return [digits]
+    return normalize(query).split()
+
+
+def search_q(query, prefix=''):
+    """
+    Q que filtra por la consulta. `prefix` permite buscar a través de una
+    relación (p. ej. 'client__' sobre AccessLog). Una consulta vacía no filtra.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return Q()
+    condition = Q()
+    for term in terms:
+        condition &= Q(**{f'{prefix}search_text__contains': term})
+    query = query.strip()
+    if query.isdigit():
+        condition |= Q(**{f'{prefix}pk': int(query)})
+    return condition
+
+
+def _rank(query, terms):
+    first = terms[0]
+    exact = Q(dni__iexact=query) | Q(email__iexact=query)
+    if query.isdigit():
+        exact |= Q(pk=int(query))
+    if len(terms) == 1 and first.isdigit() and len(first) >= MIN_PHONE_DIGITS:
+        exact |= Q(search_text__endswith=f' {first}')
+    return Case(
+        When(exact, then=Value(0)),
+        When(search_text__startswith=first, then=Value(1)),
+        When(search_text__contains=f' {first}', then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+
+
+def search_clients(queryset, query, limit=None):
+    """
+    Clientes de `queryset` que coinciden con la consulta, ordenados por
+    relevancia y nombre. Sin consulta, todos por orden alfabético.
+    """
+    terms = search_terms(query)
+    if not terms:
+        clients = queryset.order_by('first_name', 'last_name', 'id')
+    else:
+        clients = queryset.filter(search_q(query)).annotate(
+            search_rank=_rank(query.strip(), terms),
+        ).order_by('search_rank', 'first_name', 'last_name', 'id')
+    return clients[:limit] if limit else clients
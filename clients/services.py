@@ -1,4 +1,4 @@
-from django.db.models import Q, Max, Count
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 from datetime import timedelta
 
@@ -8,18 +8,19 @@ class ClientFilterService:
         """
         Applies filters to the Client queryset based on request parameters.
         params: dict-like object (request.GET)
+
+        Los datos agregados (visitas, reservas, membresías, pausas, monedero,
+        tokens) se leen de ClientSummary y las relaciones restantes se filtran
+        con EXISTS, así que el resultado no necesita distinct().
         """
+        from .models import ClientMembership
+        from .search import search_q
         clients = queryset
 
         # 1. Text Search
         query = params.get("q", "").strip()
         if query:
-            clients = clients.filter(
-                Q(first_name__icontains=query)
-                | Q(last_name__icontains=query)
-                | Q(email__icontains=query)
-                | Q(phone_number__icontains=query)
-            )
+            clients = clients.filter(search_q(query))
 
         # 2. Status Filter
         statuses = params.getlist("status")
@@ -30,10 +31,10 @@ class ClientFilterService:
             if normal_statuses and has_unpaid_filter:
                 clients = clients.filter(
                     Q(status__in=normal_statuses) | 
-                    Q(memberships__status='PENDING_PAYMENT')
-                ).distinct()
+                    Q(summary__has_unpaid_membership=True)
+                )
             elif has_unpaid_filter:
-                clients = clients.filter(memberships__status='PENDING_PAYMENT').distinct()
+                clients = clients.filter(summary__has_unpaid_membership=True)
             elif normal_statuses:
                 clients = clients.filter(status__in=normal_statuses)
         
@@ -45,7 +46,10 @@ class ClientFilterService:
         # 3. Tags
         selected_tags = params.getlist("tags")
         if selected_tags:
-            clients = clients.filter(tags__id__in=selected_tags)
+            from .models import Client
+            clients = clients.filter(Exists(Client.tags.through.objects.filter(
+                client_id=OuterRef('pk'), clienttag_id__in=selected_tags
+            )))
 
         # 4. Client Type (Company/Individual)
         companies = params.getlist("company")
@@ -64,10 +68,10 @@ class ClientFilterService:
             if 'stripe' in gateways:
                 gateway_q |= Q(preferred_gateway='STRIPE') | Q(stripe_customer_id__isnull=False)
             if 'redsys' in gateways:
-                gateway_q |= Q(preferred_gateway='REDSYS') | Q(redsys_tokens__isnull=False)
+                gateway_q |= Q(preferred_gateway='REDSYS') | Q(summary__has_redsys_token=True)
             if 'auto' in gateways:
                 gateway_q |= Q(preferred_gateway='AUTO', stripe_customer_id__isnull=True)
-            clients = clients.filter(gateway_q).distinct()
+            clients = clients.filter(gateway_q)
         
         # Legacy Gateway Support
         gateway = params.get("gateway_single", "all")
@@ -75,9 +79,9 @@ class ClientFilterService:
             if gateway == "stripe":
                 clients = clients.filter(Q(preferred_gateway='STRIPE') | Q(stripe_customer_id__isnull=False))
             elif gateway == "redsys":
-                clients = clients.filter(Q(preferred_gateway='REDSYS') | Q(redsys_tokens__isnull=False)).distinct()
+                clients = clients.filter(Q(preferred_gateway='REDSYS') | Q(summary__has_redsys_token=True))
             elif gateway == "auto":
-                clients = clients.filter(preferred_gateway='AUTO', stripe_customer_id__isnull=True).exclude(redsys_tokens__isnull=False)
+                clients = clients.filter(preferred_gateway='AUTO', stripe_customer_id__isnull=True).exclude(summary__has_redsys_token=True)
 
         # 6. Gender
         genders = params.getlist("gender")
@@ -94,31 +98,38 @@ class ClientFilterService:
         if wallet_balance and 'all' not in wallet_balance:
             wallet_q = Q()
             if 'positive' in wallet_balance:
-                wallet_q |= Q(wallet__balance__gt=0)
+                wallet_q |= Q(summary__wallet_sign=1)
             if 'negative' in wallet_balance:
-                wallet_q |= Q(wallet__balance__lt=0)
+                wallet_q |= Q(summary__wallet_sign=-1)
             if 'zero' in wallet_balance:
-                wallet_q |= Q(wallet__balance=0)
+                wallet_q |= Q(summary__wallet_sign=0)
             if 'no_wallet' in wallet_balance:
-                wallet_q |= Q(wallet__isnull=True)
+                wallet_q |= Q(summary__wallet_sign__isnull=True)
             clients = clients.filter(wallet_q)
 
         # 8. Membership Plans
         membership_plans_filter = params.getlist("membership_plan")
         if membership_plans_filter and 'all' not in membership_plans_filter:
-            clients = clients.filter(memberships__plan_id__in=membership_plans_filter).distinct()
-
-        # 9. Services & Products
-        services_filter = params.getlist("service")
-        if services_filter and 'all' not in services_filter:
+            # Planes de las membresías activas
+            plan_q = Q()
+            for plan_id in membership_plans_filter:
+                if str(plan_id).isdigit():
+                    plan_q |= Q(summary__active_plan_ids__contains=f",{int(plan_id)},")
+            clients = clients.filter(plan_q) if plan_q else clients.none()
+
+        # 9. Services & Products (citas o ventas del servicio/producto)
+        services_filter = [s for s in params.getlist("service") if str(s).isdigit()]
+        if services_filter:
+            from services.models import Service, ServiceAppointment
             clients = clients.filter(
-                Q(session_bookings__session__service_id__in=services_filter) |
-                Q(memberships__plan__services__id__in=services_filter)
-            ).distinct()
+                Exists(ServiceAppointment.objects.filter(client_id=OuterRef('pk'), service_id__in=services_filter))
+                | ClientFilterService._bought(Service, services_filter)
+            )
         
-        products_filter = params.getlist("product")
-        if products_filter and 'all' not in products_filter:
-            clients = clients.filter(orders__items__product_id__in=products_filter).distinct()
+        products_filter = [p for p in params.getlist("product") if str(p).isdigit()]
+        if products_filter:
+            from products.models import Product
+            clients = clients.filter(ClientFilterService._bought(Product, products_filter))
 
         # 10. Origin
         created_froms = params.getlist("created_from")
@@ -138,20 +149,16 @@ class ClientFilterService:
         if days_no_visit and days_no_visit.isdigit():
             days = int(days_no_visit)
             threshold_date = timezone.now().date() - timedelta(days=days)
-            clients = clients.annotate(
-                last_visit_date=Max('visits__date')
-            ).filter(
-                Q(last_visit_date__lt=threshold_date) | Q(last_visit_date__isnull=True)
+            clients = clients.filter(
+                Q(summary__last_visit_date__lt=threshold_date) | Q(summary__last_visit_date__isnull=True)
             )
 
         days_no_booking = params.get('days_no_booking', '')
         if days_no_booking and days_no_booking.isdigit():
             days = int(days_no_booking)
             threshold_date = timezone.now().date() - timedelta(days=days)
-            clients = clients.annotate(
-                last_booking_date=Max('session_bookings__created_at')
-            ).filter(
-                Q(last_booking_date__date__lt=threshold_date) | Q(last_booking_date__isnull=True)
+            clients = clients.filter(
+                Q(summary__last_booking_at__date__lt=threshold_date) | Q(summary__last_booking_at__isnull=True)
             )
 
         membership_expires_days = params.get('membership_expires_days', '')
@@ -159,42 +166,34 @@ class ClientFilterService:
             days = int(membership_expires_days)
             threshold_date = timezone.now().date() + timedelta(days=days)
             clients = clients.filter(
-                memberships__status='ACTIVE',
-                memberships__end_date__lte=threshold_date,
-                memberships__end_date__gte=timezone.now().date()
-            ).distinct()
+                summary__membership_expires_on__lte=threshold_date,
+                summary__membership_expires_on__gte=timezone.now().date()
+            )
 
         # 13. Cancellation & Pauses
         cancelled_from = params.get('cancelled_from', '')
         cancelled_to = params.get('cancelled_to', '')
-        if cancelled_from:
-            clients = clients.filter(memberships__status='CANCELLED', memberships__updated_at__date__gte=cancelled_from).distinct()
-        if cancelled_to:
-            clients = clients.filter(memberships__status='CANCELLED', memberships__updated_at__date__lte=cancelled_to).distinct()
+        if cancelled_from or cancelled_to:
+            # ClientMembership no guarda fecha de cancelación: se usa su fecha de fin
+            cancelled = ClientMembership.objects.filter(client_id=OuterRef('pk'), status='CANCELLED')
+            if cancelled_from:
+                cancelled = cancelled.filter(end_date__gte=cancelled_from)
+            if cancelled_to:
+                cancelled = cancelled.filter(end_date__lte=cancelled_to)
+            clients = clients.filter(Exists(cancelled))
 
         has_active_pause = params.get('has_active_pause', '')
         if has_active_pause == 'yes':
-            today = timezone.now().date()
-            clients = clients.filter(
-                memberships__pauses__status='ACTIVE',
-                memberships__pauses__start_date__lte=today,
-                memberships__pauses__end_date__gte=today
-            ).distinct()
+            clients = clients.filter(summary__has_active_pause=True)
         elif has_active_pause == 'no':
-            today = timezone.now().date()
-            clients = clients.exclude(
-                memberships__pauses__status='ACTIVE',
-                memberships__pauses__start_date__lte=today,
-                memberships__pauses__end_date__gte=today
-            )
+            clients = clients.exclude(summary__has_active_pause=True)
 
         # 14. No-Shows
         min_no_shows = params.get('min_no_shows', '')
         if min_no_shows and min_no_shows.isdigit():
             min_count = int(min_no_shows)
-            clients = clients.annotate(
-                noshow_count=Count('visits', filter=Q(visits__status='NOSHOW'))
-            ).filter(noshow_count__gte=min_count)
+            if min_count > 0:
+                clients = clients.filter(summary__noshow_count__gte=min_count)
 
         # 15. App Usage
         has_app_filter = params.getlist('has_app')
@@ -207,3 +206,15 @@ class ClientFilterService:
             clients = clients.filter(app_q)
 
         return clients
+
+    @staticmethod
+    def _bought(model, object_ids):
+        """EXISTS de ventas del cliente con líneas de `model` (OrderItem es genérico)."""
+        from django.contrib.contenttypes.models import ContentType
+        from sales.models import OrderItem
+
+        return Exists(OrderItem.objects.filter(
+            order__client_id=OuterRef('pk'),
+            content_type=ContentType.objects.get_for_model(model),
+            object_id__in=object_ids,
+        ))
@@ -1,10 +1,15 @@
 """
-Signals para auto-generar documentos y enviar emails cuando se crean membresías
+Signals para auto-generar documentos y enviar emails cuando se crean membresías,
+para recalcular el riesgo de abandono cuando cambian ventas, membresías o accesos,
+para buscar duplicados de los clientes nuevos y para mantener ClientSummary.
 """
-from django.db.models.signals import post_save
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import ClientMembership, ClientDocument
+from sales.models import Order
+from .models import Client, ClientMembership, ClientDocument, ClientRiskScore
 
 
 @receiver(post_save, sender=ClientMembership)
@@ -99,6 +104,10 @@ def send_membership_welcome_email(sender, instance, created, **kwargs):
             client=client,
             defaults={'status': 'ACTIVE', 'current_step': step}
         )
+        if exec_created:
+            # El primer paso se envía ahora; programar el siguiente
+            from marketing.workflow_scheduler import schedule_executions
+            schedule_executions([execution])
         
         # Preparar contenido del email
         gym_name = gym.commercial_name or gym.name
@@ -152,3 +161,131 @@ def send_membership_welcome_email(sender, instance, created, **kwargs):
         
     except Exception as e:
         print(f"⚠️ Error al enviar email de bienvenida: {e}")
+
+
+# =============================================================================
+# RIESGO DE ABANDONO (recálculo incremental de ClientRiskScore)
+# =============================================================================
+
+def _queue_risk_rescore(client_id):
+    """Encola el recálculo del riesgo de un cliente al confirmar la transacción."""
+    if not client_id:
+        return
+    from marketing.signals import safe_delay
+    from .tasks import rescore_client_risk
+
+    transaction.on_commit(lambda: safe_delay(rescore_client_risk, [client_id]))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def rescore_risk_on_order_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _queue_risk_rescore(instance.client_id)
+
+
+@receiver(post_save, sender=ClientMembership)
+@receiver(post_delete, sender=ClientMembership)
+def rescore_risk_on_membership_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _queue_risk_rescore(instance.client_id)
+
+
+@receiver(user_logged_in)
+def rescore_risk_on_login(sender, request, user, **kwargs):
+    """
+    Un acceso solo cambia la puntuación si tenía factores de inactividad en la app;
+    en el resto de casos no se encola nada.
+    """
+    from .risk_scoring import LOGIN_FACTORS
+
+    stored = ClientRiskScore.objects.filter(client__user=user).values_list('client_id', 'factors').first()
+    if stored and any(f.get('type') in LOGIN_FACTORS for f in stored[1]):
+        _queue_risk_rescore(stored[0])
+
+
+# =============================================================================
+# DUPLICADOS (comprobación incremental al crear un cliente)
+# =============================================================================
+
+@receiver(post_save, sender=Client)
+def check_duplicates_on_client_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    from marketing.signals import safe_delay
+    from .tasks import check_client_duplicates
+
+    client_id = instance.id
+    transaction.on_commit(lambda: safe_delay(check_client_duplicates, client_id))
+
+
+# =============================================================================
+# RESUMEN DEL LISTADO (ClientSummary)
+# =============================================================================
+
+@receiver(post_save, sender=Client)
+def create_client_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from .summary import mark_dirty
+        mark_dirty(instance.id)
+
+
+@receiver(post_save, sender="clients.ClientVisit")
+@receiver(post_delete, sender="clients.ClientVisit")
+@receiver(post_save, sender=ClientMembership)
+@receiver(post_delete, sender=ClientMembership)
+@receiver(post_save, sender="activities.ActivitySessionBooking")
+@receiver(post_delete, sender="activities.ActivitySessionBooking")
+@receiver(post_save, sender="finance.ClientWallet")
+@receiver(post_delete, sender="finance.ClientWallet")
+@receiver(post_save, sender="finance.ClientRedsysToken")
+@receiver(post_delete, sender="finance.ClientRedsysToken")
+def refresh_client_summary(sender, instance, raw=False, **kwargs):
+    if not raw:
+        from .summary import mark_dirty
+        mark_dirty(instance.client_id)
+
+
+@receiver(post_save, sender="memberships.MembershipPause")
+@receiver(post_delete, sender="memberships.MembershipPause")
+def refresh_client_summary_on_pause(sender, instance, raw=False, **kwargs):
+    if not raw:
+        from .summary import mark_dirty
+        mark_dirty(ClientMembership.objects.filter(id=instance.membership_id).values_list('client_id', flat=True).first())
+
+
+@receiver(post_save, sender="activities.ActivitySessionBooking")
+@receiver(post_delete, sender="activities.ActivitySessionBooking")
+def bump_calendar_feed_on_booking_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        from .calendar_service import schedule_feed_bump
+        schedule_feed_bump([instance.client_id])
+
+
+@receiver(post_save, sender="activities.ActivitySession")
+def bump_calendar_feed_on_session_change(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    from activities.models import ActivitySessionBooking
+    from .calendar_service import schedule_feed_bump
+
+    schedule_feed_bump(
+        ActivitySessionBooking.objects.filter(session=instance, client__calendar_token__isnull=False)
+        .values_list('client_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender="activities.Activity")
+def bump_calendar_feed_on_activity_change(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    from activities.models import ActivitySessionBooking
+    from .calendar_service import feed_window_start, schedule_feed_bump
+
+    schedule_feed_bump(
+        ActivitySessionBooking.objects.filter(
+            session__activity=instance,
+            session__start_datetime__gte=feed_window_start(),
+            client__calendar_token__isnull=False,
+        ).values_list('client_id', flat=True).distinct()
+    )
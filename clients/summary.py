@@ -0,0 +1,188 @@
+"""
+Mantenimiento de ClientSummary (resumen desnormalizado para el listado de clientes).
+
+- refresh_summaries(): recalcula unos clientes con una consulta agrupada por
+  tabla origen y guarda con un upsert. Lo usan las señales (visitas,
+  reservas, membresías, pausas, monedero y tokens Redsys) al confirmar la
+  transacción, agrupando los clientes tocados en la misma transacción.
+- rebuild_summaries(): recalcula todos los clientes de un gimnasio por lotes
+  (reconciliación nocturna y `manage.py rebuild_client_summaries`). Además
+  de corregir cambios hechos sin señales, actualiza los campos que dependen
+  del día (pausa activa, próxima expiración).
+"""
+import logging
+import threading
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+SUMMARY_FIELDS = [
+    'gym', 'last_visit_date', 'last_booking_at', 'noshow_count', 'active_plan_ids',
+    'membership_expires_on', 'has_unpaid_membership', 'has_active_pause',
+    'has_redsys_token', 'wallet_sign', 'updated_at',
+]
+
+_dirty = threading.local()
+
+
+def _grouped(queryset, **aggregates):
+    """{client_id: valor} de una agregación agrupada por cliente."""
+    (name, aggregate), = aggregates.items()
+    return dict(
+        queryset.values('client_id').annotate(**{name: aggregate}).order_by()
+        .values_list('client_id', name)
+    )
+
+
+def _sign(balance):
+    if balance is None:
+        return None
+    return (balance > 0) - (balance < 0)
+
+
+def compute_summaries(rows, today=None):
+    """
+    ClientSummary (sin guardar) para filas (client_id, gym_id).
+    Una consulta por tabla origen para todo el lote.
+    """
+    from activities.models import ActivitySessionBooking
+    from finance.models import ClientWallet, ClientRedsysToken
+    from memberships.models import MembershipPause
+    from .models import ClientMembership, ClientSummary, ClientVisit
+
+    today = today or timezone.localdate()
+    ids = [client_id for client_id, _ in rows]
+
+    visits = {
+        client_id: (last, noshows)
+        for client_id, last, noshows in ClientVisit.objects.filter(client_id__in=ids)
+        .values('client_id').annotate(
+            last=Max('date'),
+            noshows=Count('id', filter=Q(status=ClientVisit.Status.NOSHOW)),
+        ).order_by().values_list('client_id', 'last', 'noshows')
+    }
+    last_booking = _grouped(
+        ActivitySessionBooking.objects.filter(client_id__in=ids), last=Max('booked_at')
+    )
+
+    memberships = ClientMembership.objects.filter(client_id__in=ids)
+    expires = _grouped(
+        memberships.filter(status='ACTIVE', end_date__gte=today), end=Min('end_date')
+    )
+    unpaid = set(
+        memberships.filter(status='PENDING_PAYMENT').values_list('client_id', flat=True).distinct()
+    )
+    plans = {}
+    for client_id, plan_id in memberships.filter(status='ACTIVE', plan__isnull=False).values_list(
+        'client_id', 'plan_id'
+    ).distinct():
+        plans.setdefault(client_id, set()).add(plan_id)
+
+    paused = set(
+        MembershipPause.objects.filter(
+            membership__client_id__in=ids,
+            status='ACTIVE',
+            start_date__lte=today,
+            end_date__gte=today,
+        ).values_list('membership__client_id', flat=True).distinct()
+    )
+    redsys = set(
+        ClientRedsysToken.objects.filter(client_id__in=ids).values_list('client_id', flat=True).distinct()
+    )
+    wallets = dict(ClientWallet.objects.filter(client_id__in=ids).values_list('client_id', 'balance'))
+
+    summaries = []
+    for client_id, gym_id in rows:
+        last_visit, noshows = visits.get(client_id, (None, 0))
+        plan_ids = sorted(plans.get(client_id, ()))
+        summaries.append(ClientSummary(
+            client_id=client_id,
+            gym_id=gym_id,
+            last_visit_date=last_visit,
+            last_booking_at=last_booking.get(client_id),
+            noshow_count=noshows,
+            active_plan_ids=f",{','.join(map(str, plan_ids))}," if plan_ids else "",
+            membership_expires_on=expires.get(client_id),
+            has_unpaid_membership=client_id in unpaid,
+            has_active_pause=client_id in paused,
+            has_redsys_token=client_id in redsys,
+            wallet_sign=_sign(wallets.get(client_id)),
+        ))
+    return summaries
+
+
+def _save(summaries):
+    from .models import ClientSummary
+
+    if summaries:
+        ClientSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['client'],
+            update_fields=SUMMARY_FIELDS,
+        )
+    return len(summaries)
+
+
+def refresh_summaries(client_ids, today=None):
+    """Recalcula el resumen de unos clientes. Devuelve el número de filas guardadas."""
+    from .models import Client
+
+    rows = list(Client.objects.filter(id__in=list(client_ids)).values_list('id', 'gym_id'))
+    return _save(compute_summaries(rows, today))
+
+
+def rebuild_summaries(gym, today=None, batch_size=BATCH_SIZE):
+    """Recalcula el resumen de todos los clientes de un gimnasio (keyset por id)."""
+    from .models import Client
+
+    clients = Client.objects.filter(gym=gym)
+    saved = 0
+    last_id = 0
+    while True:
+        rows = list(
+            clients.filter(id__gt=last_id).order_by('id').values_list('id', 'gym_id')[:batch_size]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            saved += _save(compute_summaries(rows, today))
+        last_id = rows[-1][0]
+    logger.info(f"Resúmenes de clientes {gym}: {saved}")
+    return saved
+
+
+def mark_dirty(client_id):
+    """
+    Marca un cliente para recalcular su resumen al confirmar la transacción.
+    Todos los clientes tocados en la misma transacción se recalculan juntos.
+
+    El lote pendiente va unido a su callback de on_commit: si la transacción
+    (o el savepoint donde se registró) se deshace, Django descarta el
+    callback y la siguiente marca empieza un lote nuevo en vez de arrastrar
+    los ids deshechos a otra petición.
+    """
+    if not client_id:
+        return
+    connection = transaction.get_connection()
+    batch = getattr(_dirty, 'batch', None)
+    if batch is not None and any(entry[1] is batch[1] for entry in connection.run_on_commit):
+        batch[0].add(client_id)
+        return
+    ids = {client_id}
+    flush = _dirty.batch = (ids, lambda: _flush(ids))
+    transaction.on_commit(flush[1])
+
+
+def _flush(ids):
+    batch = getattr(_dirty, 'batch', None)
+    if batch is not None and batch[0] is ids:
+        _dirty.batch = None
+    try:
+        refresh_summaries(ids)
+    except Exception as e:
+        logger.error(f"Error actualizando resúmenes de clientes {sorted(ids)[:10]}: {e}")
@@ -0,0 +1,93 @@
+"""
+Tareas Celery de clientes.
+"""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='clients.score_client_risk')
+def score_client_risk(gym_id=None):
+    """
+    Recalcula el riesgo de abandono (ClientRiskScore) de todos los clientes
+    activos, gimnasio a gimnasio (o solo de `gym_id`).
+    """
+    from organizations.models import Gym
+    from clients.risk_scoring import RiskScoringEngine
+
+    gyms = Gym.objects.all()
+    if gym_id:
+        gyms = gyms.filter(id=gym_id)
+
+    total = 0
+    for gym in gyms.iterator():
+        try:
+            total += RiskScoringEngine(gym).run()
+        except Exception as e:
+            logger.error(f"Error calculando riesgo de abandono de {gym}: {e}")
+    logger.info(f"Riesgo de abandono recalculado: {total} clientes")
+    return total
+
+
+@shared_task(name='clients.rescore_client_risk')
+def rescore_client_risk(client_ids):
+    """Recálculo incremental del riesgo de abandono de algunos clientes."""
+    from clients.risk_scoring import rescore_clients
+
+    return rescore_clients(client_ids)
+
+
+@shared_task(name='clients.scan_duplicate_clients')
+def scan_duplicate_clients(gym_id=None):
+    """Escaneo completo de duplicados (DuplicateCandidate), gimnasio a gimnasio."""
+    from organizations.models import Gym
+    from clients.utils.duplicate_detection import DuplicateDetector
+
+    gyms = Gym.objects.all()
+    if gym_id:
+        gyms = gyms.filter(id=gym_id)
+
+    total = 0
+    for gym in gyms.iterator():
+        try:
+            total += DuplicateDetector(gym).run()
+        except Exception as e:
+            logger.error(f"Error buscando duplicados de {gym}: {e}")
+    return total
+
+
+@shared_task(name='clients.check_client_duplicates')
+def check_client_duplicates(client_id):
+    """Comprobación incremental de duplicados de un cliente recién creado."""
+    from clients.models import Client
+    from clients.utils.duplicate_detection import check_client_duplicates as check
+
+    client = Client.objects.filter(id=client_id).select_related('gym').first()
+    if client is None:
+        return 0
+    return check(client)
+
+
+@shared_task(name='clients.reconcile_client_summaries')
+def reconcile_client_summaries(gym_id=None):
+    """
+    Recalcula ClientSummary de todos los clientes (o de `gym_id`).
+    Corrige cambios hechos sin señales y los campos que dependen del día.
+    """
+    from organizations.models import Gym
+    from clients.summary import rebuild_summaries
+
+    gyms = Gym.objects.all()
+    if gym_id:
+        gyms = gyms.filter(id=gym_id)
+
+    total = 0
+    for gym in gyms.iterator():
+        try:
+            total += rebuild_summaries(gym)
+        except Exception as e:
+            logger.error(f"Error reconstruyendo resúmenes de clientes de {gym}: {e}")
+    logger.info(f"Resúmenes de clientes reconciliados: {total}")
+    return total
@@ -1,31 +1,245 @@
-from rapidfuzz import fuzz
-from clients.models import Client
+"""
+Detección de clientes duplicados por gimnasio.
 
+En lugar de comparar todas las parejas de clientes (O(N²)), agrupa las fichas
+en bloques por claves normalizadas y solo compara dentro de cada bloque:
 
-def find_potential_duplicates(threshold=85):
-    """
-    Busca posibles clientes duplicados por nombre y apellidos (fuzzy) y teléfono exacto.
-    Devuelve una lista de tuplas: (cliente1, cliente2, score, motivo)
-    """
-    clients = list(Client.objects.all())
-    duplicates = []
-    checked = set()
-    for i, c1 in enumerate(clients):
-        for j, c2 in enumerate(clients):
-            if i >= j:
-                continue
-            key = tuple(sorted([c1.id, c2.id]))
-            if key in checked:
+- Teléfono (últimos 9 dígitos), email y DNI: coincidencia exacta, score 100.
+- Prefijo de cada palabra del nombre completo: los bloques se puntúan con
+  rapidfuzz.process.cdist (token_sort_ratio) por lotes de filas.
+
+Las parejas encontradas se guardan en DuplicateCandidate, que lee la vista de
+duplicados y el asistente de fusión. Los candidatos descartados se conservan
+en siguientes escaneos.
+
+Usage:
+    from clients.utils.duplicate_detection import DuplicateDetector, check_client_duplicates
+
+    DuplicateDetector(gym).run()             # escaneo completo del gimnasio
+    check_client_duplicates(client)          # al crear un cliente
+"""
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 85
+# Longitud del prefijo de palabra usado como clave de bloque por nombre
+NAME_PREFIX = 3
+# Filas por llamada a cdist (acota la memoria de la matriz de scores)
+CDIST_BATCH = 512
+WRITE_BATCH = 1000
+# Bloques exactos más grandes suelen ser valores de relleno (teléfono del
+# gimnasio, email genérico): no se generan parejas con ellos
+MAX_EXACT_BLOCK = 50
+CLIENT_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone_number', 'dni')
+
+REASONS = {
+    'phone': 'Teléfono igual',
+    'email': 'Email igual',
+    'dni': 'DNI igual',
+    'name': 'Nombre y apellidos similares',
+}
+
+
+def normalize_phone(value):
+    """Últimos 9 dígitos (ignora prefijo internacional y separadores)."""
+    digits = re.sub(r'\D', '', value or '')
+    return digits[-9:] if len(digits) >= 6 else ''
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def normalize_dni(value):
+    return re.sub(r'[^0-9A-Z]', '', (value or '').upper())
+
+
+def normalize_name(first_name, last_name):
+    """Nombre completo en minúsculas, sin acentos ni signos."""
+    name = f"{first_name or ''} {last_name or ''}"
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9 ]', ' ', name.lower()).split())
+
+
+def name_keys(name):
+    """Claves de bloque por nombre: prefijo de cada palabra significativa."""
+    return {word[:NAME_PREFIX] for word in name.split() if len(word) >= NAME_PREFIX}
+
+
+def exact_keys(row):
+    """Claves exactas (tipo, valor) de una fila de CLIENT_FIELDS."""
+    _, _, _, email, phone, dni = row
+    keys = []
+    if normalize_phone(phone):
+        keys.append(('phone', normalize_phone(phone)))
+    if normalize_email(email):
+        keys.append(('email', normalize_email(email)))
+    if normalize_dni(dni):
+        keys.append(('dni', normalize_dni(dni)))
+    return keys
+
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+class DuplicateDetector:
+    """Escaneo por bloques de los clientes de un gimnasio."""
+
+    def __init__(self, gym, threshold=DEFAULT_THRESHOLD):
+        self.gym = gym
+        self.threshold = threshold
+
+    def _rows(self):
+        from clients.models import Client
+
+        return list(Client.objects.filter(gym=self.gym).values_list(*CLIENT_FIELDS).order_by('id'))
+
+    def iter_pairs(self, rows):
+        """
+        Genera (id_a, id_b, score, motivo) bloque a bloque.
+        Una misma pareja puede salir en varios bloques.
+        """
+        from rapidfuzz import fuzz, process
+
+        exact_blocks = defaultdict(list)
+        name_blocks = defaultdict(list)
+        ids, names = [], []
+        for row in rows:
+            for key in exact_keys(row):
+                exact_blocks[key].append(row[0])
+            name = normalize_name(row[1], row[2])
+            if name:
+                for key in name_keys(name):
+                    name_blocks[key].append(len(ids))
+                ids.append(row[0])
+                names.append(name)
+
+        for (kind, _), block in exact_blocks.items():
+            if len(block) > MAX_EXACT_BLOCK:
                 continue
-            checked.add(key)
-            # Comparar por teléfono exacto
-            if c1.phone_number and c2.phone_number and c1.phone_number == c2.phone_number:
-                duplicates.append((c1, c2, 100, 'Teléfono igual'))
+            for i, a in enumerate(block):
+                for b in block[i + 1:]:
+                    yield a, b, 100, kind
+
+        for block in name_blocks.values():
+            if len(block) < 2:
                 continue
-            # Comparar por nombre+apellidos fuzzy
-            name1 = f"{c1.first_name} {c1.last_name}".strip().lower()
-            name2 = f"{c2.first_name} {c2.last_name}".strip().lower()
-            score = fuzz.token_sort_ratio(name1, name2)
-            if score >= threshold:
-                duplicates.append((c1, c2, score, 'Nombre y apellidos similares'))
-    return duplicates
+            block_names = [names[i] for i in block]
+            for start in range(0, len(block), CDIST_BATCH):
+                scores = process.cdist(
+                    block_names[start:start + CDIST_BATCH],
+                    block_names,
+                    scorer=fuzz.token_sort_ratio,
+                    score_cutoff=self.threshold,
+                    dtype='uint8',
+                    workers=-1,
+                )
+                rows_idx, cols_idx = scores.nonzero()
+                for r, c in zip(rows_idx.tolist(), cols_idx.tolist()):
+                    # Solo el triángulo superior (cada pareja una vez por bloque)
+                    if start + r < c:
+                        yield ids[block[start + r]], ids[block[c]], int(scores[r, c]), 'name'
+
+    def collect(self, pairs):
+        """Combina las parejas repetidas: score máximo y todos los motivos."""
+        found = {}
+        for a, b, score, kind in pairs:
+            key = _pair(a, b)
+            current = found.get(key)
+            if current is None:
+                found[key] = [score, [kind]]
+            else:
+                current[0] = max(current[0], score)
+                if kind not in current[1]:
+                    current[1].append(kind)
+        return found
+
+    def run(self):
+        """Escanea el gimnasio y sincroniza DuplicateCandidate. Devuelve el número de parejas."""
+        from clients.models import DuplicateCandidate
+
+        found = self.collect(self.iter_pairs(self._rows()))
+        with transaction.atomic():
+            save_candidates(self.gym, found)
+            # Los pendientes que ya no aparecen (datos corregidos) se eliminan
+            stale = DuplicateCandidate.objects.filter(
+                gym=self.gym, status=DuplicateCandidate.Status.PENDING
+            ).values_list('id', 'client_a_id', 'client_b_id')
+            stale_ids = [pk for pk, a, b in stale.iterator() if (a, b) not in found]
+            for start in range(0, len(stale_ids), WRITE_BATCH):
+                DuplicateCandidate.objects.filter(id__in=stale_ids[start:start + WRITE_BATCH]).delete()
+
+        logger.info(f"Duplicados {self.gym}: {len(found)} parejas")
+        return len(found)
+
+
+def save_candidates(gym, found):
+    """Upsert de {(id_a, id_b): [score, motivos]} sin tocar el estado (descartados)."""
+    from clients.models import DuplicateCandidate
+
+    candidates = [
+        DuplicateCandidate(
+            gym=gym,
+            client_a_id=a,
+            client_b_id=b,
+            score=score,
+            reasons=[REASONS[kind] for kind in kinds],
+        )
+        for (a, b), (score, kinds) in found.items()
+    ]
+    for start in range(0, len(candidates), WRITE_BATCH):
+        DuplicateCandidate.objects.bulk_create(
+            candidates[start:start + WRITE_BATCH],
+            update_conflicts=True,
+            unique_fields=['client_a', 'client_b'],
+            update_fields=['score', 'reasons', 'updated_at'],
+        )
+    return len(candidates)
+
+
+def check_client_duplicates(client, threshold=DEFAULT_THRESHOLD):
+    """
+    Comprobación incremental de un cliente contra su gimnasio: solo carga las
+    fichas que comparten alguna clave con él. Devuelve el número de parejas.
+    """
+    from django.db.models import Q
+    from clients.models import Client
+
+    row = tuple(getattr(client, field) for field in CLIENT_FIELDS)
+    name = normalize_name(client.first_name, client.last_name)
+
+    lookup = Q()
+    for kind, value in exact_keys(row):
+        if kind == 'phone':
+            lookup |= Q(phone_number__contains=value[-4:])
+        elif kind == 'email':
+            lookup |= Q(email__iexact=value)
+        else:
+            lookup |= Q(dni__iexact=client.dni.strip())
+    # Prefijos normalizados y tal cual (el nombre guardado puede llevar acentos)
+    raw_name = f"{client.first_name or ''} {client.last_name or ''}".lower()
+    for prefix in name_keys(name) | name_keys(raw_name):
+        lookup |= Q(first_name__icontains=prefix) | Q(last_name__icontains=prefix)
+    if not lookup:
+        return 0
+
+    others = list(
+        Client.objects.filter(gym_id=client.gym_id).filter(lookup)
+        .exclude(id=client.id).values_list(*CLIENT_FIELDS)
+    )
+    detector = DuplicateDetector(client.gym, threshold=threshold)
+    found = {
+        key: value
+        for key, value in detector.collect(detector.iter_pairs([row] + others)).items()
+        if client.id in key
+    }
+    save_candidates(client.gym, found)
+    return len(found)
+
@@ -9,12 +9,12 @@ from django.utils import timezone
 from django.utils.text import slugify
 
 from accounts.decorators import require_gym_permission
+from accounts.permissions import user_has_gym_permission
 from core.audit_decorators import log_action
 from organizations.models import Gym
 from .forms import ClientDocumentForm, ClientFieldForm, ClientForm, ClientGroupForm, ClientNoteForm, ClientTagForm, ClientHealthRecordForm, ClientHealthDocumentForm
-from .models import Client, ClientDocument, ClientField, ClientFieldOption, ClientGroup, ClientNote, ClientTag, ClientHealthRecord, ClientHealthDocument, DocumentTemplate
+from .models import Client, ClientDocument, ClientField, ClientFieldOption, ClientGroup, ClientNote, ClientTag, ClientHealthRecord, ClientHealthDocument, DocumentTemplate, DuplicateCandidate
 from routines.models import WorkoutRoutine
-from clients.utils.duplicate_detection import find_potential_duplicates
 
 
 @login_required
@@ -24,6 +24,9 @@ def merge_clients_wizard(request, c1_id, c2_id):
     gym = request.gym
     c1 = get_object_or_404(Client, id=c1_id, gym=gym)
     c2 = get_object_or_404(Client, id=c2_id, gym=gym)
+    candidate = DuplicateCandidate.objects.filter(
+        gym=gym, client_a_id=min(c1.id, c2.id), client_b_id=max(c1.id, c2.id)
+    ).first()
     conflict_warning = None
     # Comprobar conflictos de membresía activa
     c1_active_memberships = list(c1.memberships.filter(status="ACTIVE"))
@@ -85,18 +88,48 @@ def merge_clients_wizard(request, c1_id, c2_id):
             pass
         # TODO: Unificar otros historiales si aplica (pagos, reservas, etc.)
         c1.save()
-        c2.delete()
+        c2.delete()  # Elimina también sus DuplicateCandidate
+        # La ficha resultante puede tener nuevos duplicados
+        from clients.utils.duplicate_detection import check_client_duplicates
+        check_client_duplicates(c1)
         messages.success(request, "Fichas fusionadas correctamente.")
         return redirect("clients_duplicates")
-    return render(request, "clients/merge_wizard.html", {"c1": c1, "c2": c2, "conflict_warning": conflict_warning})
+    return render(request, "clients/merge_wizard.html", {"c1": c1, "c2": c2, "candidate": candidate, "conflict_warning": conflict_warning})
 
 
 @login_required
 @require_gym_permission("clients.view")
 def clients_duplicates(request):
-    # Opcional: filtrar solo por el gimnasio actual si aplica multi-gym
-    duplicates = find_potential_duplicates()
-    return render(request, "clients/duplicates.html", {"duplicates": duplicates})
+    """
+    Posibles duplicados del gimnasio (DuplicateCandidate pendientes).
+    POST action=scan encola el escaneo completo; action=dismiss descarta una
+    pareja. Las dos acciones requieren clients.change, como la fusión.
+    """
+    gym = request.gym
+    if request.method == "POST":
+        if not user_has_gym_permission(request.user, gym.id, "clients.change"):
+            messages.error(request, "No tienes permiso para gestionar duplicados.")
+            return redirect("clients_duplicates")
+        action = request.POST.get("action")
+        if action == "scan":
+            from marketing.signals import safe_delay
+            from clients.tasks import scan_duplicate_clients
+            if safe_delay(scan_duplicate_clients, gym.id) is None:
+                messages.error(request, "No se pudo lanzar la búsqueda de duplicados. Inténtalo más tarde.")
+            else:
+                messages.success(request, "Búsqueda de duplicados en marcha: los resultados aparecerán en unos minutos.")
+        elif action == "dismiss":
+            DuplicateCandidate.objects.filter(
+                gym=gym, id=request.POST.get("candidate_id")
+            ).update(status=DuplicateCandidate.Status.DISMISSED)
+            messages.success(request, "Pareja descartada.")
+        return redirect("clients_duplicates")
+
+    candidates = DuplicateCandidate.objects.filter(
+        gym=gym, status=DuplicateCandidate.Status.PENDING
+    ).select_related("client_a", "client_b").order_by("-score", "-id")
+    page_obj = Paginator(candidates, 50).get_page(request.GET.get("page", 1))
+    return render(request, "clients/duplicates.html", {"candidates": page_obj, "page_obj": page_obj})
 
 
 @login_required
@@ -141,7 +174,7 @@ def clients_list(request):
     min_no_shows = request.GET.get('min_no_shows', '')
     has_app_filter = request.GET.getlist('has_app')
 
-    clients = Client.objects.filter(gym=gym).prefetch_related("tags", "redsys_tokens").select_related("wallet")
+    clients = Client.objects.filter(gym=gym).prefetch_related("tags", "redsys_tokens").select_related("wallet", "risk_score")
 
     # Use the new Service for filtering
     from .services import ClientFilterService
@@ -165,39 +198,47 @@ def clients_list(request):
         field.selected_value = selected_value or ""
 
     # === ORDENACIÓN ===
+    # Claves (campo, descendente) para la paginación por keyset; la última es única.
+    # Los valores que pueden ser NULL se anotan con Coalesce.
+    from datetime import date
+    from django.db.models import Value
+    from django.db.models.functions import Coalesce
     sort_by = request.GET.get('sort', '-created_at')
     valid_sorts = {
-        'created_at': 'created_at',
-        '-created_at': '-created_at',
-        'name': ('first_name', 'last_name'),
-        '-name': ('-first_name', '-last_name'),
-        'last_visit': 'last_visit_date',
-        '-last_visit': '-last_visit_date',
+        'created_at': [('created_at', False), ('id', False)],
+        '-created_at': [('created_at', True), ('id', True)],
+        'name': [('first_name', False), ('last_name', False), ('id', False)],
+        '-name': [('first_name', True), ('last_name', True), ('id', True)],
+        # Última visita de ClientSummary; sin visitas cuenta como la más antigua
+        'last_visit': [('sort_last_visit', False), ('id', False)],
+        '-last_visit': [('sort_last_visit', True), ('id', True)],
+        # Riesgo de abandono precalculado (ClientRiskScore); sin puntuación al final
+        '-risk': [('sort_risk', True), ('id', True)],
     }
-    
-    # Añadir anotación de última visita si no existe
-    if 'last_visit' in sort_by and not hasattr(clients, '_last_visit_annotated'):
-        from django.db.models import Max
-        clients = clients.annotate(last_visit_date=Max('visits__date'))
-    
-    if sort_by in valid_sorts:
-        sort_fields = valid_sorts[sort_by]
-        if isinstance(sort_fields, tuple):
-            clients = clients.order_by(*sort_fields).distinct()
-        else:
-            clients = clients.order_by(sort_fields).distinct()
-    else:
-        clients = clients.order_by("-created_at").distinct()
+    if sort_by not in valid_sorts:
+        sort_by = '-created_at'
+    sort_keys = valid_sorts[sort_by]
+
+    if 'last_visit' in sort_by:
+        clients = clients.annotate(sort_last_visit=Coalesce('summary__last_visit_date', Value(date.min)))
+    elif sort_by == '-risk':
+        clients = clients.annotate(sort_risk=Coalesce('risk_score__score', Value(-1)))
 
     custom_field_options = {
         field.slug: ({True: "Sí", False: "No"} if field.field_type == ClientField.FieldType.TOGGLE else {opt.value: opt.label for opt in field.options.all()})
         for field in custom_fields
     }
 
-    # Paginación - 50 clientes por página
-    paginator = Paginator(clients, 50)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Paginación por keyset - 50 clientes por página (sin OFFSET)
+    from core.pagination import keyset_page
+    total_count = clients.order_by().count()
+    page_obj = keyset_page(
+        clients,
+        sort_keys,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=50,
+    )
     
     clients_page = list(page_obj.object_list)
     custom_field_values = {}
@@ -234,7 +275,7 @@ def clients_list(request):
     context = {
         "clients": clients_page,
         "page_obj": page_obj,
-        "paginator": paginator,
+        "total_count": total_count,
         "tags": gym.client_tags.all(),
         "custom_fields": custom_fields,
         "custom_field_options": custom_field_options,
@@ -753,6 +794,11 @@ def client_export_excel(request):
     
     gym = request.gym
     clients = Client.objects.filter(gym=gym).order_by('-created_at')
+    filename = f'clientes_{gym.name}_{datetime.now().strftime("%Y%m%d")}.xlsx'
+
+    # Listados grandes: en segundo plano y aviso por email
+    if _start_background_export(request, clients, 'xlsx', filename):
+        return redirect('clients')
     
     # Generar Excel
     excel_file = ClientExportService.export_to_excel(clients, gym.name)
@@ -762,11 +808,32 @@ def client_export_excel(request):
         excel_file.read(),
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = f'attachment; filename="clientes_{gym.name}_{datetime.now().strftime("%Y%m%d")}.xlsx"'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     return response
 
 
+def _start_background_export(request, clients, export_format, filename):
+    """Encola la exportación si el listado es grande. True si se ha encolado."""
+    from core.export_jobs import BACKGROUND_EXPORT_ROWS, ExportJobStatus, start_export
+
+    total = clients.count()
+    if total <= BACKGROUND_EXPORT_ROWS:
+        return False
+    job = start_export(
+        request, 'clients.export_service.build_clients_export', export_format, filename,
+        params={'format': export_format}, total=total,
+    )
+    if job['status'] == ExportJobStatus.FAILED:
+        messages.error(request, "No se ha podido iniciar la exportación. Inténtalo de nuevo en unos minutos.")
+    else:
+        messages.success(
+            request,
+            "Estamos generando la exportación. Te enviaremos un email con el enlace de descarga cuando esté lista.",
+        )
+    return True
+
+
 import json
 from datetime import datetime
 
@@ -932,13 +999,17 @@ def client_export_pdf(request):
     
     gym = request.gym
     clients = Client.objects.filter(gym=gym).order_by('-created_at')
+    filename = f'clientes_{gym.name}_{datetime.now().strftime("%Y%m%d")}.pdf'
+
+    if _start_background_export(request, clients, 'pdf', filename):
+        return redirect('clients')
     
     # Generar PDF
     pdf_file = ClientExportService.export_to_pdf(clients, gym.name)
     
     # Preparar respuesta
     response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="clientes_{gym.name}_{datetime.now().strftime("%Y%m%d")}.pdf"'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     return response
 
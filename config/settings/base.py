@@ -337,11 +337,56 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.tasks.backup_media_task',
         'schedule': crontab(hour=4, minute=0, day_of_week='sunday'),
     },
+    # Limpieza de ficheros de exportaciones caducadas a las 4:30 AM
+    'cleanup-exports-daily': {
+        'task': 'core.cleanup_old_exports',
+        'schedule': crontab(hour=4, minute=30),
+    },
     # Limpieza de backups antiguos los lunes a las 5:00 AM
     'cleanup-backups-weekly': {
         'task': 'core.tasks.cleanup_old_backups_task',
         'schedule': crontab(hour=5, minute=0, day_of_week='monday'),
     },
+    # Métricas por gimnasio para el panel de superadmin a la 1:30 AM
+    'snapshot-tenant-metrics-daily': {
+        'task': 'saas_billing.snapshot_tenant_metrics',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    # Volcado de los contadores de cupo de email a GymEmailUsage cada 5 minutos
+    'flush-email-usage': {
+        'task': 'saas_billing.flush_email_usage',
+        'schedule': crontab(minute='*/5'),
+    },
+    # Conciliación del stock de productos con sus movimientos, domingos a las 5:30 AM
+    'reconcile-stock-weekly': {
+        'task': 'products.reconcile_stock',
+        'schedule': crontab(hour=5, minute=30, day_of_week='sunday'),
+    },
+    # Reconstrucción de la tabla de hechos de asistencia a las 2:30 AM
+    'rebuild-attendance-facts-daily': {
+        'task': 'activities.rebuild_attendance_facts',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    # Reconciliación de la facturación mensual agregada a las 2:45 AM
+    'reconcile-monthly-revenue-daily': {
+        'task': 'sales.reconcile_monthly_revenue',
+        'schedule': crontab(hour=2, minute=45),
+    },
+    # Reconciliación del resumen del listado de clientes a las 2:05 AM
+    'reconcile-client-summaries-daily': {
+        'task': 'clients.reconcile_client_summaries',
+        'schedule': crontab(hour=2, minute=5),
+    },
+    # Riesgo de abandono de todos los clientes activos a las 2:15 AM
+    'score-client-risk-daily': {
+        'task': 'clients.score_client_risk',
+        'schedule': crontab(hour=2, minute=15),
+    },
+    # Escaneo completo de clientes duplicados los domingos a las 3:30 AM
+    'scan-duplicate-clients-weekly': {
+        'task': 'clients.scan_duplicate_clients',
+        'schedule': crontab(hour=3, minute=30, day_of_week='sunday'),
+    },
 }
 
 # --------------------------------------------------
@@ -350,6 +395,15 @@ CELERY_BEAT_SCHEDULE = {
 BACKUP_DIR = os.getenv('BACKUP_DIR', str(BASE_DIR / 'backups'))
 BACKUP_RETENTION_DAYS = int(os.getenv('BACKUP_RETENTION_DAYS', '30'))
 
+# --------------------------------------------------
+# TELEMETRIA (core.telemetry, expuesta en /metrics)
+# --------------------------------------------------
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'True') == 'True'
+TELEMETRY_SLOW_REQUEST_MS = int(os.getenv('TELEMETRY_SLOW_REQUEST_MS', '1000'))
+TELEMETRY_SLOW_SAMPLE_RATE = float(os.getenv('TELEMETRY_SLOW_SAMPLE_RATE', '1.0'))
+# Sin token /metrics responde 404
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # --------------------------------------------------
 # EMAIL (configuración base)
 # --------------------------------------------------
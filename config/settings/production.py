@@ -78,6 +78,11 @@ for key in ["POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST"
     if not os.getenv(key):
         raise ValueError(f"❌ DATABASE ERROR: Variable de entorno {key} no configurada")
 
+# /metrics solo con token en producción
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+if not METRICS_TOKEN:
+    raise ValueError("❌ METRICS ERROR: Variable de entorno METRICS_TOKEN no configurada")
+
 # --------------------------------------------------
 # CACHING (Redis OBLIGATORIO en producción)
 # --------------------------------------------------
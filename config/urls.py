@@ -9,11 +9,13 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, Spec
 
 # Calendar feed view (público, sin autenticación)
 from clients.calendar_views import calendar_feed
+from core.health_views import MetricsView
 
 
 urlpatterns = [
     # Health Check endpoints (para Docker, Kubernetes, Load Balancers)
     path("health/", include("core.urls", namespace="health")),
+    path("metrics", MetricsView.as_view(), name="metrics"),
     
     # Internationalization (i18n) - Language selector
     path("i18n/", include("django.conf.urls.i18n")),
@@ -2,18 +2,22 @@
 Servicio de Backups para el CRM.
 
 Proporciona funcionalidad para:
-- Backup de base de datos PostgreSQL
-- Backup de archivos media
+- Backup de base de datos PostgreSQL (SQL plano o formato directorio en paralelo)
+- Backup incremental de archivos media (almacen de objetos por hash + manifests)
 - Subida a S3 (opcional)
 - Limpieza de backups antiguos
 - Restauracion de backups
 """
 
 import os
+import re
+import json
+import hashlib
 import subprocess
 import gzip
 import shutil
 import logging
+import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, List, Tuple
@@ -22,6 +26,12 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+COPY_BUFFER_SIZE = 1024 * 1024  # 1 MB
+MANIFEST_VERSION = 1
+# Los objetos mas recientes que esto no se borran en la limpieza (pueden ser
+# de un backup de media en curso cuyo manifest aun no se ha escrito)
+OBJECT_GRACE_PERIOD = timedelta(hours=24)
+
 
 class BackupService:
     """
@@ -33,8 +43,13 @@ class BackupService:
         # Backup completo
         db_path, media_path = service.create_full_backup()
         
-        # Solo base de datos
+        # Solo base de datos (jobs > 1: pg_dump -F d -j N)
         db_path = service.backup_database()
+        db_path = service.backup_database(jobs=4)
+        
+        # Media incremental (devuelve el manifest) y restauracion
+        manifest_path = service.backup_media()
+        service.restore_media(manifest_path)
         
         # Subir a S3
         service.upload_to_s3(db_path)
@@ -54,6 +69,7 @@ class BackupService:
         # Subdirectorios
         self.db_backup_dir = self.backup_dir / 'database'
         self.media_backup_dir = self.backup_dir / 'media'
+        self.media_objects_dir = self.media_backup_dir / 'objects'
         self.db_backup_dir.mkdir(exist_ok=True)
         self.media_backup_dir.mkdir(exist_ok=True)
         
@@ -64,6 +80,14 @@ class BackupService:
         self.retention_days = int(os.getenv('BACKUP_RETENTION_DAYS', '30'))
         self.keep_weekly = int(os.getenv('BACKUP_KEEP_WEEKLY', '4'))
         self.keep_monthly = int(os.getenv('BACKUP_KEEP_MONTHLY', '3'))
+        self.media_generations = int(os.getenv('BACKUP_MEDIA_GENERATIONS', '14'))
+        
+        # Rendimiento de pg_dump
+        self.db_jobs = int(os.getenv('BACKUP_DB_JOBS', '1'))
+        self.compress_level = int(os.getenv('BACKUP_COMPRESS_LEVEL', '6'))
+        
+        # Estadisticas del ultimo backup_media()
+        self.last_media_stats = None
     
     def create_full_backup(self) -> Tuple[Path, Path]:
         """
@@ -80,25 +104,34 @@ class BackupService:
         logger.info(f"Backup completo finalizado: DB={db_path}, Media={media_path}")
         return db_path, media_path
     
-    def backup_database(self, compress: bool = True) -> Path:
+    def backup_database(self, compress: bool = True, jobs: Optional[int] = None) -> Path:
         """
         Crea un backup de la base de datos PostgreSQL.
         
+        Con jobs > 1 usa el formato directorio de pg_dump (-F d -j N): cada
+        tabla se vuelca (y comprime con -Z) en paralelo en su propio archivo.
+        Con jobs = 1 genera un .sql plano comprimido en streaming.
+        
         Args:
             compress: Si True, comprime el backup con gzip
+            jobs: Workers de pg_dump. Por defecto BACKUP_DB_JOBS (1)
             
         Returns:
-            Path al archivo de backup
+            Path al archivo (o directorio) de backup
         """
+        jobs = jobs or self.db_jobs
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"db_backup_{timestamp}.sql"
         
-        if compress:
-            filename += '.gz'
+        if jobs > 1:
+            filename = f"db_backup_{timestamp}.dir"
+        else:
+            filename = f"db_backup_{timestamp}.sql"
+            if compress:
+                filename += '.gz'
         
         backup_path = self.db_backup_dir / filename
         
-        logger.info(f"Creando backup de base de datos: {backup_path}")
+        logger.info(f"Creando backup de base de datos: {backup_path} (jobs={jobs})")
         
         # Construir comando pg_dump
         env = os.environ.copy()
@@ -112,22 +145,37 @@ class BackupService:
             '-d', self.db_config['NAME'],
             '--no-owner',
             '--no-privileges',
-            '-F', 'p',  # Plain text format
         ]
         
         try:
-            if compress:
-                # Ejecutar pg_dump y comprimir
+            if jobs > 1:
+                # Formato directorio en paralelo. Se escribe en .partial y se
+                # renombra al terminar para no listar backups a medias.
+                partial_path = backup_path.with_name(backup_path.name + '.partial')
+                shutil.rmtree(partial_path, ignore_errors=True)
+                subprocess.run(
+                    cmd + [
+                        '-F', 'd',
+                        '-j', str(jobs),
+                        '-Z', str(self.compress_level if compress else 0),
+                        '-f', str(partial_path),
+                    ],
+                    stderr=subprocess.PIPE,
+                    env=env,
+                    check=True
+                )
+                partial_path.rename(backup_path)
+            elif compress:
+                # Ejecutar pg_dump y comprimir en streaming
                 process = subprocess.Popen(
-                    cmd,
+                    cmd + ['-F', 'p'],  # Plain text format
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     env=env
                 )
                 
-                with gzip.open(backup_path, 'wb') as f:
-                    for chunk in iter(lambda: process.stdout.read(8192), b''):
-                        f.write(chunk)
+                with gzip.open(backup_path, 'wb', compresslevel=self.compress_level) as f:
+                    shutil.copyfileobj(process.stdout, f, COPY_BUFFER_SIZE)
                 
                 _, stderr = process.communicate()
                 if process.returncode != 0:
@@ -138,14 +186,14 @@ class BackupService:
                 # Ejecutar pg_dump sin comprimir
                 with open(backup_path, 'w') as f:
                     subprocess.run(
-                        cmd,
+                        cmd + ['-F', 'p'],
                         stdout=f,
                         stderr=subprocess.PIPE,
                         env=env,
                         check=True
                     )
             
-            size_mb = backup_path.stat().st_size / (1024 * 1024)
+            size_mb = self.backup_size(backup_path) / (1024 * 1024)
             logger.info(f"Backup de DB completado: {backup_path} ({size_mb:.2f} MB)")
             
             return backup_path
@@ -159,10 +207,16 @@ class BackupService:
     
     def backup_media(self) -> Path:
         """
-        Crea un backup comprimido de los archivos media.
+        Crea un backup incremental de los archivos media.
+        
+        Cada archivo se guarda una sola vez en media/objects/ con su SHA-256
+        como nombre; cada backup es un manifest (media_backup_<fecha>.json.gz)
+        con ruta -> (hash, tamano, mtime). Los archivos con el mismo tamano y
+        mtime que en el manifest anterior reutilizan su hash sin releerse, asi
+        que solo se leen y copian los archivos nuevos o modificados.
         
         Returns:
-            Path al archivo tar.gz
+            Path al manifest (None si no hay directorio media)
         """
         media_root = Path(settings.MEDIA_ROOT)
         
@@ -171,21 +225,62 @@ class BackupService:
             return None
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = self.media_backup_dir / f"media_backup_{timestamp}.tar.gz"
+        backup_path = self.media_backup_dir / f"media_backup_{timestamp}.json.gz"
         
         logger.info(f"Creando backup de media: {backup_path}")
         
         try:
-            # Crear archivo tar.gz
-            shutil.make_archive(
-                str(backup_path).replace('.tar.gz', ''),
-                'gztar',
-                root_dir=media_root.parent,
-                base_dir=media_root.name
-            )
+            previous = self._latest_media_manifest()
+            previous_files = self.read_media_manifest(previous)['files'] if previous else {}
+            
+            files = {}
+            new_objects = []
+            stats = {'files': 0, 'total_bytes': 0, 'new_objects': 0, 'new_bytes': 0, 'hashed': 0}
             
-            size_mb = backup_path.stat().st_size / (1024 * 1024)
-            logger.info(f"Backup de media completado: {backup_path} ({size_mb:.2f} MB)")
+            for file_path in sorted(media_root.rglob('*')):
+                if not file_path.is_file() or file_path.is_symlink():
+                    continue
+                relative = file_path.relative_to(media_root).as_posix()
+                stat = file_path.stat()
+                
+                entry = previous_files.get(relative)
+                if (
+                    entry and entry[1] == stat.st_size and entry[2] == stat.st_mtime_ns
+                    and self._object_path(entry[0]).exists()
+                ):
+                    digest = entry[0]
+                else:
+                    digest, created = self._store_object(file_path)
+                    stats['hashed'] += 1
+                    if created:
+                        new_objects.append(digest)
+                        stats['new_objects'] += 1
+                        stats['new_bytes'] += stat.st_size
+                
+                files[relative] = [digest, stat.st_size, stat.st_mtime_ns]
+                stats['files'] += 1
+                stats['total_bytes'] += stat.st_size
+            
+            manifest = {
+                'version': MANIFEST_VERSION,
+                'created': datetime.now().isoformat(),
+                'media_root': str(media_root),
+                'previous': previous.name if previous else None,
+                'stats': stats,
+                'new_objects': new_objects,
+                'files': files,
+            }
+            partial_path = backup_path.with_name(backup_path.name + '.partial')
+            with gzip.open(partial_path, 'wt', encoding='utf-8') as f:
+                json.dump(manifest, f, separators=(',', ':'))
+            partial_path.rename(backup_path)
+            
+            self.last_media_stats = stats
+            logger.info(
+                f"Backup de media completado: {backup_path} "
+                f"({stats['files']} archivos, {stats['new_objects']} nuevos, "
+                f"{stats['new_bytes'] / (1024 * 1024):.2f} MB copiados)"
+            )
             
             return backup_path
             
@@ -193,6 +288,93 @@ class BackupService:
             logger.error(f"Error creando backup de media: {e}")
             raise
     
+    def _object_path(self, digest: str) -> Path:
+        return self.media_objects_dir / digest[:2] / digest
+    
+    def _store_object(self, file_path: Path) -> Tuple[str, bool]:
+        """
+        Calcula el SHA-256 de un archivo copiandolo a la vez (una sola
+        lectura) y lo guarda en el almacen de objetos si no existia.
+        
+        Returns:
+            (hash, True si el objeto es nuevo)
+        """
+        self.media_objects_dir.mkdir(exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=self.media_objects_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(file_path, 'rb') as src:
+                for chunk in iter(lambda: src.read(COPY_BUFFER_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+            
+            object_path = self._object_path(digest.hexdigest())
+            if object_path.exists():
+                # Reutilizado: se actualiza el mtime para que la limpieza
+                # no lo borre mientras el manifest aun no esta escrito
+                os.utime(object_path)
+                return digest.hexdigest(), False
+            
+            object_path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_name, object_path)
+            return digest.hexdigest(), True
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+    
+    def _media_manifests(self) -> List[Path]:
+        """Manifests de media, del mas reciente al mas antiguo."""
+        return sorted(self.media_backup_dir.glob('media_backup_*.json.gz'), reverse=True)
+    
+    def _latest_media_manifest(self) -> Optional[Path]:
+        manifests = self._media_manifests()
+        return manifests[0] if manifests else None
+    
+    @staticmethod
+    def read_media_manifest(manifest_path: Path) -> dict:
+        with gzip.open(manifest_path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def restore_media(self, manifest_path: Path, target_dir: Optional[str] = None) -> int:
+        """
+        Restaura los archivos media de un manifest.
+        
+        Args:
+            manifest_path: Ruta al manifest (media_backup_<fecha>.json.gz)
+            target_dir: Directorio destino. Por defecto MEDIA_ROOT
+            
+        Returns:
+            Numero de archivos restaurados
+        """
+        manifest_path = Path(manifest_path)
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"Backup no encontrado: {manifest_path}")
+        
+        target = Path(target_dir or settings.MEDIA_ROOT)
+        logger.warning(f"⚠️ Restaurando media desde: {manifest_path} en {target}")
+        
+        restored = 0
+        for relative, (digest, size, mtime_ns) in self.read_media_manifest(manifest_path)['files'].items():
+            destination = target / relative
+            object_path = self._object_path(digest)
+            if not object_path.exists():
+                raise FileNotFoundError(f"Objeto de media no encontrado: {digest} ({relative})")
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(object_path, destination)
+            os.utime(destination, ns=(mtime_ns, mtime_ns))
+            restored += 1
+        
+        logger.info(f"✅ Restauracion de media completada: {restored} archivos")
+        return restored
+    
+    @staticmethod
+    def backup_size(path: Path) -> int:
+        """Tamano en bytes de un backup (archivo o directorio)."""
+        path = Path(path)
+        if path.is_dir():
+            return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+        return path.stat().st_size
+    
     def upload_to_s3(self, file_path: Path, bucket_prefix: str = 'backups') -> Optional[str]:
         """
         Sube un archivo de backup a S3.
@@ -228,18 +410,49 @@ class BackupService:
             # Generar key en S3
             date_prefix = datetime.now().strftime('%Y/%m/%d')
             s3_key = f"{bucket_prefix}/{date_prefix}/{file_path.name}"
+            extra_args = {
+                'StorageClass': 'STANDARD_IA',  # Mas economico para backups
+                'ServerSideEncryption': 'AES256'
+            }
             
             logger.info(f"Subiendo a S3: s3://{bucket_name}/{s3_key}")
             
-            s3_client.upload_file(
-                str(file_path),
-                bucket_name,
-                s3_key,
-                ExtraArgs={
-                    'StorageClass': 'STANDARD_IA',  # Mas economico para backups
-                    'ServerSideEncryption': 'AES256'
-                }
-            )
+            if file_path.is_dir():
+                # Backup de DB en formato directorio: un objeto por archivo
+                for part in sorted(file_path.rglob('*')):
+                    if part.is_file():
+                        s3_client.upload_file(
+                            str(part), bucket_name,
+                            f"{s3_key}/{part.relative_to(file_path).as_posix()}",
+                            ExtraArgs=extra_args
+                        )
+            else:
+                if file_path.parent == self.media_backup_dir and file_path.name.endswith('.json.gz'):
+                    # Manifest de media: subir antes todos los objetos que
+                    # referencia y aun no estan en el bucket (no solo los
+                    # nuevos: una subida anterior pudo fallar o no hacerse)
+                    objects_prefix = f"{bucket_prefix}/objects/"
+                    uploaded = set()
+                    for page in s3_client.get_paginator('list_objects_v2').paginate(
+                        Bucket=bucket_name, Prefix=objects_prefix
+                    ):
+                        uploaded.update(item['Key'] for item in page.get('Contents', []))
+                    
+                    files = self.read_media_manifest(file_path)['files']
+                    for digest in sorted({entry[0] for entry in files.values()}):
+                        object_key = f"{objects_prefix}{digest[:2]}/{digest}"
+                        if object_key not in uploaded:
+                            s3_client.upload_file(
+                                str(self._object_path(digest)), bucket_name, object_key,
+                                ExtraArgs=extra_args
+                            )
+                
+                s3_client.upload_file(
+                    str(file_path),
+                    bucket_name,
+                    s3_key,
+                    ExtraArgs=extra_args
+                )
             
             s3_url = f"s3://{bucket_name}/{s3_key}"
             logger.info(f"Upload completado: {s3_url}")
@@ -254,13 +467,17 @@ class BackupService:
         """
         Elimina backups antiguos segun politica de retencion.
         
-        Politica:
+        Politica (DB y archivos media .tar.gz antiguos):
         - Mantiene backups diarios de los ultimos N dias
         - Mantiene 1 backup semanal de las ultimas N semanas
         - Mantiene 1 backup mensual de los ultimos N meses
         
+        Media incremental: mantiene las ultimas BACKUP_MEDIA_GENERATIONS
+        generaciones (manifests) y 1 mensual de los ultimos N meses, y despues
+        borra los objetos que ya no referencia ningun manifest.
+        
         Returns:
-            Numero de archivos eliminados
+            Numero de backups eliminados
         """
         logger.info("Limpiando backups antiguos...")
         deleted_count = 0
@@ -268,19 +485,18 @@ class BackupService:
         now = datetime.now()
         cutoff_daily = now - timedelta(days=self.retention_days)
         
-        for backup_dir in [self.db_backup_dir, self.media_backup_dir]:
-            backups = sorted(backup_dir.glob('*_backup_*'), reverse=True)
-            
+        legacy_backups = [
+            sorted(self.db_backup_dir.glob('*_backup_*'), reverse=True),
+            sorted(self.media_backup_dir.glob('*_backup_*.tar.gz'), reverse=True),
+        ]
+        for backups in legacy_backups:
             # Agrupar por semana y mes para retencion
             weekly_kept = set()
             monthly_kept = set()
             
             for backup_file in backups:
-                # Extraer fecha del nombre del archivo
-                try:
-                    date_str = backup_file.stem.split('_')[-2]  # YYYYMMDD
-                    file_date = datetime.strptime(date_str, '%Y%m%d')
-                except (ValueError, IndexError):
+                file_date = self._backup_date(backup_file)
+                if file_date is None:
                     continue
                 
                 week_key = file_date.strftime('%Y-W%W')
@@ -305,12 +521,84 @@ class BackupService:
                 
                 if not keep:
                     logger.info(f"Eliminando backup antiguo: {backup_file}")
-                    backup_file.unlink()
+                    self._delete_backup(backup_file)
                     deleted_count += 1
         
-        logger.info(f"Limpieza completada: {deleted_count} archivos eliminados")
+        deleted_count += self._cleanup_media_generations()
+        
+        logger.info(f"Limpieza completada: {deleted_count} backups eliminados")
+        return deleted_count
+    
+    def _cleanup_media_generations(self) -> int:
+        """Retencion de manifests de media y borrado de objetos huerfanos."""
+        monthly_kept = set()
+        kept = []
+        deleted_count = 0
+        
+        for position, manifest_path in enumerate(self._media_manifests()):
+            file_date = self._backup_date(manifest_path)
+            month_key = file_date.strftime('%Y-%m') if file_date else None
+            
+            if position < self.media_generations:
+                keep = True
+            elif month_key and month_key not in monthly_kept and len(monthly_kept) < self.keep_monthly:
+                monthly_kept.add(month_key)
+                keep = True
+            else:
+                keep = False
+            
+            if keep:
+                kept.append(manifest_path)
+            else:
+                logger.info(f"Eliminando generacion de media: {manifest_path}")
+                manifest_path.unlink()
+                deleted_count += 1
+        
+        if not self.media_objects_dir.exists():
+            return deleted_count
+        
+        referenced = set()
+        for manifest_path in kept:
+            referenced.update(entry[0] for entry in self.read_media_manifest(manifest_path)['files'].values())
+        
+        grace_cutoff = (datetime.now() - OBJECT_GRACE_PERIOD).timestamp()
+        freed_objects = 0
+        freed_bytes = 0
+        for object_path in self.media_objects_dir.glob('*/*'):
+            if object_path.name in referenced:
+                continue
+            stat = object_path.stat()
+            if stat.st_mtime >= grace_cutoff:
+                continue
+            object_path.unlink()
+            freed_objects += 1
+            freed_bytes += stat.st_size
+        
+        if freed_objects:
+            logger.info(
+                f"Objetos de media eliminados: {freed_objects} "
+                f"({freed_bytes / (1024 * 1024):.2f} MB)"
+            )
         return deleted_count
     
+    @staticmethod
+    def _backup_date(backup_path: Path) -> Optional[datetime]:
+        """Fecha de un backup a partir de su nombre (*_backup_YYYYMMDD_HHMMSS*)."""
+        match = re.search(r'_backup_(\d{8})_\d{6}', backup_path.name)
+        if not match:
+            return None
+        try:
+            return datetime.strptime(match.group(1), '%Y%m%d')
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _delete_backup(backup_path: Path) -> None:
+        if backup_path.is_dir():
+            shutil.rmtree(backup_path)
+        else:
+            backup_path.unlink()
+    
     def list_backups(self) -> List[dict]:
         """
         Lista todos los backups disponibles.
@@ -322,27 +610,47 @@ class BackupService:
         
         for backup_dir in [self.db_backup_dir, self.media_backup_dir]:
             for backup_file in backup_dir.glob('*_backup_*'):
+                if backup_file.name.endswith('.partial'):
+                    continue
                 stat = backup_file.stat()
+                size_bytes = self.backup_size(backup_file)
                 backups.append({
                     'path': str(backup_file),
                     'name': backup_file.name,
                     'type': 'database' if 'db_' in backup_file.name else 'media',
-                    'size_bytes': stat.st_size,
-                    'size_mb': round(stat.st_size / (1024 * 1024), 2),
+                    'format': self._backup_format(backup_file),
+                    'size_bytes': size_bytes,
+                    'size_mb': round(size_bytes / (1024 * 1024), 2),
                     'created': datetime.fromtimestamp(stat.st_ctime),
                     'modified': datetime.fromtimestamp(stat.st_mtime),
                 })
         
         return sorted(backups, key=lambda x: x['created'], reverse=True)
     
-    def restore_database(self, backup_path: Path) -> bool:
+    @staticmethod
+    def _backup_format(backup_path: Path) -> str:
+        name = backup_path.name
+        if backup_path.is_dir():
+            return 'directory'
+        if name.endswith('.json.gz'):
+            return 'manifest'
+        if name.endswith('.tar.gz'):
+            return 'archive'
+        return 'plain'
+    
+    def restore_database(self, backup_path: Path, jobs: Optional[int] = None) -> bool:
         """
         Restaura la base de datos desde un backup.
         
         ⚠️ CUIDADO: Esto sobreescribe la base de datos actual!
         
+        Formatos:
+        - Directorio (pg_dump -F d): pg_restore en paralelo con `jobs` workers
+        - .sql.gz / .sql: psql, descomprimiendo en streaming
+        
         Args:
-            backup_path: Ruta al archivo de backup
+            backup_path: Ruta al archivo (o directorio) de backup
+            jobs: Workers de pg_restore. Por defecto BACKUP_DB_JOBS
             
         Returns:
             True si la restauracion fue exitosa
@@ -357,26 +665,41 @@ class BackupService:
         env = os.environ.copy()
         env['PGPASSWORD'] = self.db_config['PASSWORD']
         
+        connection_args = [
+            '-h', self.db_config['HOST'],
+            '-p', str(self.db_config['PORT']),
+            '-U', self.db_config['USER'],
+            '-d', self.db_config['NAME'],
+        ]
+        
         # Determinar si esta comprimido
         is_compressed = backup_path.suffix == '.gz'
         
         try:
-            if is_compressed:
-                # Descomprimir y restaurar
+            if backup_path.is_dir():
+                # Formato directorio: pg_restore en paralelo
+                subprocess.run(
+                    ['pg_restore', *connection_args,
+                     '-F', 'd',
+                     '-j', str(max(jobs or self.db_jobs, 1)),
+                     '--clean', '--if-exists',
+                     '--no-owner', '--no-privileges',
+                     str(backup_path)],
+                    stderr=subprocess.PIPE,
+                    env=env,
+                    check=True
+                )
+            elif is_compressed:
+                # Descomprimir y restaurar en streaming
                 process = subprocess.Popen(
-                    ['psql',
-                     '-h', self.db_config['HOST'],
-                     '-p', str(self.db_config['PORT']),
-                     '-U', self.db_config['USER'],
-                     '-d', self.db_config['NAME'],
-                     '-q'],  # Quiet mode
+                    ['psql', *connection_args, '-q'],  # Quiet mode
                     stdin=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     env=env
                 )
                 
                 with gzip.open(backup_path, 'rb') as f:
-                    process.stdin.write(f.read())
+                    shutil.copyfileobj(f, process.stdin, COPY_BUFFER_SIZE)
                 
                 process.stdin.close()
                 _, stderr = process.communicate()
@@ -389,12 +712,7 @@ class BackupService:
                 # Restaurar directamente
                 with open(backup_path, 'r') as f:
                     subprocess.run(
-                        ['psql',
-                         '-h', self.db_config['HOST'],
-                         '-p', str(self.db_config['PORT']),
-                         '-U', self.db_config['USER'],
-                         '-d', self.db_config['NAME'],
-                         '-q'],
+                        ['psql', *connection_args, '-q'],
                         stdin=f,
                         stderr=subprocess.PIPE,
                         env=env,
@@ -78,10 +78,10 @@ def _get_gym_subscription(gym):
 
 def _check_email_limits(gym, subscription) -> Tuple[bool, str]:
     """
-    Check if the gym can send more transactional emails.
+    Check if the gym can send more transactional emails (read-only).
     Returns (can_send, error_message)
     """
-    from saas_billing.models import GymEmailUsage
+    from saas_billing.email_quota import get_usage
     
     plan = subscription.plan if subscription else None
     
@@ -91,25 +91,61 @@ def _check_email_limits(gym, subscription) -> Tuple[bool, str]:
     if not plan.module_transactional_email:
         return False, "El plan no incluye email transaccional"
     
+    daily_count, monthly_count = get_usage(gym)
+    
     # Check daily limit
-    if plan.transactional_email_limit_daily:
-        daily_count = GymEmailUsage.get_daily_count(gym)
-        if daily_count >= plan.transactional_email_limit_daily:
-            return False, f"Límite diario de emails alcanzado ({plan.transactional_email_limit_daily})"
+    if plan.transactional_email_limit_daily and daily_count >= plan.transactional_email_limit_daily:
+        return False, f"Límite diario de emails alcanzado ({plan.transactional_email_limit_daily})"
     
     # Check monthly limit
-    if plan.transactional_email_limit_monthly:
-        monthly_count = GymEmailUsage.get_monthly_count(gym)
-        if monthly_count >= plan.transactional_email_limit_monthly:
-            return False, f"Límite mensual de emails alcanzado ({plan.transactional_email_limit_monthly})"
+    if plan.transactional_email_limit_monthly and monthly_count >= plan.transactional_email_limit_monthly:
+        return False, f"Límite mensual de emails alcanzado ({plan.transactional_email_limit_monthly})"
     
     return True, ""
 
 
-def _increment_email_usage(gym):
-    """Increment the email usage counter for the gym"""
-    from saas_billing.models import GymEmailUsage
-    GymEmailUsage.increment_usage(gym)
+def _reserve_email_quota(gym, subscription, quota=None) -> None:
+    """
+    Consume one send of the gym's quota: a slot of `quota` (batch reserved
+    beforehand) or, if there is none left, an atomic single reservation.
+    Raises EmailLimitExceededError when the limits are reached.
+    """
+    from saas_billing.email_quota import reserve
+    
+    if quota is not None and quota.consume():
+        return
+    if not reserve(gym, subscription.plan):
+        _, error_msg = _check_email_limits(gym, subscription)
+        raise EmailLimitExceededError(error_msg or "Límite de emails alcanzado")
+
+
+def _release_email_quota(gym, quota=None) -> None:
+    """Give back the send reserved by _reserve_email_quota (the email was not sent)."""
+    from saas_billing.email_quota import release
+    
+    if quota is not None and quota.used:
+        quota.refund()
+    else:
+        release(gym)
+
+
+def reserve_email_batch(gym, count: int, force_mailrelay: bool = False):
+    """
+    Reserve `count` transactional sends at once for a campaign or workflow batch.
+    
+    Returns an EmailQuotaReservation to pass as `quota=` to send_email; the
+    unused part is released when the block is closed (use it as a context
+    manager). Gyms sending through their own SMTP do not consume quota, so
+    they get an empty reservation.
+    """
+    from saas_billing.email_quota import EmailQuotaReservation
+    
+    plan = None
+    if force_mailrelay or not _has_smtp_configured(gym):
+        subscription = _get_gym_subscription(gym)
+        if subscription and subscription.plan.module_transactional_email:
+            plan = subscription.plan
+    return EmailQuotaReservation(gym, plan, count)
 
 
 def _has_smtp_configured(gym) -> bool:
@@ -297,7 +333,8 @@ def send_email(
     body: str,
     html_body: Optional[str] = None,
     attachments: Optional[List[Tuple]] = None,
-    force_mailrelay: bool = False
+    force_mailrelay: bool = False,
+    quota=None
 ) -> bool:
     """
     Send an email using the appropriate method for the gym.
@@ -315,6 +352,7 @@ def send_email(
         html_body: Optional HTML body
         attachments: Optional list of (filename, content, mimetype) tuples
         force_mailrelay: Force using Mailrelay even if SMTP is configured
+        quota: Optional EmailQuotaReservation (see reserve_email_batch)
     
     Returns:
         bool: True if email was sent successfully
@@ -356,23 +394,24 @@ def send_email(
             "El plan del gimnasio no incluye el servicio de email transaccional"
         )
     
-    # Check limits
-    can_send, error_msg = _check_email_limits(gym, subscription)
-    if not can_send:
-        raise EmailLimitExceededError(error_msg)
+    # Check and consume quota in one step (atomic reservation)
+    _reserve_email_quota(gym, subscription, quota)
     
-    # Send via Mailrelay
-    result = _send_via_mailrelay(
-        gym=gym,
-        to_emails=to_emails,
-        subject=subject,
-        body=body,
-        html_body=html_body
-    )
+    # Send via Mailrelay, refunding the reservation if it fails
+    try:
+        result = _send_via_mailrelay(
+            gym=gym,
+            to_emails=to_emails,
+            subject=subject,
+            body=body,
+            html_body=html_body
+        )
+    except Exception:
+        _release_email_quota(gym, quota)
+        raise
     
-    # Increment usage counter on success
-    if result:
-        _increment_email_usage(gym)
+    if not result:
+        _release_email_quota(gym, quota)
     
     return result
 
@@ -466,12 +505,13 @@ def get_email_usage_stats(gym) -> dict:
         - daily_remaining: remaining emails today (None = unlimited)
         - monthly_remaining: remaining emails this month (None = unlimited)
     """
-    from saas_billing.models import GymEmailUsage
+    from saas_billing.email_quota import get_usage
     
+    daily_sent, monthly_sent = get_usage(gym)
     stats = {
         'method': 'smtp' if _has_smtp_configured(gym) else 'mailrelay',
-        'daily_sent': GymEmailUsage.get_daily_count(gym),
-        'monthly_sent': GymEmailUsage.get_monthly_count(gym),
+        'daily_sent': daily_sent,
+        'monthly_sent': monthly_sent,
         'daily_limit': None,
         'monthly_limit': None,
         'daily_remaining': None,
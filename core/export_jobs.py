@@ -0,0 +1,217 @@
+"""
+Exportaciones en segundo plano.
+
+Los listados de más de BACKGROUND_EXPORT_ROWS filas no se generan dentro de
+la petición: se crea un trabajo, Celery lo genera con core.export_service
+(por bloques, guardando el progreso) y deja el fichero en el almacenamiento
+por defecto. Al terminar se avisa por email al usuario con el enlace de
+descarga; mientras tanto el estado se consulta en /exports/<job_id>/.
+
+Como la tarea no puede recibir el queryset ni la configuración (lambdas),
+el trabajo guarda la ruta de una función que los construye a partir del
+gimnasio y de parámetros serializables:
+
+    def build_clients_export(gym, params):
+        return queryset, config
+
+    start_export(request, 'clients.export_service.build_clients_export', 'xlsx', filename)
+
+El estado del trabajo vive en la caché (EXPORT_JOB_TTL) y los ficheros se
+borran con la tarea core.cleanup_old_exports.
+
+La tarea se confirma al terminar (acks_late): si el worker muere a mitad, el
+broker la vuelve a entregar. Un trabajo RUNNING sin progreso desde hace
+EXPORT_STALE_SECONDS se considera abandonado y se genera de nuevo; uno que
+sigue avanzando no se duplica.
+"""
+import logging
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_EXPORT_ROWS = getattr(settings, 'BACKGROUND_EXPORT_ROWS', 5000)
+EXPORT_JOB_TTL = 60 * 60 * 24
+# Sin actualizar el progreso durante este tiempo, un trabajo RUNNING está muerto
+EXPORT_STALE_SECONDS = 10 * 60
+EXPORT_JOB_CACHE_KEY = 'export_job:{}'
+EXPORTS_DIR = 'exports'
+
+FORMATS = {
+    'xlsx': ('export_to_excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': ('export_to_pdf', 'application/pdf'),
+    'csv': ('export_to_csv', 'text/csv; charset=utf-8'),
+}
+
+
+class ExportJobStatus:
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+
+def get_job(job_id):
+    return cache.get(EXPORT_JOB_CACHE_KEY.format(job_id))
+
+
+def update_job(job_id, **changes):
+    job = get_job(job_id)
+    if job is None:
+        return None
+    job.update(changes, updated_at=timezone.now().isoformat())
+    cache.set(EXPORT_JOB_CACHE_KEY.format(job_id), job, EXPORT_JOB_TTL)
+    return job
+
+
+def is_stale(job):
+    """True si el trabajo lleva más de EXPORT_STALE_SECONDS sin actualizarse."""
+    updated_at = parse_datetime(job.get('updated_at') or job['created_at'])
+    return timezone.now() - updated_at > timedelta(seconds=EXPORT_STALE_SECONDS)
+
+
+def start_export(request, builder, export_format, filename, params=None, total=None):
+    """
+    Crea el trabajo y lo encola. `builder` es la ruta de la función
+    (gym, params) -> (queryset, ExportConfig). Devuelve el trabajo (con status
+    FAILED si la cola no está disponible).
+    """
+    from marketing.signals import safe_delay
+    from .tasks import run_export_job
+
+    import_string(builder)  # Falla aquí y no en el worker si la ruta es incorrecta
+    if export_format not in FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: {export_format}")
+
+    job_id = uuid.uuid4().hex
+    job = {
+        'id': job_id,
+        'builder': builder,
+        'format': export_format,
+        'filename': filename,
+        'params': params or {},
+        'gym_id': request.gym.id,
+        'user_id': request.user.id,
+        'status': ExportJobStatus.PENDING,
+        'processed': 0,
+        'total': total,
+        'file': None,
+        'error': '',
+        'created_at': timezone.now().isoformat(),
+        'updated_at': timezone.now().isoformat(),
+        'status_url': request.build_absolute_uri(reverse('export_job_status', args=[job_id])),
+        'download_url': request.build_absolute_uri(reverse('export_job_download', args=[job_id])),
+    }
+    cache.set(EXPORT_JOB_CACHE_KEY.format(job_id), job, EXPORT_JOB_TTL)
+    if safe_delay(run_export_job, job_id) is None:
+        job = update_job(job_id, status=ExportJobStatus.FAILED, error='Cola de tareas no disponible')
+    return job
+
+
+def run_export(job_id):
+    """Genera el fichero del trabajo (lo ejecuta la tarea core.run_export_job)."""
+    from organizations.models import Gym
+
+    from .export_service import GenericExportService
+
+    job = get_job(job_id)
+    if job is None:
+        return job
+    if job['status'] == ExportJobStatus.RUNNING and is_stale(job):
+        logger.warning(f"Reanudando la exportación {job_id}: sin progreso desde {job['updated_at']}")
+    elif job['status'] != ExportJobStatus.PENDING:
+        return job
+    update_job(job_id, status=ExportJobStatus.RUNNING, processed=0)
+
+    try:
+        gym = Gym.objects.get(pk=job['gym_id'])
+        queryset, config = import_string(job['builder'])(gym, job['params'])
+        if job['total'] is None and hasattr(queryset, 'count'):
+            update_job(job_id, total=queryset.count())
+        method, _ = FORMATS[job['format']]
+
+        with tempfile.NamedTemporaryFile(suffix=f".{job['format']}") as output:
+            getattr(GenericExportService, method)(
+                queryset, config, gym.name,
+                output=output,
+                progress=lambda processed: update_job(job_id, processed=processed),
+            )
+            path = default_storage.save(
+                f"{EXPORTS_DIR}/{job['gym_id']}/{job_id}/{job['filename']}", File(output),
+            )
+    except Exception as e:
+        logger.exception(f"Error generando la exportación {job_id} ({job['builder']})")
+        return update_job(job_id, status=ExportJobStatus.FAILED, error=str(e))
+
+    job = update_job(job_id, status=ExportJobStatus.DONE, file=path)
+    notify_export_ready(job)
+    return job
+
+
+def notify_export_ready(job):
+    """Email al usuario que pidió la exportación con el enlace de descarga."""
+    from django.contrib.auth import get_user_model
+
+    from organizations.models import Gym
+
+    from .email_service import send_email
+
+    user = get_user_model().objects.filter(pk=job['user_id']).first()
+    if not user or not user.email:
+        return
+    try:
+        send_email(
+            Gym.objects.get(pk=job['gym_id']),
+            user.email,
+            f"Tu exportación está lista: {job['filename']}",
+            f"Puedes descargar el fichero durante las próximas 24 horas:\n{job['download_url']}",
+        )
+    except Exception as e:
+        logger.warning(f"No se pudo avisar de la exportación {job['id']}: {e}")
+
+
+def job_progress(job):
+    """Estado del trabajo para la API (sin datos internos)."""
+    total = job.get('total')
+    processed = job.get('processed', 0)
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'processed': processed,
+        'total': total,
+        'percent': min(100, round(processed * 100 / total)) if total else None,
+        'download_url': job['download_url'] if job['status'] == ExportJobStatus.DONE else None,
+        'error': job.get('error', ''),
+    }
+
+
+def cleanup_old_exports():
+    """Borra los ficheros de exportaciones con más de EXPORT_JOB_TTL. Devuelve cuántos."""
+    deleted = 0
+    limit = timezone.now() - timedelta(seconds=EXPORT_JOB_TTL)
+    try:
+        gym_dirs, _ = default_storage.listdir(EXPORTS_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return 0
+    for gym_dir in gym_dirs:
+        job_dirs, _ = default_storage.listdir(os.path.join(EXPORTS_DIR, gym_dir))
+        for job_dir in job_dirs:
+            job_path = os.path.join(EXPORTS_DIR, gym_dir, job_dir)
+            for filename in default_storage.listdir(job_path)[1]:
+                path = os.path.join(job_path, filename)
+                if default_storage.get_modified_time(path) < limit:
+                    default_storage.delete(path)
+                    deleted += 1
+    return deleted
@@ -1,25 +1,37 @@
 """
-Servicio genérico de exportación a Excel y PDF
+Servicio genérico de exportación a Excel, PDF y CSV
 Reutilizable por todos los módulos del sistema
+
+Las exportaciones no cargan el listado entero en memoria:
+- Los querysets se recorren con .iterator(chunk_size=EXPORT_CHUNK_SIZE) y,
+  si la configuración indica `values_fields`, con .values() (sin instanciar
+  modelos).
+- Excel se escribe en modo write-only de openpyxl (fila a fila).
+- CSV se genera como StreamingHttpResponse.
+- PDF se maqueta en tablas de PDF_TABLE_BLOCK_ROWS filas.
+
+Los listados grandes se generan en segundo plano (ver core.export_jobs).
 """
+import csv
 import io
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+EXPORT_CHUNK_SIZE = 2000
+PDF_TABLE_BLOCK_ROWS = 500
 
 
 class ExportConfig:
-    """Configuración para exportación"""
+    """
+    Configuración para exportación.
+
+    Con `values_fields` los registros se leen con .values(*values_fields) y
+    `data_extractor` recibe diccionarios en lugar de instancias.
+    """
     def __init__(
         self,
         title: str,
@@ -30,6 +42,7 @@ class ExportConfig:
         landscape_mode: bool = False,
         subtitle: Optional[str] = None,
         footer_text: Optional[str] = None,
+        values_fields: Optional[List[str]] = None,
     ):
         self.title = title
         self.headers = headers
@@ -39,11 +52,18 @@ class ExportConfig:
         self.landscape_mode = landscape_mode
         self.subtitle = subtitle
         self.footer_text = footer_text
+        self.values_fields = values_fields
+
+
+class _Echo:
+    """Pseudo-fichero para csv.writer: devuelve la línea en lugar de escribirla."""
+    def write(self, value):
+        return value
 
 
 class GenericExportService:
     """
-    Servicio genérico para exportar cualquier queryset a Excel o PDF
+    Servicio genérico para exportar cualquier queryset a Excel, PDF o CSV
     """
     
     @staticmethod
@@ -60,14 +80,62 @@ class GenericExportService:
         if hasattr(value, 'strftime'):  # date
             return value.strftime('%d/%m/%Y')
         return str(value)
+
+    @classmethod
+    def excel_value(cls, value: Any) -> Any:
+        """Como format_value, pero los números quedan como números y los vacíos en blanco"""
+        if value is None:
+            return ""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        return cls.format_value(value)
+
+    @staticmethod
+    def iter_records(queryset, config: ExportConfig, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Any]:
+        """Recorre el queryset por bloques (las listas se recorren tal cual)."""
+        if not isinstance(queryset, QuerySet):
+            yield from queryset
+            return
+        if config.values_fields:
+            queryset = queryset.values(*config.values_fields)
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+    @classmethod
+    def iter_rows(
+        cls,
+        queryset,
+        config: ExportConfig,
+        progress: Optional[Callable[[int], None]] = None,
+        formatter: Optional[Callable[[Any], Any]] = None,
+    ) -> Iterator[List[Any]]:
+        """
+        Filas ya formateadas (con format_value salvo otro `formatter`).
+        `progress(n)` se llama cada EXPORT_CHUNK_SIZE filas con el número de
+        filas procesadas.
+        """
+        formatter = formatter or cls.format_value
+        count = 0
+        for item in cls.iter_records(queryset, config):
+            yield [formatter(v) for v in config.data_extractor(item)]
+            count += 1
+            if progress and count % EXPORT_CHUNK_SIZE == 0:
+                progress(count)
+        if progress:
+            progress(count)
+
+    @staticmethod
+    def _title_text(config: ExportConfig, gym_name: str) -> str:
+        return f"{config.title} - {gym_name}" if gym_name else config.title
     
     @classmethod
     def export_to_excel(
         cls,
         queryset,
         config: ExportConfig,
-        gym_name: str = ""
-    ) -> io.BytesIO:
+        gym_name: str = "",
+        output=None,
+        progress: Optional[Callable[[int], None]] = None,
+    ):
         """
         Exporta un queryset a Excel
         
@@ -75,13 +143,19 @@ class GenericExportService:
             queryset: QuerySet o lista de objetos a exportar
             config: Configuración de exportación
             gym_name: Nombre del gimnasio (opcional)
+            output: Fichero binario de destino (por defecto, un BytesIO)
+            progress: Callback con el número de filas procesadas
         
         Returns:
-            BytesIO con el archivo Excel
+            El fichero de salida, posicionado al inicio
         """
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = config.title[:31]  # Excel limita a 31 caracteres
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        from openpyxl.utils import get_column_letter
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(config.title[:31])  # Excel limita a 31 caracteres
         
         # Estilos
         brand_color = config.brand_color.replace("#", "")
@@ -97,81 +171,73 @@ class GenericExportService:
         )
         center_align = Alignment(horizontal='center', vertical='center')
         left_align = Alignment(horizontal='left', vertical='center')
+        right_align = Alignment(horizontal='right', vertical='center')
         
-        current_row = 1
         num_cols = len(config.headers)
-        
-        # Título
-        sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=num_cols)
-        title_cell = sheet.cell(row=current_row, column=1)
-        title_text = f"{config.title} - {gym_name}" if gym_name else config.title
-        title_cell.value = title_text
-        title_cell.font = title_font
-        title_cell.alignment = center_align
-        current_row += 1
-        
-        # Subtítulo si existe
-        if config.subtitle:
-            sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=num_cols)
-            subtitle_cell = sheet.cell(row=current_row, column=1)
-            subtitle_cell.value = config.subtitle
-            subtitle_cell.font = subtitle_font
-            subtitle_cell.alignment = center_align
+        last_col = get_column_letter(num_cols)
+        current_row = 0
+
+        # En modo write-only los anchos se fijan antes de escribir filas
+        for i, width in enumerate(config.column_widths, 1):
+            sheet.column_dimensions[get_column_letter(i)].width = width
+
+        def banner_row(value, font, alignment):
+            nonlocal current_row
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.font = font
+            cell.alignment = alignment
+            sheet.append([cell])
             current_row += 1
+            sheet.merged_cells.add(f"A{current_row}:{last_col}{current_row}")
         
-        # Fecha de exportación
-        sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=num_cols)
-        date_cell = sheet.cell(row=current_row, column=1)
-        date_cell.value = f"Exportado: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-        date_cell.font = Font(size=9, italic=True, color="888888")
-        date_cell.alignment = center_align
-        current_row += 2  # Espacio extra
+        # Título, subtítulo y fecha de exportación
+        banner_row(cls._title_text(config, gym_name), title_font, center_align)
+        if config.subtitle:
+            banner_row(config.subtitle, subtitle_font, center_align)
+        banner_row(
+            f"Exportado: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+            Font(size=9, italic=True, color="888888"),
+            center_align,
+        )
+        sheet.append([])  # Espacio extra
+        current_row += 1
         
         # Encabezados
-        for col_num, header in enumerate(config.headers, 1):
-            cell = sheet.cell(row=current_row, column=col_num)
-            cell.value = header
+        header_cells = []
+        for header in config.headers:
+            cell = WriteOnlyCell(sheet, value=header)
             cell.font = header_font
             cell.fill = header_fill
             cell.alignment = center_align
             cell.border = border
+            header_cells.append(cell)
+        sheet.append(header_cells)
         current_row += 1
         
         # Datos
         row_count = 0
-        for item in queryset:
-            row_data = config.data_extractor(item)
-            for col_num, value in enumerate(row_data, 1):
-                cell = sheet.cell(row=current_row, column=col_num)
-                cell.value = cls.format_value(value)
+        for row_data in cls.iter_rows(queryset, config, progress, formatter=cls.excel_value):
+            row_cells = []
+            for value in row_data:
+                cell = WriteOnlyCell(sheet, value=value)
                 cell.border = border
                 cell.alignment = left_align
+                row_cells.append(cell)
+            sheet.append(row_cells)
             current_row += 1
             row_count += 1
         
         # Footer con totales si hay
         if config.footer_text:
+            sheet.append([])
             current_row += 1
-            sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=num_cols)
-            footer_cell = sheet.cell(row=current_row, column=1)
-            footer_cell.value = config.footer_text
-            footer_cell.font = Font(bold=True, size=10)
-            footer_cell.alignment = Alignment(horizontal='right', vertical='center')
+            banner_row(config.footer_text, Font(bold=True, size=10), right_align)
         
         # Total de registros
-        current_row += 1
-        sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=num_cols)
-        total_cell = sheet.cell(row=current_row, column=1)
-        total_cell.value = f"Total de registros: {row_count}"
-        total_cell.font = Font(size=9, italic=True, color="666666")
-        total_cell.alignment = Alignment(horizontal='right', vertical='center')
-        
-        # Ajustar ancho de columnas
-        for i, width in enumerate(config.column_widths, 1):
-            sheet.column_dimensions[get_column_letter(i)].width = width
+        banner_row(f"Total de registros: {row_count}", Font(size=9, italic=True, color="666666"), right_align)
         
         # Guardar
-        output = io.BytesIO()
+        output = output if output is not None else io.BytesIO()
         workbook.save(output)
         output.seek(0)
         
@@ -182,8 +248,10 @@ class GenericExportService:
         cls,
         queryset,
         config: ExportConfig,
-        gym_name: str = ""
-    ) -> io.BytesIO:
+        gym_name: str = "",
+        output=None,
+        progress: Optional[Callable[[int], None]] = None,
+    ):
         """
         Exporta un queryset a PDF
         
@@ -191,11 +259,20 @@ class GenericExportService:
             queryset: QuerySet o lista de objetos a exportar
             config: Configuración de exportación
             gym_name: Nombre del gimnasio (opcional)
+            output: Fichero binario de destino (por defecto, un BytesIO)
+            progress: Callback con el número de filas procesadas
         
         Returns:
-            BytesIO con el archivo PDF
+            El fichero de salida, posicionado al inicio
         """
-        output = io.BytesIO()
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+
+        output = output if output is not None else io.BytesIO()
         
         # Configurar página
         page_size = landscape(A4) if config.landscape_mode else A4
@@ -223,8 +300,7 @@ class GenericExportService:
             alignment=TA_CENTER,
             fontName='Helvetica-Bold'
         )
-        title_text = f"{config.title} - {gym_name}" if gym_name else config.title
-        elements.append(Paragraph(title_text, title_style))
+        elements.append(Paragraph(cls._title_text(config, gym_name), title_style))
         
         # Subtítulo si existe
         if config.subtitle:
@@ -256,23 +332,11 @@ class GenericExportService:
         
         elements.append(Spacer(1, 0.2*inch))
         
-        # Preparar datos de la tabla
-        data = [config.headers]
-        row_count = 0
-        
-        for item in queryset:
-            row_data = config.data_extractor(item)
-            data.append([cls.format_value(v) for v in row_data])
-            row_count += 1
-        
         # Calcular anchos de columna proporcionales
         page_width = page_size[0] - inch  # Margen
         total_width = sum(config.column_widths)
         col_widths = [(w / total_width) * page_width * 0.95 for w in config.column_widths]
         
-        # Crear tabla
-        table = Table(data, colWidths=col_widths, repeatRows=1)
-        
         # Estilos de tabla
         table_style = TableStyle([
             # Encabezado
@@ -294,9 +358,23 @@ class GenericExportService:
             ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ])
+
+        def add_table(rows):
+            table = Table([config.headers, *rows], colWidths=col_widths, repeatRows=1)
+            table.setStyle(table_style)
+            elements.append(table)
         
-        table.setStyle(table_style)
-        elements.append(table)
+        # Tablas por bloques: partir una sola tabla enorme entre páginas es muy lento
+        block = []
+        row_count = 0
+        for row_data in cls.iter_rows(queryset, config, progress):
+            block.append(row_data)
+            row_count += 1
+            if len(block) >= PDF_TABLE_BLOCK_ROWS:
+                add_table(block)
+                block = []
+        if block or not row_count:
+            add_table(block)
         
         # Espacio y total
         elements.append(Spacer(1, 0.3*inch))
@@ -330,6 +408,52 @@ class GenericExportService:
         
         return output
 
+    @classmethod
+    def iter_csv(
+        cls,
+        queryset,
+        config: ExportConfig,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> Iterator[str]:
+        """Líneas CSV (con BOM para que Excel detecte UTF-8)."""
+        yield from csv_lines(config.headers, cls.iter_rows(queryset, config, progress))
+
+    @classmethod
+    def export_to_csv(
+        cls,
+        queryset,
+        config: ExportConfig,
+        gym_name: str = "",
+        output=None,
+        progress: Optional[Callable[[int], None]] = None,
+    ):
+        """Exporta un queryset a CSV en un fichero binario (por defecto, un BytesIO)."""
+        output = output if output is not None else io.BytesIO()
+        for line in cls.iter_csv(queryset, config, progress):
+            output.write(line.encode('utf-8'))
+        output.seek(0)
+        return output
+
+    @classmethod
+    def csv_response(cls, queryset, config: ExportConfig, filename: str) -> StreamingHttpResponse:
+        """Descarga CSV generada mientras se envía."""
+        return csv_streaming_response(filename, cls.iter_csv(queryset, config))
+
+
+def csv_lines(header: List[str], rows: Iterable[List[Any]]) -> Iterator[str]:
+    """Cabecera y filas como líneas CSV, empezando por el BOM UTF-8."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def csv_streaming_response(filename: str, lines: Iterable[str]) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(lines, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 
 # ============================================================
 # Configuraciones predefinidas para módulos comunes
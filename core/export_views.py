@@ -0,0 +1,39 @@
+"""
+Estado y descarga de las exportaciones en segundo plano (core.export_jobs).
+
+- /exports/<job_id>/          -> JSON con el estado y el progreso
+- /exports/<job_id>/download/ -> fichero generado
+
+Solo el usuario que pidió la exportación puede consultarla.
+"""
+from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse
+
+from core.export_jobs import FORMATS, ExportJobStatus, get_job, job_progress
+
+
+def _get_user_job(request, job_id):
+    job = get_job(job_id)
+    if job is None or job['user_id'] != request.user.id:
+        raise Http404("Exportación no encontrada")
+    return job
+
+
+@login_required
+def export_job_status(request, job_id):
+    return JsonResponse(job_progress(_get_user_job(request, job_id)))
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = _get_user_job(request, job_id)
+    if job['status'] != ExportJobStatus.DONE or not default_storage.exists(job['file']):
+        raise Http404("La exportación no está disponible")
+    _, content_type = FORMATS[job['format']]
+    return FileResponse(
+        default_storage.open(job['file'], 'rb'),
+        as_attachment=True,
+        filename=job['filename'],
+        content_type=content_type,
+    )
@@ -5,9 +5,13 @@ Endpoints:
 - /health/live/   - Liveness probe (siempre 200 si Django corre)
 - /health/ready/  - Readiness probe (200 si puede recibir trafico)
 - /health/        - Estado detallado de todos los componentes
+- /metrics        - Telemetria por vista en formato Prometheus
 """
 
-from django.http import JsonResponse
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -117,3 +121,33 @@ class PingView(View):
     
     def get(self, request):
         return JsonResponse({"pong": True}, status=200)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MetricsView(View):
+    """
+    Telemetria por vista (core.telemetry) en formato de texto de Prometheus.
+    
+    Uso: scrape de Prometheus con `Authorization: Bearer <METRICS_TOKEN>`.
+    Sin METRICS_TOKEN configurado el endpoint no existe.
+    
+    Respuestas:
+    - 200: Metricas del proceso que atiende la request
+    - 401: Token ausente o incorrecto
+    - 404: METRICS_TOKEN no configurado
+    """
+    
+    def get(self, request):
+        from core.telemetry import registry
+        
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token:
+            return HttpResponse(status=404)
+        auth = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(auth.encode(), f'Bearer {token}'.encode()):
+            return HttpResponse(status=401)
+        
+        return HttpResponse(
+            registry.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
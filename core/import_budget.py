@@ -0,0 +1,112 @@
+"""
+Medición del coste de arranque de un worker (django.setup() + URLconf).
+
+Cada worker de gunicorn (cpu*2+1, reciclados cada max_requests) paga este
+coste, así que las librerías pesadas (pandas, numpy, sklearn, openpyxl,
+reportlab, weasyprint...) se importan dentro de las funciones que las usan.
+Este módulo arranca Django en un proceso limpio y devuelve el tiempo, las
+librerías pesadas cargadas y, opcionalmente, el detalle de `-X importtime`.
+
+Usage:
+    from core.import_budget import measure_boot
+
+    result = measure_boot(importtime=True)
+    result['seconds'], result['heavy_modules'], result['imports'][:10]
+
+CLI: python manage.py importtime_report
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Librerías que no deben cargarse al arrancar un worker
+HEAVY_MODULES = (
+    'pandas',
+    'numpy',
+    'scipy',
+    'sklearn',
+    'matplotlib',
+    'openpyxl',
+    'reportlab',
+    'weasyprint',
+    'face_recognition',
+    'cv2',
+)
+
+# Presupuesto por defecto (segundos) para django.setup() + carga de URLs
+DEFAULT_BUDGET_SECONDS = float(os.getenv('IMPORT_TIME_BUDGET', '5.0'))
+
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+sys.stdout.write('\\n__BOOT__' + json.dumps({{'seconds': elapsed, 'heavy_modules': heavy}}) + '\\n')
+"""
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_importtime(output):
+    """
+    Parsea la salida de `python -X importtime`.
+    Devuelve [{'module', 'self_us', 'cumulative_us', 'depth'}] en orden de carga.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        name = name.rstrip()[1:]  # Un espacio separa la columna del nombre indentado
+        imports.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+        })
+    return imports
+
+
+def measure_boot(importtime=False, settings_module=None, timeout=120):
+    """
+    Arranca Django + URLconf en un subproceso y mide el coste.
+
+    Returns:
+        dict: {'seconds', 'heavy_modules', 'imports'} ('imports' vacío si
+        importtime=False).
+
+    Raises:
+        RuntimeError: si el subproceso falla.
+    """
+    env = os.environ.copy()
+    env['DJANGO_SETTINGS_MODULE'] = settings_module or env.get('DJANGO_SETTINGS_MODULE', 'config.settings')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(BASE_DIR), env.get('PYTHONPATH')]))
+
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', BOOT_SCRIPT.format(heavy=HEAVY_MODULES)]
+
+    completed = subprocess.run(
+        command, cwd=BASE_DIR, env=env, capture_output=True, text=True, timeout=timeout
+    )
+    marker = next(
+        (line for line in completed.stdout.splitlines() if line.startswith('__BOOT__')), None
+    )
+    if completed.returncode != 0 or marker is None:
+        raise RuntimeError(
+            f"El arranque de Django falló (código {completed.returncode}):\n{completed.stderr[-2000:]}"
+        )
+
+    result = json.loads(marker[len('__BOOT__'):])
+    result['imports'] = parse_importtime(completed.stderr) if importtime else []
+    return result
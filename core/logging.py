@@ -17,8 +17,10 @@ Uso:
 import json
 import logging
 import sys
+import time
 import traceback
 import uuid
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, Optional
 
@@ -115,36 +117,35 @@ class ColoredFormatter(logging.Formatter):
 # CONTEXT FILTER
 # ==============================================
 
+# Contexto de la request en curso. Un ContextVar (y no threading.local) para
+# que cada request vea el suyo también en ASGI y en threads reutilizados.
+# Sin default mutable: un {} compartido lo verían todos los contextos.
+_request_context: ContextVar[Optional[dict]] = ContextVar('request_context', default=None)
+
+
+def get_request_context() -> dict:
+    """Contexto (request_id, user_id, gym_id) de la request en curso."""
+    context = _request_context.get()
+    return {} if context is None else context
+
+
 class RequestContextFilter(logging.Filter):
     """
     Filter que agrega contexto de request a los logs.
     """
     
     def filter(self, record: logging.LogRecord) -> bool:
-        # Intentar obtener request actual
-        try:
-            from django.contrib.auth.models import AnonymousUser
-            from threading import local
-            
-            _thread_local = getattr(self, '_thread_local', None)
-            if _thread_local is None:
-                self._thread_local = local()
-                _thread_local = self._thread_local
-            
-            # Agregar request_id si no existe
-            if not hasattr(record, 'request_id'):
-                record.request_id = getattr(_thread_local, 'request_id', '-')
-            
-            if not hasattr(record, 'user_id'):
-                record.user_id = getattr(_thread_local, 'user_id', None)
-            
-            if not hasattr(record, 'gym_id'):
-                record.gym_id = getattr(_thread_local, 'gym_id', None)
-                
-        except Exception:
-            record.request_id = '-'
-            record.user_id = None
-            record.gym_id = None
+        context = get_request_context()
+        
+        # Agregar request_id si no existe
+        if not hasattr(record, 'request_id'):
+            record.request_id = context.get('request_id', '-')
+        
+        if not hasattr(record, 'user_id'):
+            record.user_id = context.get('user_id')
+        
+        if not hasattr(record, 'gym_id'):
+            record.gym_id = context.get('gym_id')
         
         return True
 
@@ -162,6 +163,9 @@ class RequestLoggingMiddleware:
     - Duration
     - Status code
     - User y Gym context
+    
+    Ademas registra la telemetria de rendimiento de la vista (core.telemetry),
+    salvo con TELEMETRY_ENABLED = False.
     """
     
     def __init__(self, get_response):
@@ -173,47 +177,56 @@ class RequestLoggingMiddleware:
         request_id = request.META.get('HTTP_X_REQUEST_ID') or str(uuid.uuid4())[:8]
         request.request_id = request_id
         
-        # Guardar en thread local para el filter
-        from threading import local
-        _thread_local = local()
-        _thread_local.request_id = request_id
-        
+        # Contexto para el filter (se restaura al terminar la request)
+        context = {'request_id': request_id}
         if hasattr(request, 'user') and request.user.is_authenticated:
-            _thread_local.user_id = request.user.id
+            context['user_id'] = request.user.id
         
-        gym_id = getattr(request, 'gym_id', None) or request.session.get('gym_id')
+        session = getattr(request, 'session', None) or {}
+        gym_id = (
+            getattr(request, 'gym_id', None)
+            or session.get('current_gym_id')
+            or session.get('gym_id')
+        )
         if gym_id:
-            _thread_local.gym_id = gym_id
-        
-        # Log request start
-        import time
-        start_time = time.time()
-        
-        # Procesar request
-        response = self.get_response(request)
+            context['gym_id'] = gym_id
+        token = _request_context.set(context)
         
-        # Calcular duracion
-        duration_ms = (time.time() - start_time) * 1000
-        
-        # Log request end
-        log_data = {
-            'request_id': request_id,
-            'method': request.method,
-            'path': request.path,
-            'status_code': response.status_code,
-            'duration_ms': round(duration_ms, 2),
-            'user_id': getattr(request.user, 'id', None) if hasattr(request, 'user') else None,
-            'gym_id': gym_id,
-            'ip': self._get_client_ip(request),
-        }
-        
-        # Determinar nivel de log basado en status
-        if response.status_code >= 500:
-            self.logger.error("Request completed", extra=log_data)
-        elif response.status_code >= 400:
-            self.logger.warning("Request completed", extra=log_data)
-        else:
-            self.logger.info("Request completed", extra=log_data)
+        try:
+            # Procesar request (con telemetria de rendimiento)
+            if getattr(settings, 'TELEMETRY_ENABLED', True):
+                from core.telemetry import RequestTelemetry
+                
+                with RequestTelemetry(request) as telemetry:
+                    response = self.get_response(request)
+                telemetry.finish(response)
+                duration_ms = telemetry.duration * 1000
+            else:
+                start_time = time.perf_counter()
+                response = self.get_response(request)
+                duration_ms = (time.perf_counter() - start_time) * 1000
+            
+            # Log request end
+            log_data = {
+                'request_id': request_id,
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'user_id': getattr(request.user, 'id', None) if hasattr(request, 'user') else None,
+                'gym_id': gym_id,
+                'ip': self._get_client_ip(request),
+            }
+            
+            # Determinar nivel de log basado en status
+            if response.status_code >= 500:
+                self.logger.error("Request completed", extra=log_data)
+            elif response.status_code >= 400:
+                self.logger.warning("Request completed", extra=log_data)
+            else:
+                self.logger.info("Request completed", extra=log_data)
+        finally:
+            _request_context.reset(token)
         
         # Agregar header de request_id a la respuesta
         response['X-Request-ID'] = request_id
@@ -5,6 +5,9 @@ Uso:
     # Crear backup de base de datos
     python manage.py backup --database
     
+    # Backup de DB en formato directorio con 4 workers (pg_dump -j 4)
+    python manage.py backup --database --jobs 4
+    
     # Crear backup de media
     python manage.py backup --media
     
@@ -19,6 +22,9 @@ Uso:
     
     # Restaurar backup
     python manage.py backup --restore /path/to/backup.sql.gz
+    
+    # Restaurar media desde un manifest
+    python manage.py backup --restore-media /path/to/media_backup_X.json.gz
 """
 
 from django.core.management.base import BaseCommand, CommandError
@@ -62,6 +68,12 @@ class Command(BaseCommand):
             metavar='PATH',
             help='Restaurar desde un backup'
         )
+        group.add_argument(
+            '--restore-media',
+            type=str,
+            metavar='PATH',
+            help='Restaurar archivos media desde un manifest'
+        )
         
         # Opciones adicionales
         parser.add_argument(
@@ -69,6 +81,12 @@ class Command(BaseCommand):
             action='store_true',
             help='No comprimir el backup de DB'
         )
+        parser.add_argument(
+            '--jobs', '-j',
+            type=int,
+            default=None,
+            help='Workers de pg_dump/pg_restore (>1 usa formato directorio)'
+        )
         parser.add_argument(
             '--upload-s3',
             action='store_true',
@@ -99,16 +117,19 @@ class Command(BaseCommand):
             self._cleanup_backups(service)
         
         elif options['restore']:
-            self._restore_backup(service, options['restore'], options['force'])
+            self._restore_backup(service, options['restore'], options['force'], options['jobs'])
+        
+        elif options['restore_media']:
+            self._restore_media(service, options['restore_media'], options['force'])
     
     def _backup_database(self, service, options):
         """Crear backup de base de datos."""
         self.stdout.write("Creando backup de base de datos...")
         
         compress = not options['no_compress']
-        backup_path = service.backup_database(compress=compress)
+        backup_path = service.backup_database(compress=compress, jobs=options['jobs'])
         
-        size_mb = backup_path.stat().st_size / (1024 * 1024)
+        size_mb = service.backup_size(backup_path) / (1024 * 1024)
         self.stdout.write(self.style.SUCCESS(
             f"✓ Backup creado: {backup_path} ({size_mb:.2f} MB)"
         ))
@@ -128,9 +149,11 @@ class Command(BaseCommand):
             ))
             return
         
-        size_mb = backup_path.stat().st_size / (1024 * 1024)
+        stats = service.last_media_stats
         self.stdout.write(self.style.SUCCESS(
-            f"✓ Backup creado: {backup_path} ({size_mb:.2f} MB)"
+            f"✓ Backup creado: {backup_path} "
+            f"({stats['files']} archivos, {stats['new_objects']} nuevos, "
+            f"{stats['new_bytes'] / (1024 * 1024):.2f} MB copiados)"
         ))
         
         if options['upload_s3']:
@@ -144,12 +167,14 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS("✓ Backup completo creado:"))
         
-        db_size = db_path.stat().st_size / (1024 * 1024)
+        db_size = service.backup_size(db_path) / (1024 * 1024)
         self.stdout.write(f"  - DB: {db_path} ({db_size:.2f} MB)")
         
         if media_path:
-            media_size = media_path.stat().st_size / (1024 * 1024)
-            self.stdout.write(f"  - Media: {media_path} ({media_size:.2f} MB)")
+            stats = service.last_media_stats
+            self.stdout.write(
+                f"  - Media: {media_path} ({stats['files']} archivos, {stats['new_objects']} nuevos)"
+            )
         
         if options['upload_s3']:
             self._upload_to_s3(service, db_path)
@@ -195,7 +220,7 @@ class Command(BaseCommand):
         else:
             self.stdout.write("No hay backups para eliminar")
     
-    def _restore_backup(self, service, backup_path, force):
+    def _restore_backup(self, service, backup_path, force, jobs=None):
         """Restaurar desde un backup."""
         if not force:
             self.stdout.write(self.style.WARNING(
@@ -209,7 +234,7 @@ class Command(BaseCommand):
         self.stdout.write(f"Restaurando desde: {backup_path}")
         
         try:
-            service.restore_database(backup_path)
+            service.restore_database(backup_path, jobs=jobs)
             self.stdout.write(self.style.SUCCESS(
                 "✓ Base de datos restaurada correctamente"
             ))
@@ -218,6 +243,29 @@ class Command(BaseCommand):
         except Exception as e:
             raise CommandError(f"Error restaurando: {e}")
     
+    def _restore_media(self, service, manifest_path, force):
+        """Restaurar archivos media desde un manifest."""
+        if not force:
+            self.stdout.write(self.style.WARNING(
+                "\n⚠️  ADVERTENCIA: Esta accion sobreescribira los archivos media actuales!\n"
+            ))
+            confirm = input("Escribe 'CONFIRMAR' para continuar: ")
+            if confirm != 'CONFIRMAR':
+                self.stdout.write(self.style.ERROR("Operacion cancelada"))
+                return
+        
+        self.stdout.write(f"Restaurando media desde: {manifest_path}")
+        
+        try:
+            restored = service.restore_media(manifest_path)
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {restored} archivos media restaurados"
+            ))
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        except Exception as e:
+            raise CommandError(f"Error restaurando media: {e}")
+    
     def _upload_to_s3(self, service, file_path):
         """Subir archivo a S3."""
         self.stdout.write(f"Subiendo a S3: {file_path.name}...")
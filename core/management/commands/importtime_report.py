@@ -0,0 +1,70 @@
+"""
+Management command para medir el coste de arranque de un worker.
+
+Arranca Django + URLconf en un proceso limpio con `python -X importtime` y
+muestra los módulos más caros y las librerías pesadas cargadas al arrancar.
+
+Uso:
+    python manage.py importtime_report
+    python manage.py importtime_report --top 40 --budget 3
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.import_budget import DEFAULT_BUDGET_SECONDS, measure_boot
+
+
+class Command(BaseCommand):
+    help = 'Informe de tiempos de import al arrancar Django (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=25,
+            help='Número de módulos a mostrar (por tiempo acumulado)',
+        )
+        parser.add_argument(
+            '--self',
+            action='store_true',
+            dest='by_self',
+            help='Ordenar por tiempo propio en lugar de acumulado',
+        )
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=DEFAULT_BUDGET_SECONDS,
+            help=f'Presupuesto en segundos (por defecto {DEFAULT_BUDGET_SECONDS})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = measure_boot(importtime=True)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        key = 'self_us' if options['by_self'] else 'cumulative_us'
+        imports = sorted(result['imports'], key=lambda i: i[key], reverse=True)[:options['top']]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Módulos más caros ({'propio' if options['by_self'] else 'acumulado'})"
+        ))
+        self.stdout.write(f"  {'acumulado':>11}  {'propio':>9}  módulo")
+        for entry in imports:
+            self.stdout.write(
+                f"  {entry['cumulative_us'] / 1000:>9.1f}ms  {entry['self_us'] / 1000:>7.1f}ms  {entry['module']}"
+            )
+
+        self.stdout.write('')
+        if result['heavy_modules']:
+            self.stdout.write(self.style.WARNING(
+                f"Librerías pesadas cargadas al arrancar: {', '.join(result['heavy_modules'])}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Ninguna librería pesada cargada al arrancar'))
+
+        # El tiempo con -X importtime está inflado; medir de nuevo sin él
+        seconds = measure_boot()['seconds']
+        message = f"Arranque (django.setup + URLs): {seconds:.2f}s / presupuesto {options['budget']:.2f}s"
+        if seconds > options['budget']:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
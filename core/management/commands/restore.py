@@ -115,7 +115,7 @@ class Command(BaseCommand):
             raise CommandError(f"Backup no encontrado: {backup_path}")
         
         # Mostrar informacion del backup
-        size_mb = backup_path.stat().st_size / (1024 * 1024)
+        size_mb = service.backup_size(backup_path) / (1024 * 1024)
         self.stdout.write(f"\n{'='*60}")
         self.stdout.write(f"Backup a restaurar:")
         self.stdout.write(f"  Archivo: {backup_path.name}")
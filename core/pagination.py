@@ -0,0 +1,164 @@
+"""
+Paginación por keyset (cursor) para listados grandes.
+
+En lugar de OFFSET (que recorre todas las filas anteriores) cada página
+filtra a partir de los valores de ordenación de la última fila mostrada:
+    (a, b, id) > (a0, b0, id0)
+La última clave de ordenación debe ser única (normalmente 'id') y ninguna
+puede ser NULL (usar Coalesce en una anotación).
+
+Usage:
+    from core.pagination import keyset_page
+
+    page = keyset_page(
+        queryset.annotate(...),
+        keys=[('created_at', True), ('id', True)],   # (campo, descendente)
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=50,
+    )
+    page.object_list, page.next_cursor, page.previous_cursor
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return parse_datetime(value['dt'])
+        if 'd' in value:
+            return parse_date(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+    return value
+
+
+def encode_cursor(values, offset):
+    payload = json.dumps({'v': [_encode_value(v) for v in values], 'o': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, n_keys):
+    """(valores, offset) de un cursor, o None si no es válido."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = [_decode_value(v) for v in payload['v']]
+        offset = int(payload.get('o', 0))
+    except (ValueError, TypeError, KeyError):
+        return None
+    if len(values) != n_keys or offset < 0:
+        return None
+    return values, offset
+
+
+def _seek(keys, values, forward):
+    """Q de las filas posteriores (forward) o anteriores a `values` según `keys`."""
+    condition = Q()
+    equal = Q()
+    for (field, descending), value in zip(keys, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def _ordering(keys, forward):
+    return [
+        F(field).desc() if descending == forward else F(field).asc()
+        for field, descending in keys
+    ]
+
+
+class KeysetPage:
+    """Página de resultados con cursores a la página siguiente y anterior."""
+
+    def __init__(self, object_list, offset, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.offset = offset
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def start_index(self):
+        return self.offset + 1 if self.object_list else 0
+
+    @property
+    def end_index(self):
+        return self.offset + len(self.object_list)
+
+
+def keyset_page(queryset, keys, after=None, before=None, per_page=50):
+    """
+    Página de `queryset` ordenada por `keys` [(campo, descendente), ...].
+    `after` / `before`: cursores recibidos de una página anterior.
+    """
+    def key_values(obj):
+        return [getattr(obj, field) for field, _ in keys]
+
+    forward = True
+    offset = 0
+    qs = queryset
+    cursor = decode_cursor(after, len(keys))
+    if cursor:
+        values, offset = cursor
+        qs = qs.filter(_seek(keys, values, forward=True))
+    else:
+        cursor = decode_cursor(before, len(keys))
+        if cursor:
+            values, offset = cursor
+            forward = False
+            qs = qs.filter(_seek(keys, values, forward=False))
+
+    rows = list(qs.order_by(*_ordering(keys, forward))[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if forward:
+        start = offset
+        has_next = has_more
+        has_previous = cursor is not None and start > 0
+    else:
+        rows.reverse()
+        start = max(0, offset - len(rows))
+        has_next = True
+        has_previous = has_more
+
+    next_cursor = encode_cursor(key_values(rows[-1]), start + len(rows)) if has_next and rows else None
+    previous_cursor = encode_cursor(key_values(rows[0]), start) if has_previous and rows else None
+    return KeysetPage(rows, start, next_cursor, previous_cursor)
@@ -214,6 +214,7 @@ class RateLimitMiddleware:
     # Paths excluidos del rate limiting
     EXCLUDED_PATHS = [
         '/health/',
+        '/metrics',
         '/static/',
         '/media/',
         '/favicon.ico',
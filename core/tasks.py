@@ -42,7 +42,7 @@ def backup_database_task(self):
             'status': 'success',
             'backup_path': str(backup_path),
             's3_url': s3_url,
-            'size_mb': round(backup_path.stat().st_size / (1024 * 1024), 2),
+            'size_mb': round(service.backup_size(backup_path) / (1024 * 1024), 2),
         }
         
         logger.info(f"Backup de DB completado: {result}")
@@ -89,7 +89,9 @@ def backup_media_task(self):
             'status': 'success',
             'backup_path': str(backup_path),
             's3_url': s3_url,
-            'size_mb': round(backup_path.stat().st_size / (1024 * 1024), 2),
+            'files': service.last_media_stats['files'],
+            'new_objects': service.last_media_stats['new_objects'],
+            'new_mb': round(service.last_media_stats['new_bytes'] / (1024 * 1024), 2),
         }
         
         logger.info(f"Backup de media completado: {result}")
@@ -125,11 +127,11 @@ def full_backup_task(self, upload_to_s3: bool = True):
             'status': 'success',
             'database': {
                 'path': str(db_path),
-                'size_mb': round(db_path.stat().st_size / (1024 * 1024), 2),
+                'size_mb': round(service.backup_size(db_path) / (1024 * 1024), 2),
             },
             'media': {
                 'path': str(media_path) if media_path else None,
-                'size_mb': round(media_path.stat().st_size / (1024 * 1024), 2) if media_path else 0,
+                'new_mb': round(service.last_media_stats['new_bytes'] / (1024 * 1024), 2) if media_path else 0,
             }
         }
         
@@ -175,6 +177,30 @@ def cleanup_old_backups_task():
         raise
 
 
+@shared_task(name='core.run_export_job', acks_late=True)
+def run_export_job(job_id):
+    """Genera una exportación en segundo plano (ver core.export_jobs)."""
+    from core.export_jobs import run_export
+
+    job = run_export(job_id)
+    return job and job['status']
+
+
+@shared_task(name='core.cleanup_old_exports')
+def cleanup_old_exports_task():
+    """
+    Borra los ficheros de exportaciones caducadas.
+    
+    Programar en Celery Beat:
+        Diariamente a las 4:30 AM
+    """
+    from core.export_jobs import cleanup_old_exports
+
+    deleted_count = cleanup_old_exports()
+    logger.info(f"Exportaciones caducadas eliminadas: {deleted_count}")
+    return {'status': 'success', 'deleted_count': deleted_count}
+
+
 # ==============================================
 # CONFIGURACION DE CELERY BEAT
 # ==============================================
@@ -0,0 +1,356 @@
+"""
+Telemetría de rendimiento por vista.
+
+RequestLoggingMiddleware abre un RequestTelemetry por request que mide:
+- Duración (histograma por vista)
+- Consultas SQL: número y tiempo (connection.execute_wrapper)
+- Caché: gets, hits y sets (instrumentación de los backends configurados)
+- Tiempo de render de plantillas (render de nivel superior, sin includes)
+
+Los datos se agregan en memoria del proceso (MetricsRegistry) y se exponen en
+formato de texto de Prometheus en /metrics (core.health_views.MetricsView).
+Con varios workers cada proceso expone sus propias métricas (etiqueta `pid`).
+
+Las requests lentas (TELEMETRY_SLOW_REQUEST_MS) se muestrean
+(TELEMETRY_SLOW_SAMPLE_RATE) y se registran con sus consultas más caras.
+
+Uso:
+    from core.telemetry import registry
+    registry.render_prometheus()
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger('core.telemetry')
+
+# Buckets del histograma de duración (segundos)
+DURATION_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Consultas distintas que se guardan por request para el muestreo de lentas
+MAX_TRACKED_STATEMENTS = 200
+TOP_QUERIES = 5
+
+_current = ContextVar('request_telemetry', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ViewMetrics:
+    """Acumulados de una vista."""
+
+    __slots__ = (
+        'requests', 'statuses', 'buckets', 'duration_sum', 'db_queries', 'db_seconds',
+        'cache_gets', 'cache_hits', 'cache_sets', 'template_seconds', 'slow_requests',
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.duration_sum = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_gets = 0
+        self.cache_hits = 0
+        self.cache_sets = 0
+        self.template_seconds = 0.0
+        self.slow_requests = 0
+
+
+class MetricsRegistry:
+    """Agregación en memoria (thread-safe) de la telemetría de las requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def record(self, telemetry, slow=False):
+        with self._lock:
+            metrics = self._views.get(telemetry.view)
+            if metrics is None:
+                metrics = self._views[telemetry.view] = ViewMetrics()
+            key = (telemetry.method, telemetry.status)
+            metrics.requests += 1
+            metrics.statuses[key] = metrics.statuses.get(key, 0) + 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if telemetry.duration <= bound:
+                    metrics.buckets[i] += 1
+            metrics.duration_sum += telemetry.duration
+            metrics.db_queries += telemetry.db_queries
+            metrics.db_seconds += telemetry.db_seconds
+            metrics.cache_gets += telemetry.cache_gets
+            metrics.cache_hits += telemetry.cache_hits
+            metrics.cache_sets += telemetry.cache_sets
+            metrics.template_seconds += telemetry.template_seconds
+            metrics.slow_requests += int(slow)
+
+    def snapshot(self):
+        """Copia de los acumulados: {vista: ViewMetrics}."""
+        with self._lock:
+            copy = {}
+            for view, metrics in self._views.items():
+                clone = ViewMetrics()
+                for field in ViewMetrics.__slots__:
+                    value = getattr(metrics, field)
+                    setattr(clone, field, value.copy() if isinstance(value, (list, dict)) else value)
+                copy[view] = clone
+            return copy
+
+    def render_prometheus(self):
+        """Métricas en formato de texto de Prometheus (version 0.0.4)."""
+        pid = os.getpid()
+        views = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def labels(view, **extra):
+            pairs = [('view', view), ('pid', str(pid))] + [(k, str(v)) for k, v in extra.items()]
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+        family('crm_http_requests_total', 'counter', 'Requests por vista, método y status.', [
+            f'crm_http_requests_total{labels(view, method=method, status=status)} {count}'
+            for view, m in views for (method, status), count in sorted(m.statuses.items())
+        ])
+
+        samples = []
+        for view, m in views:
+            for bound, count in zip(DURATION_BUCKETS, m.buckets):
+                samples.append(f'crm_http_request_duration_seconds_bucket{labels(view, le=bound)} {count}')
+            samples.append(f'crm_http_request_duration_seconds_bucket{labels(view, le="+Inf")} {m.requests}')
+            samples.append(f'crm_http_request_duration_seconds_sum{labels(view)} {m.duration_sum:.6f}')
+            samples.append(f'crm_http_request_duration_seconds_count{labels(view)} {m.requests}')
+        family('crm_http_request_duration_seconds', 'histogram', 'Duración de las requests.', samples)
+
+        simple = [
+            ('crm_db_queries_total', 'counter', 'Consultas SQL.', 'db_queries', '{}'),
+            ('crm_db_query_duration_seconds_total', 'counter', 'Tiempo en consultas SQL.', 'db_seconds', '{:.6f}'),
+            ('crm_cache_gets_total', 'counter', 'Lecturas de caché.', 'cache_gets', '{}'),
+            ('crm_cache_hits_total', 'counter', 'Lecturas de caché con acierto.', 'cache_hits', '{}'),
+            ('crm_cache_sets_total', 'counter', 'Escrituras en caché.', 'cache_sets', '{}'),
+            ('crm_template_render_seconds_total', 'counter', 'Tiempo de render de plantillas.',
+             'template_seconds', '{:.6f}'),
+            ('crm_slow_requests_total', 'counter', 'Requests por encima del umbral de lentitud.',
+             'slow_requests', '{}'),
+        ]
+        for name, kind, help_text, field, fmt in simple:
+            family(name, kind, help_text, [
+                f'{name}{labels(view)} {fmt.format(getattr(m, field))}' for view, m in views
+            ])
+
+        family('crm_cache_hit_ratio', 'gauge', 'Aciertos / lecturas de caché.', [
+            f'crm_cache_hit_ratio{labels(view)} {m.cache_hits / m.cache_gets:.4f}'
+            for view, m in views if m.cache_gets
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class RequestTelemetry:
+    """Contadores de una request. Se activa con `with RequestTelemetry(request):`."""
+
+    def __init__(self, request):
+        self.request = request
+        self.view = 'unresolved'
+        self.method = request.method
+        self.status = 0
+        self.duration = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_gets = 0
+        self.cache_hits = 0
+        self.cache_sets = 0
+        self.template_seconds = 0.0
+        self._template_depth = 0
+        self._statements = {}
+        self._stack = None
+        self._token = None
+        self._start = None
+
+    # --- Instrumentación ---
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db_queries += 1
+            self.db_seconds += elapsed
+            stats = self._statements.get(sql)
+            if stats is not None:
+                stats[0] += 1
+                stats[1] += elapsed
+            elif len(self._statements) < MAX_TRACKED_STATEMENTS:
+                self._statements[sql] = [1, elapsed]
+
+    def top_queries(self, n=TOP_QUERIES):
+        """[(sql, veces, segundos)] de las consultas con más tiempo acumulado."""
+        ranked = sorted(self._statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:n]]
+
+    # --- Ciclo de vida ---
+
+    def __enter__(self):
+        from django.db import connections
+
+        install_instrumentation()
+        self._token = _current.set(self)
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._execute_wrapper))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.duration = time.perf_counter() - self._start
+        self._stack.close()
+        _current.reset(self._token)
+        return False
+
+    def finish(self, response):
+        """Registra la request en el agregado y muestrea si ha sido lenta."""
+        match = getattr(self.request, 'resolver_match', None)
+        if match is not None:
+            self.view = match.view_name or match._func_path
+        self.status = getattr(response, 'status_code', 0)
+
+        slow = self.duration * 1000 >= _setting('TELEMETRY_SLOW_REQUEST_MS', 1000)
+        registry.record(self, slow=slow)
+        if slow and random.random() < _setting('TELEMETRY_SLOW_SAMPLE_RATE', 1.0):
+            logger.warning(
+                "Slow request",
+                extra={
+                    'request_id': getattr(self.request, 'request_id', '-'),
+                    'view': self.view,
+                    'path': self.request.path,
+                    'duration_ms': round(self.duration * 1000, 2),
+                    'db_queries': self.db_queries,
+                    'db_ms': round(self.db_seconds * 1000, 2),
+                    'template_ms': round(self.template_seconds * 1000, 2),
+                    'top_queries': [
+                        {'sql': sql[:500], 'count': count, 'ms': round(seconds * 1000, 2)}
+                        for sql, count, seconds in self.top_queries()
+                    ],
+                },
+            )
+
+
+def current():
+    """RequestTelemetry activo en este contexto, o None."""
+    return _current.get()
+
+
+# ==============================================
+# INSTRUMENTACION DE CACHE Y PLANTILLAS
+# ==============================================
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def _wrap_cache_get(original):
+    def get(self, key, default=None, *args, **kwargs):
+        value = original(self, key, default, *args, **kwargs)
+        telemetry = _current.get()
+        if telemetry is not None:
+            telemetry.cache_gets += 1
+            telemetry.cache_hits += value is not default
+        return value
+    get._telemetry = True
+    return get
+
+
+def _wrap_cache_get_many(original):
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = original(self, keys, *args, **kwargs)
+        telemetry = _current.get()
+        if telemetry is not None:
+            telemetry.cache_gets += len(keys)
+            telemetry.cache_hits += len(values)
+        return values
+    get_many._telemetry = True
+    return get_many
+
+
+def _wrap_cache_set(original, count_items=False):
+    def set_(self, *args, **kwargs):
+        result = original(self, *args, **kwargs)
+        telemetry = _current.get()
+        if telemetry is not None:
+            telemetry.cache_sets += len(args[0]) if count_items and args else 1
+        return result
+    set_._telemetry = True
+    return set_
+
+
+def _wrap_template_render(original):
+    def render(self, *args, **kwargs):
+        telemetry = _current.get()
+        if telemetry is None:
+            return original(self, *args, **kwargs)
+        telemetry._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            telemetry._template_depth -= 1
+            if telemetry._template_depth == 0:
+                telemetry.template_seconds += time.perf_counter() - start
+    render._telemetry = True
+    return render
+
+
+def install_instrumentation():
+    """
+    Instrumenta (una sola vez por proceso) las clases de los backends de caché
+    configurados y el render de plantillas. Fuera de una request los
+    wrappers no hacen nada.
+    """
+    global _installed
+    if _installed:
+        return
+    with _install_lock:
+        if _installed:
+            return
+        from django.core.cache import caches
+        from django.template.backends.django import Template
+
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            for name, wrapper in (
+                ('get', _wrap_cache_get),
+                ('get_many', _wrap_cache_get_many),
+                ('set', _wrap_cache_set),
+                ('add', _wrap_cache_set),
+                ('set_many', lambda original: _wrap_cache_set(original, count_items=True)),
+            ):
+                method = getattr(backend, name, None)
+                if method is not None and not getattr(method, '_telemetry', False):
+                    setattr(backend, name, wrapper(method))
+
+        if not getattr(Template.render, '_telemetry', False):
+            Template.render = _wrap_template_render(Template.render)
+        _installed = True
@@ -496,7 +496,7 @@ def search_clients(request):
     Solo para staff.
     """
     from clients.models import Client
-    from django.db.models import Q
+    from clients.search import search_clients as ranked_search
     
     staff = getattr(request.user, 'staff_profile', None)
     
@@ -510,15 +510,11 @@ def search_clients(request):
     if len(query) < 2:
         return Response({'results': []})
     
-    clients = Client.objects.filter(
-        gym=staff.gym,
-        status='active'
-    ).filter(
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query) |
-        Q(phone__icontains=query)
-    )[:20]
+    clients = ranked_search(
+        Client.objects.filter(gym=staff.gym, status=Client.Status.ACTIVE),
+        query,
+        limit=20,
+    )
     
     return Response({
         'results': [
@@ -526,7 +522,7 @@ def search_clients(request):
                 'id': c.id,
                 'full_name': c.full_name,
                 'email': c.email,
-                'phone': c.phone,
+                'phone': c.phone_number,
                 'photo': c.photo.url if c.photo else None
             }
             for c in clients
@@ -4,14 +4,17 @@ Utiliza la librería face_recognition para detectar y comparar rostros.
 """
 import time
 import logging
-import numpy as np
+import importlib.util
 from io import BytesIO
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 from PIL import Image
 
 from django.utils import timezone
 from django.core.files.uploadedfile import InMemoryUploadedFile
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = logging.getLogger(__name__)
 
 # Función para verificar disponibilidad de face_recognition dinámicamente
@@ -19,12 +22,10 @@ def check_face_recognition_available():
     """
     Verifica si la librería face_recognition está disponible.
     Se evalúa cada vez que se llama para detectar instalaciones en caliente.
+    Sólo localiza el paquete (no lo importa: face_recognition carga dlib y
+    los modelos, y se importa al usarlo).
     """
-    try:
-        import face_recognition
-        return True
-    except ImportError:
-        return False
+    return importlib.util.find_spec('face_recognition') is not None
 
 # Variable global que se puede actualizar
 FACE_RECOGNITION_AVAILABLE = check_face_recognition_available()
@@ -59,11 +60,13 @@ class FaceRecognitionService:
         """Comprueba si el reconocimiento facial está disponible"""
         return FACE_RECOGNITION_AVAILABLE
     
-    def _load_image(self, image_file) -> Optional[np.ndarray]:
+    def _load_image(self, image_file) -> Optional['np.ndarray']:
         """
         Carga una imagen desde un archivo.
         Acepta: InMemoryUploadedFile, BytesIO, path string
         """
+        import numpy as np
+
         try:
             if isinstance(image_file, (InMemoryUploadedFile, BytesIO)):
                 # Leer desde memoria
@@ -75,6 +78,7 @@ class FaceRecognitionService:
                 return np.array(pil_image)
             elif isinstance(image_file, str):
                 # Leer desde path
+                import face_recognition
                 return face_recognition.load_image_file(image_file)
             elif isinstance(image_file, np.ndarray):
                 return image_file
@@ -98,6 +102,8 @@ class FaceRecognitionService:
         if not FACE_RECOGNITION_AVAILABLE:
             return 0, []
         
+        import face_recognition
+        
         image = self._load_image(image_file)
         if image is None:
             return 0, []
@@ -105,7 +111,7 @@ class FaceRecognitionService:
         face_locations = face_recognition.face_locations(image)
         return len(face_locations), face_locations
     
-    def get_face_encoding(self, image_file) -> Optional[np.ndarray]:
+    def get_face_encoding(self, image_file) -> Optional['np.ndarray']:
         """
         Extrae el encoding facial de una imagen.
         
@@ -116,6 +122,8 @@ class FaceRecognitionService:
             logger.error("face_recognition no disponible")
             return None
         
+        import face_recognition
+        
         image = self._load_image(image_file)
         if image is None:
             return None
@@ -154,6 +162,7 @@ class FaceRecognitionService:
                 'quality_score': float
             }
         """
+        import numpy as np
         from .models import ClientFaceEncoding
         
         if not FACE_RECOGNITION_AVAILABLE:
@@ -322,6 +331,9 @@ class FaceRecognitionService:
                 'client': None
             }
         
+        import face_recognition
+        import numpy as np
+        
         # Obtener encoding de la imagen
         unknown_encoding = self.get_face_encoding(image_file)
         
@@ -8,11 +8,12 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count
 from django.utils import timezone
 
 from accounts.decorators import require_gym_permission
 from clients.models import Client
+from clients.search import search_q
 from organizations.models import Gym
 from .models import ClientWallet, WalletTransaction, WalletSettings, PaymentMethod
 from .wallet_service import WalletService
@@ -146,11 +147,7 @@ def wallet_list(request):
     balance_filter = request.GET.get('balance', 'all')
     
     if search:
-        wallets = wallets.filter(
-            Q(client__first_name__icontains=search) |
-            Q(client__last_name__icontains=search) |
-            Q(client__email__icontains=search)
-        )
+        wallets = wallets.filter(search_q(search, prefix='client__'))
     
     if status_filter == 'active':
         wallets = wallets.filter(is_active=True)
@@ -319,27 +319,20 @@ def api_search_clients(request):
     """API para buscar clientes (para asignar taquillas)."""
     gym = request.gym
     from clients.models import Client
+    from clients.search import search_clients
     
     query = request.GET.get('q', '').strip()
     if len(query) < 2:
         return JsonResponse({'clients': []})
     
-    clients = Client.objects.filter(
-        gym=gym,
-        status='ACTIVE'
-    ).filter(
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query) |
-        Q(phone__icontains=query)
-    )[:10]
+    clients = search_clients(Client.objects.filter(gym=gym, status='ACTIVE'), query, limit=10)
     
     data = [{
         'id': c.id,
         'first_name': c.first_name,
         'last_name': c.last_name,
         'email': c.email or '',
-        'phone': c.phone or '',
+        'phone': c.phone_number or '',
     } for c in clients]
     
     return JsonResponse({'clients': data})
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0016_add_saved_audience_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailworkflowexecution',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, help_text='Cuándo debe enviarse el siguiente paso', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='emailworkflowexecution',
+            index=models.Index(fields=['status', 'next_due_at'], name='marketing_e_status_560600_idx'),
+        ),
+    ]
@@ -1044,10 +1044,16 @@ class EmailWorkflowExecution(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     
     current_step = models.ForeignKey(EmailWorkflowStep, on_delete=models.SET_NULL, null=True, blank=True, related_name='current_executions')
+    
+    # Programación: cuándo toca enviar el siguiente paso (ver marketing.workflow_scheduler)
+    next_due_at = models.DateTimeField(null=True, blank=True, help_text="Cuándo debe enviarse el siguiente paso")
 
     class Meta:
         ordering = ['-started_at']
         unique_together = ('workflow', 'client')  # Un cliente solo puede estar una vez en cada workflow
+        indexes = [
+            models.Index(fields=['status', 'next_due_at']),
+        ]
 
     def __str__(self):
         return f"{self.client} - {self.workflow.name} ({self.status})"
@@ -3,7 +3,7 @@ Django Signals for Lead Management Automations
 Triggers Celery tasks when relevant events occur.
 """
 import logging
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -254,6 +254,20 @@ def on_client_created(sender, instance, created, **kwargs):
         safe_delay(start_workflow_for_client, workflow.id, instance.id)
 
 
+@receiver(post_save, sender='marketing.EmailWorkflowStep')
+@receiver(post_delete, sender='marketing.EmailWorkflowStep')
+def on_workflow_step_changed(sender, instance, **kwargs):
+    """
+    When a workflow step is added, edited or removed, recompute next_due_at
+    for the workflow's active executions.
+    """
+    from .workflow_scheduler import reschedule_workflow
+    try:
+        reschedule_workflow(instance.workflow_id)
+    except Exception as e:
+        logger.warning(f"Could not reschedule workflow {instance.workflow_id}: {e}")
+
+
 # =============================================================================
 # LEAD SCORING SIGNALS
 # =============================================================================
@@ -214,123 +214,14 @@ def create_lead_card_for_client(client_id, pipeline_id=None):
 @shared_task(name='marketing.process_email_workflows', **CRITICAL_RETRY_CONFIG)
 def process_email_workflows():
     """
-    Task periódico que procesa todos los workflows activos.
-    Revisa qué emails deben enviarse hoy según los delays configurados.
+    Task periódico que envía los pasos de workflow vencidos.
+    Sólo selecciona las ejecuciones con next_due_at <= ahora (consulta indexada),
+    las agrupa por paso y registra los envíos en bloque.
     Ejecutar diariamente via Celery Beat.
     """
-    from .models import EmailWorkflowExecution, EmailWorkflowStepLog, EmailWorkflowStep
-    from core.email_service import send_email, NoEmailConfigurationError, EmailLimitExceededError
-    from django.conf import settings
-    
-    today = timezone.now()
-    processed_count = 0
+    from .workflow_scheduler import process_due_executions
     
-    # Obtener todas las ejecuciones activas
-    active_executions = EmailWorkflowExecution.objects.filter(
-        status='ACTIVE',
-        workflow__is_active=True
-    ).select_related('workflow', 'client', 'current_step')
-    
-    for execution in active_executions:
-        # Obtener pasos del workflow ordenados
-        steps = execution.workflow.steps.filter(is_active=True).order_by('order')
-        
-        if not steps.exists():
-            continue
-        
-        # Determinar siguiente paso a enviar
-        if not execution.current_step:
-            # Primer paso
-            next_step = steps.first()
-            scheduled_for = execution.started_at + timedelta(days=next_step.delay_days)
-        else:
-            # Buscar siguiente paso
-            current_step_logs = execution.step_logs.filter(step=execution.current_step)
-            if not current_step_logs.exists():
-                continue
-            
-            last_log = current_step_logs.order_by('-sent_at').first()
-            next_steps = steps.filter(order__gt=execution.current_step.order)
-            
-            if not next_steps.exists():
-                # Workflow completado
-                execution.status = 'COMPLETED'
-                execution.completed_at = today
-                execution.save()
-                continue
-            
-            next_step = next_steps.first()
-            scheduled_for = last_log.sent_at + timedelta(days=next_step.delay_days)
-        
-        # Verificar si es hora de enviar
-        if scheduled_for <= today:
-            # Verificar si el cliente tiene notificaciones activadas
-            if not execution.client.email_notifications_enabled:
-                # Marcar como completado sin enviar
-                EmailWorkflowStepLog.objects.create(
-                    execution=execution,
-                    step=next_step,
-                    scheduled_for=scheduled_for,
-                    success=False,
-                    error_message='Cliente con notificaciones desactivadas'
-                )
-                execution.current_step = next_step
-                execution.save()
-                continue
-            
-            try:
-                # Obtener contenido del email
-                if next_step.template:
-                    email_html = next_step.template.content_html
-                else:
-                    email_html = next_step.content_html
-                
-                # Personalizar con datos del cliente
-                email_html = email_html.replace('{{client_name}}', execution.client.first_name or execution.client.email)
-                
-                # Enviar email usando servicio unificado
-                gym = execution.workflow.gym
-                
-                send_email(
-                    gym=gym,
-                    to=execution.client.email,
-                    subject=next_step.subject,
-                    body=next_step.subject,  # Fallback texto plano
-                    html_body=email_html,
-                )
-                
-                # Registrar envío exitoso
-                EmailWorkflowStepLog.objects.create(
-                    execution=execution,
-                    step=next_step,
-                    scheduled_for=scheduled_for,
-                    success=True
-                )
-                
-                # Actualizar current_step
-                execution.current_step = next_step
-                execution.save()
-                
-                processed_count += 1
-                
-            except (NoEmailConfigurationError, EmailLimitExceededError) as e:
-                # Registrar error de configuración
-                EmailWorkflowStepLog.objects.create(
-                    execution=execution,
-                    step=next_step,
-                    scheduled_for=scheduled_for,
-                    success=False,
-                    error_message=f"Configuración de email: {str(e)}"
-                )
-            except Exception as e:
-                # Registrar error
-                EmailWorkflowStepLog.objects.create(
-                    execution=execution,
-                    step=next_step,
-                    scheduled_for=scheduled_for,
-                    success=False,
-                    error_message=str(e)
-                )
+    processed_count = process_due_executions()
     
     return f"Processed {processed_count} workflow emails"
 
@@ -354,12 +245,15 @@ def start_workflow_for_client(workflow_id, client_id):
     if EmailWorkflowExecution.objects.filter(workflow=workflow, client=client, status='ACTIVE').exists():
         return f"Client {client} already in workflow {workflow.name}"
     
-    # Crear ejecución
+    # Crear ejecución y programar su primer paso
+    from .workflow_scheduler import schedule_executions
+    
     execution = EmailWorkflowExecution.objects.create(
         workflow=workflow,
         client=client,
         status='ACTIVE'
     )
+    schedule_executions([execution])
     
     return f"Started workflow '{workflow.name}' for {client}"
 
@@ -432,106 +326,149 @@ def decay_lead_scores():
     Task periódico para "decaer" scores de leads inactivos.
     Ejecutar semanalmente via Celery Beat.
     Resta puntos a leads que no han tenido actividad positiva recientemente.
+    Se aplica con un único UPDATE por lote y los logs se insertan en bloque.
     """
-    from .models import LeadScore
+    from .models import LeadScore, LeadScoreLog
+    from django.db import transaction
+    from django.db.models import F
     from datetime import timedelta
     
-    decay_threshold = timezone.now() - timedelta(days=14)
+    now = timezone.now()
+    decay_threshold = now - timedelta(days=14)
     decay_points = -5
+    description = "Decaimiento por inactividad (14 días)"
     
     # Leads sin actividad positiva en 14 días
-    stale_scores = LeadScore.objects.filter(
+    stale_ids = list(LeadScore.objects.filter(
         last_positive_event__lt=decay_threshold,
         score__gt=0  # Solo si tienen puntos
-    )
-    
-    decayed_count = 0
-    for lead_score in stale_scores:
-        lead_score.add_points(decay_points, "Decaimiento por inactividad (14 días)")
-        decayed_count += 1
+    ).values_list('id', flat=True))
+    
+    batch_size = 1000
+    for i in range(0, len(stale_ids), batch_size):
+        batch_ids = stale_ids[i:i + batch_size]
+        with transaction.atomic():
+            LeadScore.objects.filter(id__in=batch_ids).update(
+                score=F('score') + decay_points,
+                last_negative_event=now,
+                updated_at=now,
+            )
+            LeadScoreLog.objects.bulk_create([
+                LeadScoreLog(lead_score_id=score_id, points=decay_points, description=description)
+                for score_id in batch_ids
+            ])
     
-    return f"Decayed {decayed_count} lead scores ({decay_points} pts each)"
+    return f"Decayed {len(stale_ids)} lead scores ({decay_points} pts each)"
 
 
 # =============================================================================
 # ALERTAS DE RETENCIÓN
 # =============================================================================
 
+def _least_loaded_staff_assigner(gym):
+    """
+    Devuelve una función que asigna, en memoria, el staff (MANAGER/TRAINER) con
+    menos alertas abiertas. Se inicializa con un único COUNT agrupado y cada
+    asignación incrementa la carga del elegido (round robin por carga).
+    """
+    import heapq
+    from django.db.models import Count, Q
+    from staff.models import StaffProfile
+    
+    staff_loads = StaffProfile.objects.filter(
+        gym=gym,
+        role__in=['MANAGER', 'TRAINER']
+    ).annotate(
+        pending_alerts=Count('assigned_retention_alerts', filter=Q(assigned_retention_alerts__status='OPEN'))
+    ).values_list('id', 'pending_alerts')
+    
+    heap = [(pending, position, staff_id) for position, (staff_id, pending) in enumerate(staff_loads)]
+    heapq.heapify(heap)
+    
+    def assign():
+        if not heap:
+            return None
+        pending, position, staff_id = heapq.heappop(heap)
+        heapq.heappush(heap, (pending + 1, position, staff_id))
+        return staff_id
+    
+    return assign
+
+
 @shared_task(name='marketing.check_retention_alerts', **RETRY_CONFIG)
 def check_retention_alerts():
     """
     Task periódico que verifica clientes en riesgo y crea alertas.
     Ejecutar diariamente via Celery Beat.
+    
+    Por cada regla: una consulta obtiene los clientes en riesgo excluyendo (anti-join)
+    los que ya tienen una alerta abierta, las alertas se crean con bulk_create y
+    el staff se asigna en memoria por menor carga.
+    
+    El risk_score de la alerta es la puntuación de abandono del cliente
+    (ClientRiskScore) con el risk_score de la regla como mínimo.
     """
     from .models import RetentionRule, RetentionAlert
     from clients.models import Client
-    from django.db.models import Max, Count
+    from django.db.models import F, Max, Q, Exists, OuterRef
     
     today = timezone.now()
     alerts_created = 0
+    open_statuses = ['OPEN', 'IN_PROGRESS']
     
     # Obtener todas las reglas activas
-    rules = RetentionRule.objects.filter(is_active=True).select_related('gym')
+    rules = RetentionRule.objects.filter(is_active=True).select_related('gym', 'start_workflow')
     
     for rule in rules:
         gym = rule.gym
         
         if rule.alert_type == 'NO_ATTENDANCE':
             # Buscar clientes activos sin visitas recientes
-            threshold_date = today - timedelta(days=rule.days_threshold)
+            threshold_date = (today - timedelta(days=rule.days_threshold)).date()
+            
+            open_alert = RetentionAlert.objects.filter(
+                client=OuterRef('pk'),
+                alert_type='NO_ATTENDANCE',
+                status__in=open_statuses
+            )
             
-            # Clientes que tienen visitas pero la última es antigua
-            from django.db.models import Q
+            # Clientes sin visitas o con la última visita antigua y sin alerta abierta
             at_risk_clients = Client.objects.filter(
                 gym=gym,
                 status='ACTIVE'
+            ).filter(
+                ~Exists(open_alert)
             ).annotate(
                 last_visit=Max('visits__date')
             ).filter(
                 Q(last_visit__lt=threshold_date) | Q(last_visit__isnull=True)
-            )
+            ).values_list('id', 'first_name', 'last_visit', 'risk_score__score')
             
-            for client in at_risk_clients:
-                # Verificar si ya existe alerta abierta
-                existing = RetentionAlert.objects.filter(
-                    client=client,
-                    alert_type='NO_ATTENDANCE',
-                    status__in=['OPEN', 'IN_PROGRESS']
-                ).exists()
+            assign_staff = _least_loaded_staff_assigner(gym) if rule.auto_assign_to_staff else None
+            
+            new_alerts = []
+            for client_id, first_name, last_visit, churn_score in at_risk_clients.iterator(chunk_size=2000):
+                days_inactive = (today.date() - last_visit).days if last_visit else rule.days_threshold
                 
-                if not existing:
-                    days_inactive = (today.date() - client.last_visit).days if client.last_visit else rule.days_threshold
-                    
-                    alert = RetentionAlert.objects.create(
-                        gym=gym,
-                        client=client,
-                        alert_type='NO_ATTENDANCE',
-                        title=f"{client.first_name} sin asistir {days_inactive} días",
-                        description=f"El cliente no ha registrado visitas en {days_inactive} días. Acción recomendada: Contactar y ofrecer apoyo.",
-                        days_inactive=days_inactive,
-                        risk_score=rule.risk_score
-                    )
-                    
-                    # Asignar automáticamente si configurado
-                    if rule.auto_assign_to_staff:
-                        # Asignar al staff con menos alertas pendientes
-                        from staff.models import StaffProfile
-                        staff = StaffProfile.objects.filter(
-                            gym=gym,
-                            role__in=['MANAGER', 'TRAINER']
-                        ).annotate(
-                            pending_alerts=Count('assigned_retention_alerts', filter=Q(assigned_retention_alerts__status='OPEN'))
-                        ).order_by('pending_alerts').first()
-                        
-                        if staff:
-                            alert.assigned_to = staff
-                            alert.save()
-                    
-                    # Iniciar workflow si configurado
-                    if rule.start_workflow:
-                        safe_task_delay(start_workflow_for_client, rule.start_workflow.id, client.id)
-                    
-                    alerts_created += 1
+                new_alerts.append(RetentionAlert(
+                    gym=gym,
+                    client_id=client_id,
+                    alert_type='NO_ATTENDANCE',
+                    title=f"{first_name} sin asistir {days_inactive} días",
+                    description=f"El cliente no ha registrado visitas en {days_inactive} días. Acción recomendada: Contactar y ofrecer apoyo.",
+                    days_inactive=days_inactive,
+                    risk_score=max(rule.risk_score, churn_score or 0),
+                    # Asignar automáticamente al staff con menos alertas pendientes
+                    assigned_to_id=assign_staff() if assign_staff else None,
+                ))
+            
+            RetentionAlert.objects.bulk_create(new_alerts, batch_size=500)
+            alerts_created += len(new_alerts)
+            
+            # Iniciar workflow si configurado
+            if rule.start_workflow:
+                for alert in new_alerts:
+                    safe_task_delay(start_workflow_for_client, rule.start_workflow.id, alert.client_id)
         
         elif rule.alert_type == 'MEMBERSHIP_EXPIRING':
             # Buscar membresías que expiran pronto
@@ -541,34 +478,42 @@ def check_retention_alerts():
             try:
                 from subscriptions.models import Subscription
                 
+                open_alert = RetentionAlert.objects.filter(
+                    client=OuterRef('client_id'),
+                    alert_type='MEMBERSHIP_EXPIRING',
+                    status__in=open_statuses
+                )
+                
                 expiring_subs = Subscription.objects.filter(
                     client__gym=gym,
                     status='ACTIVE',
                     end_date__lte=expiry_threshold,
                     end_date__gte=today
-                ).select_related('client')
+                ).filter(
+                    ~Exists(open_alert)
+                ).select_related('client').annotate(
+                    churn_score=F('client__risk_score__score')
+                )
                 
+                new_alerts = []
+                seen_clients = set()
                 for sub in expiring_subs:
-                    # Verificar si ya existe alerta
-                    existing = RetentionAlert.objects.filter(
+                    if sub.client_id in seen_clients:
+                        continue
+                    seen_clients.add(sub.client_id)
+                    days_until = (sub.end_date - today.date()).days
+                    
+                    new_alerts.append(RetentionAlert(
+                        gym=gym,
                         client=sub.client,
                         alert_type='MEMBERSHIP_EXPIRING',
-                        status__in=['OPEN', 'IN_PROGRESS']
-                    ).exists()
-                    
-                    if not existing:
-                        days_until = (sub.end_date - today.date()).days
-                        
-                        RetentionAlert.objects.create(
-                            gym=gym,
-                            client=sub.client,
-                            alert_type='MEMBERSHIP_EXPIRING',
-                            title=f"Membresía de {sub.client.first_name} expira en {days_until} días",
-                            description=f"Membresía expira el {sub.end_date.strftime('%d/%m/%Y')}. Contactar para renovación.",
-                            risk_score=rule.risk_score
-                        )
-                        
-                        alerts_created += 1
+                        title=f"Membresía de {sub.client.first_name} expira en {days_until} días",
+                        description=f"Membresía expira el {sub.end_date.strftime('%d/%m/%Y')}. Contactar para renovación.",
+                        risk_score=max(rule.risk_score, sub.churn_score or 0)
+                    ))
+                
+                RetentionAlert.objects.bulk_create(new_alerts, batch_size=500)
+                alerts_created += len(new_alerts)
             except ImportError:
                 pass  # Modelo Subscription no disponible
     
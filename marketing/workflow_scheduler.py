@@ -0,0 +1,308 @@
+"""
+Programador de Email Workflows (Secuencias).
+
+Cada EmailWorkflowExecution guarda en `next_due_at` cuándo toca enviar su
+siguiente paso. El proceso diario sólo selecciona las ejecuciones vencidas con
+una consulta indexada (status, next_due_at), las agrupa por paso y envía cada
+lote registrando los logs con bulk_create. El coste diario depende de los
+emails que realmente hay que enviar, no del número de clientes inscritos.
+
+Usage:
+    from marketing.workflow_scheduler import process_due_executions, schedule_executions
+
+    # Recalcular next_due_at (al inscribir un cliente o al editar pasos)
+    schedule_executions([execution])
+
+    # Envío diario (Celery Beat)
+    sent = process_due_executions()
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F, Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def load_step_plans(workflow_ids):
+    """
+    Carga en una sola consulta los pasos activos de varios workflows.
+    Devuelve {workflow_id: [pasos ordenados por 'order']}.
+    """
+    from .models import EmailWorkflowStep
+
+    plans = defaultdict(list)
+    steps = EmailWorkflowStep.objects.filter(
+        workflow_id__in=set(workflow_ids),
+        is_active=True
+    ).select_related('template').order_by('workflow_id', 'order', 'id')
+
+    for step in steps:
+        plans[step.workflow_id].append(step)
+    return plans
+
+
+def get_next_step(plan, current_step):
+    """Siguiente paso del plan tras `current_step` (o el primero si no hay paso actual)."""
+    if not plan:
+        return None
+    if current_step is None:
+        return plan[0]
+    for step in plan:
+        if step.order > current_step.order:
+            return step
+    return None
+
+
+def _last_sent_by_execution(executions):
+    """Fecha del último log del paso actual de cada ejecución, en una consulta."""
+    from .models import EmailWorkflowStepLog
+
+    ids = [e.id for e in executions if e.current_step_id]
+    if not ids:
+        return {}
+    rows = EmailWorkflowStepLog.objects.filter(
+        execution_id__in=ids,
+        step_id=F('execution__current_step_id')
+    ).values('execution_id').annotate(last_sent=Max('sent_at'))
+    return {row['execution_id']: row['last_sent'] for row in rows}
+
+
+def schedule_executions(executions, now=None, plans=None):
+    """
+    Recalcula `next_due_at` para un conjunto de ejecuciones ACTIVE.
+
+    - Sin paso actual: started_at + delay del primer paso.
+    - Con paso actual: fecha del último envío de ese paso + delay del siguiente.
+    - Sin más pasos: la ejecución se marca como COMPLETED.
+
+    Las ejecuciones de workflows sin pasos activos quedan sin programar.
+    Devuelve el número de ejecuciones actualizadas.
+    """
+    from .models import EmailWorkflowExecution
+
+    now = now or timezone.now()
+    executions = [e for e in executions if e.status == EmailWorkflowExecution.Status.ACTIVE]
+    if not executions:
+        return 0
+
+    if plans is None:
+        plans = load_step_plans(e.workflow_id for e in executions)
+    last_sent = _last_sent_by_execution(executions)
+
+    for execution in executions:
+        plan = plans.get(execution.workflow_id)
+        if not plan:
+            execution.next_due_at = None
+            continue
+
+        next_step = get_next_step(plan, execution.current_step)
+        if next_step is None:
+            execution.status = EmailWorkflowExecution.Status.COMPLETED
+            execution.completed_at = now
+            execution.next_due_at = None
+            continue
+
+        if execution.current_step_id:
+            base = last_sent.get(execution.id) or execution.started_at or now
+        else:
+            base = execution.started_at or now
+        execution.next_due_at = base + timedelta(days=next_step.delay_days)
+
+    EmailWorkflowExecution.objects.bulk_update(
+        executions, ['status', 'completed_at', 'next_due_at'], batch_size=DEFAULT_BATCH_SIZE
+    )
+    return len(executions)
+
+
+def reschedule_workflow(workflow_id):
+    """Reprograma todas las ejecuciones activas de un workflow (p.ej. tras editar sus pasos)."""
+    from .models import EmailWorkflowExecution
+
+    executions = list(
+        EmailWorkflowExecution.objects.filter(
+            workflow_id=workflow_id,
+            status=EmailWorkflowExecution.Status.ACTIVE
+        ).select_related('current_step')
+    )
+    return schedule_executions(executions)
+
+
+def schedule_pending_executions(now=None):
+    """Programa las ejecuciones activas que aún no tienen `next_due_at` (altas nuevas o antiguas)."""
+    from .models import EmailWorkflowExecution
+
+    executions = list(
+        EmailWorkflowExecution.objects.filter(
+            status=EmailWorkflowExecution.Status.ACTIVE,
+            workflow__is_active=True,
+            next_due_at__isnull=True
+        ).select_related('current_step')
+    )
+    return schedule_executions(executions, now=now)
+
+
+def _render_step_html(step, client):
+    """Contenido HTML del paso personalizado con los datos del cliente."""
+    if step.template:
+        email_html = step.template.content_html
+    else:
+        email_html = step.content_html
+    return email_html.replace('{{client_name}}', client.first_name or client.email)
+
+
+def _send_batch(step, executions, plans, now):
+    """
+    Envía un paso a un lote de ejecuciones.
+    Devuelve (logs a crear, ejecuciones a actualizar, enviados OK).
+    """
+    from .models import EmailWorkflowExecution, EmailWorkflowStepLog
+    from core.email_service import (
+        send_email, reserve_email_batch, NoEmailConfigurationError, EmailLimitExceededError,
+    )
+
+    logs = []
+    advanced = []
+    sent_count = 0
+
+    # Cupo de email reservado de una vez para todo el lote (lo no enviado se devuelve)
+    gym = step.workflow.gym
+    recipients = sum(1 for execution in executions if execution.client.email_notifications_enabled)
+    with reserve_email_batch(gym, recipients) as quota:
+        for execution in executions:
+            client = execution.client
+            scheduled_for = execution.next_due_at
+
+            if not client.email_notifications_enabled:
+                logs.append(EmailWorkflowStepLog(
+                    execution=execution,
+                    step=step,
+                    scheduled_for=scheduled_for,
+                    success=False,
+                    error_message='Cliente con notificaciones desactivadas'
+                ))
+                advanced.append(execution)
+                continue
+
+            try:
+                send_email(
+                    gym=gym,
+                    to=client.email,
+                    subject=step.subject,
+                    body=step.subject,  # Fallback texto plano
+                    html_body=_render_step_html(step, client),
+                    quota=quota,
+                )
+            except (NoEmailConfigurationError, EmailLimitExceededError) as e:
+                # Se reintenta en la siguiente ejecución (next_due_at no cambia)
+                logs.append(EmailWorkflowStepLog(
+                    execution=execution,
+                    step=step,
+                    scheduled_for=scheduled_for,
+                    success=False,
+                    error_message=f"Configuración de email: {str(e)}"
+                ))
+                continue
+            except Exception as e:
+                logs.append(EmailWorkflowStepLog(
+                    execution=execution,
+                    step=step,
+                    scheduled_for=scheduled_for,
+                    success=False,
+                    error_message=str(e)
+                ))
+                continue
+
+            logs.append(EmailWorkflowStepLog(
+                execution=execution,
+                step=step,
+                scheduled_for=scheduled_for,
+                success=True
+            ))
+            advanced.append(execution)
+            sent_count += 1
+
+    # Avanzar las ejecuciones al paso enviado y programar el siguiente
+    plan = plans.get(step.workflow_id, [])
+    following = get_next_step(plan, step)
+    for execution in advanced:
+        execution.current_step = step
+        if following is None:
+            execution.status = EmailWorkflowExecution.Status.COMPLETED
+            execution.completed_at = now
+            execution.next_due_at = None
+        else:
+            execution.next_due_at = now + timedelta(days=following.delay_days)
+
+    return logs, advanced, sent_count
+
+
+def process_due_executions(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Envía todos los pasos vencidos (next_due_at <= now).
+
+    Recorre las ejecuciones vencidas por lotes (keyset por id), agrupa cada lote
+    por paso a enviar, y persiste logs y ejecuciones con operaciones bulk.
+    Devuelve el número de emails enviados correctamente.
+    """
+    from .models import EmailWorkflowExecution, EmailWorkflowStepLog
+
+    now = now or timezone.now()
+    schedule_pending_executions(now=now)
+
+    due = EmailWorkflowExecution.objects.filter(
+        status=EmailWorkflowExecution.Status.ACTIVE,
+        workflow__is_active=True,
+        next_due_at__lte=now
+    ).select_related('workflow__gym', 'client', 'current_step').order_by('id')
+
+    sent_count = 0
+    last_id = 0
+    plans = {}
+
+    while True:
+        batch = list(due.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        missing = {e.workflow_id for e in batch} - set(plans)
+        if missing:
+            plans.update(load_step_plans(missing))
+
+        # Agrupar por paso a enviar
+        by_step = defaultdict(list)
+        steps = {}
+        orphans = []
+        for execution in batch:
+            next_step = get_next_step(plans.get(execution.workflow_id), execution.current_step)
+            if next_step is None:
+                orphans.append(execution)
+                continue
+            steps[next_step.id] = next_step
+            by_step[next_step.id].append(execution)
+
+        logs = []
+        advanced = []
+        for step_id, executions in by_step.items():
+            step_logs, step_advanced, step_sent = _send_batch(steps[step_id], executions, plans, now)
+            logs.extend(step_logs)
+            advanced.extend(step_advanced)
+            sent_count += step_sent
+
+        EmailWorkflowStepLog.objects.bulk_create(logs, batch_size=batch_size)
+        if advanced:
+            EmailWorkflowExecution.objects.bulk_update(
+                advanced, ['current_step', 'status', 'completed_at', 'next_due_at'], batch_size=batch_size
+            )
+
+        # Vencidas sin paso aplicable (pasos desactivados o borrados): completar o desprogramar
+        if orphans:
+            schedule_executions(orphans, now=now, plans=plans)
+
+    logger.info(f"Email workflows: {sent_count} emails enviados")
+    return sent_count
@@ -3,6 +3,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 
 from .models import ProductCategory, Product, StockMove
+from .stock import save_product_form
 
 
 @admin.register(ProductCategory)
@@ -101,6 +102,16 @@ class ProductAdmin(admin.ModelAdmin):
 		),
 	)
 	
+	def get_form(self, request, obj=None, **kwargs):
+		form = super().get_form(request, obj, **kwargs)
+		# Detectar el cambio de stock contra el valor mostrado, no contra el actual
+		form.base_fields["stock_quantity"].show_hidden_initial = True
+		return form
+
+	def save_model(self, request, obj, form, change):
+		# El cambio de stock va al libro de movimientos como ADJUSTMENT
+		save_product_form(obj, form.changed_data, user=request.user)
+
 	@admin.display(description=_("Código de Barras"))
 	def display_barcode(self, obj):
 		if obj.barcode:
@@ -1,7 +1,9 @@
 """
 API endpoints para escaneo de códigos de barras y generación de etiquetas.
 """
-from django.http import JsonResponse, HttpResponse
+from functools import lru_cache
+
+from django.http import FileResponse, JsonResponse
 from django.views.decorators.http import require_http_methods, require_GET
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
@@ -130,6 +132,20 @@ def barcode_validate(request):
     return JsonResponse(response)
 
 
+# Configuración por formato de etiqueta
+LABEL_FORMATS = {
+    '30x20': {'width': 30, 'height': 20, 'cols': 6, 'rows': 13},
+    '40x25': {'width': 40, 'height': 25, 'cols': 5, 'rows': 10},
+    '50x30': {'width': 50, 'height': 30, 'cols': 4, 'rows': 9},
+    '70x35': {'width': 70, 'height': 35, 'cols': 2, 'rows': 7},
+}
+
+# Trabajos con más etiquetas se generan en segundo plano (Celery)
+LABELS_SYNC_LIMIT = 500
+LABEL_JOB_TTL = 24 * 3600
+LABEL_JOB_CACHE_KEY = 'label_job:{}'
+
+
 @require_GET
 @require_gym_permission('products.view_product')
 def barcode_labels_pdf(request):
@@ -141,12 +157,19 @@ def barcode_labels_pdf(request):
     Parámetros:
     - ids: IDs de productos separados por coma
     - copies: Número de copias por producto (default: 1)
-    - format: Formato de etiqueta (30x20, 40x25, 50x30)
+    - format: Formato de etiqueta (30x20, 40x25, 50x30, 70x35)
+    
+    Hasta LABELS_SYNC_LIMIT etiquetas se devuelve el PDF directamente. Por
+    encima se encola la generación y se responde 202 con la URL de estado
+    (barcode_labels_job), que incluye el enlace de descarga cuando termina.
     """
-    from io import BytesIO
+    import uuid
+    from django.core.cache import cache
+    from django.urls import reverse
+    from marketing.signals import safe_delay
+    from .tasks import generate_label_sheet_task
     
     ids = request.GET.get('ids', '')
-    copies = int(request.GET.get('copies', 1))
     label_format = request.GET.get('format', '40x25')
     gym = request.gym
     
@@ -154,101 +177,188 @@ def barcode_labels_pdf(request):
         return JsonResponse({'error': 'Se requieren IDs de productos'}, status=400)
     
     try:
+        copies = max(1, int(request.GET.get('copies', 1)))
         product_ids = [int(x.strip()) for x in ids.split(',') if x.strip()]
     except ValueError:
         return JsonResponse({'error': 'IDs inválidos'}, status=400)
     
-    products = Product.objects.filter(gym=gym, id__in=product_ids)
+    product_ids = list(Product.objects.filter(gym=gym, id__in=product_ids).values_list('id', flat=True))
     
-    if not products.exists():
+    if not product_ids:
         return JsonResponse({'error': 'No se encontraron productos'}, status=404)
     
+    if len(product_ids) * copies > LABELS_SYNC_LIMIT:
+        job_id = uuid.uuid4().hex
+        cache.set(LABEL_JOB_CACHE_KEY.format(job_id), {
+            'gym_id': gym.id, 'status': 'PENDING', 'labels': len(product_ids) * copies,
+        }, LABEL_JOB_TTL)
+        if safe_delay(generate_label_sheet_task, job_id, gym.id, product_ids, copies, label_format) is not None:
+            return JsonResponse({
+                'job_id': job_id,
+                'status': 'PENDING',
+                'status_url': reverse('product_labels_job', args=[job_id]),
+            }, status=202)
+        cache.delete(LABEL_JOB_CACHE_KEY.format(job_id))
+        # Sin broker: se genera en la propia request
+    
     # Generar PDF con códigos de barras
     try:
-        pdf_buffer = generate_barcode_labels_pdf(products, copies, label_format)
-        
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="etiquetas_productos.pdf"'
-        return response
+        pdf_file = generate_barcode_labels_pdf(_label_products(gym, product_ids), copies, label_format)
     except ImportError as e:
         return JsonResponse({
             'error': 'Módulo python-barcode no instalado',
-            'install': 'pip install python-barcode[images] reportlab'
+            'install': 'pip install python-barcode reportlab'
         }, status=500)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+    
+    pdf_file.seek(0)
+    return FileResponse(pdf_file, as_attachment=True, filename='etiquetas_productos.pdf', content_type='application/pdf')
+
+
+@require_GET
+@require_gym_permission('products.view_product')
+def barcode_labels_job(request, job_id):
+    """
+    Estado de una hoja de etiquetas generada en segundo plano.
+    
+    GET /products/api/labels/jobs/<job_id>/            -> {"status": "PENDING|DONE|FAILED", ...}
+    GET /products/api/labels/jobs/<job_id>/?download=1 -> PDF (cuando está DONE)
+    """
+    from django.core.cache import cache
+    from django.core.files.storage import default_storage
+    
+    job = cache.get(LABEL_JOB_CACHE_KEY.format(job_id))
+    if not job or job['gym_id'] != request.gym.id:
+        return JsonResponse({'error': 'Trabajo no encontrado'}, status=404)
+    
+    if job['status'] == 'DONE' and request.GET.get('download'):
+        return FileResponse(
+            default_storage.open(job['path'], 'rb'),
+            as_attachment=True, filename='etiquetas_productos.pdf', content_type='application/pdf',
+        )
+    
+    response = {'job_id': job_id, 'status': job['status'], 'labels': job.get('labels')}
+    if job['status'] == 'DONE':
+        response['download_url'] = f"{request.path}?download=1"
+    if job.get('error'):
+        response['error'] = job['error']
+    return JsonResponse(response)
+
+
+def _label_products(gym, product_ids):
+    """Productos de la hoja con lo necesario para el precio final (sin N+1)."""
+    return (
+        Product.objects.filter(gym=gym, id__in=product_ids)
+        .select_related('tax_rate')
+        .prefetch_related('additional_tax_rates')
+        .order_by('name', 'pk')
+    )
+
+
+def _barcode_symbology(product):
+    """Simbología según el código del producto."""
+    if product.barcode and len(product.barcode) == 13:
+        return 'ean13'
+    if product.barcode and len(product.barcode) == 8:
+        return 'ean8'
+    return 'code128'
+
+
+@lru_cache(maxsize=4096)
+def barcode_geometry(code, symbology):
+    """
+    Geometría de las barras de un código, memorizada por (código, simbología):
+    (número total de módulos, ((módulo inicial, anchura en módulos), ...)).
+    None si el código no es válido para la simbología.
+    """
+    try:
+        import barcode
+    except ImportError:
+        raise ImportError("Instalar: pip install python-barcode")
+    
+    try:
+        modules = ''.join(barcode.get_barcode_class(symbology)(code).build())
+    except Exception:
+        return None
+    
+    bars = []
+    start = None
+    for i, module in enumerate(modules):
+        if module == '1' and start is None:
+            start = i
+        elif module != '1' and start is not None:
+            bars.append((start, i - start))
+            start = None
+    if start is not None:
+        bars.append((start, len(modules) - start))
+    return len(modules), tuple(bars)
 
 
-def generate_barcode_labels_pdf(products, copies=1, label_format='40x25'):
+def generate_barcode_labels_pdf(products, copies=1, label_format='40x25', output=None):
     """
     Genera un PDF con etiquetas de códigos de barras.
-    Requiere: pip install python-barcode[images] reportlab
+    
+    Cada producto distinto se dibuja una sola vez como Form XObject vectorial
+    (barras como rectángulos, sin imágenes) y cada copia lo referencia con
+    doForm, así que el coste no crece con el número de copias.
+    
+    `output`: fichero donde escribir (por defecto un temporal en disco).
+    Requiere: pip install python-barcode reportlab
     """
-    from io import BytesIO
+    import tempfile
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import mm
     from reportlab.pdfgen import canvas
-    from reportlab.lib import colors
     
-    try:
-        import barcode
-        from barcode.writer import ImageWriter
-    except ImportError:
-        raise ImportError("Instalar: pip install python-barcode[images]")
-    
-    # Configuración por formato
-    formats = {
-        '30x20': {'width': 30*mm, 'height': 20*mm, 'cols': 6, 'rows': 13},
-        '40x25': {'width': 40*mm, 'height': 25*mm, 'cols': 5, 'rows': 10},
-        '50x30': {'width': 50*mm, 'height': 30*mm, 'cols': 4, 'rows': 9},
-        '70x35': {'width': 70*mm, 'height': 35*mm, 'cols': 2, 'rows': 7},
-    }
+    config = LABEL_FORMATS.get(label_format, LABEL_FORMATS['40x25'])
+    width, height = config['width'] * mm, config['height'] * mm
+    cols, rows = config['cols'], config['rows']
     
-    config = formats.get(label_format, formats['40x25'])
-    
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
+    output = output if output is not None else tempfile.TemporaryFile()
+    c = canvas.Canvas(output, pagesize=A4, pageCompression=1)
     page_width, page_height = A4
     
     # Calcular márgenes para centrar
-    total_width = config['cols'] * config['width']
-    total_height = config['rows'] * config['height']
-    margin_x = (page_width - total_width) / 2
-    margin_y = (page_height - total_height) / 2
+    margin_x = (page_width - cols * width) / 2
+    margin_y = (page_height - rows * height) / 2
+    labels_per_page = cols * rows
     
-    labels = []
+    idx = 0
     for product in products:
-        for _ in range(copies):
-            labels.append(product)
-    
-    labels_per_page = config['cols'] * config['rows']
-    
-    for page_num, start_idx in enumerate(range(0, len(labels), labels_per_page)):
-        if page_num > 0:
-            c.showPage()
+        form_name = f'label{product.pk}'
+        c.beginForm(form_name, lowerx=0, lowery=0, upperx=width, uppery=height)
+        _draw_label_content(c, product, width, height)
+        c.endForm()
         
-        page_labels = labels[start_idx:start_idx + labels_per_page]
-        
-        for idx, product in enumerate(page_labels):
-            row = idx // config['cols']
-            col = idx % config['cols']
-            
-            x = margin_x + col * config['width']
-            y = page_height - margin_y - (row + 1) * config['height']
+        for _ in range(copies):
+            if idx and idx % labels_per_page == 0:
+                c.showPage()
+            slot = idx % labels_per_page
+            row, col = slot // cols, slot % cols
             
-            # Dibujar etiqueta
-            draw_label(c, product, x, y, config['width'], config['height'])
+            c.saveState()
+            c.translate(margin_x + col * width, page_height - margin_y - (row + 1) * height)
+            c.doForm(form_name)
+            c.restoreState()
+            idx += 1
     
     c.save()
-    buffer.seek(0)
-    return buffer
+    return output
 
 
 def draw_label(canvas, product, x, y, width, height):
     """Dibuja una etiqueta individual."""
+    canvas.saveState()
+    canvas.translate(x, y)
+    _draw_label_content(canvas, product, width, height)
+    canvas.restoreState()
+
+
+def _draw_label_content(canvas, product, width, height):
+    """Contenido de una etiqueta con origen en su esquina inferior izquierda."""
     from reportlab.lib.units import mm
     from reportlab.lib import colors
-    from io import BytesIO
     
     padding = 2*mm
     
@@ -264,62 +374,39 @@ def draw_label(canvas, product, x, y, width, height):
     # Dibujar borde (opcional, para corte)
     canvas.setStrokeColor(colors.lightgrey)
     canvas.setLineWidth(0.5)
-    canvas.rect(x, y, width, height)
+    canvas.rect(0, 0, width, height)
     
     # Nombre del producto
     canvas.setFillColor(colors.black)
     canvas.setFont("Helvetica-Bold", 7)
-    canvas.drawString(x + padding, y + height - 4*mm, name)
+    canvas.drawString(padding, height - 4*mm, name)
     
-    # Código de barras como imagen
-    try:
-        import barcode
-        from barcode.writer import ImageWriter
-        from PIL import Image
-        
-        # Determinar tipo de código de barras
-        if product.barcode and len(product.barcode) == 13:
-            barcode_class = barcode.get_barcode_class('ean13')
-        elif product.barcode and len(product.barcode) == 8:
-            barcode_class = barcode.get_barcode_class('ean8')
-        else:
-            barcode_class = barcode.get_barcode_class('code128')
-        
-        # Generar imagen del código de barras
-        bc = barcode_class(code, writer=ImageWriter())
-        
-        bc_buffer = BytesIO()
-        bc.write(bc_buffer, options={
-            'write_text': False,
-            'module_height': 8,
-            'module_width': 0.3,
-            'quiet_zone': 1
-        })
-        bc_buffer.seek(0)
-        
-        # Insertar imagen
-        from reportlab.lib.utils import ImageReader
-        img = ImageReader(bc_buffer)
-        
+    # Código de barras vectorial: un path con un rectángulo por barra
+    geometry = barcode_geometry(code, _barcode_symbology(product))
+    if geometry is None and _barcode_symbology(product) != 'code128':
+        geometry = barcode_geometry(code, 'code128')
+    
+    if geometry:
+        total_modules, bars = geometry
         bc_width = width - 2*padding
         bc_height = height * 0.45
-        bc_x = x + padding
-        bc_y = y + 5*mm
-        
-        canvas.drawImage(img, bc_x, bc_y, width=bc_width, height=bc_height, preserveAspectRatio=True)
-        
-    except Exception as e:
+        module = bc_width / total_modules
+        path = canvas.beginPath()
+        for start, size in bars:
+            path.rect(padding + start * module, 5*mm, size * module, bc_height)
+        canvas.drawPath(path, stroke=0, fill=1)
+    else:
         # Si falla el código de barras, mostrar el código como texto
         canvas.setFont("Courier", 8)
-        canvas.drawCentredString(x + width/2, y + height/2, code)
+        canvas.drawCentredString(width/2, height/2, code)
     
     # Código en texto
     canvas.setFont("Courier", 6)
-    canvas.drawCentredString(x + width/2, y + 3*mm, code)
+    canvas.drawCentredString(width/2, 3*mm, code)
     
     # Precio
     canvas.setFont("Helvetica-Bold", 9)
-    canvas.drawRightString(x + width - padding, y + height - 4*mm, price)
+    canvas.drawRightString(width - padding, height - 4*mm, price)
 
 
 @require_http_methods(["POST"])
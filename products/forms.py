@@ -1,5 +1,6 @@
 from django import forms
 from .models import Product, ProductCategory, detect_barcode_type, validate_ean13, validate_ean8
+from .stock import save_product_form
 from finance.models import TaxRate
 from organizations.models import Gym
 
@@ -122,6 +123,10 @@ class ProductForm(forms.ModelForm):
         
         # Guardar gym para validación de barcode
         self._gym = gym
+        self._user = user
+        # changed_data compara con el stock que vio el usuario, no con el actual:
+        # si no lo toca, las ventas hechas mientras editaba no se deshacen
+        self.fields['stock_quantity'].show_hidden_initial = True
         
         if gym:
             self.fields['category'].queryset = ProductCategory.objects.filter(gym=gym)
@@ -148,3 +153,11 @@ class ProductForm(forms.ModelForm):
                         self.initial['propagate_to_gyms'] = gyms_with_product
             else:
                 del self.fields['propagate_to_gyms']
+
+    def save(self, commit=True):
+        # El stock no se guarda con la ficha: el cambio va al libro como ADJUSTMENT
+        product = super().save(commit=False)
+        if commit:
+            save_product_form(product, self.changed_data, user=self._user)
+            self.save_m2m()
+        return product
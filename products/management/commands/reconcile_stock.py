@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from products.stock import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = 'Concilia el stock de los productos con la suma de sus movimientos (StockMove)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', type=int, help='ID del gimnasio (por defecto, todos)')
+        parser.add_argument(
+            '--fix', choices=['ledger', 'stock'],
+            help='ledger: registrar un ajuste por la diferencia; stock: recalcular el stock desde los movimientos',
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile_stock(gym_id=options['gym'], fix=options['fix'])
+        for product_id, stock, total in drift:
+            self.stdout.write(f'Producto {product_id}: stock {stock}, movimientos {total} ({stock - total:+d})')
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('✅ Stock conciliado'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(drift)} productos corregidos ({options['fix']})"))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(drift)} productos con diferencias (usa --fix)'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_additional_tax_rates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock_quantity__lte', models.F('low_stock_threshold')), ('track_stock', True)), fields=['gym'], name='product_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0107_gym_monthly_revenue'),
+        ('products', '0006_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmove',
+            name='order',
+            field=models.ForeignKey(blank=True, help_text='Ticket del TPV que originó el movimiento (ventas y devoluciones)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_moves', to='sales.order'),
+        ),
+    ]
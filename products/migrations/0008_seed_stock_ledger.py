@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+
+def seed_stock_ledger(apps, schema_editor):
+    """
+    Abre el libro de stock: un ADJUSTMENT por la diferencia entre el stock
+    actual y la suma de movimientos de cada producto con control de stock
+    (stock inicial y ediciones desde la ficha anteriores al libro), para que
+    la conciliación semanal parta de cero descuadres.
+    """
+    Product = apps.get_model('products', 'Product')
+    StockMove = apps.get_model('products', 'StockMove')
+
+    drift = (
+        Product.objects.filter(track_stock=True)
+        .annotate(ledger_total=Coalesce(Sum('stock_moves__quantity_change'), 0))
+        .exclude(stock_quantity=F('ledger_total'))
+        .values_list('pk', 'stock_quantity', 'ledger_total')
+    )
+    batch = []
+    for pk, stock, total in drift.iterator(chunk_size=2000):
+        batch.append(StockMove(
+            product_id=pk,
+            quantity_change=stock - total,
+            reason='ADJUSTMENT',
+            notes='Saldo inicial del libro de stock',
+        ))
+        if len(batch) >= 2000:
+            StockMove.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        StockMove.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_stockmove_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_stock_ledger, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from organizations.models import Gym
@@ -270,6 +272,12 @@ class Product(models.Model):
             models.Index(fields=['gym', 'barcode']),
             models.Index(fields=['gym', 'sku']),
             models.Index(fields=['gym', 'is_active']),
+            # Pantallas de reposición: solo las filas bajo el umbral (ver products.stock)
+            models.Index(
+                fields=['gym'],
+                name='product_low_stock_idx',
+                condition=models.Q(track_stock=True, stock_quantity__lte=F('low_stock_threshold')),
+            ),
         ]
 
     def __str__(self):
@@ -371,12 +379,25 @@ class StockMove(models.Model):
     quantity_change = models.IntegerField(_("Cambio (+/-)"))
     reason = models.CharField(max_length=20, choices=REASONS)
     notes = models.CharField(max_length=255, blank=True)
+    order = models.ForeignKey(
+        'sales.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_moves',
+        help_text=_("Ticket del TPV que originó el movimiento (ventas y devoluciones)")
+    )
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def save(self, *args, **kwargs):
-        # Update product stock on save
-        if not self.pk: # Only on creation
-            self.product.stock_quantity += self.quantity_change
-            self.product.save()
+        # Aplicar el movimiento al stock del producto (UPDATE atómico, solo al crear).
+        # Para varios movimientos a la vez usar products.stock.apply_stock_moves.
+        if not self.pk:
+            with transaction.atomic():
+                Product.objects.filter(pk=self.product_id).update(
+                    stock_quantity=F('stock_quantity') + self.quantity_change,
+                    updated_at=timezone.now(),
+                )
+                super().save(*args, **kwargs)
+            self.product.refresh_from_db(fields=['stock_quantity', 'updated_at'])
+            from .services import invalidate_product_cache
+            invalidate_product_cache(self.product.gym_id)
+            return
         super().save(*args, **kwargs)
@@ -0,0 +1,231 @@
+"""
+Libro de stock de productos.
+
+Todos los cambios de stock se registran como StockMove y se aplican al
+producto con UPDATE atómicos (F()), nunca leyendo y guardando la fila entera:
+
+- apply_stock_moves(moves): aplica todos los movimientos de una operación
+  (p. ej. las líneas de un ticket) en un único bloque: bloquea los productos
+  ordenados por id (sin deadlocks entre terminales), un solo UPDATE con los
+  deltas agregados por producto y bulk_create de los StockMove.
+- record_sale(order, lines): movimientos SALE de un ticket del TPV.
+- record_return(order): devuelve al stock lo que el ticket sacó (cancelación
+  o devolución total); idempotente.
+- save_product_form(product, changed_data): guarda la ficha de un producto
+  (backoffice o admin) y registra el cambio de stock como ADJUSTMENT.
+- low_stock_products(gym): productos por debajo del umbral de aviso (índice
+  parcial product_low_stock_idx).
+- reconcile_stock(): comprueba stock_quantity == suma de movimientos.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMove
+from .services import invalidate_product_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_caches(gym_ids):
+    """Caché del catálogo online (incluye el stock) de los gimnasios afectados."""
+    for gym_id in gym_ids:
+        if gym_id:
+            invalidate_product_cache(gym_id)
+
+
+def apply_stock_moves(moves):
+    """
+    Aplica una lista de StockMove sin guardar. Solo cuentan los productos con
+    control de stock; los movimientos del resto se descartan.
+    Devuelve los StockMove creados.
+    """
+    deltas = defaultdict(int)
+    for move in moves:
+        deltas[move.product_id] += move.quantity_change
+    if not deltas:
+        return []
+
+    with transaction.atomic():
+        # Bloqueo en orden de id: dos ventas con los mismos productos no se cruzan
+        locked = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=deltas, track_stock=True)
+            .order_by('pk')
+            .values_list('pk', 'gym_id')
+        )
+        if not locked:
+            return []
+
+        changes = [When(pk=pk, then=Value(deltas[pk])) for pk in locked if deltas[pk]]
+        if changes:
+            Product.objects.filter(pk__in=locked).update(
+                stock_quantity=F('stock_quantity') + Case(*changes, default=Value(0), output_field=IntegerField()),
+                updated_at=timezone.now(),
+            )
+        created = StockMove.objects.bulk_create([move for move in moves if move.product_id in locked])
+
+        gym_ids = set(locked.values())
+        transaction.on_commit(lambda: _invalidate_caches(gym_ids))
+    return created
+
+
+def record_sale(order, lines, user=None):
+    """
+    Descuenta el stock de un ticket. `lines` es un iterable de
+    (product_id, cantidad vendida).
+    """
+    return apply_stock_moves([
+        StockMove(
+            product_id=product_id,
+            quantity_change=-qty,
+            reason='SALE',
+            notes=f"Ticket #{order.id}",
+            order=order,
+            created_by=user,
+        )
+        for product_id, qty in lines
+        if qty
+    ])
+
+
+def record_return(order, user=None):
+    """
+    Devuelve al stock lo que el ticket sacó y aún no ha vuelto (SALE menos
+    RETURN de sus movimientos). Llamarlo dos veces no duplica nada; los
+    tickets anteriores al libro de stock no tienen movimientos y no devuelven
+    nada.
+    """
+    outstanding = (
+        StockMove.objects.filter(order=order, reason__in=('SALE', 'RETURN'))
+        .values('product_id').annotate(total=Sum('quantity_change'))
+    )
+    return apply_stock_moves([
+        StockMove(
+            product_id=row['product_id'],
+            quantity_change=-row['total'],
+            reason='RETURN',
+            notes=f"Ticket #{order.id}",
+            order=order,
+            created_by=user,
+        )
+        for row in outstanding
+        if row['total'] < 0
+    ])
+
+
+def set_stock(product, quantity, user=None, notes='Ajuste manual'):
+    """
+    Deja el stock de un producto en `quantity` con un movimiento ADJUSTMENT
+    por la diferencia con el stock actual (leído con la fila bloqueada).
+    Sin control de stock se guarda el valor tal cual, sin movimiento.
+    """
+    with transaction.atomic():
+        current = (
+            Product.objects.select_for_update().filter(pk=product.pk)
+            .values_list('stock_quantity', flat=True).get()
+        )
+        if not product.track_stock:
+            Product.objects.filter(pk=product.pk).update(stock_quantity=quantity, updated_at=timezone.now())
+        elif quantity != current:
+            apply_stock_moves([StockMove(
+                product_id=product.pk,
+                quantity_change=quantity - current,
+                reason='ADJUSTMENT',
+                notes=notes,
+                created_by=user,
+            )])
+    product.refresh_from_db(fields=['stock_quantity', 'updated_at'])
+
+
+def save_product_form(product, changed_data, user=None):
+    """
+    Guarda un producto editado en un formulario sin escribir stock_quantity
+    con el resto de la ficha (pisaría las ventas hechas mientras se editaba).
+    Si el formulario cambia el stock, la diferencia queda en el libro como
+    ADJUSTMENT; el stock inicial de un producto nuevo también.
+    """
+    requested = product.stock_quantity
+    if product.pk is None:
+        product.stock_quantity = 0
+        product.save()
+    else:
+        product.save(update_fields=[
+            field.name for field in product._meta.concrete_fields
+            if not field.primary_key and field.name != 'stock_quantity'
+        ])
+    if 'stock_quantity' in changed_data:
+        set_stock(product, requested, user=user, notes='Ajuste desde la ficha del producto')
+    else:
+        product.refresh_from_db(fields=['stock_quantity'])
+    return product
+
+
+def low_stock_products(gym):
+    """Productos con stock controlado en o por debajo de su umbral de aviso."""
+    return Product.objects.filter(
+        gym=gym, track_stock=True, stock_quantity__lte=F('low_stock_threshold')
+    )
+
+
+def _ledger_total():
+    """Suma de los movimientos del producto de la consulta exterior."""
+    ledger = StockMove.objects.filter(product=OuterRef('pk')).values('product').annotate(
+        total=Sum('quantity_change')
+    ).values('total')
+    return Coalesce(Subquery(ledger), 0)
+
+
+def find_stock_drift(gym_id=None):
+    """
+    [(product_id, stock_quantity, total del libro)] de los productos cuyo
+    stock no coincide con la suma de sus movimientos.
+    """
+    products = Product.objects.filter(track_stock=True).annotate(
+        ledger_total=_ledger_total()
+    ).exclude(stock_quantity=F('ledger_total'))
+    if gym_id is not None:
+        products = products.filter(gym_id=gym_id)
+    return list(products.order_by('pk').values_list('pk', 'stock_quantity', 'ledger_total'))
+
+
+def reconcile_stock(gym_id=None, fix=None, user=None):
+    """
+    Concilia stock_quantity con el libro de movimientos.
+
+    fix=None     -> solo informa (devuelve las diferencias)
+    fix='ledger' -> el stock actual manda: crea un ADJUSTMENT por la diferencia
+                    (stock inicial o editado a mano desde la ficha)
+    fix='stock'  -> el libro manda: stock_quantity = suma de movimientos
+    """
+    drift = find_stock_drift(gym_id)
+    if not drift:
+        return drift
+
+    if fix == 'ledger':
+        StockMove.objects.bulk_create([
+            StockMove(
+                product_id=pk,
+                quantity_change=stock - total,
+                reason='ADJUSTMENT',
+                notes='Conciliación de stock',
+                created_by=user,
+            )
+            for pk, stock, total in drift
+        ])
+    elif fix == 'stock':
+        ids = [pk for pk, _, _ in drift]
+        with transaction.atomic():
+            gym_ids = set(
+                Product.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('gym_id', flat=True)
+            )
+            # La suma se recalcula dentro del UPDATE (incluye ventas posteriores a la comprobación)
+            Product.objects.filter(pk__in=ids).update(stock_quantity=_ledger_total(), updated_at=timezone.now())
+            transaction.on_commit(lambda: _invalidate_caches(gym_ids))
+
+    logger.info(f"Conciliación de stock: {len(drift)} productos con diferencias (fix={fix})")
+    return drift
@@ -0,0 +1,76 @@
+"""
+Tareas Celery de productos.
+"""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='products.reconcile_stock')
+def reconcile_stock_task():
+    """
+    Comprueba que stock_quantity coincide con la suma de StockMove en todos
+    los productos. Solo informa: la corrección se hace con el comando
+    reconcile_stock --fix.
+    """
+    from products.stock import reconcile_stock
+
+    drift = reconcile_stock()
+    if drift:
+        logger.warning(
+            f"Stock descuadrado en {len(drift)} productos",
+            extra={'products': [product_id for product_id, _, _ in drift[:50]]},
+        )
+    return len(drift)
+
+
+@shared_task(name='products.generate_label_sheet')
+def generate_label_sheet_task(job_id, gym_id, product_ids, copies, label_format):
+    """
+    Genera en segundo plano una hoja de etiquetas grande y la deja en el
+    storage; el estado del trabajo vive en caché (products.barcode_api).
+    """
+    from datetime import timedelta
+
+    from django.core.cache import cache
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+    from django.utils import timezone
+
+    from products.barcode_api import (
+        LABEL_JOB_CACHE_KEY, LABEL_JOB_TTL, _label_products, generate_barcode_labels_pdf,
+    )
+
+    key = LABEL_JOB_CACHE_KEY.format(job_id)
+    job = cache.get(key) or {'gym_id': gym_id}
+    directory = f'labels/{gym_id}'
+
+    # Hojas anteriores ya caducadas
+    try:
+        _, files = default_storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        files = []
+    expired = timezone.now() - timedelta(seconds=LABEL_JOB_TTL)
+    for name in files:
+        try:
+            if default_storage.get_modified_time(f'{directory}/{name}') < expired:
+                default_storage.delete(f'{directory}/{name}')
+        except (OSError, NotImplementedError):
+            continue
+
+    try:
+        from organizations.models import Gym
+
+        gym = Gym.objects.get(pk=gym_id)
+        with generate_barcode_labels_pdf(_label_products(gym, product_ids), copies, label_format) as pdf_file:
+            pdf_file.seek(0)
+            path = default_storage.save(f'{directory}/{job_id}.pdf', File(pdf_file))
+    except Exception as e:
+        logger.exception(f"Error generando etiquetas ({job_id})")
+        cache.set(key, {**job, 'status': 'FAILED', 'error': str(e)}, LABEL_JOB_TTL)
+        return {'job_id': job_id, 'status': 'FAILED'}
+
+    cache.set(key, {**job, 'status': 'DONE', 'path': path}, LABEL_JOB_TTL)
+    return {'job_id': job_id, 'status': 'DONE'}
@@ -17,6 +17,7 @@ urlpatterns = [
     path('api/scan/', barcode_api.barcode_scan, name='product_barcode_scan'),
     path('api/barcode/validate/', barcode_api.barcode_validate, name='product_barcode_validate'),
     path('api/labels/pdf/', barcode_api.barcode_labels_pdf, name='product_labels_pdf'),
+    path('api/labels/jobs/<str:job_id>/', barcode_api.barcode_labels_job, name='product_labels_job'),
     path('api/quick-create/', barcode_api.quick_create_from_scan, name='product_quick_create'),
     path('api/without-barcode/', barcode_api.products_without_barcode, name='products_without_barcode'),
 ]
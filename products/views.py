@@ -4,6 +4,7 @@ from accounts.decorators import require_gym_permission
 from django.contrib import messages
 from .models import Product, ProductCategory
 from .forms import ProductForm, ProductCategoryForm
+from .stock import low_stock_products
 from services.franchise_service import FranchisePropagationService
 
 # --- Products ---
@@ -12,8 +13,13 @@ from services.franchise_service import FranchisePropagationService
 @require_gym_permission('products.view_product')
 def product_list(request):
     gym = request.gym
-    products = Product.objects.filter(gym=gym).select_related('category')
-    return render(request, 'backoffice/products/list.html', {'products': products})
+    low_stock = request.GET.get('stock') == 'low'
+    if low_stock:
+        # Reposición: usa el índice parcial de stock bajo
+        products = low_stock_products(gym).select_related('category').order_by('stock_quantity')
+    else:
+        products = Product.objects.filter(gym=gym).select_related('category')
+    return render(request, 'backoffice/products/list.html', {'products': products, 'low_stock': low_stock})
 
 @login_required
 @require_gym_permission('products.add_product')
@@ -22,9 +28,8 @@ def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, gym=gym, user=request.user)
         if form.is_valid():
-            product = form.save(commit=False)
-            product.gym = gym
-            product.save()
+            form.instance.gym = gym
+            product = form.save()
             
             # Handle Propagation
             if 'propagate_to_gyms' in form.fields and form.cleaned_data.get('propagate_to_gyms'):
@@ -5,3 +5,6 @@ class PublicPortalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'public_portal'
     verbose_name = 'Portal Público'
+
+    def ready(self):
+        import public_portal.signals  # noqa
@@ -0,0 +1,283 @@
+"""
+Recursos PWA de cada gimnasio: iconos, manifest y service worker.
+
+Los iconos se dibujan una sola vez por combinación de logo y color de marca
+y se guardan en el almacenamiento de media con el hash en la ruta:
+
+    pwa_icons/<gym_id>/<versión>/icon-<tamaño>.png
+
+La versión sale del logo y del color, así que no hace falta consultar nada
+para saber si un icono ha cambiado: las vistas la usan como ETag (304 sin
+abrir el logo) y el manifest enlaza los iconos con `?v=<versión>`, que se
+sirven con caché inmutable.
+
+Se generan en segundo plano al guardar el gimnasio (public_portal.signals)
+y, si aún no existen (primer acceso tras desplegar), en la primera petición
+que los pide.
+"""
+import hashlib
+import json
+import logging
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+ICON_SIZES = (16, 32, 72, 96, 128, 144, 152, 192, 384, 512)
+MANIFEST_ICON_SIZES = (72, 96, 128, 144, 152, 192, 384, 512)
+MASKABLE_SIZES = (192, 512)
+DEFAULT_ICON_SIZE = 192
+
+# Subir al cambiar el dibujo de los iconos para regenerar los existentes
+RENDER_VERSION = 1
+DEFAULT_BRAND_COLOR = '#0f172a'
+LOGO_SCALE = 0.7
+
+ICONS_ROOT = 'pwa_icons/{}'
+READY_CACHE_KEY = 'pwa_icons_ready:{}:{}'
+RENDER_LOCK_KEY = 'pwa_icons_render:{}:{}'
+
+# Campos del gimnasio que necesitan el manifest, los iconos y el service worker
+GYM_FIELDS = ('id', 'slug', 'name', 'commercial_name', 'brand_color', 'logo')
+
+
+def assets_version(gym):
+    """Versión de los iconos del gimnasio (None si no tiene logo)."""
+    if not gym.logo:
+        return None
+    source = f"{RENDER_VERSION}|{gym.logo.name}|{gym.brand_color or DEFAULT_BRAND_COLOR}"
+    return hashlib.sha256(source.encode()).hexdigest()[:12]
+
+
+def icon_path(gym_id, version, size):
+    return f"{ICONS_ROOT.format(gym_id)}/{version}/icon-{size}.png"
+
+
+def _brand_rgb(color):
+    try:
+        value = (color or DEFAULT_BRAND_COLOR).lstrip('#')
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return _brand_rgb(DEFAULT_BRAND_COLOR)
+
+
+def render_icons(gym):
+    """
+    Dibuja todos los tamaños (logo centrado sobre el color de marca) y los
+    guarda. El logo se abre y se escala una vez; cada tamaño parte de esa
+    copia. Devuelve la versión generada.
+    """
+    from PIL import Image
+
+    version = assets_version(gym)
+    with gym.logo.open('rb') as logo_file:
+        logo = Image.open(logo_file)
+        logo.load()
+    if logo.mode != 'RGBA':
+        logo = logo.convert('RGBA')
+    largest = int(max(ICON_SIZES) * LOGO_SCALE)
+    logo.thumbnail((largest, largest), Image.Resampling.LANCZOS)
+    background_color = (*_brand_rgb(gym.brand_color), 255)
+
+    # De menor a mayor: el icono más grande marca que la versión está completa
+    for size in ICON_SIZES:
+        scaled = logo.copy()
+        scaled.thumbnail((int(size * LOGO_SCALE), int(size * LOGO_SCALE)), Image.Resampling.LANCZOS)
+        icon = Image.new('RGBA', (size, size), background_color)
+        icon.paste(scaled, ((size - scaled.width) // 2, (size - scaled.height) // 2), scaled)
+        buffer = BytesIO()
+        icon.save(buffer, format='PNG', optimize=True)
+
+        path = icon_path(gym.id, version, size)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(buffer.getvalue()))
+
+    _delete_old_versions(gym.id, version)
+    cache.set(READY_CACHE_KEY.format(gym.id, version), True, None)
+    logger.info(f"Iconos PWA generados para el gimnasio {gym.id} ({version})")
+    return version
+
+
+def _delete_old_versions(gym_id, version):
+    root = ICONS_ROOT.format(gym_id)
+    try:
+        directories, _ = default_storage.listdir(root)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for directory in directories:
+        if directory == version:
+            continue
+        try:
+            _, files = default_storage.listdir(f"{root}/{directory}")
+            for name in files:
+                default_storage.delete(f"{root}/{directory}/{name}")
+        except (OSError, NotImplementedError):
+            continue
+
+
+def icons_ready(gym, version=None):
+    """True si los iconos de la versión actual ya están en el almacenamiento."""
+    version = version or assets_version(gym)
+    if not version:
+        return False
+    key = READY_CACHE_KEY.format(gym.id, version)
+    if cache.get(key):
+        return True
+    if default_storage.exists(icon_path(gym.id, version, max(ICON_SIZES))):
+        cache.set(key, True, None)
+        return True
+    return False
+
+
+def ensure_icons(gym):
+    """
+    Versión de los iconos del gimnasio, generándolos si faltan. None si no
+    tiene logo, si no se pueden generar o si otra petición los está generando.
+    """
+    version = assets_version(gym)
+    if not version or icons_ready(gym, version):
+        return version
+    lock = RENDER_LOCK_KEY.format(gym.id, version)
+    if not cache.add(lock, True, 60):
+        return None
+    try:
+        return render_icons(gym)
+    except Exception as e:
+        logger.warning(f"No se pudieron generar los iconos PWA del gimnasio {gym.id}: {e}")
+        return None
+    finally:
+        cache.delete(lock)
+
+
+def icon_url(gym, size, version):
+    """URL versionada de un icono (genérico si el gimnasio no tiene iconos propios)."""
+    if not version:
+        return f"/static/icons/icon-{size}x{size}.png"
+    url = reverse('gym_pwa_icon', kwargs={'slug': gym.slug, 'size': size})
+    return f"{url}?v={version}"
+
+
+def content_etag(content):
+    return '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+
+
+def build_manifest(gym):
+    """manifest.json del gimnasio, con nombre, colores e iconos propios."""
+    gym_name = gym.commercial_name or gym.name
+    short_name = gym_name[:12] if len(gym_name) > 12 else gym_name
+    base_url = reverse('public_gym_home', kwargs={'slug': gym.slug})
+    version = assets_version(gym) if icons_ready(gym) else None
+
+    icons = []
+    for size in MANIFEST_ICON_SIZES:
+        icon = {"src": icon_url(gym, size, version), "sizes": f"{size}x{size}", "type": "image/png"}
+        if size in MASKABLE_SIZES:
+            icon["purpose"] = "any maskable"
+        icons.append(icon)
+
+    manifest = {
+        "name": f"{gym_name} - Portal Cliente",
+        "short_name": short_name,
+        "description": f"Accede a {gym_name} desde tu móvil",
+        "start_url": base_url,
+        "display": "standalone",
+        "background_color": "#f8fafc",
+        "theme_color": gym.brand_color or DEFAULT_BRAND_COLOR,
+        "orientation": "portrait-primary",
+        "scope": base_url,
+        "icons": icons,
+        "shortcuts": [
+            {
+                "name": "Horario",
+                "short_name": "Horario",
+                "description": "Ver horario de clases",
+                "url": f"{base_url}schedule/",
+                "icons": [{"src": "/static/icons/icon-96x96.png", "sizes": "96x96"}]
+            },
+            {
+                "name": "Mi Perfil",
+                "short_name": "Perfil",
+                "description": "Ver mi perfil",
+                "url": f"{base_url}profile/",
+                "icons": [{"src": "/static/icons/icon-96x96.png", "sizes": "96x96"}]
+            }
+        ]
+    }
+    return json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+SERVICE_WORKER_TEMPLATE = '''
+// Service Worker para {gym_name}
+const CACHE_NAME = 'gym-{slug}-{version}';
+const urlsToCache = [
+    '/gym/{slug}/',
+    '/gym/{slug}/schedule/',
+    '/gym/{slug}/profile/',
+    '{icon}',
+];
+
+// Instalación
+self.addEventListener('install', function(event) {{
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(function(cache) {{
+                return cache.addAll(urlsToCache);
+            }})
+    );
+}});
+
+// Fetch con estrategia Network First
+self.addEventListener('fetch', function(event) {{
+    event.respondWith(
+        fetch(event.request)
+            .then(function(response) {{
+                // Si es exitoso, cachear y devolver
+                if (response && response.status === 200) {{
+                    const responseClone = response.clone();
+                    caches.open(CACHE_NAME).then(function(cache) {{
+                        cache.put(event.request, responseClone);
+                    }});
+                }}
+                return response;
+            }})
+            .catch(function() {{
+                // Si falla, buscar en cache
+                return caches.match(event.request);
+            }})
+    );
+}});
+
+// Activación - limpiar caches antiguas
+self.addEventListener('activate', function(event) {{
+    event.waitUntil(
+        caches.keys().then(function(cacheNames) {{
+            return Promise.all(
+                cacheNames.filter(function(cacheName) {{
+                    return cacheName.startsWith('gym-{slug}-') && cacheName !== CACHE_NAME;
+                }}).map(function(cacheName) {{
+                    return caches.delete(cacheName);
+                }})
+            );
+        }})
+    );
+}});
+'''
+
+
+def build_service_worker(gym):
+    """
+    Service worker del gimnasio. El nombre de la caché lleva la versión de
+    los iconos: al cambiar el logo se descarta la caché anterior.
+    """
+    version = assets_version(gym) if icons_ready(gym) else None
+    return SERVICE_WORKER_TEMPLATE.format(
+        gym_name=gym.commercial_name or gym.name,
+        slug=gym.slug,
+        version=version or 'v1',
+        icon=icon_url(gym, DEFAULT_ICON_SIZE, version),
+    ).encode('utf-8')
@@ -0,0 +1,20 @@
+"""
+Signals del portal público: regeneración en segundo plano de los iconos PWA
+cuando cambia el logo o el color de marca del gimnasio.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender='organizations.Gym')
+def render_pwa_icons_on_gym_change(sender, instance, raw=False, **kwargs):
+    if raw or not instance.logo:
+        return
+    from marketing.signals import safe_delay
+    from .pwa_assets import icons_ready
+    from .tasks import render_pwa_icons
+
+    # La versión depende del logo y del color: si ya existe no hay nada que dibujar
+    if not icons_ready(instance):
+        transaction.on_commit(lambda: safe_delay(render_pwa_icons, instance.id))
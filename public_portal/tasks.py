@@ -0,0 +1,17 @@
+"""
+Tareas Celery del portal público.
+"""
+from celery import shared_task
+
+
+@shared_task(name='public_portal.render_pwa_icons')
+def render_pwa_icons(gym_id):
+    """Genera los iconos PWA del gimnasio si aún no existen para su logo y color actuales."""
+    from organizations.models import Gym
+
+    from .pwa_assets import ensure_icons
+
+    gym = Gym.objects.filter(pk=gym_id).first()
+    if gym is None or not gym.logo:
+        return None
+    return ensure_icons(gym)
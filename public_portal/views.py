@@ -14,10 +14,12 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse
 from django_ratelimit.decorators import ratelimit
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.utils.cache import get_conditional_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,7 @@ from clients.models import Client, ClientMembership
 from services.models import Service
 from products.models import Product
 from clients.models import Client, Membership
+from . import pwa_assets
 
 
 def get_gym_by_slug(slug):
@@ -2603,179 +2606,58 @@ def public_reset_password(request, slug, token):
 # PWA - MANIFEST DINÁMICO
 # ===========================
 
+def _versioned_response(request, content, content_type, cache_control, etag=None):
+    """Respuesta con ETag (del contenido si no se indica) y 304 si no ha cambiado."""
+    etag = etag or pwa_assets.content_etag(content)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
 def gym_manifest(request, slug):
     """
     Genera un manifest.json dinámico para cada gimnasio.
     Esto permite que cada gym tenga su propia PWA con nombre, colores e iconos personalizados.
+    Los iconos se enlazan versionados (ver public_portal.pwa_assets).
     """
-    import json
-    from django.urls import reverse
-    from django.conf import settings as django_settings
-    
-    gym = get_object_or_404(Gym, slug=slug)
-    
-    # Nombre para mostrar
-    gym_name = gym.commercial_name or gym.name
-    short_name = gym_name[:12] if len(gym_name) > 12 else gym_name
-    
-    # Color de la marca
-    theme_color = gym.brand_color or "#0f172a"
-    
-    # URL base del gym - usar reverse para obtener la URL correcta
-    base_url = reverse('public_gym_home', kwargs={'slug': slug})
-    
-    # Construir iconos - si el gym tiene logo, usamos versiones escaladas del logo
-    # Si no, usamos iconos genéricos
-    if gym.logo:
-        # El gym tiene logo - usamos endpoint dinámico para iconos
-        icon_base = reverse('gym_pwa_icon', kwargs={'slug': slug, 'size': 72}).rsplit('/72/', 1)[0]
-        icons = [
-            {
-                "src": f"{icon_base}/72/",
-                "sizes": "72x72",
-                "type": "image/png"
-            },
-            {
-                "src": f"{icon_base}/96/",
-                "sizes": "96x96",
-                "type": "image/png"
-            },
-            {
-                "src": f"{icon_base}/128/",
-                "sizes": "128x128",
-                "type": "image/png"
-            },
-            {
-                "src": f"{icon_base}/144/",
-                "sizes": "144x144",
-                "type": "image/png"
-            },
-            {
-                "src": f"{icon_base}/152/",
-                "sizes": "152x152",
-                "type": "image/png"
-            },
-            {
-                "src": f"{icon_base}/192/",
-                "sizes": "192x192",
-                "type": "image/png",
-                "purpose": "any maskable"
-            },
-            {
-                "src": f"{icon_base}/384/",
-                "sizes": "384x384",
-                "type": "image/png"
-            },
-            {
-                "src": f"{icon_base}/512/",
-                "sizes": "512x512",
-                "type": "image/png",
-                "purpose": "any maskable"
-            }
-        ]
-    else:
-        # Sin logo - usar iconos genéricos
-        icons = [
-            {"src": "/static/icons/icon-72x72.png", "sizes": "72x72", "type": "image/png"},
-            {"src": "/static/icons/icon-96x96.png", "sizes": "96x96", "type": "image/png"},
-            {"src": "/static/icons/icon-128x128.png", "sizes": "128x128", "type": "image/png"},
-            {"src": "/static/icons/icon-144x144.png", "sizes": "144x144", "type": "image/png"},
-            {"src": "/static/icons/icon-152x152.png", "sizes": "152x152", "type": "image/png"},
-            {"src": "/static/icons/icon-192x192.png", "sizes": "192x192", "type": "image/png", "purpose": "any maskable"},
-            {"src": "/static/icons/icon-384x384.png", "sizes": "384x384", "type": "image/png"},
-            {"src": "/static/icons/icon-512x512.png", "sizes": "512x512", "type": "image/png", "purpose": "any maskable"}
-        ]
-    
-    manifest = {
-        "name": f"{gym_name} - Portal Cliente",
-        "short_name": short_name,
-        "description": f"Accede a {gym_name} desde tu móvil",
-        "start_url": base_url,
-        "display": "standalone",
-        "background_color": "#f8fafc",
-        "theme_color": theme_color,
-        "orientation": "portrait-primary",
-        "scope": base_url,
-        "icons": icons,
-        "shortcuts": [
-            {
-                "name": "Horario",
-                "short_name": "Horario",
-                "description": "Ver horario de clases",
-                "url": f"{base_url}schedule/",
-                "icons": [{"src": "/static/icons/icon-96x96.png", "sizes": "96x96"}]
-            },
-            {
-                "name": "Mi Perfil",
-                "short_name": "Perfil",
-                "description": "Ver mi perfil",
-                "url": f"{base_url}profile/",
-                "icons": [{"src": "/static/icons/icon-96x96.png", "sizes": "96x96"}]
-            }
-        ]
-    }
-    
-    return HttpResponse(
-        json.dumps(manifest, ensure_ascii=False, indent=2),
-        content_type='application/manifest+json'
+    gym = get_object_or_404(Gym.objects.only(*pwa_assets.GYM_FIELDS), slug=slug)
+    return _versioned_response(
+        request, pwa_assets.build_manifest(gym), 'application/manifest+json', 'public, max-age=3600'
     )
 
 
 def gym_pwa_icon(request, slug, size):
     """
-    Genera iconos PWA dinámicos basados en el logo del gimnasio.
-    Redimensiona el logo al tamaño solicitado.
+    Icono PWA del gimnasio basado en su logo. Se sirve el icono ya generado
+    (ver public_portal.pwa_assets); con `?v=<versión>` actual la respuesta
+    es inmutable. Sin logo, redirige al icono genérico.
     """
-    from PIL import Image
-    from io import BytesIO
-    import os
-    
-    gym = get_object_or_404(Gym, slug=slug)
+    gym = get_object_or_404(Gym.objects.only(*pwa_assets.GYM_FIELDS), slug=slug)
     
     # Validar tamaño - incluir tamaños pequeños para favicons
-    valid_sizes = [16, 32, 72, 96, 128, 144, 152, 192, 384, 512]
-    if size not in valid_sizes:
-        size = 192  # Default
-    
-    # Si el gym tiene logo, redimensionarlo
-    if gym.logo:
-        try:
-            # Abrir imagen del logo
-            img = Image.open(gym.logo.path)
-            
-            # Convertir a RGBA si es necesario
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-            
-            # Crear imagen cuadrada con fondo del color de marca
-            brand_color = gym.brand_color or "#0f172a"
-            # Convertir hex a RGB
-            brand_rgb = tuple(int(brand_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-            
-            # Crear fondo cuadrado
-            background = Image.new('RGBA', (size, size), (*brand_rgb, 255))
-            
-            # Redimensionar logo manteniendo proporción
-            img.thumbnail((int(size * 0.7), int(size * 0.7)), Image.Resampling.LANCZOS)
-            
-            # Centrar logo sobre fondo
-            offset_x = (size - img.width) // 2
-            offset_y = (size - img.height) // 2
-            background.paste(img, (offset_x, offset_y), img if img.mode == 'RGBA' else None)
-            
-            # Guardar en buffer
-            buffer = BytesIO()
-            background.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            return HttpResponse(buffer.getvalue(), content_type='image/png')
-            
-        except Exception as e:
-            # Si hay error, devolver icono genérico
-            pass
+    if size not in pwa_assets.ICON_SIZES:
+        size = pwa_assets.DEFAULT_ICON_SIZE
+    
+    version = pwa_assets.assets_version(gym)
+    if version:
+        etag = f'"{version}-{size}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None and pwa_assets.ensure_icons(gym):
+            response = FileResponse(
+                default_storage.open(pwa_assets.icon_path(gym.id, version, size)), content_type='image/png'
+            )
+        if response is not None:
+            response['ETag'] = etag
+            if request.GET.get('v') == version:
+                response['Cache-Control'] = 'public, max-age=31536000, immutable'
+            else:
+                response['Cache-Control'] = 'public, max-age=86400'
+            return response
     
     # Fallback: redirigir a icono genérico
-    from django.shortcuts import redirect
     return redirect(f'/static/icons/icon-{size}x{size}.png')
 
 
@@ -2784,67 +2666,11 @@ def gym_service_worker(request, slug):
     Genera un Service Worker básico para cada gimnasio.
     Esto permite funcionalidad offline y mejor experiencia PWA.
     """
-    gym = get_object_or_404(Gym, slug=slug)
-    gym_name = gym.commercial_name or gym.name
-    
-    sw_content = f'''
-// Service Worker para {gym_name}
-const CACHE_NAME = 'gym-{slug}-v1';
-const urlsToCache = [
-    '/gym/{slug}/',
-    '/gym/{slug}/schedule/',
-    '/gym/{slug}/profile/',
-    '/static/icons/icon-192x192.png',
-];
-
-// Instalación
-self.addEventListener('install', function(event) {{
-    event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(function(cache) {{
-                return cache.addAll(urlsToCache);
-            }})
-    );
-}});
-
-// Fetch con estrategia Network First
-self.addEventListener('fetch', function(event) {{
-    event.respondWith(
-        fetch(event.request)
-            .then(function(response) {{
-                // Si es exitoso, cachear y devolver
-                if (response && response.status === 200) {{
-                    const responseClone = response.clone();
-                    caches.open(CACHE_NAME).then(function(cache) {{
-                        cache.put(event.request, responseClone);
-                    }});
-                }}
-                return response;
-            }})
-            .catch(function() {{
-                // Si falla, buscar en cache
-                return caches.match(event.request);
-            }})
-    );
-}});
-
-// Activación - limpiar caches antiguas
-self.addEventListener('activate', function(event) {{
-    event.waitUntil(
-        caches.keys().then(function(cacheNames) {{
-            return Promise.all(
-                cacheNames.filter(function(cacheName) {{
-                    return cacheName.startsWith('gym-{slug}-') && cacheName !== CACHE_NAME;
-                }}).map(function(cacheName) {{
-                    return caches.delete(cacheName);
-                }})
-            );
-        }})
-    );
-}});
-'''
-    
-    return HttpResponse(sw_content, content_type='application/javascript')
+    gym = get_object_or_404(Gym.objects.only(*pwa_assets.GYM_FIELDS), slug=slug)
+    # El navegador revalida el service worker en cada comprobación de actualización
+    return _versioned_response(
+        request, pwa_assets.build_service_worker(gym), 'application/javascript', 'no-cache'
+    )
 
 
 # ===========================
@@ -9,20 +9,24 @@ from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.utils import timezone
 
-try:
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.chart import BarChart, LineChart, Reference
-    from openpyxl.utils import get_column_letter
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
+# openpyxl y weasyprint se importan al exportar (no en el arranque de los workers).
+# weasyprint además necesita librerías del sistema (pango): si faltan lanza OSError.
 
-try:
-    from weasyprint import HTML, CSS
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+
+def _load_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("openpyxl no está instalado. Ejecuta: pip install openpyxl")
+    return openpyxl
+
+
+def _load_weasyprint_html():
+    try:
+        from weasyprint import HTML
+    except (ImportError, OSError):
+        raise ImportError("weasyprint no está instalado. Ejecuta: pip install weasyprint")
+    return HTML
 
 
 class ExportService:
@@ -57,8 +61,7 @@ class ExportService:
         """
         Genera un archivo Excel completo con múltiples hojas.
         """
-        if not EXCEL_AVAILABLE:
-            raise ImportError("openpyxl no está instalado. Ejecuta: pip install openpyxl")
+        openpyxl = _load_openpyxl()
         
         wb = openpyxl.Workbook()
         
@@ -99,6 +102,8 @@ class ExportService:
     
     def _apply_header_style(self, cell):
         """Aplica estilo de cabecera a una celda."""
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
         cell.font = Font(bold=True, color=self.HEADER_FONT_COLOR, size=11)
         cell.fill = PatternFill(start_color=self.HEADER_COLOR, end_color=self.HEADER_COLOR, fill_type="solid")
         cell.alignment = Alignment(horizontal='center', vertical='center')
@@ -108,6 +113,8 @@ class ExportService:
     
     def _apply_number_format(self, cell, is_currency=False, is_percentage=False):
         """Aplica formato numérico a una celda."""
+        from openpyxl.styles import Alignment
+
         if is_currency:
             cell.number_format = '#,##0.00 €'
         elif is_percentage:
@@ -118,6 +125,8 @@ class ExportService:
     
     def _apply_growth_style(self, cell, value):
         """Aplica estilo según el valor de crecimiento."""
+        from openpyxl.styles import Font
+
         if value > 0:
             cell.font = Font(color=self.SUCCESS_COLOR, bold=True)
         elif value < 0:
@@ -125,6 +134,8 @@ class ExportService:
     
     def _auto_adjust_columns(self, ws):
         """Ajusta automáticamente el ancho de las columnas."""
+        from openpyxl.utils import get_column_letter
+
         for column in ws.columns:
             max_length = 0
             column_letter = get_column_letter(column[0].column)
@@ -141,6 +152,9 @@ class ExportService:
     
     def _create_summary_sheet(self, wb):
         """Crea hoja de resumen ejecutivo."""
+        from openpyxl.styles import Font, Alignment
+        from openpyxl.utils import get_column_letter
+
         ws = wb.create_sheet("Resumen Ejecutivo")
         
         # Título
@@ -232,6 +246,10 @@ class ExportService:
     
     def _create_revenue_sheet(self, wb):
         """Crea hoja detallada de facturación."""
+        from openpyxl.styles import Font
+        from openpyxl.chart import BarChart, Reference
+        from openpyxl.utils import get_column_letter
+
         ws = wb.create_sheet("Facturación")
         
         revenue = self.data.get('revenue', {})
@@ -303,6 +321,9 @@ class ExportService:
     
     def _create_memberships_sheet(self, wb):
         """Crea hoja de membresías."""
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
         ws = wb.create_sheet("Membresías")
         
         membership = self.data.get('memberships', {})
@@ -391,6 +412,10 @@ class ExportService:
     
     def _create_attendance_sheet(self, wb):
         """Crea hoja de asistencias."""
+        from openpyxl.styles import Font
+        from openpyxl.chart import LineChart, Reference
+        from openpyxl.utils import get_column_letter
+
         ws = wb.create_sheet("Asistencias")
         
         attendance = self.data.get('attendance', {})
@@ -444,6 +469,8 @@ class ExportService:
     
     def _create_products_sheet(self, wb):
         """Crea hoja de productos."""
+        from openpyxl.styles import Font
+
         ws = wb.create_sheet("Productos")
         
         products = self.data.get('products', {})
@@ -487,8 +514,7 @@ class ExportService:
         """
         Genera un archivo PDF con el reporte.
         """
-        if not PDF_AVAILABLE:
-            raise ImportError("weasyprint no está instalado. Ejecuta: pip install weasyprint")
+        HTML = _load_weasyprint_html()
         
         # Renderizar HTML
         html_content = render_to_string('reporting/pdf_report.html', {
@@ -5,15 +5,16 @@ from django.views.decorators.http import require_GET
 from accounts.decorators import require_gym_permission
 from organizations.models import Gym
 from clients.models import Client, ClientField, ClientTag, ClientGroup, DocumentTemplate
+from clients.search import search_q
 from memberships.models import MembershipPlan
 from services.models import Service
 from products.models import Product
 from django.db.models import Q, Sum, Count, Exists, OuterRef
 from django.utils import timezone
 from datetime import timedelta, date
-import csv
 import json
 
+from core.export_service import EXPORT_CHUNK_SIZE, csv_lines, csv_streaming_response
 from .services import ComparativeAnalyticsService, ExportService
 
 def _get_filtered_clients(request):
@@ -51,12 +52,7 @@ def _get_filtered_clients(request):
     # Filters
     q = request.GET.get('q')
     if q:
-        clients = clients.filter(
-            Q(first_name__icontains=q) | 
-            Q(last_name__icontains=q) | 
-            Q(email__icontains=q) |
-            Q(phone_number__icontains=q)
-        )
+        clients = clients.filter(search_q(q))
 
     status = request.GET.get('status')
     if status and status != 'all':
@@ -272,40 +268,43 @@ def export_clients_csv(request):
     custom_field_options = result[3]
     if clients is None:
         return HttpResponse("No gym selected", status=400)
-    
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="clientes_{gym.name}_{date.today()}.csv"'
-    response.write('\ufeff')  # BOM for Excel UTF-8 compatibility
-    
-    writer = csv.writer(response)
+
+    status_labels = dict(Client.Status.choices)
     header = ['Nombre', 'Apellido', 'Email', 'Teléfono', 'Estado', 'Alta', 'Gasto Total', 'Empresa']
     header.extend([field.name for field in custom_fields])
-    writer.writerow(header)
-    
-    for client in clients:
-        values = {}
-        if isinstance(client.extra_data, dict):
-            for field in custom_fields:
-                raw_value = client.extra_data.get(field.slug)
-                if raw_value is not None and raw_value != "":
-                    if field.field_type == ClientField.FieldType.TOGGLE:
-                        values[field.slug] = "Sí" if raw_value else "No"
-                    else:
-                        values[field.slug] = custom_field_options.get(field.slug, {}).get(raw_value, raw_value)
 
-        writer.writerow([
-            client.first_name,
-            client.last_name,
-            client.email or '',
-            client.phone_number or '',
-            client.get_status_display(),
-            client.created_at.strftime('%d/%m/%Y') if client.created_at else '',
-            f"{client.total_spent:.2f}" if client.total_spent else '0.00',
-            'Sí' if client.is_company_client else 'No',
-            *[values.get(field.slug, '') for field in custom_fields],
-        ])
-    
-    return response
+    def rows():
+        # Por bloques y sin instanciar clientes ni precargar relaciones que el CSV no usa
+        records = clients.prefetch_related(None).values(
+            'id', 'first_name', 'last_name', 'email', 'phone_number', 'status', 'created_at',
+            'total_spent', 'is_company_client', 'extra_data',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for client in records:
+            values = {}
+            extra_data = client['extra_data']
+            if isinstance(extra_data, dict):
+                for field in custom_fields:
+                    raw_value = extra_data.get(field.slug)
+                    if raw_value is not None and raw_value != "":
+                        if field.field_type == ClientField.FieldType.TOGGLE:
+                            values[field.slug] = "Sí" if raw_value else "No"
+                        else:
+                            values[field.slug] = custom_field_options.get(field.slug, {}).get(raw_value, raw_value)
+
+            created_at = client['created_at']
+            yield [
+                client['first_name'],
+                client['last_name'],
+                client['email'] or '',
+                client['phone_number'] or '',
+                status_labels.get(client['status'], client['status']),
+                timezone.localtime(created_at).strftime('%d/%m/%Y') if created_at else '',
+                f"{client['total_spent']:.2f}" if client['total_spent'] else '0.00',
+                'Sí' if client['is_company_client'] else 'No',
+                *[values.get(field.slug, '') for field in custom_fields],
+            ]
+
+    return csv_streaming_response(f"clientes_{gym.name}_{date.today()}.csv", csv_lines(header, rows()))
 
 
 # =============================================================================
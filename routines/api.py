@@ -287,4 +287,30 @@ def api_duplicate_exercise(request, rx_id):
             'rx_id': new_rx.id
         })
     except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
\ No newline at end of file
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+@login_required
+@require_http_methods(["GET"])
+def api_client_progress(request, client_id):
+    """Exercise progression of a client for the trainer view (?exercise_id=&weeks=)"""
+    from .models import ExerciseProgress
+    from .progression import serialize_progress
+
+    client = get_object_or_404(Client, id=client_id, gym=request.gym)
+    progress = ExerciseProgress.objects.filter(client=client).select_related('exercise')
+    exercise_id = request.GET.get('exercise_id')
+    if exercise_id:
+        p = get_object_or_404(progress, exercise_id=exercise_id)
+        try:
+            weeks = max(0, int(request.GET.get('weeks', 52)))
+        except ValueError:
+            weeks = 52
+        return JsonResponse({'status': 'success', **serialize_progress(p, weeks=weeks), 'exercise_name': p.exercise.name})
+
+    return JsonResponse({
+        'status': 'success',
+        'exercises': [
+            {**serialize_progress(p), 'exercise_name': p.exercise.name}
+            for p in progress.order_by('-last_week', 'exercise__name')
+        ],
+    })
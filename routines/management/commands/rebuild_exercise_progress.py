@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from organizations.models import Gym
+from routines.progression import rebuild_progress
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de progresión (ExerciseProgress) a partir del histórico de entrenamientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', type=int, help='ID del gimnasio (por defecto, todos)')
+        parser.add_argument('--client', type=int, help='ID del cliente')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote de lectura y escritura')
+
+    def handle(self, *args, **options):
+        if options['client']:
+            rows = rebuild_progress(client_id=options['client'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✅ Cliente {options["client"]}: {rows} filas'))
+            return
+
+        gyms = Gym.objects.all()
+        if options['gym']:
+            gyms = gyms.filter(id=options['gym'])
+
+        for gym in gyms:
+            rows = rebuild_progress(gym_id=gym.id, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✅ {gym.name}: {rows} filas'))
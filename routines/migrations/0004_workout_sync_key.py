@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routines', '0003_workout_log_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutlog',
+            name='sync_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='workoutlog',
+            constraint=models.UniqueConstraint(condition=models.Q(('sync_key__isnull', False)), fields=('client', 'sync_key'), name='unique_workout_sync_key_per_client'),
+        ),
+    ]
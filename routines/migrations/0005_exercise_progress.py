@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0112_client_summary'),
+        ('routines', '0004_workout_sync_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('total_sets', models.PositiveIntegerField(default=0)),
+                ('total_reps', models.PositiveIntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('max_weight', models.DecimalField(decimal_places=2, default=0, max_digits=7, verbose_name='Peso máximo (kg)')),
+                ('max_weight_date', models.DateField(blank=True, null=True)),
+                ('best_e1rm', models.DecimalField(decimal_places=2, default=0, max_digits=7, verbose_name='1RM estimado (kg)')),
+                ('best_e1rm_date', models.DateField(blank=True, null=True)),
+                ('weekly', models.JSONField(blank=True, default=list)),
+                ('first_week', models.DateField(blank=True, null=True)),
+                ('last_week', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_progress', to='clients.client')),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='routines.exercise')),
+            ],
+            options={
+                'verbose_name': 'Progresión de Ejercicio',
+                'verbose_name_plural': 'Progresiones de Ejercicio',
+                'indexes': [models.Index(fields=['client', '-last_week'], name='routines_ex_client__ea722c_idx')],
+                'unique_together': {('client', 'exercise')},
+            },
+        ),
+    ]
@@ -151,10 +151,20 @@ class WorkoutLog(models.Model):
         default=0
     )
     
+    # Clave de idempotencia del entrenamiento grabado sin conexión en la app
+    sync_key = models.CharField(max_length=64, null=True, blank=True)
+    
     class Meta:
         verbose_name = "Registro de Entrenamiento"
         verbose_name_plural = "Registros de Entrenamiento"
         ordering = ['-date', '-started_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client', 'sync_key'],
+                name='unique_workout_sync_key_per_client',
+                condition=models.Q(sync_key__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.client.first_name} - {self.date}"
@@ -225,3 +235,43 @@ class ExerciseLog(models.Model):
                 for s in self.sets_data
             )
         super().save(*args, **kwargs)
+
+
+class ExerciseProgress(models.Model):
+    """
+    Progresión de un cliente en un ejercicio: récords, 1RM estimado y serie
+    semanal para las gráficas. Se mantiene con routines.progression (señales
+    de ExerciseLog + `manage.py rebuild_exercise_progress`).
+    """
+    client = models.ForeignKey('clients.Client', on_delete=models.CASCADE, related_name='exercise_progress')
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='progress')
+    
+    # Totales
+    sessions = models.PositiveIntegerField(default=0)
+    total_sets = models.PositiveIntegerField(default=0)
+    total_reps = models.PositiveIntegerField(default=0)
+    total_volume = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Récords personales
+    max_weight = models.DecimalField(_("Peso máximo (kg)"), max_digits=7, decimal_places=2, default=0)
+    max_weight_date = models.DateField(null=True, blank=True)
+    best_e1rm = models.DecimalField(_("1RM estimado (kg)"), max_digits=7, decimal_places=2, default=0)
+    best_e1rm_date = models.DateField(null=True, blank=True)
+    
+    # Serie semanal compacta: una lista por semana (ver progression.WEEK_COLUMNS)
+    weekly = models.JSONField(default=list, blank=True)
+    first_week = models.DateField(null=True, blank=True)
+    last_week = models.DateField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Progresión de Ejercicio"
+        verbose_name_plural = "Progresiones de Ejercicio"
+        unique_together = ('client', 'exercise')
+        indexes = [
+            models.Index(fields=['client', '-last_week']),
+        ]
+    
+    def __str__(self):
+        return f"{self.client_id} - {self.exercise_id}: {self.best_e1rm} kg"
@@ -0,0 +1,254 @@
+"""
+Índice de progresión por cliente × ejercicio (ExerciseProgress).
+
+Responde "mejor marca / 1RM estimado / volumen semanal" sin recorrer el
+sets_data de todos los ExerciseLog del cliente: cada fila guarda los récords,
+los totales y una serie semanal compacta (una lista por semana, columnas en
+WEEK_COLUMNS) lista para las gráficas de la app y de la ficha del entrenador.
+
+Mantenimiento:
+- refresh_week(): recalcula la semana de un cliente × ejercicio a partir de
+  sus logs (pocos) y rehace récords y totales desde la serie. Se llama tras
+  guardar/borrar un ExerciseLog (señales) y tras la sincronización por lotes.
+- rebuild_progress(): recalcula todo el histórico leyendo los logs en
+  streaming (backfill con `manage.py rebuild_exercise_progress`).
+
+El cambio de ejercicio de un log ya guardado no se detecta en las señales;
+lo recoge la reconstrucción.
+"""
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WEEK_COLUMNS = (
+    'week', 'sessions', 'sets', 'reps', 'volume',
+    'max_weight', 'max_weight_date', 'e1rm', 'e1rm_date',
+)
+
+# Por encima de estas repeticiones la fórmula de Epley deja de ser fiable
+E1RM_MAX_REPS = 12
+
+PROGRESS_FIELDS = (
+    'sessions', 'total_sets', 'total_reps', 'total_volume',
+    'max_weight', 'max_weight_date', 'best_e1rm', 'best_e1rm_date',
+    'weekly', 'first_week', 'last_week', 'updated_at',
+)
+
+
+def estimate_1rm(weight, reps):
+    """1RM estimado (Epley). 0 si la serie no sirve para estimarlo."""
+    if weight <= 0 or reps < 1 or reps > E1RM_MAX_REPS:
+        return 0.0
+    if reps == 1:
+        return float(weight)
+    return round(weight * (1 + reps / 30), 2)
+
+
+def week_start(day):
+    """Lunes de la semana de `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def aggregate_weeks(rows):
+    """
+    Agrupa logs en semanas. `rows` es un iterable de
+    (workout_log_id, fecha, sets_data). Devuelve {lunes: fila WEEK_COLUMNS}.
+    """
+    weeks = {}
+    workouts = {}
+    for workout_id, day, sets_data in rows:
+        sets = [s for s in sets_data or [] if isinstance(s, dict)]
+        if not sets:
+            continue
+        monday = week_start(day)
+        row = weeks.get(monday)
+        if row is None:
+            row = weeks[monday] = [monday.isoformat(), 0, 0, 0, 0.0, 0.0, None, 0.0, None]
+            workouts[monday] = set()
+        workouts[monday].add(workout_id)
+
+        for s in sets:
+            reps = int(_number(s.get('reps')))
+            weight = _number(s.get('weight'))
+            row[2] += 1
+            row[3] += reps
+            row[4] += reps * weight
+            if weight > row[5]:
+                row[5], row[6] = weight, day.isoformat()
+            e1rm = estimate_1rm(weight, reps)
+            if e1rm > row[7]:
+                row[7], row[8] = e1rm, day.isoformat()
+
+    for monday, row in weeks.items():
+        row[1] = len(workouts[monday])
+        row[4] = round(row[4], 2)
+    return weeks
+
+
+def apply_series(progress, weekly):
+    """Rehace récords y totales de `progress` a partir de la serie semanal."""
+    progress.weekly = weekly
+    progress.sessions = sum(w[1] for w in weekly)
+    progress.total_sets = sum(w[2] for w in weekly)
+    progress.total_reps = sum(w[3] for w in weekly)
+    progress.total_volume = Decimal(str(round(sum(w[4] for w in weekly), 2)))
+
+    # Ante empate manda la primera vez que se consiguió
+    best_weight = max(weekly, key=lambda w: w[5], default=None)
+    best_e1rm = max(weekly, key=lambda w: w[7], default=None)
+    progress.max_weight = Decimal(str(best_weight[5])) if best_weight else 0
+    progress.max_weight_date = date.fromisoformat(best_weight[6]) if best_weight and best_weight[6] else None
+    progress.best_e1rm = Decimal(str(best_e1rm[7])) if best_e1rm else 0
+    progress.best_e1rm_date = date.fromisoformat(best_e1rm[8]) if best_e1rm and best_e1rm[8] else None
+
+    progress.first_week = date.fromisoformat(weekly[0][0]) if weekly else None
+    progress.last_week = date.fromisoformat(weekly[-1][0]) if weekly else None
+    progress.updated_at = timezone.now()
+    return progress
+
+
+def refresh_week(client_id, exercise_id, day):
+    """Recalcula la semana de `day` para un cliente × ejercicio."""
+    from .models import ExerciseLog, ExerciseProgress
+
+    monday = week_start(day)
+    rows = ExerciseLog.objects.filter(
+        workout_log__client_id=client_id,
+        exercise_id=exercise_id,
+        workout_log__date__gte=monday,
+        workout_log__date__lt=monday + timedelta(days=7),
+    ).values_list('workout_log_id', 'workout_log__date', 'sets_data')
+    row = aggregate_weeks(rows).get(monday)
+
+    with transaction.atomic():
+        progress = ExerciseProgress.objects.select_for_update().filter(
+            client_id=client_id, exercise_id=exercise_id
+        ).first()
+        if progress is None:
+            if row is None:
+                return None
+            progress = ExerciseProgress(client_id=client_id, exercise_id=exercise_id)
+
+        weekly = [w for w in progress.weekly if w[0] != monday.isoformat()]
+        if row is not None:
+            weekly = sorted(weekly + [row], key=lambda w: w[0])
+
+        if not weekly:
+            if progress.pk:
+                progress.delete()
+            return None
+        apply_series(progress, weekly)
+        if progress.pk:
+            progress.save(update_fields=PROGRESS_FIELDS)
+        else:
+            # Otra petición pudo crearla a la vez: la última escritura manda
+            ExerciseProgress.objects.bulk_create(
+                [progress], update_conflicts=True,
+                unique_fields=['client', 'exercise'], update_fields=PROGRESS_FIELDS,
+            )
+    return progress
+
+
+def refresh_many(keys):
+    """Recalcula un conjunto de (client_id, exercise_id, fecha) sin repetir semanas."""
+    seen = set()
+    for client_id, exercise_id, day in keys:
+        key = (client_id, exercise_id, week_start(day))
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            refresh_week(*key)
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar la progresión {key}: {e}")
+
+
+def schedule_refresh(keys):
+    """refresh_many() al confirmar la transacción en curso."""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: refresh_many(keys))
+
+
+def rebuild_progress(gym_id=None, client_id=None, batch_size=1000):
+    """
+    Recalcula todas las progresiones (de un gimnasio o cliente) leyendo los
+    logs ordenados por cliente × ejercicio en streaming y escribiendo por
+    lotes. Devuelve el número de filas escritas.
+    """
+    from .models import ExerciseLog, ExerciseProgress
+
+    started = timezone.now()
+    logs = ExerciseLog.objects.all()
+    existing = ExerciseProgress.objects.all()
+    if gym_id is not None:
+        logs = logs.filter(workout_log__client__gym_id=gym_id)
+        existing = existing.filter(client__gym_id=gym_id)
+    if client_id is not None:
+        logs = logs.filter(workout_log__client_id=client_id)
+        existing = existing.filter(client_id=client_id)
+
+    rows = logs.order_by('workout_log__client_id', 'exercise_id', 'workout_log__date', 'id').values_list(
+        'workout_log__client_id', 'exercise_id', 'workout_log_id', 'workout_log__date', 'sets_data'
+    ).iterator(chunk_size=batch_size)
+
+    written = 0
+    buffer = []
+
+    def flush():
+        ExerciseProgress.objects.bulk_create(
+            buffer, update_conflicts=True,
+            unique_fields=['client', 'exercise'], update_fields=PROGRESS_FIELDS,
+        )
+        buffer.clear()
+
+    for (client, exercise), group in groupby(rows, key=lambda r: (r[0], r[1])):
+        weeks = aggregate_weeks(r[2:] for r in group)
+        if not weeks:
+            continue
+        weekly = [weeks[monday] for monday in sorted(weeks)]
+        buffer.append(apply_series(ExerciseProgress(client_id=client, exercise_id=exercise), weekly))
+        written += 1
+        if len(buffer) >= batch_size:
+            flush()
+    if buffer:
+        flush()
+
+    # Progresiones sin logs (borrados desde la última reconstrucción)
+    existing.filter(updated_at__lt=started).delete()
+    logger.info(f"ExerciseProgress gym={gym_id} client={client_id}: {written} filas")
+    return written
+
+
+def serialize_progress(progress, weeks=None):
+    """Resumen (y serie semanal, si se pide) para la API y la ficha del cliente."""
+    data = {
+        'exercise_id': progress.exercise_id,
+        'sessions': progress.sessions,
+        'total_sets': progress.total_sets,
+        'total_reps': progress.total_reps,
+        'total_volume': float(progress.total_volume),
+        'max_weight': float(progress.max_weight),
+        'max_weight_date': progress.max_weight_date.isoformat() if progress.max_weight_date else None,
+        'best_e1rm': float(progress.best_e1rm),
+        'best_e1rm_date': progress.best_e1rm_date.isoformat() if progress.best_e1rm_date else None,
+        'last_week': progress.last_week.isoformat() if progress.last_week else None,
+    }
+    if weeks is not None:
+        series = progress.weekly[-weeks:] if weeks else progress.weekly
+        data['columns'] = WEEK_COLUMNS
+        data['weekly'] = series
+    return data
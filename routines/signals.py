@@ -0,0 +1,30 @@
+"""
+Signals de rutinas: mantenimiento del índice de progresión (ExerciseProgress).
+"""
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+def _schedule_progress_refresh(log):
+    from .models import WorkoutLog
+    from .progression import schedule_refresh
+
+    try:
+        workout = log.workout_log
+    except WorkoutLog.DoesNotExist:
+        return
+    schedule_refresh([(workout.client_id, log.exercise_id, workout.date)])
+
+
+@receiver(post_save, sender='routines.ExerciseLog')
+def update_progress_on_exercise_log_save(sender, instance, **kwargs):
+    _schedule_progress_refresh(instance)
+
+
+@receiver(post_delete, sender='routines.ExerciseLog')
+def update_progress_on_exercise_log_delete(sender, instance, **kwargs):
+    _schedule_progress_refresh(instance)
@@ -24,4 +24,5 @@ urlpatterns = [
     # Client Routine APIs
     path('api/clients/<int:client_id>/assign/', api.api_assign_routine, name='api_assign_routine'),
     path('api/clients/<int:client_id>/create-personal/', api.api_create_personal_routine, name='api_create_personal_routine'),
+    path('api/clients/<int:client_id>/progress/', api.api_client_progress, name='api_client_progress'),
 ]
@@ -0,0 +1,295 @@
+"""
+Sincronización por lotes de entrenamientos (app móvil sin conexión).
+
+La app graba el entrenamiento completo en local y lo envía en una sola
+petición; sync_workout() lo aplica de una vez:
+
+- Idempotencia: el entrenamiento se identifica por workout_id o por su
+  sync_key, y cada serie lleva un `id` generado en el cliente. Reenviar el
+  mismo lote (reintentos con mala cobertura) no duplica nada.
+- Escritura: bulk_create de los ExerciseLog nuevos y bulk_update de los
+  existentes, con las estadísticas calculadas solo sobre las series nuevas.
+- Totales del WorkoutLog: se suman los deltas con F() (sin volver a agregar
+  los ExerciseLog). Al finalizar no hace falta calculate_stats().
+- Progresión: se recalcula la semana de los ejercicios con series nuevas
+  (routines.progression) al confirmar la transacción.
+
+Formato del lote:
+    {
+        "workout_id": 12,                  # o bien "sync_key" (+ "day_id" si es nuevo)
+        "sync_key": "a1b2...",
+        "day_id": 3,
+        "completed_at": "2026-10-19T19:30:00Z",   # opcional: finaliza
+        "difficulty_rating": 7, "notes": "...",
+        "exercises": [
+            {"exercise_log_id": 5,         # o "routine_exercise_id" / "exercise_id"
+             "completed": true,
+             "sets": [{"id": "s-1", "reps": 12, "weight": 50, "timestamp": "..."}]}
+        ]
+    }
+"""
+import math
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ClientRoutine, Exercise, ExerciseLog, RoutineDay, RoutineExercise, WorkoutLog
+from .progression import schedule_refresh
+
+# Límite de series por lote (un entrenamiento real no se acerca)
+MAX_SETS_PER_SYNC = 500
+
+
+class WorkoutSyncError(Exception):
+    """Lote inválido o sin acceso. `status` es el código HTTP a devolver."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_set(raw):
+    try:
+        reps = int(raw.get('reps', 0))
+        weight = float(raw.get('weight', 0))
+    except (TypeError, ValueError, AttributeError):
+        raise WorkoutSyncError('Serie inválida')
+    if reps < 0 or weight < 0 or not math.isfinite(weight):
+        raise WorkoutSyncError('Serie inválida')
+    return {
+        'id': str(raw['id']) if raw.get('id') else None,
+        'reps': reps,
+        'weight': weight,
+        'timestamp': raw.get('timestamp') or timezone.now().isoformat(),
+    }
+
+
+def _parse_difficulty(value):
+    """Dificultad percibida (1-10) o None; acepta el número o su texto."""
+    if value is None:
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 10:
+        raise WorkoutSyncError('difficulty_rating debe ser un entero entre 1 y 10')
+    return value
+
+
+def _get_or_create_workout(client, payload):
+    """WorkoutLog bloqueado (select_for_update) al que se aplica el lote."""
+    workouts = WorkoutLog.objects.select_for_update()
+    workout_id = payload.get('workout_id')
+    sync_key = payload.get('sync_key')
+
+    if workout_id:
+        try:
+            return workouts.get(id=workout_id, client=client), False
+        except WorkoutLog.DoesNotExist:
+            raise WorkoutSyncError('Entrenamiento no encontrado', status=404)
+    if not sync_key:
+        raise WorkoutSyncError('workout_id o sync_key requerido')
+
+    workout = workouts.filter(client=client, sync_key=sync_key).first()
+    if workout:
+        return workout, False
+
+    day = None
+    if payload.get('day_id'):
+        day = RoutineDay.objects.select_related('routine').filter(id=payload['day_id']).first()
+        if day is None:
+            raise WorkoutSyncError('Día no encontrado', status=404)
+        if not ClientRoutine.objects.filter(client=client, routine=day.routine, is_active=True).exists():
+            raise WorkoutSyncError('No tienes acceso a esta rutina', status=403)
+
+    try:
+        with transaction.atomic():
+            workout = WorkoutLog.objects.create(
+                client=client,
+                routine=day.routine if day else None,
+                routine_day=day,
+                sync_key=sync_key,
+            )
+    except IntegrityError:
+        # El mismo lote llegó a la vez por otra conexión
+        return workouts.get(client=client, sync_key=sync_key), False
+
+    started_at = parse_datetime(payload.get('started_at') or '')
+    if started_at:
+        WorkoutLog.objects.filter(pk=workout.pk).update(started_at=started_at, date=timezone.localdate(started_at))
+        workout.started_at, workout.date = started_at, timezone.localdate(started_at)
+    return workout, True
+
+
+def _resolve_logs(client, workout, exercises):
+    """
+    Empareja cada ejercicio del lote con su ExerciseLog (existente o nuevo,
+    sin guardar). Devuelve [(ExerciseLog, datos del lote)].
+    """
+    logs = list(workout.exercise_logs.all())
+    by_id = {log.id: log for log in logs}
+    by_routine_exercise = {log.routine_exercise_id: log for log in logs if log.routine_exercise_id}
+    by_exercise = {}
+    for log in logs:
+        by_exercise.setdefault(log.exercise_id, log)
+
+    routine_exercise_ids = {e.get('routine_exercise_id') for e in exercises if e.get('routine_exercise_id')}
+    routine_exercises = {
+        re.id: re for re in RoutineExercise.objects.filter(
+            id__in=routine_exercise_ids - set(by_routine_exercise), day__routine__gym_id=client.gym_id
+        )
+    }
+    exercise_ids = {e.get('exercise_id') for e in exercises if e.get('exercise_id')}
+    valid_exercises = set(
+        Exercise.objects.filter(id__in=exercise_ids - set(by_exercise), gym_id=client.gym_id).values_list('id', flat=True)
+    )
+
+    resolved = []
+    for data in exercises:
+        log = None
+        if data.get('exercise_log_id'):
+            log = by_id.get(data['exercise_log_id'])
+            if log is None:
+                raise WorkoutSyncError('Ejercicio no encontrado', status=404)
+        elif data.get('routine_exercise_id'):
+            log = by_routine_exercise.get(data['routine_exercise_id'])
+            if log is None:
+                re = routine_exercises.get(data['routine_exercise_id'])
+                if re is None:
+                    raise WorkoutSyncError('Ejercicio no encontrado', status=404)
+                log = ExerciseLog(workout_log=workout, exercise_id=re.exercise_id, routine_exercise=re, sets_data=[])
+                by_routine_exercise[re.id] = log
+        elif data.get('exercise_id'):
+            log = by_exercise.get(data['exercise_id'])
+            if log is None:
+                if data['exercise_id'] not in valid_exercises:
+                    raise WorkoutSyncError('Ejercicio no encontrado', status=404)
+                log = ExerciseLog(workout_log=workout, exercise_id=data['exercise_id'], sets_data=[])
+                by_exercise[data['exercise_id']] = log
+        else:
+            raise WorkoutSyncError('Cada ejercicio necesita exercise_log_id, routine_exercise_id o exercise_id')
+        resolved.append((log, data))
+    return resolved
+
+
+def _apply_sets(log, sets):
+    """
+    Añade las series nuevas (por id) al log y actualiza sus estadísticas de
+    forma incremental. Devuelve (series, reps, volumen, duplicadas) añadidas.
+    """
+    seen = {s.get('id') for s in log.sets_data or [] if s.get('id')}
+    added = []
+    duplicates = 0
+    for new in sets:
+        if new['id'] and new['id'] in seen:
+            duplicates += 1
+            continue
+        if new['id']:
+            seen.add(new['id'])
+        added.append(new)
+
+    reps = sum(s['reps'] for s in added)
+    volume = Decimal(str(round(sum(s['reps'] * s['weight'] for s in added), 2)))
+    if added:
+        log.sets_data = (log.sets_data or []) + added
+        log.sets_completed = len(log.sets_data)
+        log.total_reps = (log.total_reps or 0) + reps
+        log.total_volume = (log.total_volume or 0) + volume
+        log.max_weight = max(Decimal(str(log.max_weight or 0)), Decimal(str(max(s['weight'] for s in added))))
+    return len(added), reps, volume, duplicates
+
+
+def sync_workout(client, payload):
+    """
+    Aplica un lote de entrenamiento del cliente. Devuelve el resumen para la
+    respuesta de la API. Lanza WorkoutSyncError si el lote no es válido.
+    """
+    exercises = payload.get('exercises') or []
+    if not isinstance(exercises, list):
+        raise WorkoutSyncError('exercises debe ser una lista')
+    parsed = [
+        dict(data, sets=[_parse_set(s) for s in data.get('sets') or []])
+        for data in exercises
+        if isinstance(data, dict)
+    ]
+    if sum(len(data['sets']) for data in parsed) > MAX_SETS_PER_SYNC:
+        raise WorkoutSyncError(f'Máximo {MAX_SETS_PER_SYNC} series por lote')
+    difficulty_rating = _parse_difficulty(payload.get('difficulty_rating'))
+
+    with transaction.atomic():
+        workout, created = _get_or_create_workout(client, payload)
+        resolved = _resolve_logs(client, workout, parsed)
+
+        totals = {'sets': 0, 'reps': 0, 'volume': Decimal('0'), 'duplicates': 0}
+        changed = {}
+        progressed = set()
+        for log, data in resolved:
+            n_sets, reps, volume, duplicates = _apply_sets(log, data['sets'])
+            if n_sets:
+                progressed.add(log.exercise_id)
+            totals['sets'] += n_sets
+            totals['reps'] += reps
+            totals['volume'] += volume
+            totals['duplicates'] += duplicates
+            dirty = bool(n_sets) or log.pk is None
+            if data.get('completed') and not log.completed:
+                log.completed = dirty = True
+            if dirty:
+                changed[id(log)] = log
+
+        new_logs = [log for log in changed.values() if log.pk is None]
+        existing = [log for log in changed.values() if log.pk is not None]
+        ExerciseLog.objects.bulk_create(new_logs)
+        if existing:
+            ExerciseLog.objects.bulk_update(
+                existing, ['sets_data', 'sets_completed', 'total_reps', 'total_volume', 'max_weight', 'completed']
+            )
+
+        updates = {}
+        if totals['sets']:
+            updates.update(
+                total_sets=F('total_sets') + totals['sets'],
+                total_reps=F('total_reps') + totals['reps'],
+                total_volume=F('total_volume') + totals['volume'],
+            )
+        completed_at = parse_datetime(payload.get('completed_at') or '')
+        if completed_at and workout.completed_at is None:
+            updates['completed_at'] = completed_at
+            if workout.started_at:
+                updates['duration_minutes'] = max(0, int((completed_at - workout.started_at).total_seconds() / 60))
+            if difficulty_rating is not None:
+                updates['difficulty_rating'] = difficulty_rating
+            if payload.get('notes'):
+                updates['notes'] = str(payload['notes'])
+        if updates:
+            WorkoutLog.objects.filter(pk=workout.pk).update(**updates)
+            workout.refresh_from_db()
+
+        # bulk_create/bulk_update no disparan las señales de ExerciseLog
+        schedule_refresh((client.id, exercise_id, workout.date) for exercise_id in progressed)
+
+    return {
+        'workout_id': workout.id,
+        'created': created,
+        'sets_added': totals['sets'],
+        'duplicates_skipped': totals['duplicates'],
+        'completed': workout.completed_at is not None,
+        'exercise_logs': [
+            {
+                'exercise_log_id': log.id,
+                'exercise_id': log.exercise_id,
+                'routine_exercise_id': log.routine_exercise_id,
+                'sets_completed': log.sets_completed,
+                'completed': log.completed,
+            }
+            for log, _ in resolved
+        ],
+        'totals': {
+            'total_sets': workout.total_sets,
+            'total_reps': workout.total_reps,
+            'total_volume': float(workout.total_volume),
+            'duration_minutes': workout.duration_minutes,
+        },
+    }
@@ -0,0 +1,241 @@
+"""
+Atomic transactional email quota accounting.
+
+Every gym has one GymEmailQuota row per month with the month-to-date and the
+current-day counters. Checking and consuming quota is a single conditional
+UPDATE that only matches while both limits still have room:
+
+    UPDATE ... SET month_used = month_used + n, day_used = ...
+    WHERE gym_id = %s AND month = %s
+      AND month_used <= monthly_limit - n
+      AND (day <> today OR day_used <= daily_limit - n)
+
+so concurrent workers can never overshoot a limit, and there is no
+read-then-write window. Campaigns and workflows reserve a whole batch at once
+(EmailQuotaReservation) and give back what they did not send.
+
+GymEmailUsage stays the per-day billing record: flush_email_usage() copies the
+counters into it (absolute values, so it is idempotent) every few minutes.
+
+- reserve(gym, plan, count): all-or-nothing reservation
+- reserve_up_to(gym, plan, count): as many as fit (batches)
+- release(gym, count): refund of reserved but unsent emails
+- get_usage(gym): (daily_sent, monthly_sent) from the counters
+"""
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import GymEmailQuota, GymEmailUsage
+
+logger = logging.getLogger(__name__)
+
+
+def _limits(plan):
+    """(daily_limit, monthly_limit) of the plan; None = unlimited."""
+    if plan is None:
+        return None, None
+    return plan.transactional_email_limit_daily or None, plan.transactional_email_limit_monthly or None
+
+
+def _ensure_bucket(gym_id, today):
+    """
+    Create the bucket of the current month, seeded from GymEmailUsage so that
+    usage recorded before the bucket existed still counts.
+    Returns True if the row did not exist before this call (created here or
+    by a concurrent worker), i.e. a failed reservation is worth retrying.
+    """
+    month = today.replace(day=1)
+    if GymEmailQuota.objects.filter(gym_id=gym_id, month=month).exists():
+        return False
+
+    usage = GymEmailUsage.objects.filter(gym_id=gym_id, date__gte=month, date__lte=today).aggregate(
+        month=Sum('emails_sent'), today=Sum('emails_sent', filter=Q(date=today)),
+    )
+    try:
+        with transaction.atomic():
+            GymEmailQuota.objects.create(
+                gym_id=gym_id,
+                month=month,
+                month_used=usage['month'] or 0,
+                day=today,
+                day_used=usage['today'] or 0,
+            )
+    except IntegrityError:
+        # Created concurrently by another worker
+        pass
+    return True
+
+
+def reserve(gym, plan, count=1, today=None):
+    """
+    Reserve `count` sends against the daily and monthly limits of `plan`.
+    All or nothing: returns True if the whole amount was reserved.
+    """
+    if count <= 0:
+        return True
+    daily_limit, monthly_limit = _limits(plan)
+    if (daily_limit and count > daily_limit) or (monthly_limit and count > monthly_limit):
+        return False
+
+    today = today or timezone.localdate()
+    room = Q()
+    if monthly_limit:
+        room &= Q(month_used__lte=monthly_limit - count)
+    if daily_limit:
+        room &= ~Q(day=today) | Q(day_used__lte=daily_limit - count)
+
+    same_day = When(day=today, then=F('day_used') + count)
+    updates = {
+        'month_used': F('month_used') + count,
+        'day_used': Case(same_day, default=Value(count)),
+        # On day change, the closed day is kept until it is flushed
+        'prev_day': Case(When(day=today, then=F('prev_day')), default=F('day')),
+        'prev_day_used': Case(When(day=today, then=F('prev_day_used')), default=F('day_used')),
+        'day': Value(today),
+        'updated_at': timezone.now(),
+    }
+    bucket = GymEmailQuota.objects.filter(gym_id=gym.id, month=today.replace(day=1))
+
+    if bucket.filter(room).update(**updates):
+        return True
+    # No row matched: either the limit is reached or the month has no bucket yet
+    if _ensure_bucket(gym.id, today):
+        return bool(bucket.filter(room).update(**updates))
+    return False
+
+
+def release(gym, count=1, today=None):
+    """Give back `count` reserved sends that were not delivered."""
+    if count <= 0:
+        return
+    today = today or timezone.localdate()
+    counter = PositiveIntegerField()
+    GymEmailQuota.objects.filter(gym_id=gym.id, month=today.replace(day=1)).update(
+        month_used=Greatest(F('month_used') - count, 0, output_field=counter),
+        day_used=Case(
+            When(day=today, then=Greatest(F('day_used') - count, 0, output_field=counter)),
+            default=F('day_used'),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def get_usage(gym, today=None):
+    """(daily_sent, monthly_sent) of the gym, one query."""
+    today = today or timezone.localdate()
+    row = GymEmailQuota.objects.filter(gym_id=gym.id, month=today.replace(day=1)).values_list(
+        'day', 'day_used', 'month_used'
+    ).first()
+    if row is None:
+        # Bucket not created yet this month: whatever GymEmailUsage has
+        return (
+            GymEmailUsage.get_daily_count(gym, today),
+            GymEmailUsage.get_monthly_count(gym, today.year, today.month),
+        )
+    day, day_used, month_used = row
+    return (day_used if day == today else 0), month_used
+
+
+def reserve_up_to(gym, plan, count, today=None):
+    """
+    Reserve up to `count` sends and return how many were granted. The common
+    case (everything fits) is a single UPDATE; near the limit the remaining
+    room is read and reserved.
+    """
+    if count <= 0:
+        return 0
+    today = today or timezone.localdate()
+    if reserve(gym, plan, count, today):
+        return count
+
+    daily_limit, monthly_limit = _limits(plan)
+    daily_sent, monthly_sent = get_usage(gym, today)
+    room = [count]
+    if daily_limit:
+        room.append(daily_limit - daily_sent)
+    if monthly_limit:
+        room.append(monthly_limit - monthly_sent)
+    granted = min(room)
+    if granted > 0 and reserve(gym, plan, granted, today):
+        return granted
+    return 0
+
+
+class EmailQuotaReservation:
+    """
+    A block of sends reserved at once for a campaign or workflow batch.
+
+        with EmailQuotaReservation(gym, plan, len(recipients)) as quota:
+            for recipient in recipients:
+                send_email(..., quota=quota)
+
+    consume() takes a pre-reserved slot without touching the database; the
+    slots left unused are released when the block is closed.
+    """
+
+    def __init__(self, gym, plan, count, today=None):
+        self.gym = gym
+        self.today = today or timezone.localdate()
+        self.granted = reserve_up_to(gym, plan, count, self.today) if plan is not None else 0
+        self.used = 0
+
+    @property
+    def remaining(self):
+        return self.granted - self.used
+
+    def consume(self):
+        """Take one reserved slot. False when the block is exhausted."""
+        if self.used >= self.granted:
+            return False
+        self.used += 1
+        return True
+
+    def refund(self):
+        """Return a consumed slot (the send failed)."""
+        if self.used:
+            self.used -= 1
+
+    def close(self):
+        unused = self.remaining
+        if unused > 0:
+            release(self.gym, unused, self.today)
+        self.granted = self.used
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def flush_email_usage(now=None, days=2):
+    """
+    Copy the quota counters to GymEmailUsage (current and previous day of
+    every bucket touched in the last `days` days). Values are absolute, so
+    running it twice is harmless. Returns the number of rows written.
+    """
+    now = now or timezone.now()
+    rows = {}
+    buckets = GymEmailQuota.objects.filter(updated_at__gte=now - timedelta(days=days)).values_list(
+        'gym_id', 'day', 'day_used', 'prev_day', 'prev_day_used'
+    )
+    for gym_id, day, day_used, prev_day, prev_day_used in buckets.iterator():
+        rows[(gym_id, day)] = day_used
+        if prev_day is not None:
+            rows.setdefault((gym_id, prev_day), prev_day_used)
+
+    GymEmailUsage.objects.bulk_create(
+        [GymEmailUsage(gym_id=gym_id, date=day, emails_sent=sent) for (gym_id, day), sent in rows.items()],
+        update_conflicts=True,
+        unique_fields=['gym', 'date'],
+        update_fields=['emails_sent'],
+        batch_size=1000,
+    )
+    logger.info(f"Email usage flushed: {len(rows)} gym-days")
+    return len(rows)
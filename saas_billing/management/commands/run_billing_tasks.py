@@ -6,6 +6,7 @@ Usage:
     python manage.py run_billing_tasks --task=overdue
     python manage.py run_billing_tasks --task=reminders
     python manage.py run_billing_tasks --task=invoices
+    python manage.py run_billing_tasks --task=metrics
 """
 from django.core.management.base import BaseCommand
 from django.utils import timezone
@@ -20,7 +21,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--task',
             type=str,
-            choices=['all', 'overdue', 'reminders', 'invoices', 'mrr'],
+            choices=['all', 'overdue', 'reminders', 'invoices', 'mrr', 'metrics'],
             default='all',
             help='Which task to run (default: all)'
         )
@@ -53,6 +54,8 @@ class Command(BaseCommand):
             self._run_invoices()
         elif task == 'mrr':
             self._run_mrr()
+        elif task == 'metrics':
+            self._run_metrics()
     
     def _show_status(self):
         """Show current status without making changes."""
@@ -93,6 +96,19 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("\n✅ All tasks completed!"))
         self._print_results(results)
     
+    def _run_metrics(self):
+        """Refresh the tenant metrics snapshots of the superadmin panel."""
+        from saas_billing.tenant_metrics import snapshot_tenant_metrics
+        
+        self.stdout.write("Computing tenant metrics snapshots...\n")
+        
+        fleet = snapshot_tenant_metrics()
+        
+        self.stdout.write(self.style.SUCCESS("\n✅ Tenant metrics updated!"))
+        self.stdout.write(f"  Gyms: {fleet.total_gyms}")
+        self.stdout.write(f"  Active members: {fleet.members_active}")
+        self.stdout.write(f"  MRR: {fleet.mrr}€")
+    
     def _run_overdue(self):
         """Run overdue processing only."""
         self.stdout.write("Processing overdue subscriptions...\n")
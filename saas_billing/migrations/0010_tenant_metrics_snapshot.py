@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:40
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('saas_billing', '0009_add_mailrelay_and_email_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Fecha')),
+                ('total_gyms', models.PositiveIntegerField(default=0)),
+                ('active_gyms', models.PositiveIntegerField(default=0)),
+                ('suspended_gyms', models.PositiveIntegerField(default=0)),
+                ('past_due_gyms', models.PositiveIntegerField(default=0)),
+                ('cancelled_this_month', models.PositiveIntegerField(default=0)),
+                ('mrr', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('monthly_revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Facturas pagadas en el mes en curso', max_digits=12)),
+                ('members_active', models.PositiveIntegerField(default=0)),
+                ('staff_count', models.PositiveIntegerField(default=0)),
+                ('emails_month', models.PositiveIntegerField(default=0)),
+                ('storage_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('plan_distribution', models.JSONField(blank=True, default=list, help_text="[{'plan__name': ..., 'count': ...}] por número de gimnasios")),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Métricas de Plataforma',
+                'verbose_name_plural': 'Métricas de Plataforma',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TenantMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('members_active', models.PositiveIntegerField(default=0, verbose_name='Socios activos')),
+                ('members_total', models.PositiveIntegerField(default=0, verbose_name='Socios totales')),
+                ('staff_count', models.PositiveIntegerField(default=0, verbose_name='Empleados')),
+                ('mrr_contribution', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='Aportación al MRR')),
+                ('emails_today', models.PositiveIntegerField(default=0, verbose_name='Emails hoy')),
+                ('emails_month', models.PositiveIntegerField(default=0, verbose_name='Emails este mes')),
+                ('storage_bytes', models.BigIntegerField(blank=True, help_text='Bytes de fotos y documentos de clientes (vacío si el storage no es local)', null=True, verbose_name='Almacenamiento')),
+                ('last_activity_at', models.DateTimeField(blank=True, help_text='Último login de staff, venta o visita', null=True, verbose_name='Última actividad')),
+                ('computed_at', models.DateTimeField(verbose_name='Calculado')),
+                ('gym', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics_snapshot', to='organizations.gym')),
+            ],
+            options={
+                'verbose_name': 'Métricas de Gimnasio',
+                'verbose_name_plural': 'Métricas de Gimnasios',
+                'indexes': [models.Index(fields=['-members_active'], name='saas_billin_members_837d96_idx'), models.Index(fields=['-mrr_contribution'], name='saas_billin_mrr_con_d5fba9_idx'), models.Index(fields=['-last_activity_at'], name='saas_billin_last_ac_5fc2e4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('saas_billing', '0010_tenant_metrics_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymEmailQuota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='Primer día del mes')),
+                ('month_used', models.PositiveIntegerField(default=0)),
+                ('day', models.DateField(help_text='Día al que corresponde day_used')),
+                ('day_used', models.PositiveIntegerField(default=0)),
+                ('prev_day', models.DateField(blank=True, null=True)),
+                ('prev_day_used', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_quotas', to='organizations.gym')),
+            ],
+            options={
+                'verbose_name': 'Cupo de Email Transaccional',
+                'verbose_name_plural': 'Cupos de Email Transaccional',
+                'unique_together': {('gym', 'month')},
+            },
+        ),
+    ]
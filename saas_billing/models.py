@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -612,6 +613,124 @@ class GymEmailUsage(models.Model):
         return result['total'] or 0
 
 
+class GymEmailQuota(models.Model):
+    """
+    Atomic counter of a gym's transactional email quota for one month.
+
+    A single row per (gym, month) holds the month-to-date count and the count
+    of the current day, so reserving N sends against both limits is one
+    conditional UPDATE (see saas_billing.email_quota). The counters are
+    flushed periodically to GymEmailUsage, which stays the billing record.
+    """
+    gym = models.ForeignKey(
+        'organizations.Gym',
+        on_delete=models.CASCADE,
+        related_name='email_quotas'
+    )
+    month = models.DateField(help_text=_("Primer día del mes"))
+    month_used = models.PositiveIntegerField(default=0)
+    day = models.DateField(help_text=_("Día al que corresponde day_used"))
+    day_used = models.PositiveIntegerField(default=0)
+    # Último día cerrado por el cambio de día, pendiente de volcar a GymEmailUsage
+    prev_day = models.DateField(null=True, blank=True)
+    prev_day_used = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("Cupo de Email Transaccional")
+        verbose_name_plural = _("Cupos de Email Transaccional")
+        unique_together = ['gym', 'month']
+
+    def __str__(self):
+        return f"{self.gym_id} - {self.month:%Y-%m} - {self.month_used} emails"
+
+
+class TenantMetricsSnapshot(models.Model):
+    """
+    Precomputed per-gym metrics for the superadmin panel.
+    Refreshed nightly (and on demand) by saas_billing.tenant_metrics.
+    """
+    gym = models.OneToOneField(
+        'organizations.Gym',
+        on_delete=models.CASCADE,
+        related_name='metrics_snapshot'
+    )
+    members_active = models.PositiveIntegerField(default=0, verbose_name=_("Socios activos"))
+    members_total = models.PositiveIntegerField(default=0, verbose_name=_("Socios totales"))
+    staff_count = models.PositiveIntegerField(default=0, verbose_name=_("Empleados"))
+    mrr_contribution = models.DecimalField(
+        max_digits=10, decimal_places=2, default=Decimal('0.00'),
+        verbose_name=_("Aportación al MRR")
+    )
+    emails_today = models.PositiveIntegerField(default=0, verbose_name=_("Emails hoy"))
+    emails_month = models.PositiveIntegerField(default=0, verbose_name=_("Emails este mes"))
+    storage_bytes = models.BigIntegerField(
+        null=True, blank=True,
+        verbose_name=_("Almacenamiento"),
+        help_text=_("Bytes de fotos y documentos de clientes (vacío si el storage no es local)")
+    )
+    last_activity_at = models.DateTimeField(
+        null=True, blank=True,
+        verbose_name=_("Última actividad"),
+        help_text=_("Último login de staff, venta o visita")
+    )
+    computed_at = models.DateTimeField(verbose_name=_("Calculado"))
+    
+    class Meta:
+        verbose_name = _("Métricas de Gimnasio")
+        verbose_name_plural = _("Métricas de Gimnasios")
+        indexes = [
+            models.Index(fields=['-members_active']),
+            models.Index(fields=['-mrr_contribution']),
+            models.Index(fields=['-last_activity_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.gym.name} - {self.members_active} socios ({self.computed_at:%Y-%m-%d})"
+
+
+class FleetMetricsSnapshot(models.Model):
+    """
+    Platform-wide summary row, one per day (KPIs of the superadmin dashboard).
+    """
+    date = models.DateField(unique=True, verbose_name=_("Fecha"))
+    total_gyms = models.PositiveIntegerField(default=0)
+    active_gyms = models.PositiveIntegerField(default=0)
+    suspended_gyms = models.PositiveIntegerField(default=0)
+    past_due_gyms = models.PositiveIntegerField(default=0)
+    cancelled_this_month = models.PositiveIntegerField(default=0)
+    mrr = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    monthly_revenue = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'),
+        help_text=_("Facturas pagadas en el mes en curso")
+    )
+    members_active = models.PositiveIntegerField(default=0)
+    staff_count = models.PositiveIntegerField(default=0)
+    emails_month = models.PositiveIntegerField(default=0)
+    storage_bytes = models.BigIntegerField(null=True, blank=True)
+    plan_distribution = models.JSONField(
+        default=list, blank=True,
+        help_text=_("[{'plan__name': ..., 'count': ...}] por número de gimnasios")
+    )
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = _("Métricas de Plataforma")
+        verbose_name_plural = _("Métricas de Plataforma")
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.date} - {self.total_gyms} gyms - MRR {self.mrr}"
+    
+    @property
+    def arr(self):
+        return self.mrr * 12
+    
+    @property
+    def churn_rate(self):
+        return (self.cancelled_this_month / self.total_gyms * 100) if self.total_gyms else 0
+
+
 class BillingConfig(models.Model):
     """
     Singleton model for superadmin billing configuration.
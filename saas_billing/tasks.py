@@ -7,6 +7,8 @@ Background tasks for subscription management:
 - Generate recurring invoices
 - Monitor webhook health
 - Calculate and store MRR metrics
+- Snapshot per-gym metrics for the superadmin panel (Celery)
+- Flush the transactional email quota counters to GymEmailUsage (Celery)
 
 These tasks should be run via cron, Celery, or Django-Q.
 """
@@ -15,6 +17,7 @@ from decimal import Decimal
 from typing import Optional
 import logging
 
+from celery import shared_task
 from django.db import transaction
 from django.db.models import Sum, Count, Q, F
 from django.utils import timezone
@@ -376,3 +379,22 @@ def process_overdue():
 def send_reminders():
     """Entry point for reminders only."""
     return task_service.send_payment_reminders()
+
+
+# ==================== Celery Tasks ====================
+
+@shared_task(name='saas_billing.snapshot_tenant_metrics')
+def snapshot_tenant_metrics_task():
+    """Nightly TenantMetricsSnapshot / FleetMetricsSnapshot refresh for the superadmin panel."""
+    from .tenant_metrics import snapshot_tenant_metrics
+
+    fleet = snapshot_tenant_metrics()
+    return {'date': fleet.date.isoformat(), 'total_gyms': fleet.total_gyms, 'mrr': str(fleet.mrr)}
+
+
+@shared_task(name='saas_billing.flush_email_usage')
+def flush_email_usage_task():
+    """Copy the atomic email quota counters to GymEmailUsage (billing record)."""
+    from .email_quota import flush_email_usage
+
+    return {'rows': flush_email_usage()}
@@ -0,0 +1,239 @@
+"""
+Tenant metrics snapshots for the superadmin panel.
+
+Instead of counting members, staff, emails and revenue live on every page load,
+the metrics of every gym are computed in a handful of grouped queries (one per
+source table for the whole fleet) and stored in TenantMetricsSnapshot, plus a
+daily FleetMetricsSnapshot with the platform-wide KPIs.
+
+- snapshot_tenant_metrics(): every gym + fleet row (nightly task / dashboard refresh)
+- refresh_gym_metrics(gym): a single gym, on demand (no fleet row)
+"""
+import logging
+import os
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    FleetMetricsSnapshot, GymEmailUsage, GymSubscription, Invoice, TenantMetricsSnapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = [
+    'members_active', 'members_total', 'staff_count', 'mrr_contribution',
+    'emails_today', 'emails_month', 'storage_bytes', 'last_activity_at', 'computed_at',
+]
+
+
+def _grouped(queryset, key, **aggregates):
+    """{key: {alias: value}} of an aggregation grouped by `key`."""
+    rows = queryset.values(key).annotate(**aggregates).order_by()
+    return {row.pop(key): row for row in rows}
+
+
+def _mrr(status, frequency, price_monthly, price_yearly):
+    """Monthly contribution of a subscription (same rule as alerts.calculate_current_mrr)."""
+    if status != 'ACTIVE':
+        return Decimal('0.00')
+    if frequency == 'YEARLY':
+        return ((price_yearly or Decimal('0')) / 12).quantize(Decimal('0.01'))
+    return price_monthly or Decimal('0.00')
+
+
+def _local_storage():
+    """True if default_storage keeps files on local disk (sizes via os.stat)."""
+    try:
+        default_storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+
+def _storage_bytes(gym_ids):
+    """
+    {gym_id: bytes} of client photos, documents, signatures and health
+    documents. None when storage is not local (a HEAD request per file in
+    S3 would be too expensive for a nightly job).
+    """
+    from clients.models import Client, ClientDocument, ClientHealthDocument
+
+    if not _local_storage():
+        return None
+
+    sources = [
+        Client.objects.filter(gym_id__in=gym_ids).exclude(photo='').values_list('gym_id', 'photo'),
+        ClientDocument.objects.filter(client__gym_id__in=gym_ids).exclude(file='').values_list(
+            'client__gym_id', 'file'
+        ),
+        ClientDocument.objects.filter(client__gym_id__in=gym_ids).exclude(signature_image='').values_list(
+            'client__gym_id', 'signature_image'
+        ),
+        ClientHealthDocument.objects.filter(health_record__client__gym_id__in=gym_ids).exclude(
+            file=''
+        ).values_list('health_record__client__gym_id', 'file'),
+    ]
+    totals = {}
+    for source in sources:
+        for gym_id, name in source.iterator():
+            if not name:
+                continue
+            try:
+                size = os.path.getsize(default_storage.path(name))
+            except OSError:
+                continue
+            totals[gym_id] = totals.get(gym_id, 0) + size
+    return totals
+
+
+def _latest(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def compute_tenant_metrics(gym_ids, now=None):
+    """TenantMetricsSnapshot (unsaved) for `gym_ids`, one grouped query per source."""
+    from clients.models import Client, ClientVisit
+    from sales.models import Order
+    from staff.models import StaffProfile
+
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    month_start = today.replace(day=1)
+
+    members = _grouped(
+        Client.objects.filter(gym_id__in=gym_ids), 'gym_id',
+        total=Count('id'), active=Count('id', filter=Q(status='ACTIVE')),
+    )
+    staff = _grouped(
+        StaffProfile.objects.filter(gym_id__in=gym_ids), 'gym_id',
+        count=Count('id'), last_login=Max('user__last_login'),
+    )
+    emails = _grouped(
+        GymEmailUsage.objects.filter(gym_id__in=gym_ids, date__gte=month_start), 'gym_id',
+        month=Sum('emails_sent'), today=Sum('emails_sent', filter=Q(date=today)),
+    )
+    last_order = _grouped(Order.objects.filter(gym_id__in=gym_ids), 'gym_id', last=Max('created_at'))
+    last_visit = _grouped(
+        ClientVisit.objects.filter(client__gym_id__in=gym_ids), 'client__gym_id', last=Max('date')
+    )
+    subscriptions = {
+        row[0]: row[1:]
+        for row in GymSubscription.objects.filter(gym_id__in=gym_ids).values_list(
+            'gym_id', 'status', 'billing_frequency', 'plan__price_monthly', 'plan__price_yearly'
+        )
+    }
+    storage = _storage_bytes(gym_ids)
+
+    tz = timezone.get_current_timezone()
+    snapshots = []
+    for gym_id in gym_ids:
+        visit_date = last_visit.get(gym_id, {}).get('last')
+        subscription = subscriptions.get(gym_id)
+        snapshots.append(TenantMetricsSnapshot(
+            gym_id=gym_id,
+            members_active=members.get(gym_id, {}).get('active', 0),
+            members_total=members.get(gym_id, {}).get('total', 0),
+            staff_count=staff.get(gym_id, {}).get('count', 0),
+            mrr_contribution=_mrr(*subscription) if subscription else Decimal('0.00'),
+            emails_today=emails.get(gym_id, {}).get('today') or 0,
+            emails_month=emails.get(gym_id, {}).get('month') or 0,
+            storage_bytes=storage.get(gym_id, 0) if storage is not None else None,
+            last_activity_at=_latest(
+                staff.get(gym_id, {}).get('last_login'),
+                last_order.get(gym_id, {}).get('last'),
+                timezone.make_aware(datetime.combine(visit_date, time.min), tz) if visit_date else None,
+            ),
+            computed_at=now,
+        ))
+    return snapshots
+
+
+def _save(snapshots):
+    if snapshots:
+        TenantMetricsSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['gym'],
+            update_fields=SNAPSHOT_FIELDS,
+        )
+    return snapshots
+
+
+def refresh_gym_metrics(gym, now=None):
+    """Recompute the snapshot of a single gym. Returns the (saved) snapshot."""
+    _save(compute_tenant_metrics([gym.id], now))
+    return TenantMetricsSnapshot.objects.get(gym=gym)
+
+
+def compute_fleet_metrics(snapshots, now=None):
+    """FleetMetricsSnapshot (unsaved) from the per-gym snapshots + subscription/invoice totals."""
+    from organizations.models import Gym
+
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    month_start = today.replace(day=1)
+
+    statuses = dict(
+        GymSubscription.objects.values('status').annotate(n=Count('id')).order_by().values_list('status', 'n')
+    )
+    cancelled_this_month = GymSubscription.objects.filter(
+        status='CANCELLED',
+        updated_at__gte=timezone.make_aware(datetime.combine(month_start, time.min)),
+    ).count()
+    monthly_revenue = Invoice.objects.filter(
+        status='PAID', paid_date__gte=month_start
+    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+    plan_distribution = list(
+        GymSubscription.objects.values('plan__name').annotate(count=Count('id')).order_by('-count')
+    )
+    storage = [s.storage_bytes for s in snapshots if s.storage_bytes is not None]
+
+    return FleetMetricsSnapshot(
+        date=today,
+        total_gyms=Gym.objects.count(),
+        active_gyms=statuses.get('ACTIVE', 0),
+        suspended_gyms=statuses.get('SUSPENDED', 0),
+        past_due_gyms=statuses.get('PAST_DUE', 0),
+        cancelled_this_month=cancelled_this_month,
+        mrr=sum((s.mrr_contribution for s in snapshots), Decimal('0.00')),
+        monthly_revenue=monthly_revenue,
+        members_active=sum(s.members_active for s in snapshots),
+        staff_count=sum(s.staff_count for s in snapshots),
+        emails_month=sum(s.emails_month for s in snapshots),
+        storage_bytes=sum(storage) if storage else None,
+        plan_distribution=plan_distribution,
+        computed_at=now,
+    )
+
+
+def snapshot_tenant_metrics(now=None, batch_size=500):
+    """
+    Recompute the snapshots of every gym (in batches of `batch_size` ids) and
+    the fleet row of today. Returns the FleetMetricsSnapshot.
+    """
+    from organizations.models import Gym
+
+    now = now or timezone.now()
+    gym_ids = list(Gym.objects.order_by('id').values_list('id', flat=True))
+    snapshots = []
+    for start in range(0, len(gym_ids), batch_size):
+        with transaction.atomic():
+            snapshots += _save(compute_tenant_metrics(gym_ids[start:start + batch_size], now))
+
+    fleet = compute_fleet_metrics(snapshots, now)
+    FleetMetricsSnapshot.objects.bulk_create(
+        [fleet],
+        update_conflicts=True,
+        unique_fields=['date'],
+        update_fields=[
+            f.name for f in FleetMetricsSnapshot._meta.concrete_fields if f.name not in ('id', 'date')
+        ],
+    )
+    logger.info(f"Tenant metrics snapshot: {len(snapshots)} gyms, MRR {fleet.mrr}")
+    return fleet
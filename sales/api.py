@@ -9,8 +9,11 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from .models import Order, OrderItem, OrderPayment, OrderRefund
 from products.models import Product
+from products.stock import record_return, record_sale
+from .pos_catalog import search_catalog
 from services.models import Service
 from clients.models import Client
+from clients import search as client_search
 from finance.models import PaymentMethod
 from accounts.decorators import require_gym_permission
 from memberships.models import MembershipPlan
@@ -163,6 +166,7 @@ def order_cancel(request, order_id):
         
     order.internal_notes += note
     order.save()
+    record_return(order, user=request.user)
     
     return JsonResponse({'success': True, 'message': 'Venta cancelada. ' + ', '.join(refund_notes)})
 
@@ -192,6 +196,7 @@ def order_delete(request, order_id):
         }, status=400)
     
     try:
+        record_return(order, user=request.user)
         order.delete()
         return JsonResponse({
             'success': True, 
@@ -361,6 +366,9 @@ def order_process_refund(request, order_id):
     
     # Actualizar total devuelto de la orden
     order.update_refund_total()
+    # Devolución total: los productos vuelven al stock (las parciales solo son dinero)
+    if order.is_fully_refunded:
+        record_return(order, user=request.user)
     
     # Registrar en notas
     note = f"\n[Devolución de {amount}€ por {request.user.get_full_name() or request.user.username} - {datetime.datetime.now().strftime('%d/%m/%Y %H:%M')}]"
@@ -529,6 +537,8 @@ def order_refund_retry(request, order_id, refund_id):
     
     if refund.status == 'COMPLETED':
         order.update_refund_total()
+        if order.is_fully_refunded:
+            record_return(order, user=request.user)
     
     return JsonResponse({
         'success': refund.status == 'COMPLETED',
@@ -670,106 +680,13 @@ from decimal import Decimal
 
 @require_gym_permission('sales.view_sale')
 def search_products(request):
+    """
+    Búsqueda del TPV (productos, servicios y planes) en cada pulsación.
+    Un barcode o SKU exacto devuelve solo ese producto con exact_match.
+    Se resuelve en memoria contra el índice del gimnasio (sales.pos_catalog).
+    """
     query = request.GET.get('q', '').strip()
-    gym = request.gym
-    results = []
-
-    # Search Products - Incluye búsqueda por código de barras y SKU
-    products = Product.objects.filter(gym=gym, is_active=True)
-    if query:
-        # Búsqueda por barcode exacto (escaneo)
-        barcode_match = products.filter(barcode=query).first()
-        if barcode_match:
-            # Si hay coincidencia exacta por barcode, retornar solo ese producto
-            return JsonResponse({'results': [{
-                'type': 'product',
-                'id': barcode_match.id,
-                'name': barcode_match.name,
-                'price': float(barcode_match.final_price),
-                'image': barcode_match.image.url if barcode_match.image else None,
-                'category': barcode_match.category.name if barcode_match.category else 'Sin Categoría',
-                'barcode': barcode_match.barcode,
-                'sku': barcode_match.sku,
-                'exact_match': True
-            }]})
-        
-        # Búsqueda por SKU exacto
-        sku_match = products.filter(sku__iexact=query).first()
-        if sku_match:
-            return JsonResponse({'results': [{
-                'type': 'product',
-                'id': sku_match.id,
-                'name': sku_match.name,
-                'price': float(sku_match.final_price),
-                'image': sku_match.image.url if sku_match.image else None,
-                'category': sku_match.category.name if sku_match.category else 'Sin Categoría',
-                'barcode': sku_match.barcode,
-                'sku': sku_match.sku,
-                'exact_match': True
-            }]})
-        
-        # Búsqueda por nombre (parcial)
-        from django.db.models import Q
-        products = products.filter(
-            Q(name__icontains=query) |
-            Q(barcode__icontains=query) |
-            Q(sku__icontains=query)
-        )
-    
-    for p in products[:10]:
-        try:
-            results.append({
-                'type': 'product',
-                'id': p.id,
-                'name': p.name,
-                'price': float(p.final_price),
-                'image': p.image.url if p.image else None,
-                'category': p.category.name if p.category else 'Sin Categoría',
-                'barcode': p.barcode or '',
-                'sku': p.sku or ''
-            })
-        except Exception as e:
-            logger.exception(f"Error loading product {p.id}")
-
-    # Search Services
-    services = Service.objects.filter(gym=gym, is_active=True)
-    if query:
-        services = services.filter(name__icontains=query)
-
-    for s in services[:10]:
-        try:
-            results.append({
-                'type': 'service',
-                'id': s.id,
-                'name': s.name,
-                'price': float(s.final_price),
-                'image': s.image.url if s.image else None,
-                'category': s.category.name if s.category else 'Sin Categoría'
-            })
-        except Exception:
-            pass
-
-    # Search Memberships (Plans)
-    plans = MembershipPlan.objects.filter(gym=gym, is_active=True)
-    if query:
-        plans = plans.filter(name__icontains=query)
-    
-    for plan in plans[:10]:
-        try:
-            results.append({
-                'type': 'membership',
-                'id': plan.id,
-                'name': plan.name,
-                'price': float(plan.final_price),
-                'image': plan.image.url if plan.image else None,
-                'category': 'Cuota / Plan',
-                'has_enrollment_fee': bool(getattr(plan, 'has_enrollment_fee', False)),
-                'enrollment_fee': float(getattr(plan, 'final_enrollment_fee', 0)),
-            })
-        except Exception:
-            pass
-
-    return JsonResponse({'results': results})
+    return JsonResponse({'results': search_catalog(request.gym.id, query)})
 
 @require_gym_permission('sales.view_sale')
 def search_clients(request):
@@ -781,19 +698,10 @@ def search_clients(request):
     
     # Direct ID lookup takes priority
     if client_id:
-        clients = clients.filter(id=client_id)
-    elif query:
-        # Check if query is numeric for ID search
-        if query.isdigit():
-             clients = clients.filter(id=query) | clients.filter(dni__icontains=query)
-        else:
-             clients = clients.filter(first_name__icontains=query) | clients.filter(last_name__icontains=query) | clients.filter(dni__icontains=query)
+        clients = clients.filter(id=client_id)[:20]
     else:
-        # Sin query: mostrar todos los clientes ordenados alfabéticamente
-        clients = clients.order_by('first_name', 'last_name')
-    
-    # Limitar resultados
-    clients = clients[:20]
+        # Sin query: todos los clientes ordenados alfabéticamente
+        clients = client_search.search_clients(clients, query, limit=20)
     
     results = []
     for c in clients:
@@ -905,6 +813,8 @@ def process_sale(request):
 
     total_amount = Decimal(0)
     total_discount = Decimal(0)
+    # (product_id, qty) que descuentan stock, aplicados de una vez al cerrar la venta
+    stock_lines = []
 
     # 3. Create Items
     for item in items:
@@ -921,6 +831,8 @@ def process_sale(request):
 
         if obj_type == 'product':
             obj = Product.objects.get(pk=obj_id, gym=gym)
+            if obj.track_stock:
+                stock_lines.append((obj.id, qty))
         elif obj_type == 'service':
             obj = Service.objects.get(pk=obj_id, gym=gym)
         else:
@@ -1008,6 +920,7 @@ def process_sale(request):
         order.total_amount = total_amount
         order.total_discount = total_discount
         order.save()
+        record_sale(order, stock_lines, user=sale_user)
         
         return JsonResponse({
             'success': True, 
@@ -1103,6 +1016,7 @@ def process_sale(request):
     order.total_amount = total_amount
     order.total_discount = total_discount
     order.save()
+    record_sale(order, stock_lines, user=sale_user)
     
     if client and order.status == 'PAID':
         _auto_assign_memberships_from_order(order, client, gym)
@@ -1550,6 +1464,8 @@ def order_update_status(request, order_id):
             change_summary = " | ".join(changes)
         else:
             change_summary = "Sin cambios"
+        if new_status in ('CANCELLED', 'REFUNDED') and old_status != new_status:
+            record_return(order, user=request.user)
         
         return JsonResponse({
             'success': True, 
@@ -1920,6 +1836,7 @@ def deferred_order_cancel(request, order_id):
         order.status = 'CANCELLED'
         order.internal_notes += f" | Venta diferida cancelada el {date.today().strftime('%d/%m/%Y')}"
         order.save()
+        record_return(order, user=request.user)
         
         return JsonResponse({'success': True, 'message': 'Venta diferida cancelada correctamente'})
         
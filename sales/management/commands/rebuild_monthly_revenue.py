@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from organizations.models import Gym
+from sales.revenue import add_months, month_start, rebuild_months
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la facturación mensual agregada (GymMonthlyRevenue) desde las ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=36, help='Meses de histórico a reconstruir')
+        parser.add_argument('--gym', type=int, help='ID del gimnasio (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        current = month_start(timezone.localdate())
+        start = add_months(current, -(options['months'] - 1))
+
+        gyms = Gym.objects.all()
+        if options['gym']:
+            gyms = gyms.filter(id=options['gym'])
+
+        for gym in gyms:
+            rows = rebuild_months([gym.id], start, current)
+            self.stdout.write(self.style.SUCCESS(f'✅ {gym.name}: {rows} meses'))
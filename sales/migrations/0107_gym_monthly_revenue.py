@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_revenue(apps, schema_editor):
+    Order = apps.get_model('sales', 'Order')
+    GymMonthlyRevenue = apps.get_model('sales', 'GymMonthlyRevenue')
+
+    rows = Order.objects.filter(status='PAID').annotate(
+        month=TruncMonth('created_at')
+    ).values('gym_id', 'month').annotate(
+        total=Sum('total_amount'),
+        orders=Count('id'),
+    ).order_by()
+
+    GymMonthlyRevenue.objects.bulk_create([
+        GymMonthlyRevenue(
+            gym_id=row['gym_id'],
+            month=row['month'].date() if hasattr(row['month'], 'date') else row['month'],
+            total_amount=row['total'] or 0,
+            orders_count=row['orders'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0020_add_checkin_methods_and_geolocation'),
+        ('sales', '0106_verification_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymMonthlyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='Primer día del mes', verbose_name='Mes')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Facturación')),
+                ('orders_count', models.IntegerField(default=0, verbose_name='Nº Ventas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_revenue', to='organizations.gym')),
+            ],
+            options={
+                'verbose_name': 'Facturación Mensual',
+                'verbose_name_plural': 'Facturación Mensual',
+                'ordering': ['gym', 'month'],
+                'unique_together': {('gym', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_monthly_revenue, migrations.RunPython.noop),
+    ]
@@ -206,3 +206,25 @@ class OrderRefund(models.Model):
     
     def __str__(self):
         return f"Devolución #{self.pk} - {self.amount}€ ({self.get_status_display()})"
+
+
+class GymMonthlyRevenue(models.Model):
+    """
+    Facturación mensual agregada por gimnasio (ventas PAID por mes de creación).
+    Se mantiene de forma incremental desde las señales de Order (ver sales.revenue)
+    para que los dashboards y el forecast no recorran Order.
+    """
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='monthly_revenue')
+    month = models.DateField(_("Mes"), help_text=_("Primer día del mes"))
+    total_amount = models.DecimalField(_("Facturación"), max_digits=14, decimal_places=2, default=0)
+    orders_count = models.IntegerField(_("Nº Ventas"), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Facturación Mensual")
+        verbose_name_plural = _("Facturación Mensual")
+        ordering = ['gym', 'month']
+        unique_together = ('gym', 'month')
+
+    def __str__(self):
+        return f"{self.gym} {self.month:%m/%Y}: {self.total_amount}€"
@@ -0,0 +1,296 @@
+"""
+Índice en memoria del catálogo vendible del TPV (productos, servicios y planes).
+
+search_products se llama en cada pulsación del cajero. En lugar de encadenar
+consultas (barcode exacto, SKU, icontains en varias columnas, servicios y
+planes), cada proceso guarda un CatalogIndex por gimnasio y responde en una
+sola pasada en memoria:
+
+- barcode y SKU exactos: diccionarios.
+- nombre/código: prefijos de palabra (lista ordenada + bisect), sin acentos
+  ni mayúsculas; si no se llenan los resultados, se completa buscando el
+  texto dentro del nombre, como hacía el icontains.
+
+Las entradas (ya serializadas, con precio final e imagen) se comparten entre
+procesos en la caché, una clave por tipo, junto a una versión del catálogo.
+Las señales (sales.signals) descartan solo el tipo del elemento guardado o
+borrado y la versión; la siguiente búsqueda rehace ese tipo desde la base de
+datos (una consulta) y publica una versión nueva. Nadie reescribe la lista
+de otro proceso, así que dos ediciones simultáneas no se pisan. Cada proceso
+compara la versión en cada búsqueda (una lectura de caché) y reconstruye su
+índice local solo si ha cambiado. Los cambios de impuestos o categorías
+descartan el catálogo del gimnasio entero.
+"""
+import heapq
+import logging
+import time
+import unicodedata
+from bisect import bisect_left
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_KEY = 'pos_catalog:{}:{}'
+CATALOG_VERSION_CACHE_KEY = 'pos_catalog_version:{}'
+# Acota cualquier desajuste entre una reconstrucción y una edición simultánea
+CATALOG_TTL = 3600
+
+RESULTS_PER_TYPE = 10
+MAX_MERGED_TOKENS = 64
+TYPES = ('product', 'service', 'membership')
+
+# Índices por gimnasio de este proceso: {gym_id: CatalogIndex}
+_indexes = {}
+MAX_PROCESS_INDEXES = 200
+
+
+def normalize(text):
+    """Minúsculas y sin acentos, para comparar como lo escribe el cajero."""
+    text = str(text or '').lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+# -----------------------------------------------------------------------------
+# Entradas del catálogo
+# -----------------------------------------------------------------------------
+
+def _image_url(image):
+    try:
+        return image.url if image else None
+    except ValueError:
+        return None
+
+
+def product_entry(product):
+    return {
+        'type': 'product',
+        'id': product.id,
+        'name': product.name,
+        'price': float(product.final_price),
+        'image': _image_url(product.image),
+        'category': product.category.name if product.category else 'Sin Categoría',
+        'barcode': product.barcode or '',
+        'sku': product.sku or '',
+    }
+
+
+def service_entry(service):
+    return {
+        'type': 'service',
+        'id': service.id,
+        'name': service.name,
+        'price': float(service.final_price),
+        'image': _image_url(service.image),
+        'category': service.category.name if service.category else 'Sin Categoría',
+    }
+
+
+def plan_entry(plan):
+    return {
+        'type': 'membership',
+        'id': plan.id,
+        'name': plan.name,
+        'price': float(plan.final_price),
+        'image': _image_url(plan.image),
+        'category': 'Cuota / Plan',
+        'has_enrollment_fee': bool(getattr(plan, 'has_enrollment_fee', False)),
+        'enrollment_fee': float(getattr(plan, 'final_enrollment_fee', 0)),
+    }
+
+
+def _querysets(gym_id):
+    from memberships.models import MembershipPlan
+    from products.models import Product
+    from services.models import Service
+
+    return {
+        'product': (
+            Product.objects.filter(gym_id=gym_id, is_active=True)
+            .select_related('category', 'tax_rate').prefetch_related('additional_tax_rates'),
+            product_entry,
+        ),
+        'service': (
+            Service.objects.filter(gym_id=gym_id, is_active=True).select_related('category', 'tax_rate'),
+            service_entry,
+        ),
+        'membership': (
+            MembershipPlan.objects.filter(gym_id=gym_id, is_active=True)
+            .select_related('tax_rate', 'enrollment_fee_tax_rate').prefetch_related('additional_tax_rates'),
+            plan_entry,
+        ),
+    }
+
+
+def build_entries(gym_id, kind):
+    """Entradas vendibles de un tipo del gimnasio (una consulta)."""
+    queryset, serialize = _querysets(gym_id)[kind]
+    entries = []
+    for obj in queryset:
+        try:
+            entries.append(serialize(obj))
+        except Exception:
+            logger.exception(f"Error indexando {obj.__class__.__name__} {obj.pk} en el TPV")
+    return entries
+
+
+def load_entries(gym_id):
+    """
+    Entradas de todos los tipos: las de la caché y, para los tipos que faltan,
+    construidas y guardadas. Devuelve (entradas, reconstruido).
+    """
+    keys = {kind: CATALOG_CACHE_KEY.format(gym_id, kind) for kind in TYPES}
+    cached = cache.get_many(keys.values())
+    entries = []
+    rebuilt = {}
+    for kind, key in keys.items():
+        if key not in cached:
+            cached[key] = rebuilt[key] = build_entries(gym_id, kind)
+        entries.extend(cached[key])
+    if rebuilt:
+        cache.set_many(rebuilt, CATALOG_TTL)
+    return entries, bool(rebuilt)
+
+
+def invalidate_entries(gym_id, kind):
+    """Descarta las entradas de un tipo (y la versión) del catálogo del gimnasio."""
+    if gym_id:
+        cache.delete_many([CATALOG_CACHE_KEY.format(gym_id, kind), CATALOG_VERSION_CACHE_KEY.format(gym_id)])
+
+
+def schedule_invalidate(gym_id, kind):
+    """invalidate_entries() al confirmar la transacción en curso."""
+    if gym_id:
+        transaction.on_commit(lambda: invalidate_entries(gym_id, kind))
+
+
+def invalidate_catalog(gym_id):
+    """Descarta el catálogo del gimnasio (cambios que afectan a muchas entradas)."""
+    if gym_id:
+        cache.delete_many(
+            [CATALOG_CACHE_KEY.format(gym_id, kind) for kind in TYPES]
+            + [CATALOG_VERSION_CACHE_KEY.format(gym_id)]
+        )
+
+
+# -----------------------------------------------------------------------------
+# Índice
+# -----------------------------------------------------------------------------
+
+class _TypeIndex:
+    """Entradas de un tipo ordenadas por nombre, con índice de prefijos de palabra."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda e: (normalize(e['name']), e['id']))
+        # El barcode y el SKU también se buscan en parcial, como antes
+        self.haystacks = [
+            ' '.join(normalize(entry.get(field)) for field in ('name', 'barcode', 'sku') if entry.get(field))
+            for entry in self.entries
+        ]
+        self.entry_tokens = [tuple(set(haystack.split())) for haystack in self.haystacks]
+        postings = {}
+        for position, tokens in enumerate(self.entry_tokens):
+            for token in tokens:
+                postings.setdefault(token, []).append(position)
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+
+    def _prefix_range(self, term):
+        return bisect_left(self.tokens, term), bisect_left(self.tokens, term + '\uffff')
+
+    def _prefix_matches(self, terms, limit):
+        ranges = []
+        for term in terms:
+            lo, hi = self._prefix_range(term)
+            if lo == hi:
+                return []
+            ranges.append((sum(len(p) for p in self.postings[lo:hi]), lo, hi))
+        # Se recorre el término más selectivo en orden de nombre y se comprueban los demás
+        _, lo, hi = min(ranges)
+        if hi - lo > MAX_MERGED_TOKENS:
+            # Prefijo muy corto con muchas palabras distintas (p. ej. un dígito):
+            # recorrer las entradas en orden sale antes que mezclar tantas listas
+            return list(islice((
+                position for position, tokens in enumerate(self.entry_tokens)
+                if all(any(token.startswith(term) for token in tokens) for term in terms)
+            ), limit))
+        found = []
+        previous = None
+        for position in heapq.merge(*self.postings[lo:hi]):
+            if position == previous:
+                continue
+            previous = position
+            tokens = self.entry_tokens[position]
+            if all(any(token.startswith(term) for token in tokens) for term in terms):
+                found.append(position)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def search(self, terms, limit):
+        found = self._prefix_matches(terms, limit) if terms else list(range(min(limit, len(self.entries))))
+        if len(found) < limit and terms:
+            # Completar con coincidencias dentro del texto
+            needle = ' '.join(terms)
+            seen = set(found)
+            for position, haystack in enumerate(self.haystacks):
+                if position not in seen and needle in haystack:
+                    found.append(position)
+                    if len(found) >= limit:
+                        break
+        return [self.entries[position] for position in found]
+
+
+class CatalogIndex:
+    """Índice de búsqueda de un catálogo (inmutable; se sustituye entero)."""
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.by_barcode = {}
+        self.by_sku = {}
+        by_type = {kind: [] for kind in TYPES}
+        for entry in entries:
+            by_type[entry['type']].append(entry)
+            if entry.get('barcode'):
+                self.by_barcode.setdefault(entry['barcode'], entry)
+            if entry.get('sku'):
+                self.by_sku.setdefault(entry['sku'].lower(), entry)
+        self.types = {kind: _TypeIndex(type_entries) for kind, type_entries in by_type.items()}
+
+    def search(self, query, limit=RESULTS_PER_TYPE):
+        """Misma forma de resultados que search_products: lista de entradas."""
+        query = (query or '').strip()
+        if query:
+            exact = self.by_barcode.get(query) or self.by_sku.get(query.lower())
+            if exact:
+                return [{**exact, 'exact_match': True}]
+        terms = normalize(query).split()
+        return [entry for kind in TYPES for entry in self.types[kind].search(terms, limit)]
+
+
+def get_index(gym_id):
+    """Índice del gimnasio en este proceso, reconstruido si cambió la versión."""
+    version = cache.get(CATALOG_VERSION_CACHE_KEY.format(gym_id))
+    index = _indexes.get(gym_id)
+    if index is not None and version is not None and index.version == version:
+        return index
+
+    entries, rebuilt = load_entries(gym_id)
+    if rebuilt or version is None:
+        version = time.time_ns()
+        cache.set(CATALOG_VERSION_CACHE_KEY.format(gym_id), version, CATALOG_TTL)
+    _indexes.pop(gym_id, None)
+    if len(_indexes) >= MAX_PROCESS_INDEXES:
+        # El gimnasio que lleva más tiempo sin reconstruirse
+        _indexes.pop(next(iter(_indexes)))
+    index = _indexes[gym_id] = CatalogIndex(entries, version)
+    return index
+
+
+def search_catalog(gym_id, query, limit=RESULTS_PER_TYPE):
+    return get_index(gym_id).search(query, limit)
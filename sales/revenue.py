@@ -0,0 +1,167 @@
+"""
+Agregados de facturación mensual por gimnasio (GymMonthlyRevenue).
+
+Una venta cuenta en el mes (hora local) de su creación mientras esté PAID,
+igual que el TruncMonth('created_at') que usaban los dashboards. El agregado
+se mantiene así:
+
+- apply_delta(): suma/resta atómica (F()) al guardar o borrar una venta
+  (señales en sales.signals).
+- rebuild_months(): recalcula meses completos desde Order (reconciliación
+  nocturna y backfill con `manage.py rebuild_monthly_revenue`), por si alguna
+  venta se modificó con queryset.update() sin pasar por las señales.
+- monthly_series(): series mensuales compactas (con ceros) para varios
+  gimnasios en una sola consulta.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value):
+    """Primer día del mes (hora local) de un datetime o date."""
+    if hasattr(value, 'hour'):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month, n):
+    """Suma n meses (n puede ser negativo) a un primer día de mes."""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start_month, end_month):
+    """Primeros días de mes entre dos meses (incluidos)."""
+    months = []
+    month = month_start(start_month)
+    while month <= end_month:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def order_contribution(gym_id, status, total_amount, created_at):
+    """(gym_id, mes, importe) con el que una venta cuenta en el agregado, o None."""
+    if status != 'PAID' or not gym_id or created_at is None:
+        return None
+    return gym_id, month_start(created_at), Decimal(total_amount or 0)
+
+
+def apply_delta(gym_id, month, amount, orders):
+    """Suma `amount` y `orders` al mes de un gimnasio (crea la fila si no existe)."""
+    from .models import GymMonthlyRevenue
+
+    if not amount and not orders:
+        return
+    updated = GymMonthlyRevenue.objects.filter(gym_id=gym_id, month=month).update(
+        total_amount=F('total_amount') + amount,
+        orders_count=F('orders_count') + orders,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            GymMonthlyRevenue.objects.create(
+                gym_id=gym_id, month=month, total_amount=amount, orders_count=orders
+            )
+    except IntegrityError:
+        # Otro proceso creó la fila a la vez: aplicar el incremento sobre ella
+        GymMonthlyRevenue.objects.filter(gym_id=gym_id, month=month).update(
+            total_amount=F('total_amount') + amount,
+            orders_count=F('orders_count') + orders,
+        )
+
+
+def apply_order_change(previous, current):
+    """
+    Aplica el cambio de una venta al agregado.
+    previous / current: resultado de order_contribution() antes y después.
+    """
+    if previous == current:
+        return
+    if previous and current and previous[:2] == current[:2]:
+        apply_delta(current[0], current[1], current[2] - previous[2], 0)
+        return
+    if previous:
+        apply_delta(previous[0], previous[1], -previous[2], -1)
+    if current:
+        apply_delta(current[0], current[1], current[2], 1)
+
+
+def rebuild_months(gym_ids, start_month, end_month):
+    """
+    Recalcula desde Order los meses [start_month, end_month] de varios gimnasios.
+    Devuelve el número de filas escritas.
+    """
+    from .models import GymMonthlyRevenue, Order
+
+    gym_ids = list(gym_ids)
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(month_start(start_month), time.min), tz)
+    end = timezone.make_aware(datetime.combine(add_months(month_start(end_month), 1), time.min), tz)
+
+    rows = Order.objects.filter(
+        gym_id__in=gym_ids,
+        status='PAID',
+        created_at__gte=start,
+        created_at__lt=end,
+    ).annotate(
+        month=TruncMonth('created_at')
+    ).values('gym_id', 'month').annotate(
+        total=Sum('total_amount'),
+        orders=Count('id'),
+    ).order_by()
+
+    aggregates = [
+        GymMonthlyRevenue(
+            gym_id=row['gym_id'],
+            month=month_start(row['month']),
+            total_amount=row['total'] or 0,
+            orders_count=row['orders'],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        GymMonthlyRevenue.objects.filter(
+            gym_id__in=gym_ids,
+            month__gte=month_start(start_month),
+            month__lte=month_start(end_month),
+        ).delete()
+        GymMonthlyRevenue.objects.bulk_create(aggregates, batch_size=1000)
+
+    logger.info(f"GymMonthlyRevenue {start_month:%m/%Y}..{end_month:%m/%Y}: {len(aggregates)} filas")
+    return len(aggregates)
+
+
+def monthly_series(gym_ids, start_month, end_month):
+    """
+    Series de facturación mensual (float, meses sin ventas = 0) para varios gimnasios.
+    Returns: {gym_id: [importe por mes]} con los meses de month_range().
+    """
+    from .models import GymMonthlyRevenue
+
+    months = month_range(start_month, end_month)
+    position = {month: i for i, month in enumerate(months)}
+    series = defaultdict(lambda: [0.0] * len(months))
+
+    rows = GymMonthlyRevenue.objects.filter(
+        gym_id__in=list(gym_ids),
+        month__gte=months[0],
+        month__lte=months[-1],
+    ).values_list('gym_id', 'month', 'total_amount')
+
+    for gym_id, month, total in rows:
+        series[gym_id][position[month]] = float(total)
+
+    return {gym_id: series[gym_id] for gym_id in gym_ids}
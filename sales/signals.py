@@ -0,0 +1,100 @@
+"""
+Señales de ventas: mantenimiento incremental de GymMonthlyRevenue.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Order
+from .revenue import apply_order_change, order_contribution
+
+logger = logging.getLogger(__name__)
+
+
+def _contribution(order):
+    return order_contribution(order.gym_id, order.status, order.total_amount, order.created_at)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_revenue(sender, instance, **kwargs):
+    """Guarda con qué importe contaba la venta antes de este cambio."""
+    instance._previous_revenue = None
+    if instance.pk:
+        previous = Order.objects.filter(pk=instance.pk).values_list(
+            'gym_id', 'status', 'total_amount', 'created_at'
+        ).first()
+        if previous:
+            instance._previous_revenue = order_contribution(*previous)
+
+
+@receiver(post_save, sender=Order)
+def update_monthly_revenue(sender, instance, raw=False, **kwargs):
+    """Aplica al agregado mensual la diferencia del cambio."""
+    if raw:
+        return
+    try:
+        apply_order_change(getattr(instance, '_previous_revenue', None), _contribution(instance))
+    except Exception as e:
+        logger.error(f"Error actualizando facturación mensual (venta {instance.pk}): {e}")
+    instance._previous_revenue = _contribution(instance)
+
+
+@receiver(post_delete, sender=Order)
+def remove_monthly_revenue(sender, instance, **kwargs):
+    try:
+        apply_order_change(_contribution(instance), None)
+    except Exception as e:
+        logger.error(f"Error actualizando facturación mensual (venta {instance.pk}): {e}")
+
+
+# =============================================================================
+# ÍNDICE DEL CATÁLOGO DEL TPV (ver sales.pos_catalog)
+# =============================================================================
+
+_CATALOG_KINDS = {
+    'products.Product': 'product',
+    'services.Service': 'service',
+    'memberships.MembershipPlan': 'membership',
+}
+
+
+@receiver(post_save, sender='products.Product')
+@receiver(post_delete, sender='products.Product')
+@receiver(post_save, sender='services.Service')
+@receiver(post_delete, sender='services.Service')
+@receiver(post_save, sender='memberships.MembershipPlan')
+@receiver(post_delete, sender='memberships.MembershipPlan')
+def invalidate_pos_catalog_entries(sender, instance, raw=False, **kwargs):
+    if not raw:
+        from .pos_catalog import schedule_invalidate
+        schedule_invalidate(instance.gym_id, _CATALOG_KINDS[sender._meta.label])
+
+
+@receiver(m2m_changed, sender='products.Product_additional_tax_rates')
+@receiver(m2m_changed, sender='memberships.MembershipPlan_additional_tax_rates')
+def update_pos_catalog_prices(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .pos_catalog import invalidate_catalog, schedule_invalidate
+
+    if reverse:
+        # tax_rate.products.add(...): afecta a varias entradas
+        transaction.on_commit(lambda: invalidate_catalog(instance.gym_id))
+    else:
+        schedule_invalidate(instance.gym_id, _CATALOG_KINDS[instance._meta.label])
+
+
+@receiver(post_save, sender='finance.TaxRate')
+@receiver(post_delete, sender='finance.TaxRate')
+@receiver(post_save, sender='products.ProductCategory')
+@receiver(post_delete, sender='products.ProductCategory')
+@receiver(post_save, sender='services.ServiceCategory')
+@receiver(post_delete, sender='services.ServiceCategory')
+def invalidate_pos_catalog(sender, instance, raw=False, **kwargs):
+    if not raw and instance.gym_id:
+        from .pos_catalog import invalidate_catalog
+
+        gym_id = instance.gym_id
+        transaction.on_commit(lambda: invalidate_catalog(gym_id))
@@ -0,0 +1,29 @@
+"""
+Tareas Celery de ventas.
+"""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='sales.reconcile_monthly_revenue')
+def reconcile_monthly_revenue(months=2):
+    """
+    Recalcula desde Order los últimos `months` meses de GymMonthlyRevenue
+    (incluido el actual) para todos los gimnasios.
+    Corrige cambios hechos con queryset.update() que no disparan señales.
+    """
+    from django.utils import timezone
+    from organizations.models import Gym
+    from sales.revenue import add_months, month_start, rebuild_months
+
+    current = month_start(timezone.localdate())
+    rows = rebuild_months(
+        Gym.objects.values_list('id', flat=True),
+        add_months(current, -(months - 1)),
+        current,
+    )
+    logger.info(f"Facturación mensual reconciliada: {rows} filas")
+    return rows
@@ -0,0 +1,94 @@
+"""
+Benchmark de los kernels de analytics sobre un dataset sintético.
+
+Compara la co-asistencia y la antelación de reservas vectorizadas
+(activities.analytics_kernels) con la implementación anterior en Python puro.
+
+    python scripts/benchmark_analytics_kernels.py --visits 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from activities.analytics_kernels import cooccurrence, lead_time_stats, top_pairs  # noqa: E402
+
+
+def synthetic_visits(n_visits, n_clients, n_activities, seed=42):
+    rng = np.random.default_rng(seed)
+    clients = rng.integers(1, n_clients + 1, n_visits)
+    # Popularidad desigual entre actividades (Zipf truncado)
+    activities = np.minimum(rng.zipf(1.3, n_visits), n_activities)
+    visit_days = 738000 + rng.integers(0, 90, n_visits)
+    booked_days = visit_days - np.minimum(rng.geometric(0.35, n_visits) - 1, 30)
+    return clients, activities, booked_days, visit_days
+
+
+def python_cross_class(clients, activities, top_n):
+    client_classes = defaultdict(set)
+    for client_id, activity_id in zip(clients.tolist(), activities.tolist()):
+        client_classes[client_id].add(activity_id)
+    patterns = defaultdict(int)
+    for classes in client_classes.values():
+        if len(classes) > 1:
+            classes_list = sorted(classes)
+            for i, class1 in enumerate(classes_list):
+                for class2 in classes_list[i + 1:]:
+                    patterns[(class1, class2)] += 1
+    return sorted(patterns.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+
+def python_lead_time(booked_days, visit_days):
+    lead_times = [v - b for b, v in zip(booked_days.tolist(), visit_days.tolist()) if v - b >= 0]
+    lead_times.sort()
+    return {
+        'avg': sum(lead_times) / len(lead_times),
+        'median': lead_times[len(lead_times) // 2],
+        'same_day': lead_times.count(0),
+        'days_1_3': len([lt for lt in lead_times if 1 <= lt <= 3]),
+        'days_4_7': len([lt for lt in lead_times if 4 <= lt <= 7]),
+        'days_8_plus': len([lt for lt in lead_times if lt > 7]),
+    }
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"  {label:<28} {time.perf_counter() - start:8.3f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--visits', type=int, default=1_000_000)
+    parser.add_argument('--clients', type=int, default=50_000)
+    parser.add_argument('--activities', type=int, default=40)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--skip-python', action='store_true', help='No ejecutar la versión Python pura')
+    args = parser.parse_args()
+
+    clients, activities, booked_days, visit_days = synthetic_visits(args.visits, args.clients, args.activities)
+    print(f"{args.visits:,} visitas, {args.clients:,} clientes, {args.activities} actividades")
+
+    print("Co-asistencia")
+    matrix, ids, support, n_clients = timed("numpy cooccurrence", cooccurrence, clients, activities)
+    pairs = timed("numpy top_pairs", top_pairs, matrix, support, n_clients, args.top)
+    if not args.skip_python:
+        expected = timed("python sets + bucles", python_cross_class, clients, activities, args.top)
+        assert [c for _, _, c, _ in pairs] == [c for _, c in expected], "Los recuentos no coinciden"
+
+    print("Antelación de reservas")
+    stats = timed("numpy lead_time_stats", lead_time_stats, booked_days, visit_days)
+    if not args.skip_python:
+        expected = timed("python listas", python_lead_time, booked_days, visit_days)
+        assert stats['median_lead_days'] == expected['median']
+        assert stats['distribution']['days_1_3'] == expected['days_1_3']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0108_membership_hierarchy'),
+        ('staff', '0015_add_personal_info_and_public_visibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staffcommission',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='staff_commissions', to='activities.activitysession'),
+        ),
+        migrations.AddConstraint(
+            model_name='staffcommission',
+            constraint=models.UniqueConstraint(condition=models.Q(('rule__isnull', False), ('session__isnull', False)), fields=('rule', 'session'), name='unique_commission_per_rule_session'),
+        ),
+    ]
@@ -261,6 +261,24 @@ class StaffCommission(models.Model):
     concept = models.CharField(max_length=255, help_text="Descripción del origen (ej: Venta Bono #123)")
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField(auto_now_add=True)
+    
+    # Sesión de clase que generó la comisión (evita pagar dos veces la misma clase/regla)
+    session = models.ForeignKey(
+        "activities.ActivitySession",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="staff_commissions"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["rule", "session"],
+                condition=models.Q(session__isnull=False, rule__isnull=False),
+                name="unique_commission_per_rule_session",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.staff.user.first_name}: {self.amount}€ ({self.concept})"
@@ -270,6 +288,7 @@ class StaffCommission(models.Model):
         """
         Calcula y crea comisiones para una sesión de clase completada.
         Busca todas las reglas activas que coincidan con la sesión.
+        Es idempotente: una regla no genera dos comisiones para la misma sesión.
         
         Args:
             session: ActivitySession instance
@@ -277,46 +296,12 @@ class StaffCommission(models.Model):
         Returns:
             list: Lista de StaffCommission creadas
         """
+        from .payroll import PayrollEngine
+        
         if not session.staff:
             return []
         
-        commissions_created = []
-        gym = session.gym
-        staff = session.staff
-        
-        # Buscar reglas activas que apliquen (globales o específicas del staff)
-        rules = IncentiveRule.objects.filter(
-            gym=gym,
-            is_active=True,
-            type__in=['CLASS_FIXED', 'CLASS_ATTENDANCE']  # Solo reglas de clases
-        ).filter(
-            models.Q(staff__isnull=True) | models.Q(staff=staff)
-        )
-        
-        for rule in rules:
-            # Verificar si la sesión cumple los criterios
-            if not rule.matches_session(session):
-                continue
-            
-            # Calcular monto según tipo
-            amount = 0
-            if rule.type == 'CLASS_FIXED':
-                amount = rule.value
-            elif rule.type == 'CLASS_ATTENDANCE':
-                attendee_count = session.attendee_count
-                amount = rule.value * attendee_count
-            
-            if amount > 0:
-                # Crear comisión
-                commission = StaffCommission.objects.create(
-                    staff=staff,
-                    rule=rule,
-                    concept=f"Clase: {session.activity.name} - {session.start_datetime.strftime('%d/%m/%Y %H:%M')}",
-                    amount=amount
-                )
-                commissions_created.append(commission)
-        
-        return commissions_created
+        return PayrollEngine(session.gym).commissions_for_sessions([session])
 
 
 class StaffTask(models.Model):
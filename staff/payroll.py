@@ -0,0 +1,232 @@
+"""
+Motor de nómina variable (comisiones por clases impartidas).
+
+Evalúa las IncentiveRule de clase (CLASS_FIXED / CLASS_ATTENDANCE) sobre todas
+las sesiones completadas de un periodo:
+
+- Las reglas se cargan una sola vez en un índice por actividad / categoría
+  (+ comodín), y los filtros de día y franja horaria se precalculan.
+- Las sesiones se recorren en streaming con el número de asistentes
+  pre-agregado en la misma consulta.
+- Las comisiones se crean con bulk_create y son idempotentes: una regla no
+  paga dos veces la misma sesión (restricción única rule + session).
+
+Usage:
+    from staff.payroll import PayrollEngine, run_franchise_payroll
+
+    result = PayrollEngine(gym).run(date(2026, 1, 1), date(2026, 1, 31))
+    result['totals']   # {staff_id: Decimal}
+
+    results = run_franchise_payroll(franchise, start, end)
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db.models import Count
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_CODES = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+CLASS_RULE_TYPES = ['CLASS_FIXED', 'CLASS_ATTENDANCE']
+
+
+class RuleIndex:
+    """
+    Índice en memoria de reglas de incentivo de clase.
+    Equivale a IncentiveRule.matches_session pero sin consultas por sesión.
+    """
+
+    def __init__(self, rules):
+        self.by_activity = defaultdict(list)
+        self.by_category = defaultdict(list)
+        self.wildcard = []
+
+        for rule in rules:
+            rule._weekday_set = frozenset(rule.weekdays or [])
+            rule._has_band = bool(rule.time_start and rule.time_end)
+            if rule.activity_id:
+                self.by_activity[rule.activity_id].append(rule)
+            elif rule.activity_category_id:
+                self.by_category[rule.activity_category_id].append(rule)
+            else:
+                self.wildcard.append(rule)
+
+    def __bool__(self):
+        return bool(self.by_activity or self.by_category or self.wildcard)
+
+    def match(self, staff_id, activity_id, category_id, start_datetime):
+        """Reglas que aplican a una sesión (mismos criterios que matches_session)."""
+        candidates = (
+            self.by_activity.get(activity_id, [])
+            + self.by_category.get(category_id, [])
+            + self.wildcard
+        )
+        if not candidates:
+            return []
+
+        session_time = start_datetime.time()
+        session_weekday = WEEKDAY_CODES[start_datetime.weekday()]
+        matched = []
+        for rule in candidates:
+            if rule.staff_id and rule.staff_id != staff_id:
+                continue
+            if rule.activity_category_id and rule.activity_category_id != category_id:
+                continue
+            if rule._has_band and not (rule.time_start <= session_time <= rule.time_end):
+                continue
+            if rule._weekday_set and session_weekday not in rule._weekday_set:
+                continue
+            matched.append(rule)
+        return matched
+
+
+class PayrollEngine:
+    """Calcula las comisiones por clase de un gimnasio."""
+
+    def __init__(self, gym, chunk_size=1000):
+        from .models import IncentiveRule
+
+        self.gym = gym
+        self.chunk_size = chunk_size
+        self.index = RuleIndex(
+            IncentiveRule.objects.filter(gym=gym, is_active=True, type__in=CLASS_RULE_TYPES)
+        )
+
+    @staticmethod
+    def _amount(rule, attendee_count):
+        if rule.type == 'CLASS_FIXED':
+            return rule.value
+        if rule.type == 'CLASS_ATTENDANCE':
+            return rule.value * attendee_count
+        return Decimal('0')
+
+    def _session_rows(self, sessions_qs):
+        """Sesiones con asistentes pre-agregados, en streaming."""
+        return sessions_qs.annotate(
+            n_attendees=Count('attendees')
+        ).values_list(
+            'id', 'staff_id', 'activity_id', 'activity__category_id',
+            'activity__name', 'start_datetime', 'n_attendees'
+        ).order_by('id').iterator(chunk_size=self.chunk_size)
+
+    def _build_commissions(self, rows):
+        """
+        Genera las StaffCommission (sin guardar) y los importes ya pagados.
+        Devuelve (nuevas, totales existentes por staff).
+        """
+        from .models import StaffCommission
+
+        pending = []
+        for row in rows:
+            session_id, staff_id, activity_id, category_id, activity_name, start_dt, n_attendees = row
+            for rule in self.index.match(staff_id, activity_id, category_id, start_dt):
+                amount = self._amount(rule, n_attendees)
+                if amount > 0:
+                    pending.append(StaffCommission(
+                        staff_id=staff_id,
+                        rule=rule,
+                        session_id=session_id,
+                        concept=f"Clase: {activity_name} - {start_dt.strftime('%d/%m/%Y %H:%M')}",
+                        amount=amount,
+                    ))
+
+        if not pending:
+            return [], {}
+
+        # Excluir las comisiones ya pagadas (reejecución de la nómina)
+        existing = StaffCommission.objects.filter(
+            session_id__in={c.session_id for c in pending},
+            rule_id__in={c.rule_id for c in pending},
+        ).values_list('session_id', 'rule_id', 'staff_id', 'amount')
+
+        paid = set()
+        existing_totals = defaultdict(Decimal)
+        for session_id, rule_id, staff_id, amount in existing:
+            if (session_id, rule_id) not in paid:
+                paid.add((session_id, rule_id))
+                existing_totals[staff_id] += amount
+
+        new = [c for c in pending if (c.session_id, c.rule_id) not in paid]
+        return new, existing_totals
+
+    def _process(self, sessions_qs):
+        from .models import StaffCommission
+
+        created = []
+        totals = defaultdict(Decimal)
+        if not self.index:
+            return created, totals
+
+        batch = []
+
+        def flush():
+            new, existing_totals = self._build_commissions(batch)
+            StaffCommission.objects.bulk_create(new, batch_size=self.chunk_size, ignore_conflicts=True)
+            created.extend(new)
+            for commission in new:
+                totals[commission.staff_id] += commission.amount
+            for staff_id, amount in existing_totals.items():
+                totals[staff_id] += amount
+            batch.clear()
+
+        for row in self._session_rows(sessions_qs):
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                flush()
+        if batch:
+            flush()
+
+        return created, totals
+
+    def commissions_for_sessions(self, sessions):
+        """Crea (si faltan) las comisiones de unas sesiones concretas."""
+        from activities.models import ActivitySession
+
+        session_ids = [s.id for s in sessions if s.staff_id]
+        qs = ActivitySession.objects.filter(id__in=session_ids, gym=self.gym)
+        created, _ = self._process(qs)
+        return created
+
+    def run(self, start_date, end_date):
+        """
+        Liquida las clases completadas entre start_date y end_date (incluidos).
+
+        Returns:
+            dict: {'gym_id', 'created', 'totals': {staff_id: Decimal}}
+        """
+        from activities.models import ActivitySession
+
+        tz = timezone.get_current_timezone()
+        period_start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+        period_end = timezone.make_aware(datetime.combine(end_date, time.max), tz)
+
+        sessions = ActivitySession.objects.filter(
+            gym=self.gym,
+            status='COMPLETED',
+            staff__isnull=False,
+            start_datetime__gte=period_start,
+            start_datetime__lte=period_end,
+        )
+        created, totals = self._process(sessions)
+
+        logger.info(
+            f"Nómina {self.gym} {start_date}..{end_date}: {len(created)} comisiones nuevas"
+        )
+        return {
+            'gym_id': self.gym.id,
+            'created': len(created),
+            'totals': dict(totals),
+        }
+
+
+def run_franchise_payroll(franchise, start_date, end_date):
+    """Ejecuta la nómina de todos los gimnasios de una franquicia."""
+    from organizations.models import Gym
+
+    return [
+        PayrollEngine(gym).run(start_date, end_date)
+        for gym in Gym.objects.filter(franchise=franchise)
+    ]
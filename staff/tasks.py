@@ -0,0 +1,39 @@
+"""
+Tareas Celery de staff (nómina variable).
+"""
+import logging
+from datetime import date
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='staff.run_payroll', acks_late=True)
+def run_payroll_task(start_date, end_date, gym_id=None, franchise_id=None):
+    """
+    Calcula las comisiones por clase de un periodo en segundo plano.
+
+    Ejecutar manualmente:
+        run_payroll_task.delay('2026-01-01', '2026-01-31', franchise_id=1)
+
+    Returns:
+        list: [{'gym_id', 'created', 'totals': {staff_id: importe}}]
+    """
+    from organizations.models import Franchise, Gym
+    from staff.payroll import PayrollEngine, run_franchise_payroll
+
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+
+    if franchise_id:
+        results = run_franchise_payroll(Franchise.objects.get(id=franchise_id), start, end)
+    else:
+        results = [PayrollEngine(Gym.objects.get(id=gym_id)).run(start, end)]
+
+    # Serializable para el result backend (JSON)
+    for result in results:
+        result['totals'] = {str(staff_id): str(amount) for staff_id, amount in result['totals'].items()}
+
+    logger.info(f"Nómina {start_date}..{end_date} completada: {len(results)} gimnasio(s)")
+    return results
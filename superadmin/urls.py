@@ -9,6 +9,7 @@ app_name = 'superadmin'
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('metrics/refresh/', views.metrics_refresh, name='metrics_refresh'),
     
     # Gyms
     path('gyms/', views.gym_list, name='gym_list'),
@@ -6,8 +6,10 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils.decorators import method_decorator
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
+from django.core.paginator import Paginator
+from django.db.models import Count, Q, F
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 
@@ -16,48 +18,22 @@ from .forms import FranchiseForm, GymCreationForm
 from organizations.models import Gym, Franchise
 from saas_billing.models import (
     SubscriptionPlan, GymSubscription, FranchiseSubscription,
-    Invoice, BillingConfig, AuditLog
+    Invoice, BillingConfig, AuditLog, FleetMetricsSnapshot, TenantMetricsSnapshot
 )
+from saas_billing.tenant_metrics import refresh_gym_metrics, snapshot_tenant_metrics
 from saas_billing.migration_service import MigrationService
 from saas_billing.health import health_monitor
-from clients.models import Client
 
 
 @superuser_required
 def dashboard(request):
     """
     Superadmin dashboard with KPIs and overview.
+    KPIs come from the latest FleetMetricsSnapshot (computed on demand if none).
     """
-    # Calculate KPIs
-    total_gyms = Gym.objects.count()
-    active_gyms = GymSubscription.objects.filter(status='ACTIVE').count()
-    suspended_gyms = GymSubscription.objects.filter(status='SUSPENDED').count()
-    past_due_gyms = GymSubscription.objects.filter(status='PAST_DUE').count()
-    
-    # Revenue metrics
-    current_month_start = date.today().replace(day=1)
-    monthly_revenue = Invoice.objects.filter(
-        status='PAID',
-        paid_date__gte=current_month_start
-    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-    
-    # MRR (Monthly Recurring Revenue) - sum of all active monthly subscriptions
-    mrr = GymSubscription.objects.filter(
-        status='ACTIVE',
-        billing_frequency='MONTHLY'
-    ).select_related('plan').aggregate(
-        total=Sum('plan__price_monthly')
-    )['total'] or Decimal('0.00')
-    
-    # ARR (Annual Recurring Revenue)
-    arr = mrr * 12
-    
-    # Churn rate (gyms cancelled this month)
-    cancelled_this_month = GymSubscription.objects.filter(
-        status='CANCELLED',
-        updated_at__gte=current_month_start
-    ).count()
-    churn_rate = (cancelled_this_month / total_gyms * 100) if total_gyms > 0 else 0
+    fleet = FleetMetricsSnapshot.objects.first()
+    if fleet is None:
+        fleet = snapshot_tenant_metrics()
     
     # System health status
     health_status = health_monitor._calculate_overall_status()
@@ -67,30 +43,63 @@ def dashboard(request):
     recent_invoices = Invoice.objects.select_related('gym', 'franchise').order_by('-created_at')[:10]
     recent_logs = AuditLog.objects.select_related('superadmin', 'target_gym').order_by('-created_at')[:15]
     
-    # Subscription plan distribution
-    plan_distribution = GymSubscription.objects.values('plan__name').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
     context = {
-        'total_gyms': total_gyms,
-        'active_gyms': active_gyms,
-        'suspended_gyms': suspended_gyms,
-        'past_due_gyms': past_due_gyms,
-        'monthly_revenue': f"{monthly_revenue:.2f}",
-        'mrr': f"{mrr:.2f}",
-        'arr': f"{arr:.2f}",
-        'churn_rate': f"{churn_rate:.1f}",
+        'fleet': fleet,
+        'total_gyms': fleet.total_gyms,
+        'active_gyms': fleet.active_gyms,
+        'suspended_gyms': fleet.suspended_gyms,
+        'past_due_gyms': fleet.past_due_gyms,
+        'monthly_revenue': f"{fleet.monthly_revenue:.2f}",
+        'mrr': f"{fleet.mrr:.2f}",
+        'arr': f"{fleet.arr:.2f}",
+        'churn_rate': f"{fleet.churn_rate:.1f}",
         'health_status': health_status,
         'recent_gyms': recent_gyms,
         'recent_invoices': recent_invoices,
         'recent_logs': recent_logs,
-        'plan_distribution': plan_distribution,
+        'plan_distribution': fleet.plan_distribution,
     }
     
     return render(request, 'superadmin/dashboard.html', context)
 
 
+@superuser_required
+def metrics_refresh(request):
+    """
+    Recompute tenant metrics on demand (POST).
+    With gym_id only that gym is refreshed synchronously; otherwise the whole
+    fleet is queued (or computed inline if the broker is unavailable).
+    """
+    if request.method != 'POST':
+        return redirect('superadmin:dashboard')
+    
+    gym_id = request.POST.get('gym_id')
+    if gym_id:
+        gym = get_object_or_404(Gym, id=gym_id)
+        refresh_gym_metrics(gym)
+        messages.success(request, f"Métricas de '{gym.name}' actualizadas")
+        return redirect('superadmin:gym_detail', gym_id=gym.id)
+    
+    from marketing.signals import safe_delay
+    from saas_billing.tasks import snapshot_tenant_metrics_task
+    
+    if safe_delay(snapshot_tenant_metrics_task):
+        messages.info(request, "Recalculando métricas de todos los gimnasios en segundo plano")
+    else:
+        snapshot_tenant_metrics()
+        messages.success(request, "Métricas de todos los gimnasios actualizadas")
+    
+    # SECURITY: only redirect back to this site (prevents an open redirect)
+    next_url = request.POST.get('next', '')
+    if next_url and url_has_allowed_host_and_scheme(
+        next_url,
+        allowed_hosts={request.get_host()},
+        require_https=request.is_secure()
+    ):
+        return redirect(next_url)
+    return redirect('superadmin:dashboard')
+
+
 @superuser_required
 def gym_create(request):
     """
@@ -108,15 +117,29 @@ def gym_create(request):
     return render(request, 'superadmin/gyms/form.html', {'form': form})
 
 
+GYM_LIST_SORTS = {
+    'name': [F('name').asc()],
+    'members': [F('metrics_snapshot__members_active').desc(nulls_last=True)],
+    'staff': [F('metrics_snapshot__staff_count').desc(nulls_last=True)],
+    'mrr': [F('metrics_snapshot__mrr_contribution').desc(nulls_last=True)],
+    'emails': [F('metrics_snapshot__emails_month').desc(nulls_last=True)],
+    'storage': [F('metrics_snapshot__storage_bytes').desc(nulls_last=True)],
+    'activity': [F('metrics_snapshot__last_activity_at').desc(nulls_last=True)],
+    'renewal': [F('subscription__current_period_end').asc(nulls_last=True)],
+    'created': [F('created_at').desc()],
+}
+
+
 @superuser_required
 def gym_list(request):
     """
-    List all gyms with search and filters.
+    List all gyms with search, filters, sorting and pagination.
+    Usage columns come from TenantMetricsSnapshot (one join, no live counts).
     """
-    gyms = Gym.objects.select_related('franchise', 'subscription__plan').all()
+    gyms = Gym.objects.select_related('franchise', 'subscription__plan', 'metrics_snapshot')
     
     # Search
-    search = request.GET.get('search', '')
+    search = request.GET.get('search', '').strip()
     if search:
         gyms = gyms.filter(
             Q(name__icontains=search) |
@@ -134,15 +157,36 @@ def gym_list(request):
     if plan_filter:
         gyms = gyms.filter(subscription__plan_id=plan_filter)
     
+    # Sorting (id as tie-breaker for stable pages)
+    sort = request.GET.get('sort', 'name')
+    if sort not in GYM_LIST_SORTS:
+        sort = 'name'
+    gyms = gyms.order_by(*GYM_LIST_SORTS[sort], 'id')
+    
+    page_obj = Paginator(gyms, 50).get_page(request.GET.get('page'))
+    
     # Get all plans for filter dropdown
     plans = SubscriptionPlan.objects.filter(is_active=True)
     
     context = {
-        'gyms': gyms,
+        'gyms': page_obj.object_list,
+        'page_obj': page_obj,
         'plans': plans,
         'search': search,
         'status_filter': status_filter,
         'plan_filter': plan_filter,
+        'sort': sort,
+        'sort_choices': [
+            ('name', 'Nombre'),
+            ('members', 'Socios activos'),
+            ('staff', 'Empleados'),
+            ('mrr', 'MRR'),
+            ('emails', 'Emails (mes)'),
+            ('storage', 'Almacenamiento'),
+            ('activity', 'Última actividad'),
+            ('renewal', 'Próx. renovación'),
+            ('created', 'Más recientes'),
+        ],
         'status_choices': GymSubscription.STATUS_CHOICES,
     }
     
@@ -163,9 +207,11 @@ def gym_detail(request, gym_id):
     except GymSubscription.DoesNotExist:
         pass
     
-    # Usage stats
-    total_members = Client.objects.filter(gym=gym, status='ACTIVE').count()
-    total_staff = gym.staff.count()
+    # Usage stats (from the snapshot, computed on demand the first time)
+    try:
+        metrics = gym.metrics_snapshot
+    except TenantMetricsSnapshot.DoesNotExist:
+        metrics = refresh_gym_metrics(gym)
     
     # Email usage stats
     from core.email_service import get_email_usage_stats, can_send_email
@@ -184,8 +230,9 @@ def gym_detail(request, gym_id):
     context = {
         'gym': gym,
         'subscription': subscription,
-        'total_members': total_members,
-        'total_staff': total_staff,
+        'metrics': metrics,
+        'total_members': metrics.members_active,
+        'total_staff': metrics.staff_count,
         'email_stats': email_stats,
         'invoices': invoices,
         'logs': logs,
@@ -336,3 +336,14 @@ class GymMembershipFactory(DjangoModelFactory):
 class StaffMembershipFactory(GymMembershipFactory):
     """Factory for staff role membership."""
     role = "STAFF"
+
+
+class StaffProfileFactory(DjangoModelFactory):
+    """Factory for staff profiles (trainers, managers...)."""
+    
+    class Meta:
+        model = "staff.StaffProfile"
+    
+    user = factory.SubFactory(UserFactory)
+    gym = factory.SubFactory(GymFactory)
+    role = "TRAINER"
@@ -0,0 +1,180 @@
+"""
+Tests for signed check-in credentials and door-side validation.
+
+Covers:
+- Ed25519 credential issuance and offline verification against a snapshot
+- Denials: tampering, expiry, foreign keys, blocked clients, zone/schedule
+- Server-side validation of signed credentials through the device API
+- Snapshot sync with ETag and idempotent batch upload of door logs
+"""
+import json
+import time
+from datetime import datetime
+
+import pytest
+from django.core.cache import cache
+
+from access_control.credentials import build_snapshot, issue_credential, rotate_key
+from access_control.models import AccessDevice, AccessLog, AccessSchedule, AccessZone
+from access_control.offline import OfflineValidator, parse_credential
+from tests.factories import ClientMembershipFactory, ClientWithUserFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def member(db):
+    return ClientMembershipFactory(client=ClientWithUserFactory())
+
+
+def _device(gym, **kwargs):
+    return AccessDevice.objects.create(
+        gym=gym, name='Torno', device_id=f'DEV-{gym.id}-{AccessDevice.objects.count()}',
+        api_key=f'key-{gym.id}-{AccessDevice.objects.count()}', validation_mode='LOCAL', **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestOfflineValidation:
+
+    def test_grant_and_denials(self, member):
+        client = member.client
+        token, expires_at = issue_credential(client)
+        claims, _, _ = parse_credential(token)
+        assert (claims.client_id, claims.gym_id, claims.plan_id) == (client.id, client.gym_id, member.plan_id)
+        assert len(token) < 130  # Cabe en un QR pequeño
+
+        validator = OfflineValidator(build_snapshot(_device(client.gym)))
+        assert validator.validate(token)['granted'] is True
+
+        tampered = token[:-4] + ('AAAA' if not token.endswith('AAAA') else 'BBBB')
+        assert validator.validate(tampered)['denial_reason'] == 'INVALID_CREDENTIAL'
+        assert validator.validate(token, now=expires_at + 120)['denial_reason'] == 'CREDENTIAL_EXPIRED'
+
+        # Credencial de otro gimnasio
+        other_token, _ = issue_credential(ClientMembershipFactory(client=ClientWithUserFactory()).client)
+        assert validator.validate(other_token)['denial_reason'] == 'INVALID_CREDENTIAL'
+
+        # Bloqueado tras emitir la credencial: la siguiente instantánea lo revoca
+        client.status = 'BLOCKED'
+        client.save()
+        cache.clear()
+        validator.load(build_snapshot(_device(client.gym)))
+        assert validator.validate(token)['denial_reason'] == 'ACCOUNT_BLOCKED'
+        assert issue_credential(client) == (None, None)
+
+        events = validator.drain()
+        assert len(events) == 5 and validator.pending == []
+        assert events[0]['status'] == 'GRANTED' and events[0]['client_id'] == client.id
+
+    def test_zone_schedule_and_stale_snapshot(self, member):
+        gym = member.client.gym
+        token, _ = issue_credential(member.client)
+
+        zone = AccessZone.objects.create(gym=gym, name='Spa', requires_specific_membership=True)
+        validator = OfflineValidator(build_snapshot(_device(gym, zone=zone)))
+        assert validator.validate(token)['denial_reason'] == 'ZONE_NOT_ALLOWED'
+
+        zone.allowed_membership_plans.add(member.plan)
+        schedule = AccessSchedule.objects.create(
+            gym=gym, name='Mañanas', days_of_week=[0, 1, 2, 3, 4], start_time='07:00', end_time='15:00'
+        )
+        schedule.membership_plans.add(member.plan)
+        cache.clear()
+        validator.load(build_snapshot(_device(gym, zone=zone)))
+
+        monday_10 = datetime(2026, 10, 19, 10, tzinfo=validator.tz).timestamp()
+        monday_20 = datetime(2026, 10, 19, 20, tzinfo=validator.tz).timestamp()
+        fresh, _ = issue_credential(member.client, now=monday_10)
+        late, _ = issue_credential(member.client, now=monday_20)
+        validator.snapshot['generated_at'] = monday_10
+        assert validator.validate(fresh, now=monday_10)['granted'] is True
+        assert validator.validate(late, now=monday_20)['denial_reason'] == 'SCHEDULE_RESTRICTED'
+        assert validator.validate(fresh, now=monday_10 + 2 * 86400)['denial_reason'] == 'DEVICE_ERROR'
+
+    def test_no_membership_and_key_rotation(self, member):
+        gym = member.client.gym
+        old_token, _ = issue_credential(member.client)
+        rotate_key(gym)
+        new_token, _ = issue_credential(member.client)
+        assert parse_credential(old_token)[0].key_id != parse_credential(new_token)[0].key_id
+
+        validator = OfflineValidator(build_snapshot(_device(gym)))
+        assert validator.validate(old_token)['granted'] and validator.validate(new_token)['granted']
+
+        rotate_key(gym, retire_previous=True)
+        cache.clear()
+        validator.load(build_snapshot(_device(gym)))
+        assert validator.validate(new_token)['denial_reason'] == 'INVALID_CREDENTIAL'
+
+        # Membresía cancelada: fuera de la allowlist aunque la credencial siga vigente
+        fresh, _ = issue_credential(member.client)
+        member.status = 'CANCELLED'
+        member.save()
+        cache.clear()
+        validator.load(build_snapshot(_device(gym)))
+        assert validator.validate(fresh)['denial_reason'] == 'NO_MEMBERSHIP'
+
+
+@pytest.mark.django_db
+class TestDeviceAPI:
+
+    def test_server_validates_signed_credential(self, client, member):
+        device = _device(member.client.gym)
+        token, _ = issue_credential(member.client)
+
+        response = client.post(
+            '/api/access/validate-qr/', data=json.dumps({'qr_token': token}),
+            content_type='application/json', HTTP_X_API_KEY=device.api_key,
+        )
+        assert response.status_code == 200
+        assert response.json()['granted'] is True
+        assert AccessLog.objects.get(device=device).client == member.client
+
+        foreign = _device(ClientMembershipFactory().client.gym)
+        denied = client.post(
+            '/api/access/validate-qr/', data=json.dumps({'qr_token': token}),
+            content_type='application/json', HTTP_X_API_KEY=foreign.api_key,
+        ).json()
+        assert denied['denial_reason'] == 'INVALID_CREDENTIAL'
+
+    def test_snapshot_etag_and_log_upload(self, client, member):
+        device = _device(member.client.gym)
+        headers = {'HTTP_X_API_KEY': device.api_key}
+
+        response = client.get('/api/access/offline/snapshot/', **headers)
+        assert response.status_code == 200
+        snapshot = response.json()
+        assert client.get('/api/access/offline/snapshot/', HTTP_IF_NONE_MATCH=response['ETag'], **headers).status_code == 304
+
+        validator = OfflineValidator(snapshot)
+        token, _ = issue_credential(member.client)
+        validator.validate(token)
+        validator.validate('GC1.garbage.sig')
+        events = validator.drain()
+
+        for _ in range(2):  # Reintento tras perder la respuesta
+            result = client.post(
+                '/api/access/offline/logs/', data=json.dumps({'events': events}),
+                content_type='application/json', **headers,
+            ).json()
+        assert result == {'success': True, 'received': 2, 'created': 0}
+        logs = AccessLog.objects.filter(device=device).order_by('status')
+        assert [(log.status, log.client_id) for log in logs] == [('DENIED', None), ('GRANTED', member.client.id)]
+        assert abs(logs[1].timestamp.timestamp() - time.time()) < 60
+
+        server_device = _device(member.client.gym)
+        server_device.validation_mode = 'SERVER'
+        server_device.save()
+        assert client.get('/api/access/offline/snapshot/', HTTP_X_API_KEY=server_device.api_key).status_code == 403
+
+    def test_app_receives_signed_credential(self, api_client, member):
+        api_client.force_authenticate(member.client.user)
+        data = api_client.post('/api/checkin/generate/').data
+        assert data['credential'].startswith('GC1.')
+        assert data['credential_expires_at'] > time.time()
@@ -0,0 +1,83 @@
+"""
+Tests for the NumPy analytics kernels.
+
+Covers:
+- Co-attendance matrix, top pairs and lift
+- Lead time distribution and histogram
+- ActivityAnalytics.get_cross_class_patterns on top of the kernel
+"""
+import pytest
+import numpy as np
+from datetime import timedelta
+from django.utils import timezone
+
+from activities.analytics_kernels import cooccurrence, lead_time_stats, top_pairs
+from tests.factories import GymFactory, ClientFactory, ActivityFactory, ActivitySessionFactory
+
+
+class TestCooccurrence:
+
+    def test_counts_each_client_once_per_pair(self):
+        # Cliente 1: A, B (dos veces A). Cliente 2: A, B, C. Cliente 3: C
+        clients = [1, 1, 1, 2, 2, 2, 3]
+        activities = [10, 10, 20, 10, 20, 30, 30]
+
+        matrix, ids, support, n_clients = cooccurrence(clients, activities, block_size=2)
+
+        assert ids.tolist() == [10, 20, 30]
+        assert n_clients == 3
+        assert support.tolist() == [2, 2, 2]
+        assert matrix[0, 1] == 2
+        assert matrix[0, 2] == 1
+        assert matrix[1, 2] == 1
+
+    def test_top_pairs_with_lift(self):
+        matrix, ids, support, n_clients = cooccurrence([1, 1, 2, 2, 3], [10, 20, 10, 20, 30])
+
+        pairs = top_pairs(matrix, support, n_clients, k=5)
+
+        # A+B: 2 clientes de 3, soporte 2 y 2 → lift = 2·3 / (2·2)
+        assert pairs == [(0, 1, 2, 1.5)]
+
+    def test_empty_input(self):
+        matrix, ids, support, n_clients = cooccurrence([], [])
+        assert n_clients == 0
+        assert top_pairs(matrix, support, n_clients) == []
+
+
+class TestLeadTimeStats:
+
+    def test_distribution_and_median(self):
+        visit = np.array([100, 100, 100, 100, 100, 100])
+        booked = visit - np.array([0, 0, 2, 5, 20, -1])
+
+        stats = lead_time_stats(booked, visit, histogram_days=7)
+
+        assert stats['avg_lead_days'] == 5.4
+        assert stats['median_lead_days'] == 2
+        assert stats['same_day_bookings'] == 2
+        assert stats['advance_bookings'] == 3
+        assert stats['distribution'] == {'same_day': 2, 'days_1_3': 1, 'days_4_7': 1, 'days_8_plus': 1}
+        assert stats['histogram'] == [2, 0, 1, 0, 0, 1, 0, 1]
+
+    def test_only_late_entries(self):
+        assert lead_time_stats([10], [9]) is None
+
+
+@pytest.mark.django_db
+def test_cross_class_patterns():
+    from activities.analytics import ActivityAnalytics
+
+    gym = GymFactory()
+    yoga = ActivityFactory(gym=gym, name="Yoga")
+    spinning = ActivityFactory(gym=gym, name="Spinning")
+    start = timezone.now() - timedelta(days=2)
+    clients = ClientFactory.create_batch(3, gym=gym)
+
+    for activity, attendees in ((yoga, clients), (spinning, clients[:2])):
+        session = ActivitySessionFactory(activity=activity, start_datetime=start, status='COMPLETED')
+        session.attendees.add(*attendees)
+
+    patterns = ActivityAnalytics(gym, start - timedelta(days=1), timezone.now()).get_cross_class_patterns()
+
+    assert patterns == [{'combination': "Spinning + Yoga", 'count': 2, 'lift': 1.0}]
@@ -0,0 +1,163 @@
+"""
+Tests for the AttendanceFact rollup and the analytics that read it.
+
+Covers:
+- Signal-driven refresh when a session is completed / attendees change
+- Full range rebuild and the migration backfill of the whole history
+- Analytics computed from the fact table (booked attendance, occupancy of capped sessions)
+"""
+import pytest
+from datetime import datetime, timedelta
+from django.utils import timezone
+
+from tests.factories import (
+    GymFactory, ClientFactory, ActivityFactory, ActivitySessionFactory, BookingFactory,
+)
+
+
+@pytest.fixture
+def gym(db):
+    return GymFactory()
+
+
+@pytest.fixture
+def activity(gym):
+    return ActivityFactory(gym=gym)
+
+
+def _start(days_ago, hour):
+    day = timezone.localdate() - timedelta(days=days_ago)
+    return timezone.make_aware(datetime(day.year, day.month, day.day, hour, 0))
+
+
+def _completed_session(activity, days_ago, hour, attendees, capacity=10):
+    session = ActivitySessionFactory(
+        activity=activity, start_datetime=_start(days_ago, hour), max_capacity=capacity
+    )
+    session.attendees.add(*[ClientFactory(gym=activity.gym) for _ in range(attendees)])
+    session.status = 'COMPLETED'
+    session.save()
+    return session
+
+
+@pytest.mark.django_db
+class TestAttendanceFactMaintenance:
+
+    def test_completed_session_creates_fact(self, activity):
+        from activities.models import AttendanceFact
+
+        session = _completed_session(activity, days_ago=1, hour=9, attendees=3)
+
+        fact = AttendanceFact.objects.get(gym=activity.gym)
+        assert fact.date == timezone.localtime(session.start_datetime).date()
+        assert fact.hour == 9
+        assert (fact.completed_sessions, fact.attendance, fact.capacity) == (1, 3, 10)
+
+        # Añadir un asistente a una sesión completada refresca el bucket
+        session.attendees.add(ClientFactory(gym=activity.gym))
+        assert AttendanceFact.objects.get(gym=activity.gym).attendance == 4
+
+    def test_scheduled_sessions_are_ignored_until_completed(self, activity):
+        from activities.models import AttendanceFact
+
+        ActivitySessionFactory(activity=activity, start_datetime=_start(0, 18))
+        assert not AttendanceFact.objects.exists()
+
+    def test_rebuild_range_matches_sessions(self, activity):
+        from activities.models import AttendanceFact
+        from activities.rollups import rebuild_range
+
+        _completed_session(activity, days_ago=2, hour=9, attendees=2)
+        _completed_session(activity, days_ago=2, hour=9, attendees=4)
+        BookingFactory(
+            client=ClientFactory(gym=activity.gym),
+            session=ActivitySessionFactory(activity=activity, start_datetime=_start(2, 9)),
+            attendance_status='NO_SHOW',
+        )
+        AttendanceFact.objects.all().delete()
+
+        today = timezone.localdate()
+        assert rebuild_range(activity.gym_id, today - timedelta(days=7), today) == 1
+
+        fact = AttendanceFact.objects.get()
+        assert fact.sessions == 3
+        assert fact.completed_sessions == 2
+        assert fact.attendance == 6
+        assert (fact.min_attendance, fact.max_attendance) == (2, 4)
+        assert fact.no_shows == 1
+        assert fact.bookings == 1
+
+
+@pytest.mark.django_db
+class TestAnalyticsFromFacts:
+
+    def test_migration_backfills_history(self, activity):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        from activities.models import AttendanceFact
+        from activities.rollups import rebuild_range
+
+        fields = ('date', 'hour', 'sessions', 'completed_sessions', 'attendance', 'capacity',
+                  'occupancy_attendance', 'attended_bookings', 'no_shows', 'min_attendance', 'max_attendance')
+        _completed_session(activity, days_ago=2, hour=9, attendees=2)
+        _completed_session(activity, days_ago=500, hour=18, attendees=4, capacity=0)
+        BookingFactory(
+            client=ClientFactory(gym=activity.gym),
+            session=ActivitySessionFactory(activity=activity, start_datetime=_start(400, 7)),
+            attendance_status='ATTENDED',
+        )
+        today = timezone.localdate()
+        rebuild_range(activity.gym_id, today - timedelta(days=600), today)
+        expected = sorted(AttendanceFact.objects.values_list(*fields))
+        AttendanceFact.objects.all().delete()
+
+        import_module('activities.migrations.0111_backfill_attendance_facts').backfill_attendance_facts(apps, None)
+        assert sorted(AttendanceFact.objects.values_list(*fields)) == expected and len(expected) == 3
+
+    def test_attendance_metrics(self, activity):
+        from activities.analytics import AttendanceAnalytics, AdvancedAnalytics
+
+        _completed_session(activity, days_ago=3, hour=9, attendees=2)
+        _completed_session(activity, days_ago=3, hour=9, attendees=4)
+        _completed_session(activity, days_ago=2, hour=18, attendees=5)
+
+        end = timezone.now()
+        start = end - timedelta(days=7)
+        analytics = AttendanceAnalytics(activity.gym, start, end)
+
+        assert analytics.get_average_class_size() == 3.67
+        assert analytics.get_occupancy_rate() == 36.67
+        peak = analytics.get_peak_hours()
+        assert peak[0]['hour'] == 9
+        assert peak[0]['total_attendance'] == 6
+        assert peak[0]['avg_attendance'] == 3
+
+        prediction = AdvancedAnalytics(activity.gym, start, end).predict_attendance(
+            activity.id, (_start(3, 9).isoweekday() % 7) + 1, 9
+        )
+        assert prediction['predicted_attendance'] == 3
+        assert (prediction['min_expected'], prediction['max_expected']) == (2, 4)
+
+    def test_booking_rates_and_uncapped_sessions(self, activity):
+        from activities.analytics import AttendanceAnalytics
+
+        session = ActivitySessionFactory(activity=activity, start_datetime=_start(1, 10), max_capacity=10)
+        BookingFactory(client=ClientFactory(gym=activity.gym), session=session, attendance_status='ATTENDED')
+        BookingFactory(client=ClientFactory(gym=activity.gym), session=session, attendance_status='NO_SHOW')
+        # Tres asistentes, dos de ellos sin reserva
+        session.attendees.add(*[ClientFactory(gym=activity.gym) for _ in range(3)])
+        session.status = 'COMPLETED'
+        session.save()
+        # Sesión sin aforo: no entra en la ocupación
+        _completed_session(activity, days_ago=1, hour=12, attendees=5, capacity=0)
+
+        end = timezone.now()
+        analytics = AttendanceAnalytics(activity.gym, end - timedelta(days=7), end)
+
+        rates = analytics.get_noshow_cancellation_rates()
+        assert (rates['total_bookings'], rates['attended'], rates['no_shows']) == (2, 1, 1)
+        assert rates['attendance_rate'] == 50
+        assert analytics.get_occupancy_rate() == 30
+        assert [row['occupancy_rate'] for row in analytics.get_attendance_trends()] == [30]
@@ -0,0 +1,139 @@
+"""
+Tests for incremental media backups in BackupService.
+
+Covers:
+- Content-addressed object store: unchanged and duplicated files are stored once
+- Restoring a generation from its manifest
+- Retention by manifest generations and garbage collection of orphan objects
+- S3 upload of a manifest: missing objects only, uploaded before the manifest
+"""
+import os
+import sys
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.backup_service import BackupService
+
+
+@pytest.fixture
+def media_root(tmp_path, settings):
+    root = tmp_path / 'media'
+    (root / 'clients').mkdir(parents=True)
+    (root / 'clients' / 'photo.jpg').write_bytes(b'photo' * 1000)
+    (root / 'clients' / 'copy.jpg').write_bytes(b'photo' * 1000)
+    (root / 'docs.pdf').write_bytes(b'pdf')
+    settings.MEDIA_ROOT = str(root)
+    return root
+
+
+@pytest.fixture
+def service(tmp_path):
+    return BackupService(backup_dir=str(tmp_path / 'backups'))
+
+
+class FakeS3Client:
+    """Cliente S3 falso: el paginador lista `existing` y se registran las subidas."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.uploads = []
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        existing = self.existing
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = [key for key in existing if key.startswith(Prefix)]
+                # Dos páginas, y una vacía sin 'Contents' como devuelve S3
+                return [{'Contents': [{'Key': key} for key in keys[:1]]},
+                        {'Contents': [{'Key': key} for key in keys[1:]]}, {}]
+
+        return Paginator()
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        self.uploads.append((filename, bucket, key))
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    s3 = FakeS3Client(existing=[])
+    boto3 = types.ModuleType('boto3')
+    boto3.client = lambda service_name, **kwargs: s3
+    botocore = types.ModuleType('botocore')
+    exceptions = types.ModuleType('botocore.exceptions')
+    exceptions.ClientError = type('ClientError', (Exception,), {})
+    botocore.exceptions = exceptions
+    monkeypatch.setitem(sys.modules, 'boto3', boto3)
+    monkeypatch.setitem(sys.modules, 'botocore', botocore)
+    monkeypatch.setitem(sys.modules, 'botocore.exceptions', exceptions)
+    monkeypatch.setenv('AWS_BACKUP_BUCKET', 'gym-backups')
+    return s3
+
+
+def _rename_generation(manifest, when):
+    renamed = manifest.with_name(f"media_backup_{when.strftime('%Y%m%d_%H%M%S')}.json.gz")
+    manifest.rename(renamed)
+    return renamed
+
+
+def test_incremental_media_backup_and_restore(media_root, service, tmp_path):
+    first = service.backup_media()
+    assert service.last_media_stats['files'] == 3
+    # La copia idéntica comparte objeto
+    assert service.last_media_stats['new_objects'] == 2
+
+    (media_root / 'docs.pdf').write_bytes(b'pdf v2')
+    (media_root / 'new.png').write_bytes(b'png')
+    first = _rename_generation(first, datetime.now() - timedelta(minutes=1))
+    second = service.backup_media()
+
+    stats = service.last_media_stats
+    assert (stats['files'], stats['hashed'], stats['new_objects']) == (4, 2, 2)
+    assert service.read_media_manifest(second)['previous'] == first.name
+
+    target = tmp_path / 'restored'
+    assert service.restore_media(first, target_dir=str(target)) == 3
+    assert (target / 'docs.pdf').read_bytes() == b'pdf'
+    assert (target / 'clients' / 'copy.jpg').read_bytes() == b'photo' * 1000
+
+    backups = {b['name']: b for b in service.list_backups()}
+    assert backups[second.name]['format'] == 'manifest'
+
+
+def test_cleanup_keeps_generations_and_collects_orphans(media_root, service):
+    service.media_generations = 1
+    service.keep_monthly = 0
+
+    old = _rename_generation(service.backup_media(), datetime.now() - timedelta(days=2))
+    old_pdf = service.read_media_manifest(old)['files']['docs.pdf'][0]
+    (media_root / 'docs.pdf').write_bytes(b'pdf v2')
+    service.backup_media()
+
+    # Objetos fuera del periodo de gracia
+    stale = (datetime.now() - timedelta(days=2)).timestamp()
+    for object_path in service.media_objects_dir.glob('*/*'):
+        os.utime(object_path, (stale, stale))
+
+    assert service.cleanup_old_backups() == 1
+    assert not old.exists()
+    assert not service._object_path(old_pdf).exists()
+    assert len(list(service.media_objects_dir.glob('*/*'))) == 2
+
+
+def test_upload_manifest_sends_missing_objects_first(media_root, service, fake_s3):
+    manifest = service.backup_media()
+    digests = sorted({entry[0] for entry in service.read_media_manifest(manifest)['files'].values()})
+    assert len(digests) == 2
+    # Uno de los objetos ya está en el bucket (subida anterior)
+    fake_s3.existing = [f"backups/objects/{digests[0][:2]}/{digests[0]}"]
+
+    url = service.upload_to_s3(manifest)
+
+    assert url.startswith('s3://gym-backups/backups/') and url.endswith(manifest.name)
+    assert fake_s3.uploads == [
+        (str(service._object_path(digests[1])), 'gym-backups', f"backups/objects/{digests[1][:2]}/{digests[1]}"),
+        (str(manifest), 'gym-backups', url[len('s3://gym-backups/'):]),
+    ]
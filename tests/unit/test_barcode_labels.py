@@ -0,0 +1,98 @@
+"""
+Tests for the vector barcode label sheets.
+
+Covers:
+- Memoized bar geometry per code
+- One Form XObject per product regardless of copies
+- Background generation of large sheets with a download link
+"""
+import re
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+
+from products.barcode_api import (
+    LABEL_JOB_CACHE_KEY, barcode_geometry, generate_barcode_labels_pdf,
+)
+from products.models import Product
+from tests.factories import GymFactory, UserFactory
+
+
+def test_barcode_geometry_is_memoized():
+    barcode_geometry.cache_clear()
+    modules, bars = barcode_geometry('8410076470119', 'ean13')
+
+    assert modules == 95  # EAN-13
+    assert bars[0] == (0, 1)  # Guarda inicial 101
+    barcode_geometry('8410076470119', 'ean13')
+    assert barcode_geometry.cache_info().hits == 1
+    assert barcode_geometry('123', 'ean13') is None
+
+
+@pytest.mark.django_db
+class TestLabelSheets:
+
+    def _products(self, gym, n):
+        return [
+            Product.objects.create(gym=gym, name=f'Producto {i}', base_price=2, barcode=f'P-{i:04d}')
+            for i in range(n)
+        ]
+
+    def test_one_form_per_product(self):
+        gym = GymFactory()
+        self._products(gym, 3)
+
+        with generate_barcode_labels_pdf(Product.objects.filter(gym=gym), copies=60) as pdf_file:
+            pdf_file.seek(0)
+            content = pdf_file.read()
+
+        assert content.startswith(b'%PDF')
+        assert len(re.findall(rb'/Subtype /Form', content)) == 3
+        # 180 etiquetas en formato 40x25 (50 por página)
+        assert len(re.findall(rb'/Type /Page\b', content)) == 4
+
+    def test_large_sheet_runs_as_background_job(self, client, settings, monkeypatch, tmp_path):
+        from accounts.models_memberships import GymMembership
+        from products import barcode_api
+        from products.tasks import generate_label_sheet_task
+        from saas_billing.models import GymSubscription, SubscriptionPlan
+
+        gym = GymFactory()
+        products = self._products(gym, 3)
+        plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+        GymSubscription.objects.create(
+            gym=gym, plan=plan, status='ACTIVE',
+            current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+        )
+        user = UserFactory()
+        GymMembership.objects.create(user=user, gym=gym, role=GymMembership.Role.ADMIN)
+        client.force_login(user)
+        session = client.session
+        session['current_gym_id'] = gym.id
+        session.save()
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        queued = []
+        monkeypatch.setattr(barcode_api, 'LABELS_SYNC_LIMIT', 5)
+        monkeypatch.setattr(
+            'marketing.signals.safe_delay', lambda task, *args: queued.append(args) or object()
+        )
+        ids = ','.join(str(p.id) for p in products)
+
+        response = client.get('/products/api/labels/pdf/', {'ids': ids, 'copies': 2})
+        assert response.status_code == 202
+        job = response.json()
+        assert client.get(job['status_url']).json()['status'] == 'PENDING'
+
+        generate_label_sheet_task(*queued[0])
+        status = client.get(job['status_url']).json()
+        assert status['status'] == 'DONE'
+
+        download = client.get(status['download_url'])
+        assert download['Content-Type'] == 'application/pdf'
+        assert b''.join(download.streaming_content).startswith(b'%PDF')
+
+        # Otro gimnasio no ve el trabajo
+        cache.set(LABEL_JOB_CACHE_KEY.format(job['job_id']), {'gym_id': gym.id + 1, 'status': 'DONE'})
+        assert client.get(job['status_url']).status_code == 404
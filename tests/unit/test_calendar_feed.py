@@ -0,0 +1,99 @@
+"""
+Tests for the iCal subscription feed.
+
+Covers:
+- Direct ICS writer: escaping, line folding and UTC times
+- Conditional GET (ETag / Last-Modified) and cached rendering
+- Feed version bumps on booking, session and activity changes
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+import pytest
+from django.core.cache import cache
+
+from clients import calendar_service
+from clients.calendar_service import escape_text, fold_line
+from tests.factories import BookingFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def booking(db):
+    booking = BookingFactory(session__activity__name='Yoga, Pilates; Stretch')
+    booking.client.calendar_token = 'tok-123'
+    booking.client.save()
+    return booking
+
+
+def test_escape_and_fold():
+    assert escape_text('a,b;c\\d\ne') == 'a\\,b\\;c\\\\d\\ne'
+
+    line = 'DESCRIPTION:' + '📍' * 40
+    folded = fold_line(line)
+    parts = folded.split('\r\n')
+    assert len(parts) > 1 and all(len(p.encode('utf-8')) <= 75 for p in parts)
+    assert all(p.startswith(' ') for p in parts[1:])
+    assert ''.join(p[1:] if i else p for i, p in enumerate(parts)) == line
+
+
+@pytest.mark.django_db
+class TestCalendarFeed:
+
+    url = '/calendar/feed/tok-123.ics'
+
+    def test_booking_ics(self, booking):
+        content = calendar_service.generate_booking_ics(booking).decode()
+        assert content.startswith('BEGIN:VCALENDAR\r\n') and content.endswith('END:VCALENDAR\r\n')
+        assert 'SUMMARY:Yoga\\, Pilates\\; Stretch\r\n' in content
+        start = booking.session.start_datetime.astimezone(dt_timezone.utc)
+        assert f"DTSTART:{start:%Y%m%dT%H%M%SZ}" in content
+        assert content.count('BEGIN:VALARM') == 2 and 'TRIGGER:-PT30M' in content
+
+    def test_conditional_get_and_cache(self, client, booking, django_assert_max_num_queries):
+        response = client.get(self.url)
+        assert response.status_code == 200
+        assert f'UID:booking-{booking.id}@gymcrm.local' in response.content.decode()
+        assert response['Cache-Control'] == 'private, no-cache'
+        etag = response['ETag']
+
+        # Solo la búsqueda del token en cada petición
+        with django_assert_max_num_queries(2):
+            not_modified = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            assert not_modified.status_code == 304
+            assert not_modified['ETag'] == etag
+            # Sin If-None-Match se sirve desde la caché
+            assert client.get(self.url).content == response.content
+
+        since = client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert since.status_code == 304
+        assert client.get('/calendar/feed/otro.ics').status_code == 404
+
+    def test_changes_bump_version(self, client, booking, django_capture_on_commit_callbacks):
+        etag = client.get(self.url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            booking.session.activity.name = 'Yoga Flow'
+            booking.session.activity.save()
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert 'SUMMARY:Yoga Flow' in response.content.decode()
+
+        etag = response['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            booking.session.start_datetime += timedelta(hours=1)
+            booking.session.save()
+        assert client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+        etag = client.get(self.url)['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            booking.status = 'CANCELLED'
+            booking.save()
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert 'BEGIN:VEVENT' not in response.content.decode()
@@ -0,0 +1,83 @@
+"""
+Tests for the shared client search.
+
+Covers:
+- search_text maintained on save (accent folding, phone digits only, update_fields)
+- Multi-term, accent-insensitive and phone searches with relevance ranking
+- Searching through a relation (prefix) and the list filter
+- POS client search endpoint
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.http import QueryDict
+
+from clients.models import Client
+from clients.search import search_clients, search_q
+from clients.services import ClientFilterService
+from finance.models import ClientWallet
+from tests.factories import ClientFactory, GymFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestClientSearch:
+
+    def test_search_text_on_save(self):
+        client = ClientFactory(
+            first_name='José', last_name='Muñoz Pérez', email='Jose@Example.com',
+            dni='12345678z', phone_number='+34 612-345 678',
+        )
+        assert client.search_text == 'jose munoz perez jose@example.com 12345678z 34612345678'
+
+        client.last_name = 'Álvarez'
+        client.save(update_fields=['last_name'])
+        client.refresh_from_db()
+        assert 'alvarez' in client.search_text and 'munoz' not in client.search_text
+
+    def test_ranked_search(self):
+        gym = GymFactory()
+        ana = ClientFactory(gym=gym, first_name='Ana', last_name='García', phone_number='612 34 56 78')
+        mariana = ClientFactory(gym=gym, first_name='Mariana', last_name='Garcés')
+        juana = ClientFactory(gym=gym, first_name='Juana', last_name='Anaya')
+        ClientFactory(gym=GymFactory(), first_name='Ana', last_name='García')
+        clients = Client.objects.filter(gym=gym)
+
+        assert list(search_clients(clients, 'ana')) == [ana, juana, mariana]
+        assert list(search_clients(clients, 'GARCIA ana')) == [ana]
+        assert list(search_clients(clients, 'garc')) == [ana, mariana]
+        assert list(search_clients(clients, '612 34')) == [ana]
+        assert search_clients(clients, str(juana.id))[0] == juana
+        assert list(search_clients(clients, '', limit=2)) == [ana, juana]
+        assert not search_clients(clients, 'pedro').exists()
+
+    def test_related_and_list_filter(self):
+        gym = GymFactory()
+        ana = ClientFactory(gym=gym, first_name='Ana', email='ana@example.com')
+        ClientFactory(gym=gym, first_name='Luis', email='luis@example.com')
+        wallet = ClientWallet.objects.create(client=ana, gym=gym)
+
+        assert list(ClientWallet.objects.filter(search_q('ANA@', prefix='client__'))) == [wallet]
+        filtered = ClientFilterService.filter_clients(Client.objects.filter(gym=gym), QueryDict('q=ana%40example'))
+        assert list(filtered) == [ana]
+
+    def test_pos_endpoint(self, client):
+        from accounts.models_memberships import GymMembership
+        from saas_billing.models import GymSubscription, SubscriptionPlan
+
+        gym = GymFactory()
+        ClientFactory(gym=gym, first_name='Lucía', last_name='Martín', dni='87654321X')
+        plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+        GymSubscription.objects.create(
+            gym=gym, plan=plan, status='ACTIVE',
+            current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+        )
+        user = UserFactory()
+        GymMembership.objects.create(user=user, gym=gym, role=GymMembership.Role.ADMIN)
+        client.force_login(user)
+        session = client.session
+        session['current_gym_id'] = gym.id
+        session.save()
+
+        results = client.get('/sales/api/clients/search/', {'q': 'lucia mar'}).json()['results']
+        assert [r['last_name'] for r in results] == ['Martín']
+        assert len(client.get('/sales/api/clients/search/', {'q': '87654321x'}).json()['results']) == 1
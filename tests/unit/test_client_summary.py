@@ -0,0 +1,152 @@
+"""
+Tests for the denormalized client summary and keyset pagination of clients_list.
+
+Covers:
+- ClientSummary rebuild and incremental maintenance from signals
+- Migration backfill of the summary for existing clients
+- Dirty ids of a rolled-back transaction are not carried into the next one
+- ClientFilterService filters backed by the summary (no duplicates, no distinct)
+- Keyset pagination forwards and backwards
+"""
+import pytest
+from datetime import timedelta
+from django.http import QueryDict
+from django.utils import timezone
+
+from clients.services import ClientFilterService
+from clients.summary import rebuild_summaries
+from core.pagination import keyset_page
+from tests.factories import ClientFactory, ClientMembershipFactory, GymFactory
+
+
+def _visit(client, days_ago=0, status='ATTENDED'):
+    from clients.models import ClientVisit
+
+    return ClientVisit.objects.create(
+        client=client, date=timezone.localdate() - timedelta(days=days_ago), status=status
+    )
+
+
+def _filter(gym, query):
+    from clients.models import Client
+
+    return list(ClientFilterService.filter_clients(Client.objects.filter(gym=gym), QueryDict(query)))
+
+
+@pytest.mark.django_db
+class TestClientSummary:
+
+    def test_rebuild_and_filters(self):
+        from clients.models import ClientSummary
+
+        gym = GymFactory()
+        regular, absent, flaky = ClientFactory.create_batch(3, gym=gym)
+        _visit(regular, days_ago=1)
+        _visit(regular, days_ago=3)
+        _visit(absent, days_ago=60)
+        _visit(flaky, days_ago=2, status='NOSHOW')
+        _visit(flaky, days_ago=4, status='NOSHOW')
+        membership = ClientMembershipFactory(client=regular, end_date=timezone.localdate() + timedelta(days=5))
+        ClientMembershipFactory(client=regular, plan=membership.plan, end_date=timezone.localdate() + timedelta(days=60))
+
+        assert rebuild_summaries(gym) == 3
+        summary = ClientSummary.objects.get(client=regular)
+        assert summary.last_visit_date == timezone.localdate() - timedelta(days=1)
+        assert summary.membership_expires_on == timezone.localdate() + timedelta(days=5)
+        assert summary.active_plan_ids == f",{membership.plan_id},"
+        assert ClientSummary.objects.get(client=flaky).noshow_count == 2
+
+        assert _filter(gym, 'days_no_visit=30') == [absent]
+        assert _filter(gym, 'min_no_shows=2') == [flaky]
+        # Dos membresías del mismo plan no duplican al cliente
+        assert _filter(gym, f'membership_plan={membership.plan_id}') == [regular]
+        assert _filter(gym, 'membership_expires_days=7') == [regular]
+        assert len(_filter(gym, 'wallet_balance=no_wallet')) == 3
+
+    def test_migration_backfills_summaries(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        from clients.models import ClientSummary
+
+        fields = ('client_id', 'gym_id', 'last_visit_date', 'noshow_count', 'active_plan_ids',
+                  'membership_expires_on', 'has_unpaid_membership', 'wallet_sign')
+        gym = GymFactory()
+        regular, flaky = ClientFactory.create_batch(2, gym=gym)
+        other = ClientFactory()
+        _visit(regular, days_ago=1)
+        _visit(flaky, days_ago=2, status='NOSHOW')
+        ClientMembershipFactory(client=regular, end_date=timezone.localdate() + timedelta(days=5))
+        ClientMembershipFactory(client=other, status='PENDING_PAYMENT')
+
+        rebuild_summaries(gym)
+        rebuild_summaries(other.gym)
+        expected = sorted(ClientSummary.objects.values_list(*fields))
+        # Los clientes creados antes de la migración no tienen resumen
+        ClientSummary.objects.all().delete()
+
+        import_module('clients.migrations.0112_client_summary').backfill_client_summaries(apps, None)
+        assert sorted(ClientSummary.objects.values_list(*fields)) == expected and len(expected) == 3
+
+    def test_signals_refresh_on_commit(self, django_capture_on_commit_callbacks):
+        from clients.models import ClientSummary
+
+        gym = GymFactory()
+        with django_capture_on_commit_callbacks(execute=True):
+            client = ClientFactory(gym=gym)
+        assert ClientSummary.objects.get(client=client).last_visit_date is None
+
+        with django_capture_on_commit_callbacks(execute=True):
+            _visit(client, days_ago=2)
+            visit = _visit(client)
+        assert ClientSummary.objects.get(client=client).last_visit_date == timezone.localdate()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            visit.delete()
+        assert ClientSummary.objects.get(client=client).last_visit_date == timezone.localdate() - timedelta(days=2)
+
+    def test_rolled_back_marks_are_dropped(self, django_capture_on_commit_callbacks, monkeypatch):
+        from django.db import transaction
+
+        from clients import summary
+
+        refreshed = []
+        monkeypatch.setattr(summary, 'refresh_summaries', lambda ids: refreshed.append(set(ids)))
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                summary.mark_dirty(1)
+                raise RuntimeError
+
+        with django_capture_on_commit_callbacks(execute=True):
+            summary.mark_dirty(2)
+            summary.mark_dirty(3)
+        assert refreshed == [{2, 3}]
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_round_trip():
+    from clients.models import Client
+
+    gym = GymFactory()
+    created = ClientFactory.create_batch(7, gym=gym)
+    now = timezone.now()
+    for i, client in enumerate(created):
+        # Dos clientes con el mismo created_at: el desempate es el id
+        Client.objects.filter(pk=client.pk).update(created_at=now - timedelta(minutes=i // 2))
+    keys = [('created_at', True), ('id', True)]
+    clients = Client.objects.filter(gym=gym)
+    expected = list(clients.order_by('-created_at', '-id'))
+
+    pages = [keyset_page(clients, keys, per_page=3)]
+    while pages[-1].has_next:
+        pages.append(keyset_page(clients, keys, after=pages[-1].next_cursor, per_page=3))
+
+    assert [c for page in pages for c in page] == expected
+    assert [(p.start_index, p.end_index) for p in pages] == [(1, 3), (4, 6), (7, 7)]
+    assert not pages[0].has_previous
+
+    back = keyset_page(clients, keys, before=pages[2].previous_cursor, per_page=3)
+    assert list(back) == expected[3:6]
+    assert back.start_index == 4 and back.has_previous and back.has_next
+    assert keyset_page(clients, keys, after='not-a-cursor', per_page=3).start_index == 1
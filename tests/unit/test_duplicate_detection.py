@@ -0,0 +1,99 @@
+"""
+Tests for the blocked duplicate-client detection engine.
+
+Covers:
+- Key normalization (phone, email, DNI, names without accents)
+- Gym-scoped scan persisted into DuplicateCandidate, keeping dismissed pairs
+- Incremental check for a single new client
+- Duplicates view: scan queued as a task, POST actions require clients.change
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.urls import reverse
+
+from clients.utils.duplicate_detection import (
+    DuplicateDetector, check_client_duplicates, normalize_name, normalize_phone,
+)
+from tests.factories import ClientFactory, GymFactory, UserFactory
+
+
+def test_normalization():
+    assert normalize_phone('+34 600-123-456') == normalize_phone('600123456') == '600123456'
+    assert normalize_phone('123') == ''
+    assert normalize_name('José', 'García-López') == 'jose garcia lopez'
+
+
+@pytest.mark.django_db
+class TestDuplicateDetector:
+
+    def test_scan_is_gym_scoped_and_keeps_dismissed(self):
+        from clients.models import DuplicateCandidate
+
+        gym, other_gym = GymFactory(), GymFactory()
+        a = ClientFactory(gym=gym, first_name='María', last_name='Fernández Ruiz', phone_number='611111111')
+        b = ClientFactory(gym=gym, first_name='Maria', last_name='Fernandez Ruiz', phone_number='622222222')
+        c = ClientFactory(gym=gym, first_name='Pedro', last_name='Sánchez', phone_number='+34 633 333 333')
+        d = ClientFactory(gym=gym, first_name='Luis', last_name='Ortega', phone_number='633333333')
+        ClientFactory(gym=gym, first_name='Ana', last_name='Torres', phone_number='644444444')
+        ClientFactory(gym=other_gym, first_name='María', last_name='Fernández Ruiz', phone_number='611111111')
+
+        assert DuplicateDetector(gym).run() == 2
+        candidates = {
+            (dc.client_a_id, dc.client_b_id): dc for dc in DuplicateCandidate.objects.filter(gym=gym)
+        }
+        assert set(candidates) == {(a.id, b.id), (c.id, d.id)}
+        assert candidates[(c.id, d.id)].reasons == ['Teléfono igual']
+        assert candidates[(a.id, b.id)].score == 100
+        assert not DuplicateCandidate.objects.filter(gym=other_gym).exists()
+
+        # Un descarte sobrevive al siguiente escaneo; un dato corregido elimina la pareja
+        candidates[(a.id, b.id)].status = DuplicateCandidate.Status.DISMISSED
+        candidates[(a.id, b.id)].save()
+        d.phone_number = '655555555'
+        d.save()
+        DuplicateDetector(gym).run()
+        assert list(DuplicateCandidate.objects.filter(gym=gym).values_list('status', flat=True)) == ['DISMISSED']
+
+    def test_incremental_check_for_new_client(self):
+        from clients.models import DuplicateCandidate
+
+        gym = GymFactory()
+        existing = ClientFactory(gym=gym, first_name='Álvaro', last_name='Gómez', email='alvaro@test.com')
+        ClientFactory(gym=gym, first_name='Carmen', last_name='Vidal', email='carmen@test.com')
+        new = ClientFactory(gym=gym, first_name='Alvaro', last_name='Gomez Prieto', email='ALVARO@test.com ')
+
+        assert check_client_duplicates(new) == 1
+        candidate = DuplicateCandidate.objects.get(gym=gym)
+        assert (candidate.client_a_id, candidate.client_b_id) == (existing.id, new.id)
+        assert 'Email igual' in candidate.reasons
+
+    def test_view_queues_scan_and_requires_change(self, client, monkeypatch):
+        from accounts.models_memberships import GymMembership, Permission
+        from clients.tasks import scan_duplicate_clients
+        from saas_billing.models import GymSubscription, SubscriptionPlan
+
+        gym = GymFactory()
+        plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+        GymSubscription.objects.create(
+            gym=gym, plan=plan, status='ACTIVE',
+            current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+        )
+        user = UserFactory()
+        membership = GymMembership.objects.create(user=user, gym=gym, role=GymMembership.Role.STAFF)
+        membership.permissions.add(Permission.objects.get_or_create(code='clients.view', defaults={'label': 'Ver'})[0])
+        client.force_login(user)
+        session = client.session
+        session['current_gym_id'] = gym.id
+        session.save()
+        url = reverse('clients_duplicates')
+        queued = []
+        monkeypatch.setattr(scan_duplicate_clients, 'delay', lambda gym_id: queued.append(gym_id) or gym_id)
+
+        assert client.get(url).status_code == 200
+        assert client.post(url, {'action': 'scan'}).status_code == 302
+        assert queued == []
+
+        membership.permissions.add(Permission.objects.get_or_create(code='clients.change', defaults={'label': 'Editar'})[0])
+        client.post(url, {'action': 'scan'})
+        assert queued == [gym.id]
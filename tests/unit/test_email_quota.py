@@ -0,0 +1,103 @@
+"""
+Tests for the atomic transactional email quota.
+
+Covers:
+- Conditional reservation against daily and monthly limits (all-or-nothing and partial)
+- Day change inside the month bucket and flush to GymEmailUsage
+- send_email consuming/refunding quota and batch reservations
+"""
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from saas_billing.email_quota import (
+    EmailQuotaReservation, flush_email_usage, get_usage, release, reserve, reserve_up_to,
+)
+from tests.factories import GymFactory
+
+
+def _plan(daily=None, monthly=None):
+    from saas_billing.models import SubscriptionPlan
+
+    return SubscriptionPlan.objects.create(
+        name='Email', price_monthly=10, module_transactional_email=True,
+        transactional_email_limit_daily=daily, transactional_email_limit_monthly=monthly,
+    )
+
+
+def _subscribe(gym, plan):
+    from saas_billing.models import GymSubscription
+
+    return GymSubscription.objects.create(
+        gym=gym, plan=plan, status='ACTIVE',
+        current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+    )
+
+
+@pytest.mark.django_db
+class TestEmailQuota:
+
+    def test_reserve_respects_daily_and_monthly_limits(self):
+        gym, plan = GymFactory(), _plan(daily=5, monthly=8)
+        day = date(2026, 3, 10)
+
+        assert reserve(gym, plan, 3, today=day)
+        assert not reserve(gym, plan, 3, today=day)  # 6 > 5 diario
+        assert reserve_up_to(gym, plan, 10, today=day) == 2
+        assert get_usage(gym, day) == (5, 5)
+
+        # Día siguiente: el diario vuelve a 0, el mensual limita
+        assert reserve_up_to(gym, plan, 5, today=day + timedelta(days=1)) == 3
+        assert get_usage(gym, day + timedelta(days=1)) == (3, 8)
+
+        release(gym, 2, today=day + timedelta(days=1))
+        assert get_usage(gym, day + timedelta(days=1)) == (1, 6)
+
+    def test_bucket_seeded_from_usage_and_flushed(self):
+        from saas_billing.models import GymEmailUsage
+
+        gym, plan = GymFactory(), _plan(monthly=10)
+        day = date(2026, 3, 10)
+        GymEmailUsage.objects.create(gym=gym, date=day - timedelta(days=1), emails_sent=7)
+
+        assert reserve(gym, plan, 2, today=day - timedelta(days=1)) is True
+        assert reserve(gym, plan, 1, today=day) is True
+        assert not reserve(gym, plan, 1, today=day)
+
+        assert flush_email_usage() == 2
+        usage = dict(GymEmailUsage.objects.filter(gym=gym).values_list('date', 'emails_sent'))
+        assert usage == {day - timedelta(days=1): 9, day: 1}
+        # Idempotente
+        flush_email_usage()
+        assert GymEmailUsage.objects.filter(gym=gym).count() == 2
+
+    def test_batch_reservation_releases_unused(self):
+        gym, plan = GymFactory(), _plan(daily=10)
+
+        with EmailQuotaReservation(gym, plan, 4) as quota:
+            assert quota.granted == 4
+            assert quota.consume() and quota.consume()
+        assert get_usage(gym)[0] == 2
+
+    @patch('core.email_service._send_via_mailrelay')
+    def test_send_email_consumes_and_refunds(self, send):
+        from core.email_service import EmailLimitExceededError, reserve_email_batch, send_email
+
+        gym = GymFactory()
+        _subscribe(gym, _plan(daily=2))
+
+        send.return_value = True
+        assert send_email(gym, 'a@example.com', 'Hola', 'Cuerpo')
+        send.side_effect = Exception('Mailrelay caído')
+        with pytest.raises(Exception):
+            send_email(gym, 'b@example.com', 'Hola', 'Cuerpo')
+        assert get_usage(gym)[0] == 1
+
+        send.side_effect = None
+        with reserve_email_batch(gym, 5) as quota:
+            assert quota.granted == 1
+            assert send_email(gym, 'c@example.com', 'Hola', 'Cuerpo', quota=quota)
+            with pytest.raises(EmailLimitExceededError):
+                send_email(gym, 'd@example.com', 'Hola', 'Cuerpo', quota=quota)
+        assert get_usage(gym)[0] == 2
@@ -0,0 +1,116 @@
+"""
+Tests for the email workflow scheduler.
+
+Covers:
+- next_due_at scheduling on enrollment
+- Only due executions are processed
+- Step advancement, bulk logging and completion
+"""
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from django.utils import timezone
+
+from tests.factories import GymFactory, ClientFactory
+
+
+@pytest.fixture
+def workflow(db):
+    from marketing.models import EmailWorkflow, EmailWorkflowStep
+
+    gym = GymFactory()
+    workflow = EmailWorkflow.objects.create(gym=gym, name="Bienvenida", trigger_event='LEAD_CREATED')
+    EmailWorkflowStep.objects.create(workflow=workflow, order=1, delay_days=0, subject="Día 0", content_html="Hola {{client_name}}")
+    EmailWorkflowStep.objects.create(workflow=workflow, order=2, delay_days=3, subject="Día 3", content_html="Consejos")
+    return workflow
+
+
+def _enroll(workflow, **client_kwargs):
+    from marketing.models import EmailWorkflowExecution
+    from marketing.workflow_scheduler import schedule_executions
+
+    client = ClientFactory(gym=workflow.gym, **client_kwargs)
+    execution = EmailWorkflowExecution.objects.create(workflow=workflow, client=client)
+    schedule_executions([execution])
+    execution.refresh_from_db()
+    return execution
+
+
+@pytest.mark.django_db
+class TestWorkflowScheduling:
+    """next_due_at is computed from the step plan."""
+
+    def test_first_step_due_at_start(self, workflow):
+        execution = _enroll(workflow)
+        assert execution.next_due_at == execution.started_at
+
+    def test_reschedule_on_step_change(self, workflow):
+        execution = _enroll(workflow)
+        first = workflow.steps.get(order=1)
+        first.delay_days = 2
+        first.save()
+
+        execution.refresh_from_db()
+        assert execution.next_due_at == execution.started_at + timedelta(days=2)
+
+
+@pytest.mark.django_db
+class TestProcessDueExecutions:
+    """Daily processing only touches due executions."""
+
+    @patch('core.email_service.send_email', return_value=True)
+    def test_sends_due_step_and_schedules_next(self, mock_send, workflow):
+        from marketing.workflow_scheduler import process_due_executions
+
+        execution = _enroll(workflow)
+        now = timezone.now()
+
+        assert process_due_executions(now=now) == 1
+        execution.refresh_from_db()
+        assert execution.current_step.order == 1
+        assert execution.next_due_at == now + timedelta(days=3)
+        assert execution.step_logs.filter(success=True).count() == 1
+
+        # Nothing else is due today
+        assert process_due_executions(now=now) == 0
+        assert mock_send.call_count == 1
+
+    @patch('core.email_service.send_email', return_value=True)
+    def test_completes_after_last_step(self, mock_send, workflow):
+        from marketing.workflow_scheduler import process_due_executions
+
+        execution = _enroll(workflow)
+        now = timezone.now()
+        process_due_executions(now=now)
+        process_due_executions(now=now + timedelta(days=3))
+
+        execution.refresh_from_db()
+        assert execution.status == 'COMPLETED'
+        assert execution.next_due_at is None
+        assert execution.step_logs.count() == 2
+
+    @patch('core.email_service.send_email', return_value=True)
+    def test_notifications_disabled_skips_send(self, mock_send, workflow):
+        from marketing.workflow_scheduler import process_due_executions
+
+        execution = _enroll(workflow, email_notifications_enabled=False)
+        process_due_executions()
+
+        mock_send.assert_not_called()
+        execution.refresh_from_db()
+        assert execution.current_step.order == 1
+        assert execution.step_logs.get().success is False
+
+    def test_send_error_keeps_execution_due(self, workflow):
+        from core.email_service import NoEmailConfigurationError
+        from marketing.workflow_scheduler import process_due_executions
+
+        execution = _enroll(workflow)
+        due_at = execution.next_due_at
+        with patch('core.email_service.send_email', side_effect=NoEmailConfigurationError("sin SMTP")):
+            assert process_due_executions() == 0
+
+        execution.refresh_from_db()
+        assert execution.current_step is None
+        assert execution.next_due_at == due_at
+        assert "sin SMTP" in execution.step_logs.get().error_message
@@ -0,0 +1,140 @@
+"""
+Tests for the exercise progression index.
+
+Covers:
+- Epley estimate and weekly aggregation
+- Incremental refresh on ExerciseLog save/delete and after batch sync
+- Streaming rebuild matching the incremental index
+- Client API and trainer endpoint
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from routines.models import Exercise, ExerciseLog, ExerciseProgress, WorkoutLog
+from routines.progression import aggregate_weeks, estimate_1rm, rebuild_progress
+from tests.factories import ClientWithUserFactory
+
+MONDAY = date(2026, 10, 12)
+
+
+def test_estimate_1rm():
+    assert estimate_1rm(100, 1) == 100
+    assert estimate_1rm(100, 10) == 133.33
+    assert estimate_1rm(100, 20) == 0  # Demasiadas repeticiones
+    assert estimate_1rm(0, 10) == 0
+
+
+def test_aggregate_weeks():
+    weeks = aggregate_weeks([
+        (1, MONDAY, [{'reps': 5, 'weight': 100}, {'reps': 1, 'weight': 120}]),
+        (2, MONDAY + timedelta(days=3), [{'reps': 8, 'weight': 110}]),
+        (3, MONDAY + timedelta(days=7), [{'reps': 10, 'weight': 60}]),
+        (4, MONDAY + timedelta(days=8), []),
+    ])
+
+    assert list(weeks) == [MONDAY, MONDAY + timedelta(days=7)]
+    assert weeks[MONDAY] == ['2026-10-12', 2, 3, 14, 1500.0, 120.0, '2026-10-12', 139.33, '2026-10-15']
+    assert weeks[MONDAY + timedelta(days=7)][1:5] == [1, 1, 10, 600.0]
+
+
+@pytest.mark.django_db
+class TestExerciseProgress:
+
+    @pytest.fixture
+    def setup(self, db):
+        client = ClientWithUserFactory()
+        exercise = Exercise.objects.create(gym=client.gym, name='Sentadilla')
+        return client, exercise
+
+    def _log(self, client, exercise, day, sets):
+        workout = WorkoutLog.objects.create(client=client)
+        WorkoutLog.objects.filter(pk=workout.pk).update(date=day)
+        workout.date = day
+        return ExerciseLog.objects.create(workout_log=workout, exercise=exercise, sets_data=sets)
+
+    def test_incremental_refresh(self, setup, django_capture_on_commit_callbacks):
+        client, exercise = setup
+        with django_capture_on_commit_callbacks(execute=True):
+            self._log(client, exercise, MONDAY, [{'reps': 5, 'weight': 100}])
+            heavy = self._log(client, exercise, MONDAY + timedelta(days=7), [{'reps': 3, 'weight': 130}])
+
+        progress = ExerciseProgress.objects.get(client=client, exercise=exercise)
+        assert (progress.sessions, progress.total_sets, float(progress.total_volume)) == (2, 2, 890)
+        assert (float(progress.max_weight), progress.max_weight_date) == (130, MONDAY + timedelta(days=7))
+        assert [w[0] for w in progress.weekly] == ['2026-10-12', '2026-10-19']
+
+        # Se borra el récord: vuelve a mandar la semana anterior
+        with django_capture_on_commit_callbacks(execute=True):
+            heavy.delete()
+        progress.refresh_from_db()
+        assert (float(progress.max_weight), progress.max_weight_date) == (100, MONDAY)
+        assert progress.last_week == MONDAY
+
+    def test_batch_sync_refreshes_progress(self, api_client, setup, django_capture_on_commit_callbacks):
+        client, exercise = setup
+        api_client.force_authenticate(client.user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post('/api/workout/sync/', {
+                'sync_key': 'w-1',
+                'exercises': [{'exercise_id': exercise.id, 'sets': [
+                    {'id': 's-1', 'reps': 10, 'weight': 80}, {'id': 's-2', 'reps': 8, 'weight': 90},
+                ]}],
+            }, format='json')
+        assert response.status_code == 200
+
+        progress = ExerciseProgress.objects.get(client=client, exercise=exercise)
+        assert (progress.total_sets, float(progress.best_e1rm)) == (2, 114)
+
+        summary = api_client.get('/api/workout/progress/').data['exercises']
+        assert [(e['exercise_name'], e['best_e1rm']) for e in summary] == [('Sentadilla', 114.0)]
+        detail = api_client.get(f'/api/workout/progress/{exercise.id}/').data
+        assert detail['columns'][0] == 'week' and len(detail['weekly']) == 1
+        assert api_client.get('/api/workout/progress/999999/').status_code == 404
+
+    def test_rebuild_matches_incremental(self, setup, django_capture_on_commit_callbacks):
+        client, exercise = setup
+        bench = Exercise.objects.create(gym=client.gym, name='Press banca')
+        with django_capture_on_commit_callbacks(execute=True):
+            for i in range(6):
+                self._log(client, exercise, MONDAY + timedelta(days=3 * i), [{'reps': 5, 'weight': 100 + i}])
+                self._log(client, bench, MONDAY + timedelta(days=3 * i), [{'reps': 8, 'weight': 60}])
+
+        fields = ('exercise_id', 'sessions', 'total_sets', 'total_volume', 'best_e1rm', 'best_e1rm_date', 'weekly')
+        incremental = list(ExerciseProgress.objects.order_by('exercise_id').values_list(*fields))
+        ExerciseProgress.objects.all().delete()
+        stale_exercise = Exercise.objects.create(gym=client.gym, name='Remo')
+        ExerciseProgress.objects.create(client=client, exercise=stale_exercise)
+
+        assert rebuild_progress(gym_id=client.gym_id, batch_size=1) == 2
+        assert list(ExerciseProgress.objects.order_by('exercise_id').values_list(*fields)) == incremental
+
+        call_command('rebuild_exercise_progress', client=client.id, stdout=StringIO())
+        assert ExerciseProgress.objects.count() == 2
+
+    def test_trainer_endpoint(self, client, setup):
+        from accounts.models_memberships import GymMembership
+        from saas_billing.models import GymSubscription, SubscriptionPlan
+        from tests.factories import UserFactory
+
+        member, exercise = setup
+        ExerciseProgress.objects.create(client=member, exercise=exercise, best_e1rm=120, weekly=[['2026-10-12']])
+        plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+        GymSubscription.objects.create(
+            gym=member.gym, plan=plan, status='ACTIVE',
+            current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+        )
+        user = UserFactory()
+        GymMembership.objects.create(user=user, gym=member.gym, role=GymMembership.Role.ADMIN)
+        client.force_login(user)
+        session = client.session
+        session['current_gym_id'] = member.gym.id
+        session.save()
+
+        url = f'/routines/api/clients/{member.id}/progress/'
+        assert client.get(url).json()['exercises'][0]['best_e1rm'] == 120
+        assert client.get(url, {'exercise_id': exercise.id}).json()['weekly'] == [['2026-10-12']]
+        assert client.get(f'/routines/api/clients/{ClientWithUserFactory().id}/progress/').status_code == 404
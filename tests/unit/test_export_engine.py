@@ -0,0 +1,152 @@
+"""
+Tests for the streaming export engine.
+
+Covers:
+- Write-only Excel from values() querysets with banners, headers and totals
+- Streaming CSV responses and PDF tables split into blocks
+- Background client exports: job progress, download and owner-only access
+- Redelivered jobs: running ones are skipped, stale ones resumed
+"""
+from datetime import date, timedelta
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from clients.export_service import ClientExportService, get_client_export_config
+from clients.models import Client
+from core import export_jobs, export_service
+from core.export_service import ExportConfig, GenericExportService
+from core.tasks import run_export_job
+from tests.factories import ClientFactory, GymFactory, UserFactory
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+ROWS_CONFIG = ExportConfig(
+    title="Listado",
+    headers=['ID', 'Nombre', 'Importe'],
+    data_extractor=lambda row: row,
+    subtitle="Subtítulo",
+)
+
+
+def _login(client, gym):
+    from accounts.models_memberships import GymMembership
+    from saas_billing.models import GymSubscription, SubscriptionPlan
+
+    plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+    GymSubscription.objects.create(
+        gym=gym, plan=plan, status='ACTIVE',
+        current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+    )
+    user = UserFactory()
+    GymMembership.objects.create(user=user, gym=gym, role=GymMembership.Role.ADMIN)
+    client.force_login(user)
+    session = client.session
+    session['current_gym_id'] = gym.id
+    session.save()
+
+
+def test_csv_and_pdf_from_rows(monkeypatch):
+    rows = [[i, f'Fila {i}', None] for i in range(1, 8)]
+
+    response = GenericExportService.csv_response(rows, ROWS_CONFIG, 'listado.csv')
+    assert isinstance(response, StreamingHttpResponse)
+    assert response['Content-Disposition'] == 'attachment; filename="listado.csv"'
+    lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+    assert lines[0] == '\ufeffID,Nombre,Importe' and lines[1] == '1,Fila 1,-' and len(lines) == 8
+
+    monkeypatch.setattr(export_service, 'PDF_TABLE_BLOCK_ROWS', 3)
+    pdf = GenericExportService.export_to_pdf(rows, ROWS_CONFIG, 'Gym').read()
+    assert pdf.startswith(b'%PDF')
+
+
+@pytest.mark.django_db
+class TestExportEngine:
+
+    def test_excel_from_values(self, django_assert_num_queries):
+        gym = GymFactory()
+        ClientFactory(gym=gym, first_name='Ana', last_name='García', email=None, status=Client.Status.ACTIVE)
+        ClientFactory(gym=gym, first_name='Luis', last_name='Pérez', status=Client.Status.LEAD)
+        clients = Client.objects.filter(gym=gym).order_by('first_name')
+
+        with django_assert_num_queries(1):
+            workbook = load_workbook(ClientExportService.export_to_excel(clients, gym.name))
+        sheet = workbook.active
+        assert sheet['A1'].value == f'Listado de Clientes - {gym.name}'
+        assert 'A1:H1' in {str(cell_range) for cell_range in sheet.merged_cells.ranges}
+        assert [c.value for c in sheet[4]] == get_client_export_config().headers
+        assert [sheet['B5'].value, sheet['C5'].value, sheet['G5'].value] == ['Ana', 'García', 'Activo']
+        # Valores nativos: el ID como número y los vacíos en blanco
+        assert isinstance(sheet['A5'].value, int) and sheet['D5'].value in (None, '')
+        assert sheet['G6'].value == 'Prospecto'
+        assert sheet['A7'].value == 'Total de registros: 2'
+
+    def test_background_client_export(self, client, monkeypatch):
+        gym = GymFactory()
+        _login(client, gym)
+        for name in ('Ana', 'Luis', 'Marta'):
+            ClientFactory(gym=gym, first_name=name)
+        monkeypatch.setattr(export_jobs, 'BACKGROUND_EXPORT_ROWS', 2)
+        monkeypatch.setattr(export_service, 'EXPORT_CHUNK_SIZE', 2)
+        queued = []
+        monkeypatch.setattr(run_export_job, 'delay', lambda job_id: queued.append(job_id) or job_id)
+
+        response = client.get('/clients/export/excel/')
+        assert response.status_code == 302 and response.url == '/clients/'
+        job_id = queued[0]
+        status = client.get(f'/exports/{job_id}/').json()
+        assert status['status'] == 'PENDING' and status['total'] == 3 and status['download_url'] is None
+
+        progress = []
+        original_update = export_jobs.update_job
+        monkeypatch.setattr(
+            export_jobs, 'update_job',
+            lambda job_id, **changes: progress.append(changes.get('processed')) or original_update(job_id, **changes),
+        )
+        assert run_export_job(job_id) == 'DONE'
+        assert [p for p in progress if p is not None] == [0, 2, 3]
+
+        status = client.get(f'/exports/{job_id}/').json()
+        assert status['status'] == 'DONE' and status['percent'] == 100
+        assert status['download_url'].endswith(f'/exports/{job_id}/download/')
+
+        download = client.get(f'/exports/{job_id}/download/')
+        assert download['Content-Disposition'].startswith('attachment')
+        sheet = load_workbook(BytesIO(b''.join(download.streaming_content))).active
+        assert sheet['A8'].value == 'Total de registros: 3'
+
+        client.force_login(UserFactory())
+        assert client.get(f'/exports/{job_id}/').status_code == 404
+        assert client.get(f'/exports/{job_id}/download/').status_code == 404
+
+    def test_redelivered_job(self, client, monkeypatch):
+        gym = GymFactory()
+        _login(client, gym)
+        ClientFactory(gym=gym)
+        monkeypatch.setattr(export_jobs, 'BACKGROUND_EXPORT_ROWS', 0)
+        queued = []
+        monkeypatch.setattr(run_export_job, 'delay', lambda job_id: queued.append(job_id) or job_id)
+        client.get('/clients/export/excel/')
+        job_id = queued[0]
+
+        # Otra entrega mientras el trabajo avanza: no se duplica
+        export_jobs.update_job(job_id, status=export_jobs.ExportJobStatus.RUNNING)
+        assert run_export_job(job_id) == 'RUNNING'
+
+        # El worker murió (acks_late): sin progreso reciente se genera de nuevo
+        stale = (timezone.now() - timedelta(seconds=export_jobs.EXPORT_STALE_SECONDS + 1)).isoformat()
+        job = export_jobs.get_job(job_id)
+        job['updated_at'] = stale
+        cache.set(export_jobs.EXPORT_JOB_CACHE_KEY.format(job_id), job)
+        assert run_export_job(job_id) == 'DONE'
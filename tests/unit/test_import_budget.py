@@ -0,0 +1,38 @@
+"""
+Import-time budget for worker boot.
+
+Every gunicorn worker runs django.setup() and loads the URLconf; heavy
+scientific/export libraries must stay behind function-level imports.
+The time budget can be tuned with IMPORT_TIME_BUDGET (seconds).
+"""
+import pytest
+
+from core.import_budget import DEFAULT_BUDGET_SECONDS, measure_boot, parse_importtime
+
+
+@pytest.fixture(scope='module')
+def boot():
+    return measure_boot()
+
+
+def test_no_heavy_libraries_loaded_at_boot(boot):
+    assert boot['heavy_modules'] == []
+
+
+def test_boot_within_budget(boot):
+    assert boot['seconds'] < DEFAULT_BUDGET_SECONDS, (
+        f"django.setup() + URLconf tardó {boot['seconds']:.2f}s "
+        f"(presupuesto {DEFAULT_BUDGET_SECONDS}s). Ver: python manage.py importtime_report"
+    )
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   encodings.utf_8\n"
+        "import time:      3000 |       4500 | django\n"
+    )
+    assert parse_importtime(output) == [
+        {'module': 'encodings.utf_8', 'self_us': 120, 'cumulative_us': 120, 'depth': 1},
+        {'module': 'django', 'self_us': 3000, 'cumulative_us': 4500, 'depth': 0},
+    ]
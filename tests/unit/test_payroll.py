@@ -0,0 +1,88 @@
+"""
+Tests for the batch class-commission payroll engine.
+
+Covers:
+- Rule index matching (activity, category, weekday, staff)
+- Attendance-based amounts from pre-aggregated counts
+- Idempotent reruns and per-staff totals
+"""
+import pytest
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.utils import timezone
+
+from tests.factories import (
+    GymFactory,
+    ClientFactory,
+    ActivityFactory,
+    ActivitySessionFactory,
+    StaffProfileFactory,
+)
+
+
+@pytest.fixture
+def setup(db):
+    gym = GymFactory()
+    staff = StaffProfileFactory(gym=gym)
+    activity = ActivityFactory(gym=gym)
+    start = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=2), time(10, 0)))
+    session = ActivitySessionFactory(
+        activity=activity, staff=staff, status='COMPLETED',
+        start_datetime=start, end_datetime=start + timedelta(hours=1)
+    )
+    session.attendees.add(*ClientFactory.create_batch(3, gym=gym))
+    return gym, staff, activity, session
+
+
+def _rule(gym, **kwargs):
+    from staff.models import IncentiveRule
+    defaults = {'name': 'Regla', 'type': 'CLASS_FIXED', 'value': Decimal('10.00')}
+    defaults.update(kwargs)
+    return IncentiveRule.objects.create(gym=gym, **defaults)
+
+
+@pytest.mark.django_db
+class TestPayrollEngine:
+
+    def test_fixed_and_attendance_rules(self, setup):
+        from staff.payroll import PayrollEngine
+
+        gym, staff, activity, session = setup
+        _rule(gym, activity=activity)
+        _rule(gym, type='CLASS_ATTENDANCE', value=Decimal('2.00'), activity_category=activity.category)
+
+        day = session.start_datetime.date()
+        result = PayrollEngine(gym).run(day, day)
+
+        assert result['created'] == 2
+        assert result['totals'][staff.id] == Decimal('16.00')
+
+    def test_non_matching_rules_are_skipped(self, setup):
+        from staff.payroll import PayrollEngine
+
+        gym, staff, activity, session = setup
+        other_weekday = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN'][(session.start_datetime.weekday() + 1) % 7]
+        _rule(gym, weekdays=[other_weekday])
+        _rule(gym, staff=StaffProfileFactory(gym=gym))
+        _rule(gym, activity=ActivityFactory(gym=gym))
+
+        day = session.start_datetime.date()
+        assert PayrollEngine(gym).run(day, day)['created'] == 0
+
+    def test_rerun_does_not_pay_twice(self, setup):
+        from staff.models import StaffCommission
+        from staff.payroll import PayrollEngine
+
+        gym, staff, activity, session = setup
+        _rule(gym)
+        day = session.start_datetime.date()
+
+        PayrollEngine(gym).run(day, day)
+        result = PayrollEngine(gym).run(day, day)
+
+        assert result['created'] == 0
+        assert result['totals'][staff.id] == Decimal('10.00')
+        assert StaffCommission.objects.filter(session=session).count() == 1
+
+        # The per-session entry point shares the same idempotency
+        assert StaffCommission.calculate_for_session(session) == []
@@ -0,0 +1,117 @@
+"""
+Tests for the in-memory POS catalog index.
+
+Covers:
+- Exact barcode / SKU hits, word-prefix and substring search, accent folding
+- Per-type invalidation from save/delete signals, rebuilt on the next search
+- Tax changes dropping the gym catalog
+- search_products endpoint answering from the index
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+
+from finance.models import TaxRate
+from products.models import Product
+from sales import pos_catalog
+from sales.pos_catalog import CatalogIndex, search_catalog
+from services.models import Service
+from tests.factories import GymFactory, MembershipPlanFactory, UserFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    pos_catalog._indexes.clear()
+    yield
+    cache.clear()
+
+
+def test_index_search():
+    index = CatalogIndex([
+        {'type': 'product', 'id': 1, 'name': 'Batido Proteína Chocolate', 'barcode': '8412345678901', 'sku': 'BAT-CHO'},
+        {'type': 'product', 'id': 2, 'name': 'Barrita proteica', 'barcode': '', 'sku': 'BAR-01'},
+        {'type': 'service', 'id': 3, 'name': 'Sesión de fisioterapia'},
+        {'type': 'membership', 'id': 4, 'name': 'Plan Premium'},
+    ])
+
+    exact = index.search('8412345678901')
+    assert len(exact) == 1 and exact[0]['id'] == 1 and exact[0]['exact_match']
+    assert index.search('bat-cho')[0]['id'] == 1 and index.search('bat-cho')[0]['exact_match']
+    assert [e['id'] for e in index.search('prot')] == [2, 1]
+    assert [e['id'] for e in index.search('proteina choc')] == [1]
+    assert [e['id'] for e in index.search('sesion')] == [3]
+    # Dentro de la palabra, como el icontains anterior
+    assert [e['id'] for e in index.search('mium')] == [4]
+    assert [e['id'] for e in index.search('84123')] == [1]
+    assert [e['type'] for e in index.search('')] == ['product', 'product', 'service', 'membership']
+    assert index.search('zzz') == []
+
+
+@pytest.mark.django_db
+class TestPosCatalog:
+
+    def test_incremental_updates(self, django_capture_on_commit_callbacks, django_assert_num_queries):
+        gym = GymFactory()
+        Product.objects.create(gym=gym, name='Toalla', base_price=10, sku='TOA-1')
+        Service.objects.create(gym=gym, name='Masaje', base_price=30)
+        MembershipPlanFactory(gym=gym, name='Cuota Mensual')
+
+        assert [e['name'] for e in search_catalog(gym.id, '')] == ['Toalla', 'Masaje', 'Cuota Mensual']
+        with django_assert_num_queries(0):
+            search_catalog(gym.id, 'toa')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            water = Product.objects.create(gym=gym, name='Agua', base_price=1, barcode='123')
+        # Solo se reconstruyen los productos (consulta + prefetch de impuestos)
+        with django_assert_num_queries(2):
+            result = search_catalog(gym.id, '123')
+        assert result[0]['id'] == water.id and result[0]['exact_match']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            water.name = 'Agua con gas'
+            water.save()
+            Service.objects.get(name='Masaje').delete()
+        assert [e['name'] for e in search_catalog(gym.id, 'agua gas')] == ['Agua con gas']
+        assert search_catalog(gym.id, 'masaje') == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            water.is_active = False
+            water.save()
+        assert search_catalog(gym.id, 'agua') == []
+
+    def test_tax_change_rebuilds_prices(self, django_capture_on_commit_callbacks):
+        gym = GymFactory()
+        tax = TaxRate.objects.create(gym=gym, name='IVA', rate_percent=10)
+        Product.objects.create(gym=gym, name='Toalla', base_price=10, tax_rate=tax, price_strategy='TAX_EXCLUDED')
+        assert search_catalog(gym.id, 'toalla')[0]['price'] == 11
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tax.rate_percent = 21
+            tax.save()
+        assert search_catalog(gym.id, 'toalla')[0]['price'] == 12.1
+
+    def test_search_endpoint(self, client):
+        from accounts.models_memberships import GymMembership
+        from saas_billing.models import GymSubscription, SubscriptionPlan
+
+        gym = GymFactory()
+        Product.objects.create(gym=gym, name='Guantes boxeo', base_price=25, barcode='777')
+        Product.objects.create(gym=GymFactory(), name='Guantes otro gym', base_price=25)
+        plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+        GymSubscription.objects.create(
+            gym=gym, plan=plan, status='ACTIVE',
+            current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+        )
+        user = UserFactory()
+        GymMembership.objects.create(user=user, gym=gym, role=GymMembership.Role.ADMIN)
+        client.force_login(user)
+        session = client.session
+        session['current_gym_id'] = gym.id
+        session.save()
+
+        results = client.get('/sales/api/products/search/', {'q': 'guan'}).json()['results']
+        assert [r['name'] for r in results] == ['Guantes boxeo']
+        assert results[0]['price'] == 25.0 and results[0]['category'] == 'Sin Categoría'
+        assert client.get('/sales/api/products/search/', {'q': '777'}).json()['results'][0]['exact_match']
@@ -0,0 +1,100 @@
+"""
+Tests for the per-gym PWA assets.
+
+Covers:
+- Icon rendering once per logo/brand color, stored under a versioned path
+- Icon, manifest and service worker responses with ETag / 304
+- Regeneration when the brand color changes, and the generic fallback
+"""
+import json
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from public_portal import pwa_assets
+from tests.factories import GymFactory
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def gym(db):
+    gym = GymFactory(brand_color='#112233')
+    buffer = BytesIO()
+    Image.new('RGB', (300, 150), (255, 0, 0)).save(buffer, format='PNG')
+    gym.logo.save('logo.png', ContentFile(buffer.getvalue()))
+    return gym
+
+
+@pytest.mark.django_db
+class TestPwaAssets:
+
+    def test_render_icons(self, gym):
+        version = pwa_assets.ensure_icons(gym)
+        assert version == pwa_assets.assets_version(gym) and pwa_assets.icons_ready(gym)
+
+        for size in pwa_assets.ICON_SIZES:
+            with default_storage.open(pwa_assets.icon_path(gym.id, version, size)) as f:
+                icon = Image.open(f)
+                assert icon.size == (size, size)
+                # Esquina con el color de marca, centro con el logo
+                assert icon.getpixel((0, 0))[:3] == (0x11, 0x22, 0x33)
+                assert icon.getpixel((size // 2, size // 2))[:3] == (255, 0, 0)
+
+    def test_icon_view_caching(self, client, gym):
+        version = pwa_assets.ensure_icons(gym)
+        url = f'/public/gym/{gym.slug}/pwa-icon/192/'
+
+        response = client.get(url, {'v': version})
+        assert response.status_code == 200 and response['Content-Type'] == 'image/png'
+        assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert Image.open(BytesIO(b''.join(response.streaming_content))).size == (192, 192)
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+        assert client.get(url)['Cache-Control'] == 'public, max-age=86400'
+        # Tamaño no soportado: el de por defecto
+        assert client.get(f'/public/gym/{gym.slug}/pwa-icon/1000/')['ETag'] == response['ETag']
+
+    def test_manifest_and_regeneration(self, client, gym, django_capture_on_commit_callbacks):
+        url = f'/public/gym/{gym.slug}/manifest.json'
+        old_version = pwa_assets.ensure_icons(gym)
+
+        response = client.get(url)
+        manifest = json.loads(response.content)
+        assert manifest['theme_color'] == '#112233'
+        assert manifest['icons'][0]['src'].endswith(f'/pwa-icon/72/?v={old_version}')
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+        sw = client.get(f'/public/gym/{gym.slug}/sw.js')
+        assert f"gym-{gym.slug}-{old_version}" in sw.content.decode()
+        assert client.get(f'/public/gym/{gym.slug}/sw.js', HTTP_IF_NONE_MATCH=sw['ETag']).status_code == 304
+
+        with django_capture_on_commit_callbacks(execute=True):
+            gym.brand_color = '#445566'
+            gym.save()
+        new_version = pwa_assets.ensure_icons(gym)
+        assert new_version != old_version
+        assert not default_storage.exists(pwa_assets.icon_path(gym.id, old_version, 512))
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 200
+        assert f'?v={new_version}' in response.content.decode()
+
+    def test_gym_without_logo(self, client, db):
+        gym = GymFactory()
+        response = client.get(f'/public/gym/{gym.slug}/pwa-icon/96/')
+        assert response.status_code == 302 and response.url == '/static/icons/icon-96x96.png'
+        manifest = json.loads(client.get(f'/public/gym/{gym.slug}/manifest.json').content)
+        assert manifest['icons'][-1] == {
+            'src': '/static/icons/icon-512x512.png', 'sizes': '512x512', 'type': 'image/png', 'purpose': 'any maskable',
+        }
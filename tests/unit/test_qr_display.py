@@ -0,0 +1,99 @@
+"""
+Tests for the session QR display feed.
+
+Covers:
+- Cached display state with an incremental check-in counter
+- 304 for unchanged polls (If-None-Match / since) without database queries
+- Gym isolation
+"""
+import time
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from activities import qr_display
+from activities.models import SessionCheckin
+from tests.factories import ActivitySessionFactory, ClientFactory, UserFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def staff_client(client, db):
+    from accounts.models_memberships import GymMembership
+    from saas_billing.models import GymSubscription, SubscriptionPlan
+
+    session = ActivitySessionFactory(max_capacity=12)
+    plan = SubscriptionPlan.objects.create(name='Pro', price_monthly=49)
+    GymSubscription.objects.create(
+        gym=session.gym, plan=plan, status='ACTIVE',
+        current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+    )
+    user = UserFactory()
+    GymMembership.objects.create(user=user, gym=session.gym, role=GymMembership.Role.ADMIN)
+    client.force_login(user)
+    django_session = client.session
+    django_session['current_gym_id'] = session.gym.id
+    django_session.save()
+    return client, session
+
+
+def _checkin(session):
+    member = ClientFactory(gym=session.gym)
+    session.attendees.add(member)
+    return SessionCheckin.objects.create(session=session, client=member, method='STAFF')
+
+
+@pytest.mark.django_db
+class TestQrDisplay:
+
+    def test_incremental_counter(self, staff_client, django_capture_on_commit_callbacks):
+        _, session = staff_client
+        assert qr_display.get_state(session.id)['checkins'] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first = _checkin(session)
+            _checkin(session)
+        state = qr_display.get_state(session.id)
+        assert (state['checkins'], state['attendee_count'], state['max_capacity']) == (2, 2, 12)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        assert qr_display.get_state(session.id)['checkins'] == 1
+        assert qr_display.get_state(999999) is None
+
+    def test_conditional_poll(self, staff_client, monkeypatch, django_capture_on_commit_callbacks):
+        client, session = staff_client
+        now = time.time()
+        monkeypatch.setattr(qr_display.time, 'time', lambda: now)  # Sin rotación del token durante el test
+        url = f'/activities/checkin/qr/{session.id}/api/'
+
+        data = client.get(url).json()
+        assert data['token'].startswith(f'{session.id}:') and data['checkins'] == 0
+        version = data['version']
+
+        client.get(url, {'since': version})  # Sesión y gimnasio del usuario ya en caché
+        # Solo las consultas de sesión/autenticación del middleware
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url, {'since': version})
+        assert response.status_code == 304
+        assert not [q for q in captured.captured_queries if 'activities_' in q['sql']]
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+        with django_capture_on_commit_callbacks(execute=True):
+            _checkin(session)
+        data = client.get(url, {'since': version}).json()
+        assert data['checkins'] == 1 and data['attendee_count'] == 1
+
+    def test_other_gym_session_not_found(self, staff_client):
+        client, _ = staff_client
+        other = ActivitySessionFactory()
+        assert client.get(f'/activities/checkin/qr/{other.id}/api/').status_code == 404
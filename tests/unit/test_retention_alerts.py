@@ -0,0 +1,92 @@
+"""
+Tests for the set-based retention and lead-score jobs.
+
+Covers:
+- Alerts are created only for at-risk clients without an open alert
+- Least-loaded staff assignment
+- Bulk lead score decay
+"""
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from tests.factories import GymFactory, ClientFactory
+
+
+@pytest.fixture
+def gym(db):
+    return GymFactory()
+
+
+def _staff(gym, email):
+    from staff.models import StaffProfile
+    from tests.factories import UserFactory
+
+    return StaffProfile.objects.create(user=UserFactory(email=email), gym=gym, role='TRAINER')
+
+
+@pytest.mark.django_db
+class TestCheckRetentionAlerts:
+
+    def test_creates_alerts_for_inactive_clients_only(self, gym):
+        from clients.models import ClientVisit
+        from marketing.models import RetentionAlert, RetentionRule
+        from marketing.tasks import check_retention_alerts
+
+        RetentionRule.objects.create(gym=gym, name="14 días", alert_type='NO_ATTENDANCE', days_threshold=14)
+        inactive = ClientFactory(gym=gym)
+        never_came = ClientFactory(gym=gym)
+        regular = ClientFactory(gym=gym)
+        ClientVisit.objects.create(client=inactive, date=timezone.now().date() - timedelta(days=30))
+        ClientVisit.objects.create(client=regular, date=timezone.now().date())
+
+        check_retention_alerts()
+
+        alerted = set(RetentionAlert.objects.values_list('client_id', flat=True))
+        assert alerted == {inactive.id, never_came.id}
+        assert RetentionAlert.objects.get(client=inactive).days_inactive == 30
+
+        # A second run does not duplicate open alerts
+        check_retention_alerts()
+        assert RetentionAlert.objects.count() == 2
+
+    def test_assigns_least_loaded_staff(self, gym):
+        from marketing.models import RetentionAlert, RetentionRule
+        from marketing.tasks import check_retention_alerts
+
+        busy = _staff(gym, "busy@test.com")
+        free = _staff(gym, "free@test.com")
+        RetentionAlert.objects.create(
+            gym=gym, client=ClientFactory(gym=gym, status='INACTIVE'), alert_type='PAYMENT_FAILED',
+            title="Previa", description="", assigned_to=busy
+        )
+        RetentionRule.objects.create(
+            gym=gym, name="14 días", alert_type='NO_ATTENDANCE', days_threshold=14, auto_assign_to_staff=True
+        )
+        ClientFactory.create_batch(3, gym=gym)
+
+        check_retention_alerts()
+
+        new_alerts = RetentionAlert.objects.filter(alert_type='NO_ATTENDANCE')
+        assert new_alerts.filter(assigned_to=free).count() == 2
+        assert new_alerts.filter(assigned_to=busy).count() == 1
+
+
+@pytest.mark.django_db
+def test_decay_lead_scores_bulk(gym):
+    from marketing.models import LeadScore, LeadScoreLog
+    from marketing.tasks import decay_lead_scores
+
+    old = timezone.now() - timedelta(days=20)
+    stale = LeadScore.objects.create(client=ClientFactory(gym=gym), score=10, last_positive_event=old)
+    fresh = LeadScore.objects.create(client=ClientFactory(gym=gym), score=10, last_positive_event=timezone.now())
+
+    decay_lead_scores()
+
+    stale.refresh_from_db()
+    fresh.refresh_from_db()
+    assert stale.score == 5
+    assert stale.last_negative_event is not None
+    assert fresh.score == 10
+    assert LeadScoreLog.objects.filter(lead_score=stale, points=-5).count() == 1
+    assert LeadScoreLog.objects.filter(lead_score=fresh).count() == 0
@@ -0,0 +1,96 @@
+"""
+Tests for monthly revenue aggregates and the dependency-free forecast.
+
+Covers:
+- Closed-form trend, moving average and seasonality
+- Incremental GymMonthlyRevenue maintenance from Order signals
+- Rebuild from Order and batch forecasting for several gyms
+"""
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+
+from backoffice.forecasting import forecast_series, linear_trend, moving_average, seasonal_indices
+from tests.factories import GymFactory, UserFactory
+
+
+def _order(gym, amount, status='PAID'):
+    from sales.models import Order
+
+    return Order.objects.create(gym=gym, created_by=UserFactory(), status=status, total_amount=amount)
+
+
+class TestForecastMath:
+
+    def test_linear_trend_matches_least_squares(self):
+        slope, intercept = linear_trend([1, 3, 5, 7])
+        assert slope == pytest.approx(2)
+        assert intercept == pytest.approx(1)
+
+        predictions, slope = forecast_series([100, 110, 120], months_ahead=2)
+        assert predictions == pytest.approx([130, 140])
+
+    def test_moving_average_centered(self):
+        assert moving_average([3, 6, 9, 12]) == pytest.approx([4.5, 6, 9, 10.5])
+
+    def test_seasonality_requires_two_cycles(self):
+        assert seasonal_indices([100] * 23) is None
+
+        # Diciembre (posición 11) dobla la facturación cada año
+        values = [100] * 11 + [200] + [100] * 11 + [200]
+        indices = seasonal_indices(values)
+        assert indices[11] > 1.5 > indices[0]
+
+        flat, _ = forecast_series(values, months_ahead=12)
+        seasonal, _ = forecast_series(values, months_ahead=12, seasonal=True)
+        assert seasonal[11] > flat[11]
+
+
+@pytest.mark.django_db
+class TestMonthlyRevenue:
+
+    def test_orders_update_aggregate_incrementally(self):
+        from sales.models import GymMonthlyRevenue
+
+        gym = GymFactory()
+        order = _order(gym, Decimal('50.00'))
+        pending = _order(gym, Decimal('20.00'), status='PENDING')
+
+        row = GymMonthlyRevenue.objects.get(gym=gym)
+        assert (row.total_amount, row.orders_count) == (Decimal('50.00'), 1)
+
+        pending.status = 'PAID'
+        pending.save()
+        order.total_amount = Decimal('60.00')
+        order.save()
+        row.refresh_from_db()
+        assert (row.total_amount, row.orders_count) == (Decimal('80.00'), 2)
+
+        order.status = 'CANCELLED'
+        order.save()
+        pending.delete()
+        row.refresh_from_db()
+        assert (row.total_amount, row.orders_count) == (Decimal('0.00'), 0)
+
+    def test_rebuild_and_batch_forecast(self):
+        from backoffice.forecasting import forecast_gyms
+        from sales.models import GymMonthlyRevenue, Order
+        from sales.revenue import add_months, month_start, rebuild_months
+
+        gym, other = GymFactory(), GymFactory()
+        current = month_start(timezone.localdate())
+        for months_ago, amount in ((2, 100), (1, 200), (0, 300)):
+            order = _order(gym, Decimal(amount))
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.now().replace(day=15) - timedelta(days=31 * months_ago)
+            )
+        GymMonthlyRevenue.objects.all().delete()
+
+        assert rebuild_months([gym.id, other.id], add_months(current, -5), current) == 3
+
+        forecasts = forecast_gyms([gym, other], months_ahead=2)
+        assert forecasts[gym.id]['trend'] == 'CRECIENTE'
+        assert forecasts[gym.id]['historical_avg'] == 200
+        assert forecasts[gym.id]['historical_data_points'] == 6
+        assert forecasts[other.id]['trend'] == 'SIN DATOS'
@@ -0,0 +1,102 @@
+"""
+Tests for the churn-risk scoring engine (ClientRiskScore).
+
+Covers:
+- Scoring rules and levels
+- Full-population batched run (no 150-client cap) and stale score cleanup
+- Incremental rescoring and the dashboard reading the stored scores
+"""
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+
+from clients.risk_scoring import RiskScoringEngine, rescore_clients, risk_level, score_client
+from tests.factories import ClientFactory, ClientMembershipFactory, GymFactory, UserFactory
+
+
+def _order(client, status='PAID', days_ago=0):
+    from sales.models import Order
+
+    order = Order.objects.create(
+        gym=client.gym, client=client, created_by=UserFactory(), status=status, total_amount=Decimal('30.00')
+    )
+    if days_ago:
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+    return order
+
+
+class TestScoringRules:
+
+    def test_factors_and_points(self):
+        now = timezone.now()
+        score, factors = score_client(
+            pending_orders=4,
+            expiring_on=timezone.localdate() + timedelta(days=5),
+            has_user=True,
+            last_login=now - timedelta(days=55),
+            last_paid_at=None,
+            created_at=now - timedelta(days=10),
+            now=now,
+        )
+        points = {f['type']: f['points'] for f in factors}
+        assert points == {
+            'billing': 30, 'expiry': 20, 'app_inactive': 25, 'no_payment': 15, 'new_client': 10,
+        }
+        assert score == 100
+
+    def test_levels(self):
+        assert risk_level(75)['label'] == 'CRÍTICO'
+        assert risk_level(50)['code'] == 'HIGH'
+        assert risk_level(15)['code'] == 'LOW'
+        assert risk_level(14)['code'] == 'NONE'
+
+
+@pytest.mark.django_db
+class TestRiskScoringEngine:
+
+    def test_run_scores_every_active_client_in_batches(self):
+        from clients.models import ClientRiskScore
+
+        gym = GymFactory()
+        clients = ClientFactory.create_batch(7, gym=gym)
+        ClientFactory(gym=gym, status='LEAD')
+        _order(clients[0], status='PENDING')
+        _order(clients[1], days_ago=3)
+        ClientMembershipFactory(client=clients[2], end_date=timezone.localdate() + timedelta(days=3))
+
+        assert RiskScoringEngine(gym, batch_size=3).run() == 7
+        scores = {s.client_id: s for s in ClientRiskScore.objects.filter(gym=gym)}
+        assert set(scores) == {c.id for c in clients}
+
+        # Nuevo + sin pagos = 25; con venta pendiente suma 10; con pago reciente resta 15
+        assert scores[clients[3].id].score == 25
+        assert scores[clients[0].id].score == 35
+        assert scores[clients[1].id].score == 10
+        assert scores[clients[1].id].level == 'NONE'
+        assert {f['type'] for f in scores[clients[2].id].factors} >= {'expiry'}
+
+        # Un cliente que deja de estar activo pierde su puntuación en la siguiente pasada
+        clients[4].status = 'INACTIVE'
+        clients[4].save()
+        RiskScoringEngine(gym).run()
+        assert not ClientRiskScore.objects.filter(client=clients[4]).exists()
+
+    def test_incremental_rescore_and_dashboard(self):
+        from backoffice.dashboard_service import DashboardService
+        from clients.models import ClientRiskScore
+
+        gym = GymFactory()
+        client = ClientFactory(gym=gym)
+        RiskScoringEngine(gym).run()
+
+        _order(client, status='PENDING')
+        _order(client, status='PENDING')
+        assert rescore_clients([client.id]) == 1
+        assert ClientRiskScore.objects.get(client=client).score == 45
+
+        risk_clients = DashboardService(gym).get_risk_clients_enhanced()
+        assert [c['id'] for c in risk_clients] == [client.id]
+        assert risk_clients[0]['level'] == 'MEDIO'
+        assert risk_clients[0]['financial_factors'][0]['type'] == 'billing'
+        assert DashboardService(gym).get_risk_clients()[0]['level'] == 'MEDIUM'
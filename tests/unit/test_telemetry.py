@@ -0,0 +1,113 @@
+"""
+Tests for per-request telemetry and the /metrics endpoint.
+
+Covers:
+- RequestLoggingMiddleware context visible to RequestContextFilter (ContextVar)
+- DB query, cache and template counters recorded per resolved view
+- Prometheus text rendering and METRICS_TOKEN protection
+- Slow-request sampling with the top queries
+"""
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import resolve
+
+from core.logging import RequestContextFilter, RequestLoggingMiddleware, get_request_context
+from core.telemetry import registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def _request(path='/health/ping/'):
+    request = RequestFactory().get(path)
+    request.resolver_match = resolve(path)
+    return request
+
+
+def _view(request):
+    from django.contrib.auth import get_user_model
+
+    get_user_model().objects.count()
+    get_user_model().objects.count()
+    cache.set('telemetry-test', 1)
+    cache.get('telemetry-test')
+    cache.get('telemetry-missing')
+    html = engines['django'].from_string('{{ value }}').render({'value': 'ok'})
+    return HttpResponse(html)
+
+
+@pytest.mark.django_db
+def test_middleware_records_view_metrics():
+    response = RequestLoggingMiddleware(_view)(_request())
+
+    assert response['X-Request-ID']
+    metrics = registry.snapshot()['health:ping']
+    assert metrics.requests == 1
+    assert metrics.statuses == {('GET', 200): 1}
+    assert metrics.db_queries == 2
+    assert (metrics.cache_gets, metrics.cache_hits, metrics.cache_sets) == (2, 1, 1)
+    assert metrics.template_seconds > 0
+    assert metrics.buckets[-1] == 1
+
+    text = registry.render_prometheus()
+    assert 'crm_http_requests_total{view="health:ping"' in text
+    assert 'crm_http_request_duration_seconds_bucket{view="health:ping"' in text
+    assert 'le="+Inf"} 1' in text
+    assert 'crm_cache_hit_ratio{view="health:ping"' in text and '} 0.5000' in text
+
+
+def test_filter_reads_request_context():
+    seen = {}
+
+    def view(request):
+        record = logging.LogRecord('test', logging.INFO, __file__, 1, 'msg', (), None)
+        RequestContextFilter().filter(record)
+        seen['request_id'] = record.request_id
+        return HttpResponse()
+
+    request = _request()
+    request.META['HTTP_X_REQUEST_ID'] = 'abc123'
+    RequestLoggingMiddleware(view)(request)
+
+    assert seen['request_id'] == 'abc123'
+    # El contexto no se filtra fuera de la request
+    assert get_request_context() == {}
+    # Fuera de una request no hay un dict compartido que se pueda ensuciar
+    get_request_context()['request_id'] = 'leak'
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'msg', (), None)
+    RequestContextFilter().filter(record)
+    assert record.request_id == '-'
+
+
+@pytest.mark.django_db
+def test_slow_requests_log_top_queries(settings, caplog):
+    settings.TELEMETRY_SLOW_REQUEST_MS = 0
+
+    with caplog.at_level(logging.WARNING, logger='core.telemetry'):
+        RequestLoggingMiddleware(_view)(_request())
+
+    record = next(r for r in caplog.records if r.name == 'core.telemetry')
+    assert record.view == 'health:ping'
+    assert record.top_queries[0]['count'] == 2
+    assert registry.snapshot()['health:ping'].slow_requests == 1
+
+
+def test_metrics_endpoint_token(client, settings):
+    settings.METRICS_TOKEN = ''
+    assert client.get('/metrics').status_code == 404
+
+    settings.METRICS_TOKEN = 'secret'
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert b'# TYPE crm_http_request_duration_seconds histogram' in response.content
@@ -0,0 +1,94 @@
+"""
+Tests for the superadmin tenant metrics snapshots.
+
+Covers:
+- Per-gym snapshot (members, staff, MRR, emails, last activity) and fleet row
+- Superadmin gym list sorted and paginated from the snapshots
+- Manual refresh only redirects back to this site
+"""
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.utils import timezone
+
+from saas_billing.tenant_metrics import refresh_gym_metrics, snapshot_tenant_metrics
+from tests.factories import ClientFactory, GymFactory, StaffProfileFactory, SuperuserFactory
+
+
+def _subscription(gym, price_monthly, price_yearly, frequency='MONTHLY', status='ACTIVE'):
+    from saas_billing.models import GymSubscription, SubscriptionPlan
+
+    plan = SubscriptionPlan.objects.create(
+        name=f'Plan {gym.id}', price_monthly=price_monthly, price_yearly=price_yearly
+    )
+    return GymSubscription.objects.create(
+        gym=gym, plan=plan, status=status, billing_frequency=frequency,
+        current_period_start=date.today(), current_period_end=date.today() + timedelta(days=30),
+    )
+
+
+@pytest.mark.django_db
+class TestTenantMetrics:
+
+    def test_snapshot_per_gym_and_fleet(self):
+        from clients.models import ClientVisit
+        from saas_billing.models import GymEmailUsage, TenantMetricsSnapshot
+
+        big, small, empty = GymFactory(), GymFactory(), GymFactory()
+        ClientFactory.create_batch(3, gym=big)
+        ClientFactory(gym=big, status='INACTIVE')
+        visitor = ClientFactory(gym=small)
+        ClientVisit.objects.create(client=visitor, date=timezone.localdate() - timedelta(days=2))
+        StaffProfileFactory.create_batch(2, gym=big)
+        GymEmailUsage.objects.create(gym=big, date=timezone.localdate(), emails_sent=7)
+        _subscription(big, Decimal('49.00'), Decimal('490.00'))
+        _subscription(small, Decimal('29.00'), Decimal('240.00'), frequency='YEARLY')
+        _subscription(empty, Decimal('99.00'), Decimal('990.00'), status='SUSPENDED')
+
+        fleet = snapshot_tenant_metrics()
+
+        snapshots = {s.gym_id: s for s in TenantMetricsSnapshot.objects.all()}
+        assert (snapshots[big.id].members_active, snapshots[big.id].members_total) == (3, 4)
+        assert snapshots[big.id].staff_count == 2
+        assert snapshots[big.id].emails_today == snapshots[big.id].emails_month == 7
+        assert snapshots[small.id].mrr_contribution == Decimal('20.00')
+        assert snapshots[empty.id].mrr_contribution == 0
+        assert timezone.localdate(snapshots[small.id].last_activity_at) == visitor.visits.get().date
+        assert snapshots[empty.id].last_activity_at is None
+
+        assert (fleet.total_gyms, fleet.active_gyms, fleet.suspended_gyms) == (3, 2, 1)
+        assert fleet.mrr == Decimal('69.00')
+        assert fleet.members_active == 4
+        assert sum(item['count'] for item in fleet.plan_distribution) == 3
+
+        # Recalculo bajo demanda de un solo gimnasio
+        ClientFactory(gym=empty)
+        assert refresh_gym_metrics(empty).members_active == 1
+
+    def test_gym_list_sorted_and_paginated(self, client):
+        gyms = GymFactory.create_batch(3)
+        for i, gym in enumerate(gyms):
+            ClientFactory.create_batch(i, gym=gym)
+        snapshot_tenant_metrics()
+        GymFactory.create_batch(50)  # Sin snapshot todavía
+
+        client.force_login(SuperuserFactory())
+        response = client.get('/superadmin/gyms/', {'sort': 'members'})
+
+        assert response.status_code == 200
+        page = response.context['page_obj']
+        assert page.paginator.count == 53 and len(page.object_list) == 50
+        assert list(page.object_list[:3]) == [gyms[2], gyms[1], gyms[0]]
+        assert client.get('/superadmin/').status_code == 200
+
+    def test_refresh_redirect_stays_on_site(self, client, monkeypatch):
+        from saas_billing.tasks import snapshot_tenant_metrics_task
+
+        monkeypatch.setattr(snapshot_tenant_metrics_task, 'delay', lambda: True)
+        client.force_login(SuperuserFactory())
+
+        response = client.post('/superadmin/metrics/refresh/', {'next': '/superadmin/gyms/'})
+        assert response.url == '/superadmin/gyms/'
+        for next_url in ('https://evil.example.com/', '//evil.example.com/'):
+            response = client.post('/superadmin/metrics/refresh/', {'next': next_url})
+            assert response.url == '/superadmin/'
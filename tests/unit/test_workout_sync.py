@@ -0,0 +1,123 @@
+"""
+Tests for the batch workout sync API.
+
+Covers:
+- Offline workout (new, by sync_key) with all sets in one request
+- Idempotent retries and incremental totals on partial re-syncs
+- Access and validation errors (difficulty rating, non-finite weights)
+"""
+import pytest
+
+from routines.models import (
+    ClientRoutine, Exercise, ExerciseLog, RoutineDay, RoutineExercise, WorkoutLog, WorkoutRoutine,
+)
+from tests.factories import ClientWithUserFactory
+
+SYNC_URL = '/api/workout/sync/'
+
+
+@pytest.fixture
+def setup(db):
+    client = ClientWithUserFactory()
+    routine = WorkoutRoutine.objects.create(gym=client.gym, name='Fuerza')
+    day = RoutineDay.objects.create(routine=routine, name='Día A')
+    squat = Exercise.objects.create(gym=client.gym, name='Sentadilla')
+    bench = Exercise.objects.create(gym=client.gym, name='Press banca')
+    re_squat = RoutineExercise.objects.create(day=day, exercise=squat, order=1)
+    ClientRoutine.objects.create(client=client, routine=routine)
+    return client, day, re_squat, bench
+
+
+def _sets(prefix, *pairs):
+    return [{'id': f'{prefix}-{i}', 'reps': reps, 'weight': weight} for i, (reps, weight) in enumerate(pairs)]
+
+
+@pytest.mark.django_db
+class TestWorkoutSync:
+
+    def test_offline_workout_in_one_request(self, api_client, setup, django_assert_max_num_queries):
+        client, day, re_squat, bench = setup
+        api_client.force_authenticate(client.user)
+        payload = {
+            'sync_key': 'w-1',
+            'day_id': day.id,
+            'started_at': '2026-10-19T18:00:00+00:00',
+            'completed_at': '2026-10-19T19:05:00+00:00',
+            'difficulty_rating': 7,
+            'exercises': [
+                {'routine_exercise_id': re_squat.id, 'completed': True,
+                 'sets': _sets('sq', (10, 100), (8, 110))},
+                {'exercise_id': bench.id, 'sets': _sets('bp', (12, 60))},
+            ],
+        }
+
+        with django_assert_max_num_queries(20):
+            response = api_client.post(SYNC_URL, payload, format='json')
+
+        assert response.status_code == 200, response.data
+        assert response.data['created'] and response.data['completed']
+        workout = WorkoutLog.objects.get(sync_key='w-1')
+        assert (workout.total_sets, workout.total_reps, float(workout.total_volume)) == (3, 30, 1880 + 720)
+        assert workout.duration_minutes == 65
+        squat_log = ExerciseLog.objects.get(workout_log=workout, routine_exercise=re_squat)
+        assert (squat_log.sets_completed, float(squat_log.max_weight), squat_log.completed) == (2, 110, True)
+
+        # Reintento del mismo lote: nada se duplica
+        retry = api_client.post(SYNC_URL, payload, format='json')
+        assert retry.status_code == 200
+        assert (retry.data['created'], retry.data['sets_added'], retry.data['duplicates_skipped']) == (False, 0, 3)
+        assert WorkoutLog.objects.filter(client=client).count() == 1
+        assert ExerciseLog.objects.filter(workout_log=workout).count() == 2
+
+    def test_incremental_sync_of_existing_workout(self, api_client, setup):
+        client, day, re_squat, bench = setup
+        api_client.force_authenticate(client.user)
+        workout = WorkoutLog.objects.create(client=client, routine=day.routine, routine_day=day)
+        log = ExerciseLog.objects.create(
+            workout_log=workout, exercise=re_squat.exercise, routine_exercise=re_squat,
+            sets_data=[{'id': 'sq-0', 'reps': 10, 'weight': 100}],
+        )
+        WorkoutLog.objects.filter(pk=workout.pk).update(total_sets=1, total_reps=10, total_volume=1000)
+
+        response = api_client.post(SYNC_URL, {
+            'workout_id': workout.id,
+            'exercises': [{'exercise_log_id': log.id, 'sets': _sets('sq', (10, 100), (6, 120))}],
+        }, format='json')
+
+        assert response.status_code == 200
+        assert response.data['sets_added'] == 1 and response.data['duplicates_skipped'] == 1
+        assert response.data['totals'] == {
+            'total_sets': 2, 'total_reps': 16, 'total_volume': 1720.0, 'duration_minutes': 0,
+        }
+        log.refresh_from_db()
+        assert (log.sets_completed, log.total_reps, float(log.max_weight)) == (2, 16, 120)
+
+    def test_errors(self, api_client, setup):
+        client, day, re_squat, bench = setup
+        other = ClientWithUserFactory()
+        api_client.force_authenticate(other.user)
+
+        assert api_client.post(SYNC_URL, {'exercises': []}, format='json').status_code == 400
+        # Rutina no asignada
+        denied = api_client.post(SYNC_URL, {'sync_key': 'x', 'day_id': day.id}, format='json')
+        assert denied.status_code == 403
+        # Ejercicio de otro gimnasio
+        foreign = api_client.post(SYNC_URL, {
+            'sync_key': 'y', 'exercises': [{'exercise_id': bench.id, 'sets': _sets('b', (5, 50))}],
+        }, format='json')
+        assert foreign.status_code == 404
+        assert not WorkoutLog.objects.filter(client=other).exists()
+
+        # Valores fuera de rango o no numéricos: 400, sin crear nada
+        api_client.force_authenticate(client.user)
+        for bad, error in (
+            ({'difficulty_rating': 'alta'}, 'difficulty_rating'),
+            ({'difficulty_rating': 11}, 'difficulty_rating'),
+            ({'exercises': [{'routine_exercise_id': re_squat.id, 'sets': [{'id': 'n', 'reps': 5, 'weight': 'nan'}]}]}, 'Serie'),
+            ({'exercises': [{'routine_exercise_id': re_squat.id, 'sets': [{'id': 'i', 'reps': 5, 'weight': 'inf'}]}]}, 'Serie'),
+        ):
+            response = api_client.post(SYNC_URL, {
+                'sync_key': 'z', 'day_id': day.id, 'completed_at': '2026-10-19T19:30:00Z', **bad,
+            }, format='json')
+            assert response.status_code == 400 and response.json()['error'].startswith(error)
+        assert not WorkoutLog.objects.filter(sync_key='z').exists()